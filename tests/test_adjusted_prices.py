@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+复权价格计算测试
+验证向量化的前复权结果与原逐行实现一致，并测试后复权、多股票分组和性能
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def _make_daily_data(ts_code="000001.SZ", days=250, seed=0):
+    """生成模拟的Tushare日线数据（倒序返回，与接口一致）"""
+    rng = np.random.default_rng(seed)
+    pct_chg = np.round(rng.normal(0, 2, days), 2)
+    close = np.round(10 * np.cumprod(1 + pct_chg / 100), 2)
+    # 模拟除权日价格跳跃
+    close[days // 2:] = np.round(close[days // 2:] * 0.8, 2)
+    dates = pd.bdate_range("2005-01-04", periods=days)
+    data = pd.DataFrame({
+        "ts_code": ts_code,
+        "trade_date": dates,
+        "open": close * 0.99,
+        "high": close * 1.02,
+        "low": close * 0.98,
+        "close": close,
+        "pct_chg": pct_chg,
+    })
+    return data.iloc[::-1].reset_index(drop=True)
+
+
+def _reference_forward_adjust(data):
+    """原逐行实现（insert(0, ...) + iloc），作为对照"""
+    adjusted_data = data.copy().sort_values('trade_date').reset_index(drop=True)
+    for col in ('close', 'open', 'high', 'low'):
+        adjusted_data[f'{col}_raw'] = adjusted_data[col].copy()
+
+    adjusted_closes = [float(adjusted_data.iloc[-1]['close'])]
+    for i in range(len(adjusted_data) - 2, -1, -1):
+        pct_change = float(adjusted_data.iloc[i + 1]['pct_chg']) / 100.0
+        adjusted_closes.insert(0, adjusted_closes[0] / (1 + pct_change))
+    adjusted_data['close'] = adjusted_closes
+
+    for i in range(len(adjusted_data)):
+        if adjusted_data.iloc[i]['close_raw'] != 0:
+            ratio = adjusted_data.iloc[i]['close'] / adjusted_data.iloc[i]['close_raw']
+            for col in ('open', 'high', 'low'):
+                adjusted_data.iloc[i, adjusted_data.columns.get_loc(col)] = adjusted_data.iloc[i][f'{col}_raw'] * ratio
+
+    adjusted_data['price_type'] = 'forward_adjusted'
+    return adjusted_data
+
+
+def test_forward_adjust_equivalence():
+    """测试前复权结果与原实现一致"""
+    print("🧪 测试前复权结果一致性...")
+
+    from tradingagents.dataflows.tushare_utils import calculate_adjusted_prices
+
+    data = _make_daily_data()
+    expected = _reference_forward_adjust(data)
+    actual = calculate_adjusted_prices(data, adjust='forward')
+
+    assert list(actual.columns) == list(expected.columns), f"{list(actual.columns)} != {list(expected.columns)}"
+    for col in ('open', 'high', 'low', 'close', 'close_raw', 'open_raw', 'high_raw', 'low_raw'):
+        assert np.allclose(actual[col], expected[col], rtol=1e-9), f"{col} 不一致"
+    assert (actual['price_type'] == 'forward_adjusted').all()
+    assert actual['close'].iloc[-1] == data.sort_values('trade_date')['close'].iloc[-1]
+    print("  ✅ 前复权各列与原实现一致")
+
+
+def test_backward_and_grouped_adjust():
+    """测试后复权和多股票分组计算"""
+    print("\n🧪 测试后复权和分组计算...")
+
+    from tradingagents.dataflows.tushare_utils import calculate_adjusted_prices
+
+    data_a = _make_daily_data("000001.SZ", seed=1)
+    data_b = _make_daily_data("600036.SH", days=180, seed=2)
+
+    backward = calculate_adjusted_prices(data_a, adjust='backward')
+    assert backward['close'].iloc[0] == backward['close_raw'].iloc[0]
+    assert (backward['price_type'] == 'backward_adjusted').all()
+    # 后复权与前复权只差一个常数比例
+    forward = calculate_adjusted_prices(data_a, adjust='forward')
+    ratio = backward['close'] / forward['close']
+    assert np.allclose(ratio, ratio.iloc[0])
+
+    combined = pd.concat([data_a, data_b], ignore_index=True).sample(frac=1, random_state=0)
+    grouped = calculate_adjusted_prices(combined, adjust='forward', group_column='ts_code')
+    for ts_code, single in (("000001.SZ", data_a), ("600036.SH", data_b)):
+        expected = calculate_adjusted_prices(single, adjust='forward')
+        actual = grouped[grouped['ts_code'] == ts_code].reset_index(drop=True)
+        assert np.allclose(actual['close'], expected['close'], rtol=1e-12), f"{ts_code} 分组结果不一致"
+    print("  ✅ 后复权和分组计算正确")
+
+
+def benchmark_forward_adjust():
+    """对比20年日线数据上的逐行实现与向量化实现"""
+    print("\n⚡ 前复权性能对比...")
+
+    from tradingagents.dataflows.tushare_utils import calculate_adjusted_prices
+
+    data = _make_daily_data(days=252 * 20)
+
+    start = time.time()
+    _reference_forward_adjust(data)
+    loop_time = time.time() - start
+
+    start = time.time()
+    calculate_adjusted_prices(data, adjust='forward')
+    vectorized_time = time.time() - start
+
+    print(f"  📊 逐行实现: {loop_time:.3f}秒")
+    print(f"  📊 向量化实现: {vectorized_time:.3f}秒")
+    if vectorized_time > 0:
+        print(f"  🚀 提速: {loop_time / vectorized_time:.1f}x")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 复权价格计算测试")
+    print("=" * 50)
+
+    test_results = [
+        ("前复权一致性", _run_test(test_forward_adjust_equivalence)),
+        ("后复权与分组", _run_test(test_backward_and_grouped_adjust)),
+        ("性能对比", _run_test(benchmark_forward_adjust)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
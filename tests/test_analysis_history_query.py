@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+分析历史查询下推测试
+验证本地历史目录在SQLite中完成过滤、排序和分页、未变化的分析不再读取文件、报告正文按需读取，
+以及MongoDB查询只返回摘要字段并把排序分页交给数据库
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+STOCKS = ["000001", "600036", "AAPL"]
+DATES = ["2025-01-02", "2025-01-03", "2025-01-06", "2025-01-07"]
+
+
+def _write_detailed(detailed_dir, stock, date_str, analysts):
+    date_dir = os.path.join(detailed_dir, stock, date_str)
+    os.makedirs(os.path.join(date_dir, "reports"))
+    with open(os.path.join(date_dir, "reports", "final_trade_decision.md"), "w", encoding="utf-8") as f:
+        f.write(f"# {stock} 最终决策\n\n**建议：持有**，" + "估值合理。" * 100)
+    with open(os.path.join(date_dir, "reports", "market_report.md"), "w", encoding="utf-8") as f:
+        f.write(f"{stock} 市场分析")
+    with open(os.path.join(date_dir, "analysis_metadata.json"), "w", encoding="utf-8") as f:
+        json.dump({"analysts": analysts, "research_depth": 2}, f)
+
+
+def _build_tree(tmp_dir):
+    web_dir = os.path.join(tmp_dir, "web_results")
+    detailed_dir = os.path.join(tmp_dir, "detailed")
+    os.makedirs(web_dir)
+    for i, stock in enumerate(STOCKS):
+        for j, date_str in enumerate(DATES):
+            analysts = ["market", "news"] if (i + j) % 2 else ["market", "fundamentals"]
+            _write_detailed(detailed_dir, stock, date_str, analysts)
+
+    # Web界面保存的结果
+    with open(os.path.join(web_dir, "analysis_web_1.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "analysis_id": "web_1", "timestamp": datetime(2025, 1, 8, 10).timestamp(),
+            "stock_symbol": "000858", "analysts": ["market"], "research_depth": 3,
+            "status": "completed", "summary": "白酒龙头", "performance": {},
+            "full_data": {"final_trade_decision": "买入"},
+        }, f, ensure_ascii=False)
+    with open(os.path.join(web_dir, "favorites.json"), "w") as f:
+        json.dump(["web_1"], f)
+    return web_dir, detailed_dir
+
+
+def test_catalog_filters_and_pagination():
+    """测试本地目录中的过滤、排序和分页"""
+    print("🧪 测试本地历史目录查询...")
+
+    from web.utils.analysis_history_catalog import AnalysisHistoryCatalog
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        web_dir, detailed_dir = _build_tree(tmp_dir)
+        catalog = AnalysisHistoryCatalog(os.path.join(tmp_dir, "catalog.db"), web_dir, detailed_dir)
+
+        everything = catalog.query(limit=100)
+        assert len(everything) == len(STOCKS) * len(DATES) + 1
+        timestamps = [r["timestamp"] for r in everything]
+        assert timestamps == sorted(timestamps, reverse=True)
+        assert everything[0]["analysis_id"] == "web_1"
+        assert all("reports" not in r and "full_data" not in r for r in everything)
+
+        page1 = catalog.query(limit=5)
+        page2 = catalog.query(skip=5, limit=5)
+        assert [r["analysis_id"] for r in page1 + page2] == [r["analysis_id"] for r in everything[:10]]
+
+        ranged = catalog.query(start_date=date(2025, 1, 3), end_date=date(2025, 1, 6))
+        assert len(ranged) == 2 * len(STOCKS)
+
+        assert {r["stock_symbol"] for r in catalog.query(stock_symbol="aap")} == {"AAPL"}
+        news = catalog.query(analyst_type="news")
+        assert news and all("news" in r["analysts"] for r in news)
+        assert len(news) == len(everything) // 2
+        assert [r["analysis_id"] for r in catalog.query(search_text="白酒")] == ["web_1"]
+        assert [r["analysis_id"] for r in catalog.query(analysis_ids=["web_1"])] == ["web_1"]
+        assert catalog.query(analysis_ids=[]) == []
+    print(f"  ✅ {len(everything)} 条分析的过滤、排序和分页正确")
+
+
+def test_catalog_incremental_refresh_and_lazy_bodies():
+    """测试未变化的分析不再读取文件，新增/删除被同步，报告正文按需读取"""
+    print("\n🧪 测试增量刷新与按需读取正文...")
+
+    import shutil
+    from web.utils.analysis_history_catalog import AnalysisHistoryCatalog
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        web_dir, detailed_dir = _build_tree(tmp_dir)
+        db_path = os.path.join(tmp_dir, "catalog.db")
+        catalog = AnalysisHistoryCatalog(db_path, web_dir, detailed_dir, refresh_interval=0)
+
+        first = catalog.refresh(force=True)
+        assert first["indexed"] == len(STOCKS) * len(DATES) + 1, first
+
+        # 新进程打开同一个目录文件，没有任何变化时不读取分析文件
+        reopened = AnalysisHistoryCatalog(db_path, web_dir, detailed_dir, refresh_interval=0)
+        assert reopened.refresh(force=True) == {"indexed": 0, "removed": 0}
+
+        time.sleep(0.01)
+        _write_detailed(detailed_dir, "000001", "2025-01-08", ["market"])
+        shutil.rmtree(os.path.join(detailed_dir, "AAPL", "2025-01-02"))
+        assert reopened.refresh(force=True) == {"indexed": 1, "removed": 1}
+
+        latest = reopened.query(stock_symbol="000001", limit=1)[0]
+        assert latest["analysis_id"].startswith("000001_2025-01-08")
+        assert latest["summary"].startswith("000001 最终决策")
+
+        detail = reopened.load_report_detail(latest["analysis_id"])
+        assert set(detail["reports"]) == {"final_trade_decision", "market_report"}
+        assert reopened.load_report_detail("web_1") == {"full_data": {"final_trade_decision": "买入"}}
+    print("  ✅ 未变化的分析不再读取，新增和删除均被同步")
+
+
+class FakeCursor:
+    def __init__(self, docs, calls):
+        self.docs = docs
+        self.calls = calls
+
+    def sort(self, key, direction):
+        self.calls.append(("sort", key, direction))
+        return self
+
+    def skip(self, n):
+        self.calls.append(("skip", n))
+        return self
+
+    def limit(self, n):
+        self.calls.append(("limit", n))
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+    """记录查询参数的集合"""
+
+    def __init__(self):
+        self.calls = []
+
+    def find(self, query, projection=None):
+        self.calls.append(("find", query, projection))
+        doc = {"analysis_id": "600036_20250102_100000", "timestamp": datetime(2025, 1, 2, 10),
+               "stock_symbol": "600036", "analysts": ["market"], "summary": "持有"}
+        return FakeCursor([doc], self.calls)
+
+    def find_one(self, query, projection=None):
+        self.calls.append(("find_one", query, projection))
+        return {"reports": {"market_report": "市场分析"}}
+
+
+def test_mongodb_query_pushdown():
+    """测试MongoDB查询条件、摘要投影、排序和分页都交给数据库"""
+    print("\n🧪 测试MongoDB查询下推...")
+
+    from web.utils.mongodb_report_manager import MongoDBReportManager
+
+    manager = MongoDBReportManager.__new__(MongoDBReportManager)
+    manager.connected = True
+    manager.collection = FakeCollection()
+
+    results = manager.query_reports(start_date=date(2025, 1, 2), end_date=date(2025, 1, 3),
+                                    stock_symbol="6000", analyst_type="market", search_text="持有",
+                                    analysis_ids={"600036_20250102_100000"}, skip=20, limit=10)
+    _, query, projection = manager.collection.calls[0]
+    assert query["timestamp"] == {"$gte": datetime(2025, 1, 2), "$lt": datetime(2025, 1, 4)}
+    assert query["stock_symbol"] == {"$regex": "^6000"}
+    assert query["analysts"] == "market"
+    assert query["analysis_id"] == {"$in": ["600036_20250102_100000"]}
+    assert len(query["$or"]) == 3
+    assert projection.get("reports") is None and projection["summary"] == 1
+    assert manager.collection.calls[1:] == [("sort", "timestamp", -1), ("skip", 20), ("limit", 10)]
+    assert results[0]["source"] == "mongodb" and "reports" not in results[0]
+
+    assert manager.query_reports(analysis_ids=[]) == []
+    assert manager.get_report_bodies("600036_20250102_100000") == {"market_report": "市场分析"}
+    assert manager.collection.calls[-1][2] == {"_id": 0, "reports": 1}
+    assert manager.get_report_bodies_batch([]) == {}
+    assert manager.get_report_bodies_batch(["600036_20250102_100000"]) == {"600036_20250102_100000": {}}
+    assert manager.collection.calls[-1][1:] == ({"analysis_id": {"$in": ["600036_20250102_100000"]}},
+                                                {"_id": 0, "analysis_id": 1, "reports": 1})
+    print("  ✅ 过滤、投影、排序和分页均下推到MongoDB")
+
+
+def test_full_export_loads_bodies():
+    """测试导出完整数据时批量读取报告正文"""
+    print("\n🧪 测试完整数据导出读取正文...")
+
+    import importlib.util
+    if importlib.util.find_spec("streamlit") is None:
+        print("⚠️ 未安装streamlit，跳过完整数据导出测试")
+        return
+
+    import pytest
+    from types import SimpleNamespace
+    from web.components import analysis_results
+    from web.utils import analysis_history_catalog
+    from web.utils.analysis_history_catalog import AnalysisHistoryCatalog
+    from web.utils.mongodb_report_manager import MongoDBReportManager
+
+    class BatchCollection:
+        def __init__(self):
+            self.calls = []
+
+        def find(self, query, projection=None):
+            self.calls.append((query, projection))
+            return iter([{"analysis_id": "mongo_1", "reports": {"market_report": "市场分析"}}])
+
+    manager = MongoDBReportManager.__new__(MongoDBReportManager)
+    manager.connected = True
+    manager.collection = BatchCollection()
+
+    with tempfile.TemporaryDirectory() as tmp_dir, pytest.MonkeyPatch.context() as monkeypatch:
+        web_dir, detailed_dir = _build_tree(tmp_dir)
+        catalog = AnalysisHistoryCatalog(os.path.join(tmp_dir, "catalog.db"), web_dir, detailed_dir)
+        monkeypatch.setattr(analysis_history_catalog, "get_history_catalog", lambda: catalog)
+        monkeypatch.setattr(analysis_results, "get_mongodb_manager", lambda: manager)
+        monkeypatch.setattr(analysis_results, "st", SimpleNamespace(session_state={}))
+
+        results = catalog.query(stock_symbol="000858") + catalog.query(stock_symbol="AAPL", limit=1) + [
+            {"analysis_id": "mongo_1", "source": "mongodb", "summary": "持有"},
+            {"analysis_id": "mongo_2", "source": "mongodb", "summary": "买入"},
+        ]
+        full = analysis_results.load_report_details(results)
+
+        assert full[0]["full_data"] == {"final_trade_decision": "买入"}
+        assert "market_report" in full[1]["reports"] and "最终决策" in full[1]["reports"]["final_trade_decision"]
+        assert full[2]["reports"] == {"market_report": "市场分析"} and full[3]["reports"] == {}
+        # MongoDB 记录一次查询读取；列表中的摘要结果保持不变
+        assert manager.collection.calls == [({"analysis_id": {"$in": ["mongo_1", "mongo_2"]}},
+                                             {"_id": 0, "analysis_id": 1, "reports": 1})]
+        assert all("reports" not in r and "full_data" not in r for r in results)
+        json.dumps(full, ensure_ascii=False)
+    print("  ✅ 导出数据包含报告正文，MongoDB 批量读取")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 分析历史查询下推测试")
+    print("=" * 50)
+
+    test_results = [
+        ("本地目录过滤分页", _run_test(test_catalog_filters_and_pagination)),
+        ("增量刷新与按需正文", _run_test(test_catalog_incremental_refresh_and_lazy_bodies)),
+        ("MongoDB查询下推", _run_test(test_mongodb_query_pushdown)),
+        ("完整数据导出", _run_test(test_full_export_loads_bodies)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+LLM适配器异步生成测试
+使用假的 DashScope 异步接口和 httpx MockTransport，验证多个请求在同一个事件循环中并发、
+token使用量照常记录，以及任务取消能中断请求
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+REQUEST_DELAY = 0.2
+CONCURRENCY = 10
+
+
+class FakeTracker:
+    """记录track_usage调用的假TokenTracker"""
+
+    def __init__(self):
+        self.calls = []
+
+    def track_usage(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(cost=0.001, **kwargs)
+
+
+class FakeAioGeneration:
+    """模拟 dashscope.AioGeneration：等待固定时间后返回响应"""
+
+    started = 0
+
+    @classmethod
+    async def call(cls, **params):
+        cls.started += 1
+        await asyncio.sleep(REQUEST_DELAY)
+        content = f"回复: {params['messages'][-1]['content']}"
+        return SimpleNamespace(
+            status_code=200,
+            output=SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))]),
+            usage=SimpleNamespace(input_tokens=120, output_tokens=80),
+        )
+
+
+async def _openai_handler(request):
+    """模拟 OpenAI 兼容的 /chat/completions 接口"""
+    await asyncio.sleep(REQUEST_DELAY)
+    body = json.loads(request.content)
+    return httpx.Response(200, json={
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body["model"],
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": f"回复: {body['messages'][-1]['content']}"},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 50, "total_tokens": 150},
+    })
+
+
+def _mock_async_client():
+    return httpx.AsyncClient(transport=httpx.MockTransport(_openai_handler))
+
+
+def test_dashscope_async_concurrency():
+    """测试 ChatDashScope 的异步请求在同一事件循环中并发执行并记录token"""
+    print("🧪 测试 ChatDashScope 异步并发...")
+
+    from tradingagents.llm_adapters import dashscope_adapter
+
+    tracker = FakeTracker()
+    original = (dashscope_adapter.AioGeneration, dashscope_adapter.token_tracker)
+    dashscope_adapter.AioGeneration, dashscope_adapter.token_tracker = FakeAioGeneration, tracker
+    try:
+        llm = dashscope_adapter.ChatDashScope(model="qwen-turbo", api_key="test")
+
+        async def run():
+            return await asyncio.gather(*[llm.ainvoke(f"问题{i}") for i in range(CONCURRENCY)])
+
+        start = time.time()
+        responses = asyncio.run(run())
+        elapsed = time.time() - start
+    finally:
+        dashscope_adapter.AioGeneration, dashscope_adapter.token_tracker = original
+
+    assert [r.content for r in responses] == [f"回复: 问题{i}" for i in range(CONCURRENCY)]
+    assert elapsed < REQUEST_DELAY * 3, f"{elapsed:.2f}s"
+    assert len(tracker.calls) == CONCURRENCY
+    assert tracker.calls[0]["input_tokens"] == 120 and tracker.calls[0]["provider"] == "dashscope"
+    print(f"  ✅ {CONCURRENCY}个请求耗时 {elapsed:.2f}秒（单个请求 {REQUEST_DELAY}秒）")
+
+
+def test_dashscope_async_cancellation():
+    """测试取消任务时请求被中断，且不记录token"""
+    print("\n🧪 测试 ChatDashScope 异步取消...")
+
+    from tradingagents.llm_adapters import dashscope_adapter
+
+    tracker = FakeTracker()
+    original = (dashscope_adapter.AioGeneration, dashscope_adapter.token_tracker)
+    dashscope_adapter.AioGeneration, dashscope_adapter.token_tracker = FakeAioGeneration, tracker
+    try:
+        llm = dashscope_adapter.ChatDashScope(model="qwen-turbo", api_key="test")
+
+        async def run():
+            task = asyncio.create_task(llm.ainvoke("会被取消的问题"))
+            await asyncio.sleep(REQUEST_DELAY / 4)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return True
+            return False
+
+        cancelled = asyncio.run(run())
+    finally:
+        dashscope_adapter.AioGeneration, dashscope_adapter.token_tracker = original
+
+    assert cancelled and tracker.calls == []
+    print("  ✅ 取消后抛出 CancelledError，未记录token")
+
+
+def test_openai_compatible_async_concurrency():
+    """测试 ChatDeepSeek 与 OpenAI 兼容适配器的异步请求并发执行并记录token"""
+    print("\n🧪 测试 OpenAI 兼容适配器异步并发...")
+
+    from tradingagents.llm_adapters import deepseek_adapter
+    from tradingagents.llm_adapters.openai_compatible_base import ChatDashScopeOpenAIUnified
+
+    tracker = FakeTracker()
+    original = deepseek_adapter.token_tracker
+    deepseek_adapter.token_tracker = tracker
+    try:
+        deepseek = deepseek_adapter.ChatDeepSeek(api_key="test", http_async_client=_mock_async_client())
+        unified = ChatDashScopeOpenAIUnified(api_key="test", http_async_client=_mock_async_client())
+
+        async def run():
+            calls = [deepseek.ainvoke(f"问题{i}", session_id="async-session") for i in range(CONCURRENCY)]
+            calls += [unified.ainvoke(f"问题{i}") for i in range(CONCURRENCY)]
+            return await asyncio.gather(*calls)
+
+        start = time.time()
+        responses = asyncio.run(run())
+        elapsed = time.time() - start
+    finally:
+        deepseek_adapter.token_tracker = original
+
+    assert [r.content for r in responses[:CONCURRENCY]] == [f"回复: 问题{i}" for i in range(CONCURRENCY)]
+    assert responses[-1].content == f"回复: 问题{CONCURRENCY - 1}"
+    assert elapsed < REQUEST_DELAY * 3, f"{elapsed:.2f}s"
+    assert len(tracker.calls) == CONCURRENCY
+    assert tracker.calls[0]["session_id"] == "async-session" and tracker.calls[0]["input_tokens"] == 100
+    print(f"  ✅ {CONCURRENCY * 2}个请求耗时 {elapsed:.2f}秒，DeepSeek记录 {len(tracker.calls)} 次token使用")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 LLM适配器异步生成测试")
+    print("=" * 50)
+
+    test_results = [
+        ("DashScope异步并发", _run_test(test_dashscope_async_concurrency)),
+        ("DashScope异步取消", _run_test(test_dashscope_async_cancellation)),
+        ("OpenAI兼容异步并发", _run_test(test_openai_compatible_async_concurrency)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
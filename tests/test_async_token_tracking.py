@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+异步Token跟踪测试
+验证track_usage不等待存储写入、批量写入、队列满时的背压与丢弃计数、关闭时写完剩余记录、成本警告，
+以及MongoDB部分写入失败时只回退未写入的记录
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+class SlowStorage:
+    """模拟每次写入耗时固定的存储，记录每批的大小"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def save_usage_batch(self, records):
+        time.sleep(self.delay)
+        with self.lock:
+            self.batches.append(len(records))
+
+
+def _make_tracker(tmp_dir, delay):
+    from tradingagents.config.config_manager import ConfigManager, TokenTracker
+
+    manager = ConfigManager(tmp_dir)
+    storage = SlowStorage(delay)
+    manager.save_usage_batch = storage.save_usage_batch
+    tracker = TokenTracker(manager, async_writes=True)
+    return manager, tracker, storage
+
+
+def test_track_usage_does_not_wait_for_storage():
+    """测试存储很慢时track_usage仍立即返回，记录被批量写入"""
+    print("🧪 测试非阻塞记录...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager, tracker, storage = _make_tracker(tmp_dir, delay=0.05)
+
+        start = time.time()
+        for i in range(100):
+            record = tracker.track_usage("dashscope", "qwen-turbo", 1000, 500, session_id="s1")
+            assert record is not None and record.cost > 0
+        elapsed = time.time() - start
+
+        assert tracker.flush(timeout=10)
+        metrics = tracker.get_pipeline_metrics()
+        assert sum(storage.batches) == 100 and metrics['written'] == 100, (storage.batches, metrics)
+        assert len(storage.batches) < 100, storage.batches
+        assert elapsed < 0.05 * 100 / 4, f"{elapsed:.2f}s"
+        tracker.usage_writer.close()
+        manager.usage_ledger.close()
+    print(f"  ✅ 100次记录耗时 {elapsed:.3f}秒，分 {len(storage.batches)} 批写入")
+
+
+def test_backpressure_and_drops():
+    """测试队列满时短暂等待后丢弃，并记录指标"""
+    print("\n🧪 测试背压与丢弃计数...")
+
+    from tradingagents.config.usage_writer import AsyncUsageWriter
+
+    storage = SlowStorage(0.5)
+    writer = AsyncUsageWriter(storage.save_usage_batch, max_queue_size=5, batch_size=5, block_timeout=0.01)
+
+    results = [writer.submit(i) for i in range(30)]
+    metrics = writer.get_metrics()
+    assert metrics['dropped'] > 0 and metrics['backpressure_waits'] >= metrics['dropped'], metrics
+    assert metrics['dropped'] == results.count(False)
+    assert metrics['max_queue_depth'] <= 5
+
+    writer.close()
+    metrics = writer.get_metrics()
+    assert metrics['written'] == results.count(True) == sum(storage.batches), metrics
+    assert metrics['pending'] == 0 and metrics['queue_depth'] == 0
+    print(f"  ✅ 接收 {results.count(True)} 条，丢弃 {results.count(False)} 条")
+
+
+def test_end_to_end_with_ledger_and_alert():
+    """测试写入本地账本、关闭时写完剩余记录，并在超过阈值时发出成本警告"""
+    print("\n🧪 测试写入账本与成本警告...")
+
+    from tradingagents.config.config_manager import ConfigManager, TokenTracker
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = ConfigManager(tmp_dir)
+        settings = manager.load_settings()
+        settings["cost_alert_threshold"] = 0.01
+        manager.save_settings(settings)
+
+        tracker = TokenTracker(manager, async_writes=True)
+        alerts = []
+        original_check = tracker._check_cost_alert
+        tracker._check_cost_alert = lambda cost: (alerts.append(cost), original_check(cost))
+
+        for i in range(20):
+            tracker.track_usage("dashscope", "qwen-turbo", 2000, 1000, session_id="session-a")
+
+        # get_session_cost 会先等待队列写完
+        session_cost = tracker.get_session_cost("session-a")
+        assert session_cost > 0.01 and alerts, (session_cost, alerts)
+        assert manager.get_usage_statistics(1)["total_requests"] == 20
+
+        tracker.track_usage("dashscope", "qwen-turbo", 2000, 1000, session_id="session-a")
+        tracker.usage_writer.close()
+        assert len(manager.load_usage_records()) == 21
+        manager.usage_ledger.close()
+    print(f"  ✅ 会话成本 ¥{session_cost:.4f}，成本警告检查 {len(alerts)} 次")
+
+
+class FlakyCollection:
+    """模拟部分写入失败的MongoDB集合：fail_indexes 中的文档写入失败，disconnect_after 条后连接中断"""
+
+    def __init__(self, fail_indexes=(), disconnect_after=None):
+        self.fail_indexes = set(fail_indexes)
+        self.disconnect_after = disconnect_after
+        self.documents = {}
+
+    def insert_many(self, documents, ordered=True):
+        from bson import ObjectId
+        from pymongo.errors import AutoReconnect, BulkWriteError
+
+        for document in documents:
+            document.setdefault('_id', ObjectId())
+        write_errors = []
+        for index, document in enumerate(documents):
+            if self.disconnect_after is not None and index >= self.disconnect_after:
+                raise AutoReconnect("connection reset")
+            if index in self.fail_indexes:
+                write_errors.append({'index': index, 'code': 121, 'errmsg': 'Document failed validation'})
+            else:
+                self.documents[document['_id']] = document
+        if write_errors:
+            raise BulkWriteError({'writeErrors': write_errors, 'nInserted': len(documents) - len(write_errors)})
+
+    def find(self, query, projection=None):
+        return [{'_id': _id} for _id in query['_id']['$in'] if _id in self.documents]
+
+
+def test_partial_mongodb_failure_not_double_counted():
+    """测试MongoDB批量写入部分失败时，只有未写入的记录回退到本地账本"""
+    print("\n🧪 测试MongoDB部分写入失败...")
+
+    from tradingagents.config.config_manager import ConfigManager
+    from tradingagents.config.mongodb_storage import MongoDBStorage
+
+    for collection, expected_fallback in ((FlakyCollection(fail_indexes=[1, 3]), 2),
+                                          (FlakyCollection(disconnect_after=3), 2)):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manager = ConfigManager(tmp_dir)
+            storage = MongoDBStorage.__new__(MongoDBStorage)
+            storage._connected = True
+            storage.collection = collection
+            manager.mongodb_storage = storage
+
+            records = [manager.build_usage_record("dashscope", "qwen-turbo", 1000, 500, session_id=f"s{i}")
+                       for i in range(5)]
+            manager.save_usage_batch(records)
+            manager.usage_ledger.flush()
+
+            fallback = manager.usage_ledger.load_records()
+            assert len(collection.documents) + len(fallback) == len(records), (collection.documents, fallback)
+            assert len(fallback) == expected_fallback, fallback
+            saved_sessions = {document['session_id'] for document in collection.documents.values()}
+            assert saved_sessions.isdisjoint(record['session_id'] for record in fallback)
+            manager.usage_ledger.close()
+    print("  ✅ 部分失败和连接中断时都只回退未写入的记录")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 异步Token跟踪测试")
+    print("=" * 50)
+
+    test_results = [
+        ("非阻塞记录", _run_test(test_track_usage_does_not_wait_for_storage)),
+        ("背压与丢弃", _run_test(test_backpressure_and_drops)),
+        ("账本与成本警告", _run_test(test_end_to_end_with_ledger_and_alert)),
+        ("MongoDB部分写入失败", _run_test(test_partial_mongodb_failure_not_double_counted)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
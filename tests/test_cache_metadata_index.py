@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+缓存元数据索引测试
+验证部分匹配查找走SQLite索引、已有元数据文件的一次性迁移，以及查找性能
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def test_partial_match_uses_index():
+    """测试未精确命中时通过索引找到同一股票的其他缓存"""
+    print("🧪 测试索引部分匹配...")
+
+    from tradingagents.dataflows.cache_manager import StockDataCache
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = StockDataCache(cache_dir=tmp_dir)
+        stock_key = cache.save_stock_data("AAPL", "price data", "2025-01-01", "2025-01-31", "yfinance")
+        fund_key = cache.save_fundamentals_data("000001", "基本面", data_source="tushare")
+
+        found = cache.find_cached_stock_data("AAPL", "2025-01-10", "2025-01-20", "yfinance")
+        assert found == stock_key, found
+        assert cache.find_cached_stock_data("AAPL", "2025-01-10", "2025-01-20", "finnhub") is None
+        # 区间不被覆盖时不能当作命中
+        assert cache.find_cached_stock_data("AAPL", "2025-02-01", "2025-02-28", "yfinance") is None
+        assert cache.find_cached_stock_data("MSFT") is None
+        assert cache.find_cached_fundamentals_data("000001", "tushare") == fund_key
+        assert cache.metadata_index.find("AAPL", "stock_data") == [stock_key]
+    print("  ✅ 索引查找结果正确")
+
+
+def test_migrates_existing_metadata():
+    """测试首次启动时导入已有的元数据文件"""
+    print("\n🧪 测试元数据迁移...")
+
+    from datetime import datetime
+    from tradingagents.dataflows.cache_manager import StockDataCache
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        metadata_dir = os.path.join(tmp_dir, "metadata")
+        os.makedirs(metadata_dir)
+        data_path = os.path.join(tmp_dir, "legacy.txt")
+        with open(data_path, "w", encoding="utf-8") as f:
+            f.write("legacy")
+        metadata = {
+            'symbol': "TSLA", 'data_type': 'stock_data', 'market_type': 'us',
+            'data_source': 'yfinance', 'file_path': data_path, 'file_format': 'txt',
+            'cached_at': datetime.now().isoformat(),
+        }
+        with open(os.path.join(metadata_dir, "TSLA_stock_data_legacy_meta.json"), "w", encoding="utf-8") as f:
+            json.dump(metadata, f)
+
+        cache = StockDataCache(cache_dir=tmp_dir)
+        assert cache.metadata_index.is_migrated()
+        assert cache.find_cached_stock_data("TSLA") == "TSLA_stock_data_legacy"
+        assert cache.load_stock_data("TSLA_stock_data_legacy") == "legacy"
+    print("  ✅ 已有元数据已导入索引")
+
+
+def benchmark_partial_match_lookup():
+    """对比索引查找与扫描全部元数据文件的耗时"""
+    print("\n⚡ 部分匹配查找性能对比...")
+
+    from tradingagents.dataflows.cache_manager import StockDataCache
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = StockDataCache(cache_dir=tmp_dir)
+        for i in range(3000):
+            cache.save_stock_data(f"SYM{i}", "data", "2025-01-01", "2025-01-31", "yfinance")
+
+        start = time.time()
+        for i in range(50):
+            cache.find_cached_stock_data(f"MISS{i}")
+        index_time = time.time() - start
+
+        index = cache.metadata_index
+        cache.metadata_index = None
+        start = time.time()
+        for i in range(50):
+            cache.find_cached_stock_data(f"MISS{i}")
+        scan_time = time.time() - start
+        cache.metadata_index = index
+
+    print(f"  📊 扫描元数据文件: {scan_time:.3f}秒")
+    print(f"  📊 索引查找: {index_time:.3f}秒")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 缓存元数据索引测试")
+    print("=" * 50)
+
+    test_results = [
+        ("索引部分匹配", _run_test(test_partial_match_uses_index)),
+        ("元数据迁移", _run_test(test_migrates_existing_metadata)),
+        ("性能对比", _run_test(benchmark_partial_match_lookup)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+实时新闻并发获取测试
+为 FinnHub / Alpha Vantage / NewsAPI 各启动一个本地HTTP桩服务，
+验证并发获取的耗时接近最慢的新闻源、单源超时、提前返回和各源耗时统计
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def _start_stub(payload, delay):
+    """启动一个延迟 delay 秒后返回 payload 的本地HTTP服务"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = json.dumps(payload).encode('utf-8')
+            try:
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def _make_aggregator(delays, ticker="AAPL", items_per_source=5):
+    from tradingagents.dataflows.realtime_news_utils import RealtimeNewsAggregator
+
+    now = datetime.now()
+    # 标题需要彼此差异明显，否则会被近似去重合并
+    topics = ['earnings beat estimates', 'new product launch', 'supply chain update',
+              'analyst upgrade', 'share buyback plan', 'regulatory review', 'dividend increase']
+    finnhub = [{'headline': f'{ticker} finnhub: {topics[i]}', 'summary': 'summary',
+                'source': 'FinnHub', 'datetime': int(now.timestamp()) - i, 'url': ''}
+               for i in range(items_per_source)]
+    alpha = {'feed': [{'title': f'{ticker} alpha vantage reports {topics[-1 - i]} today', 'summary': 'summary',
+                       'source': 'Alpha Vantage', 'time_published': now.strftime('%Y%m%dT%H%M%S'), 'url': ''}
+                      for i in range(items_per_source)]}
+    newsapi = {'articles': [{'title': f'NewsAPI wire on {ticker}: {topics[(i + 3) % len(topics)]}', 'description': 'desc',
+                             'source': {'name': 'NewsAPI'}, 'publishedAt': now.isoformat(), 'url': ''}
+                            for i in range(items_per_source)]}
+
+    servers = []
+    aggregator = RealtimeNewsAggregator()
+    aggregator.finnhub_key = aggregator.alpha_vantage_key = aggregator.newsapi_key = "test"
+    for attr, payload, delay in (('finnhub_url', finnhub, delays[0]),
+                                 ('alpha_vantage_url', alpha, delays[1]),
+                                 ('newsapi_url', newsapi, delays[2])):
+        server, url = _start_stub(payload, delay)
+        servers.append(server)
+        setattr(aggregator, attr, url)
+    aggregator._get_chinese_finance_news = lambda ticker, hours_back: []
+    return aggregator, servers
+
+
+def _stop(servers):
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_concurrent_latency_matches_slowest_source():
+    """测试并发模式的耗时接近最慢的新闻源，结果与串行模式一致"""
+    print("🧪 测试并发获取耗时...")
+
+    aggregator, servers = _make_aggregator((0.3, 0.4, 0.5))
+    try:
+        start = time.time()
+        serial = aggregator.get_realtime_stock_news("AAPL", max_news=50, concurrent=False)
+        serial_time = time.time() - start
+
+        start = time.time()
+        concurrent = aggregator.get_realtime_stock_news("AAPL", max_news=50, concurrent=True)
+        concurrent_time = time.time() - start
+
+        assert sorted(n.title for n in serial) == sorted(n.title for n in concurrent)
+        assert len(concurrent) == 15
+        assert concurrent_time < serial_time * 0.7, f"{concurrent_time:.2f}s vs {serial_time:.2f}s"
+        timings = aggregator.get_source_timings()
+        assert {timings[s]['status'] for s in ('finnhub', 'alpha_vantage', 'newsapi')} == {'ok'}
+        print(f"  ✅ 串行 {serial_time:.2f}秒，并发 {concurrent_time:.2f}秒")
+    finally:
+        _stop(servers)
+
+
+def test_slow_source_deadline():
+    """测试慢新闻源超过单源时限时被跳过"""
+    print("\n🧪 测试单源超时...")
+
+    aggregator, servers = _make_aggregator((0.1, 0.1, 3.0))
+    try:
+        start = time.time()
+        news = aggregator.get_realtime_stock_news_concurrent("AAPL", max_news=50, source_timeout=0.5, time_budget=5)
+        elapsed = time.time() - start
+
+        timings = aggregator.get_source_timings()
+        assert elapsed < 1.5, f"耗时过长: {elapsed:.2f}s"
+        assert timings['newsapi']['status'] in ('timeout', 'empty'), timings
+        assert len(news) == 10
+        print(f"  ✅ 耗时 {elapsed:.2f}秒，各源: {timings}")
+    finally:
+        _stop(servers)
+
+
+def test_early_return_with_enough_relevant_news():
+    """测试已有足够高相关性新闻时不等待慢新闻源"""
+    print("\n🧪 测试提前返回...")
+
+    aggregator, servers = _make_aggregator((0.1, 2.0, 2.0))
+    try:
+        start = time.time()
+        news = aggregator.get_realtime_stock_news_concurrent("AAPL", max_news=5, source_timeout=10, time_budget=10)
+        elapsed = time.time() - start
+
+        assert len(news) == 5 and elapsed < 1.0, f"{len(news)} 条, {elapsed:.2f}s"
+        assert aggregator.get_source_timings()['alpha_vantage']['status'] == 'skipped'
+        print(f"  ✅ 耗时 {elapsed:.2f}秒提前返回 {len(news)} 条")
+    finally:
+        _stop(servers)
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 实时新闻并发获取测试")
+    print("=" * 50)
+
+    test_results = [
+        ("并发耗时", _run_test(test_concurrent_latency_matches_slowest_source)),
+        ("单源超时", _run_test(test_slow_source_deadline)),
+        ("提前返回", _run_test(test_early_return_with_enough_relevant_news)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+数据源对冲请求测试
+验证延迟统计与自动排序、慢数据源超过p95后并行启动下一个数据源、
+失败时立即切换（包括其他请求仍在进行时）、被放弃的慢请求不占用后续请求的线程，
+以及关闭对冲时原有的顺序降级
+"""
+
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def _manager(behaviors, hedge_enabled=True, default_delay=0.2):
+    """
+    创建使用假数据源的管理器
+
+    behaviors: {ChinaDataSource: (耗时秒数, 返回结果)}
+    """
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource, DataSourceManager
+    from tradingagents.dataflows.source_latency import SourceLatencyTracker
+
+    manager = DataSourceManager.__new__(DataSourceManager)
+    manager.default_source = ChinaDataSource.AKSHARE
+    manager.current_source = ChinaDataSource.AKSHARE
+    manager.available_sources = list(behaviors)
+    manager.hedge_enabled = hedge_enabled
+    manager.hedge_timeout = 5
+    manager.latency_tracker = SourceLatencyTracker(default_delay=default_delay, min_delay=0.05, max_delay=1)
+    manager.calls = []
+
+    def fake(source):
+        def fetch(symbol, start_date, end_date):
+            manager.calls.append(source)
+            delay, result = behaviors[source]
+            time.sleep(delay)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return fetch
+
+    manager._get_akshare_data = fake(ChinaDataSource.AKSHARE)
+    manager._get_tushare_data = fake(ChinaDataSource.TUSHARE)
+    manager._get_baostock_data = fake(ChinaDataSource.BAOSTOCK)
+    manager._get_tdx_data = fake(ChinaDataSource.TDX)
+    return manager
+
+
+def test_latency_tracker():
+    """测试延迟分位数、错误率、对冲等待时间和排序"""
+    print("🧪 测试延迟统计与排序...")
+
+    from tradingagents.dataflows.source_latency import SourceLatencyTracker
+
+    tracker = SourceLatencyTracker(min_samples=5, default_delay=3, min_delay=0.5, max_delay=10)
+    assert tracker.hedge_delay("akshare") == 3
+    for duration in [1, 1, 1, 1, 1, 1, 1, 1, 1, 4]:
+        tracker.record("akshare", duration, True)
+    for duration in [0.3] * 10:
+        tracker.record("tushare", duration, True)
+    for _ in range(10):
+        tracker.record("baostock", 0.1, False)
+
+    assert tracker.latency_percentile("akshare", 0.95) == 4
+    assert tracker.hedge_delay("akshare") == 4
+    assert tracker.hedge_delay("tushare") == 0.5
+    assert tracker.error_rate("baostock") == 1.0
+    # 快但总是失败的数据源排在最后；没有统计的数据源按默认等待时间估计
+    assert tracker.rank(["baostock", "tdx", "akshare", "tushare"]) == ["tushare", "akshare", "tdx", "baostock"]
+
+    stats = tracker.get_stats()
+    assert stats["akshare"]["calls"] == 10 and stats["akshare"]["histogram"]["<=1s"] == 9
+    assert stats["baostock"]["p95"] is None
+    print("  ✅ p95、错误率与排序正确")
+
+
+def test_hedge_launches_after_delay():
+    """测试当前数据源过慢时，等待时间后并行启动下一个数据源并采用其结果"""
+    print("\n🧪 测试慢数据源对冲...")
+
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource
+
+    manager = _manager({
+        ChinaDataSource.AKSHARE: (2.0, "akshare 数据"),
+        ChinaDataSource.TUSHARE: (0.05, "tushare 数据"),
+        ChinaDataSource.BAOSTOCK: (0.05, "baostock 数据"),
+    })
+    start = time.time()
+    result = manager.get_stock_data("600036", "2025-01-01", "2025-02-01")
+    elapsed = time.time() - start
+
+    assert result == "tushare 数据", result
+    assert elapsed < 0.6, f"{elapsed:.2f}s"
+    # 下一个数据源已返回，不再启动第三个
+    assert manager.calls == [ChinaDataSource.AKSHARE, ChinaDataSource.TUSHARE]
+    print(f"  ✅ {elapsed:.2f}秒返回备用数据源结果（主数据源需要2秒）")
+
+
+def test_failures_and_learned_order():
+    """测试失败时立即切换，以及统计数据驱动的数据源顺序"""
+    print("\n🧪 测试失败切换与自动排序...")
+
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource
+
+    manager = _manager({
+        ChinaDataSource.AKSHARE: (0.01, RuntimeError("接口异常")),
+        ChinaDataSource.TUSHARE: (0.01, "❌ 未获取到数据"),
+        ChinaDataSource.BAOSTOCK: (0.02, "baostock 数据"),
+    }, default_delay=1.0)
+    start = time.time()
+    assert manager.get_stock_data("600036", "2025-01-01", "2025-02-01") == "baostock 数据"
+    assert time.time() - start < 0.5
+
+    for _ in range(5):
+        manager.get_stock_data("600036", "2025-01-01", "2025-02-01")
+    # 失败的数据源被排到后面，之后直接请求 BaoStock
+    manager.calls.clear()
+    assert manager._hedge_candidates()[0] == ChinaDataSource.BAOSTOCK
+    assert manager.get_stock_data("600036", "2025-01-01", "2025-02-01") == "baostock 数据"
+    assert manager.calls == [ChinaDataSource.BAOSTOCK]
+
+    stats = manager.get_source_latency_stats()
+    assert stats["akshare"]["error_rate"] == 1.0 and stats["baostock"]["error_rate"] == 0.0
+
+    # 全部失败时返回错误信息
+    failing = _manager({ChinaDataSource.AKSHARE: (0.01, RuntimeError("接口异常"))})
+    assert "❌" in failing.get_stock_data("600036", "2025-01-01", "2025-02-01")
+    print("  ✅ 失败立即切换，统计后自动调整顺序")
+
+
+def test_failure_launches_next_while_others_pending():
+    """测试一个数据源失败而另一个仍在进行时，立即启动下一个数据源"""
+    print("\n🧪 测试并行请求中的失败切换...")
+
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource
+
+    manager = _manager({
+        ChinaDataSource.AKSHARE: (3.0, "akshare 数据"),
+        ChinaDataSource.TUSHARE: (0.05, RuntimeError("接口异常")),
+        ChinaDataSource.BAOSTOCK: (0.05, "baostock 数据"),
+    }, default_delay=0.3)
+    start = time.time()
+    result = manager.get_stock_data("600036", "2025-01-01", "2025-02-01")
+    elapsed = time.time() - start
+
+    # AKShare 0秒启动，TuShare 0.3秒启动并在0.35秒失败，BaoStock 随即启动（不再等到0.65秒）
+    assert result == "baostock 数据", result
+    assert elapsed < 0.55, f"{elapsed:.2f}s"
+    print(f"  ✅ {elapsed:.2f}秒返回，失败后未等待对冲延迟")
+
+
+def test_abandoned_requests_do_not_starve():
+    """测试连续多次放弃慢请求后，后续请求仍能立即启动"""
+    print("\n🧪 测试被放弃请求不占用线程...")
+
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource
+
+    manager = _manager({
+        ChinaDataSource.AKSHARE: (2.0, "akshare 数据"),
+        ChinaDataSource.TUSHARE: (0.02, "tushare 数据"),
+    }, default_delay=0.05)
+    # 固定顺序，每次都先请求慢数据源再放弃
+    manager._hedge_candidates = lambda: [ChinaDataSource.AKSHARE, ChinaDataSource.TUSHARE]
+    slowest = 0.0
+    for _ in range(12):
+        start = time.time()
+        assert manager.get_stock_data("600036", "2025-01-01", "2025-02-01") == "tushare 数据"
+        slowest = max(slowest, time.time() - start)
+
+    # 12个被放弃的 AKShare 请求仍在后台运行，不影响后续请求
+    assert slowest < 0.5, f"{slowest:.2f}s"
+    print(f"  ✅ 12次请求最长耗时 {slowest:.2f}秒")
+
+
+def test_sequential_fallback_when_disabled():
+    """测试关闭对冲时保持原有的顺序降级"""
+    print("\n🧪 测试顺序降级...")
+
+    from tradingagents.dataflows.data_source_manager import ChinaDataSource
+
+    manager = _manager({
+        ChinaDataSource.AKSHARE: (0.01, "❌ 获取失败"),
+        ChinaDataSource.TUSHARE: (0.01, "tushare 数据"),
+    }, hedge_enabled=False)
+    threads_before = threading.active_count()
+    assert manager.get_stock_data("600036", "2025-01-01", "2025-02-01") == "tushare 数据"
+    assert manager.calls == [ChinaDataSource.AKSHARE, ChinaDataSource.TUSHARE]
+    assert threading.active_count() == threads_before
+    assert manager.get_source_latency_stats()["akshare"]["error_rate"] == 1.0
+    print("  ✅ 关闭对冲时按顺序降级，并记录延迟统计")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 数据源对冲请求测试")
+    print("=" * 50)
+
+    test_results = [
+        ("延迟统计与排序", _run_test(test_latency_tracker)),
+        ("慢数据源对冲", _run_test(test_hedge_launches_after_delay)),
+        ("失败切换与自动排序", _run_test(test_failures_and_learned_order)),
+        ("并行请求中的失败切换", _run_test(test_failure_launches_next_while_others_pending)),
+        ("被放弃请求不占用线程", _run_test(test_abandoned_requests_do_not_starve)),
+        ("顺序降级", _run_test(test_sequential_fallback_when_disabled)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
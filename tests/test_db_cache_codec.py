@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+数据库缓存DataFrame编码测试
+验证二进制编码保留dtype和索引、旧的JSON缓存仍可读取、Redis二进制帧与MongoDB同步，
+并对比JSON与二进制编码的体积和解码耗时
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+class FakeRedis:
+    """共享存储的假Redis客户端，decode_responses 行为与 redis-py 一致"""
+
+    def __init__(self, store, decode_responses):
+        self.store = store
+        self.decode_responses = decode_responses
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value.encode('utf-8') if isinstance(value, str) else value
+
+    def get(self, key):
+        value = self.store.get(key)
+        if value is not None and self.decode_responses:
+            return value.decode('utf-8')
+        return value
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = dict(doc)
+
+    def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+
+def _manager(codec="json_table", compression="zlib"):
+    from types import SimpleNamespace
+    from tradingagents.dataflows.dataframe_codec import DataFrameCodec
+    from tradingagents.dataflows.db_cache_manager import DatabaseCacheManager
+
+    store = {}
+    manager = DatabaseCacheManager.__new__(DatabaseCacheManager)
+    manager.mongodb_db = SimpleNamespace(stock_data=FakeCollection())
+    manager.redis_client = FakeRedis(store, decode_responses=True)
+    manager.redis_binary_client = FakeRedis(store, decode_responses=False)
+    manager.codec = DataFrameCodec(codec, compression) if codec else None
+    return manager, store
+
+
+def _price_frame(rows=1250):
+    rng = np.random.default_rng(0)
+    close = 10 + rng.standard_normal(rows).cumsum() * 0.1
+    df = pd.DataFrame({
+        "open": close + rng.standard_normal(rows) * 0.05,
+        "high": close + 0.2,
+        "low": close - 0.2,
+        "close": close,
+        "volume": rng.integers(1_000_000, 50_000_000, rows).astype("int64"),
+        "limit_up": rng.random(rows) > 0.97,
+        "board": pd.Categorical(rng.choice(["主板", "创业板"], rows)),
+    }, index=pd.date_range("2020-01-02", periods=rows, freq="B", name="date"))
+    return df
+
+
+def test_dtype_and_index_roundtrip():
+    """测试二进制编码保留dtype和索引"""
+    print("🧪 测试dtype与索引保留...")
+
+    from tradingagents.dataflows.dataframe_codec import (
+        DataFrameCodec, ZSTD_AVAILABLE, pack_frame, unpack_frame)
+
+    df = _price_frame(50)
+    compressions = ["zlib", "none"] + (["zstd"] if ZSTD_AVAILABLE else [])
+    for compression in compressions:
+        codec = DataFrameCodec("json_table", compression)
+        payload, meta = codec.encode(df)
+        restored = DataFrameCodec.decode(payload, meta)
+        pd.testing.assert_frame_equal(restored, df, check_freq=False)
+
+        header, body = unpack_frame(pack_frame(meta, payload))
+        assert header == meta and body == payload
+    assert unpack_frame(b'{"data": "[]"}') is None
+    print(f"  ✅ 压缩方式 {compressions} 均还原出相同的dtype和索引")
+
+
+def test_manager_binary_and_legacy_entries():
+    """测试缓存管理器写入二进制格式，同时能读取旧的JSON缓存"""
+    print("\n🧪 测试二进制缓存与旧缓存兼容...")
+
+    df = _price_frame(30)
+
+    # 旧版本写入的JSON缓存
+    legacy_manager, legacy_store = _manager(codec=None)
+    legacy_key = legacy_manager.save_stock_data("600036", df.reset_index(drop=True), "2025-01-01",
+                                                "2025-02-01", "tushare")
+    assert legacy_manager.mongodb_db.stock_data.docs[legacy_key]["data_format"] == "dataframe_json"
+
+    manager, store = _manager()
+    manager.mongodb_db = legacy_manager.mongodb_db
+    store.update(legacy_store)
+    legacy = manager.load_stock_data(legacy_key)
+    assert list(legacy.columns) == list(df.columns) and len(legacy) == len(df)
+
+    # 新写入的二进制缓存
+    key = manager.save_stock_data("000001", df, "2025-01-01", "2025-02-01", "tushare")
+    doc = manager.mongodb_db.stock_data.docs[key]
+    assert doc["data_format"] == "dataframe_binary" and isinstance(doc["data"], bytes)
+    assert store[key].startswith(b"TADF")
+    pd.testing.assert_frame_equal(manager.load_stock_data(key), df, check_freq=False)
+
+    # Redis过期后从MongoDB加载，并重新写入二进制帧
+    del store[key]
+    pd.testing.assert_frame_equal(manager.load_stock_data(key), df, check_freq=False)
+    assert store[key].startswith(b"TADF")
+
+    # 文本数据保持原样
+    text_key = manager.save_stock_data("AAPL", "收盘价 180.5", data_source="finnhub")
+    assert manager.load_stock_data(text_key) == "收盘价 180.5"
+    print("  ✅ 新缓存为二进制格式，旧JSON缓存与文本缓存正常读取")
+
+
+def test_payload_size_and_decode_speed():
+    """对比JSON与二进制编码的体积和解码耗时"""
+    print("\n🧪 对比编码体积与解码耗时...")
+
+    from tradingagents.dataflows.dataframe_codec import DataFrameCodec
+
+    df = _price_frame()
+    json_payload = df.reset_index().to_json(orient='records', date_format='iso')
+
+    def decode_time(fn, repeat=20):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    import io
+    json_ms = decode_time(lambda: pd.read_json(io.StringIO(json_payload), orient='records'))
+    print(f"  📊 json records: {len(json_payload.encode('utf-8')) / 1024:.1f}KB, 解码 {json_ms:.2f}ms")
+
+    codec = DataFrameCodec()
+    payload, meta = codec.encode(df)
+    codec_ms = decode_time(lambda: DataFrameCodec.decode(payload, meta))
+    print(f"  📊 {meta['codec']}+{meta['compression']}: {len(payload) / 1024:.1f}KB, 解码 {codec_ms:.2f}ms")
+
+    assert len(payload) < len(json_payload.encode('utf-8')) / 2
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 数据库缓存DataFrame编码测试")
+    print("=" * 50)
+
+    test_results = [
+        ("dtype与索引保留", _run_test(test_dtype_and_index_roundtrip)),
+        ("二进制缓存与旧缓存兼容", _run_test(test_manager_binary_and_legacy_entries)),
+        ("编码体积与解码耗时", _run_test(test_payload_size_and_decode_speed)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+辩论上下文打包测试
+使用记录提示词的假模型运行多轮多空辩论，验证辩论历史长度受预算限制、所有节点共享报告前缀、
+报告前缀不挤占历史预算、单轮辩论不打包、当前一轮每次发言都保留、每次发言只摘要一次，以及节省的token统计
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+class RecordingLLM:
+    """记录提示词并返回固定长度发言的假模型"""
+
+    def __init__(self, reply_chars=3000):
+        self.reply_chars = reply_chars
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        n = len(self.prompts)
+        sentence = f"第{n}次发言的论点：营收增速与估值水平需要结合行业周期判断。"
+        return SimpleNamespace(content=(sentence * (self.reply_chars // len(sentence) + 1))[:self.reply_chars])
+
+
+def _state(report_scale=1):
+    return {
+        "company_of_interest": "600036",
+        "market_report": "市场报告：" + "均线多头排列，成交量温和放大。" * 200 * report_scale,
+        "sentiment_report": "情绪报告：" + "投资者情绪偏乐观。" * 150 * report_scale,
+        "news_report": "新闻报告：" + "公司发布分红预案。" * 150 * report_scale,
+        "fundamentals_report": "基本面报告：" + "ROE保持在15%以上，资产质量稳定。" * 200 * report_scale,
+        "investment_debate_state": {
+            "history": "", "bull_history": "", "bear_history": "", "current_response": "", "count": 0,
+        },
+    }
+
+
+def _run_debate(packer, rounds, reply_chars=3000, report_scale=1):
+    from tradingagents.agents import create_bear_researcher, create_bull_researcher
+
+    llm = RecordingLLM(reply_chars)
+    bull = create_bull_researcher(llm, None, packer)
+    bear = create_bear_researcher(llm, None, packer)
+    state = _state(report_scale)
+    for _ in range(rounds):
+        for node in (bull, bear):
+            state.update(node(state))
+    return llm, state
+
+
+def _history_part(prompt):
+    """取出研究员提示词中的辩论历史部分"""
+    return prompt.split("辩论对话历史：", 1)[1].split("\n最后的", 1)[0]
+
+
+def _manager_prompt(packer, state):
+    from tradingagents.agents import create_research_manager
+
+    llm = RecordingLLM()
+    create_research_manager(llm, None, packer)(state)
+    return llm.prompts[-1]
+
+
+def test_under_budget_unchanged():
+    """测试未超出预算时历史原样保留"""
+    print("🧪 测试预算内历史不变...")
+
+    from tradingagents.agents.utils.context_packer import DebateContextPacker
+
+    packer = DebateContextPacker(token_budget=100000)
+    history = "\nBull Analyst: 看涨理由。\nBear Analyst: 看跌理由。"
+    assert packer.pack_history("Bull Researcher", history) == history
+    assert packer.get_stats()['saved_tokens'] == 0
+    print("  ✅ 预算内历史原样返回")
+
+
+def test_prompt_size_bounded():
+    """测试多轮辩论中辩论历史长度受预算限制，并共享报告前缀"""
+    print("\n🧪 测试提示词长度受限...")
+
+    from tradingagents.agents.utils.context_packer import (
+        DebateContextPacker, build_reports_prefix, estimate_tokens)
+
+    unpacked_llm, _ = _run_debate(DebateContextPacker(token_budget=10 ** 9), rounds=5)
+    packer = DebateContextPacker(token_budget=4000)
+    packed_llm, final_state = _run_debate(packer, rounds=5)
+
+    prefix = build_reports_prefix(_state())
+    assert all(prompt.startswith(prefix) for prompt in packed_llm.prompts)
+
+    unpacked_sizes = [estimate_tokens(_history_part(p)) for p in unpacked_llm.prompts]
+    packed_sizes = [estimate_tokens(_history_part(p)) for p in packed_llm.prompts]
+    # 报告前缀不计入预算，只有提示说明文字略超出
+    assert unpacked_sizes[-1] > 4000 and max(packed_sizes) <= 4050, (unpacked_sizes, packed_sizes)
+
+    # 状态中保存的完整历史不受影响
+    assert final_state["investment_debate_state"]["history"].count("Analyst:") == 10
+
+    stats = packer.get_stats()
+    saved = sum(unpacked_sizes) - sum(packed_sizes)
+    assert stats['saved_tokens'] > 0 and abs(stats['saved_tokens'] - saved) < 200, (stats['saved_tokens'], saved)
+    print(f"  ✅ 最后一次辩论历史 {unpacked_sizes[-1]} -> {packed_sizes[-1]} tokens，"
+          f"全程节省 {stats['saved_tokens']} tokens")
+
+
+def test_default_config_single_round_unchanged():
+    """测试默认配置下，报告约2万字的单轮辩论中研究经理看到完整的多空发言"""
+    print("\n🧪 测试默认配置单轮辩论...")
+
+    from tradingagents.agents.utils.context_packer import build_reports_prefix, create_context_packer
+    from tradingagents.default_config import DEFAULT_CONFIG
+
+    packer = create_context_packer(DEFAULT_CONFIG)
+    _, state = _run_debate(packer, rounds=DEFAULT_CONFIG["max_debate_rounds"], reply_chars=8000, report_scale=3)
+    assert len(build_reports_prefix(state)) > 20000
+
+    history = state["investment_debate_state"]["history"]
+    prompt = _manager_prompt(packer, state)
+    assert history in prompt
+    assert "Bull Analyst:" in prompt and "Bear Analyst:" in prompt
+    assert "省略" not in prompt and "（摘要）" not in prompt
+    assert packer.get_stats()['saved_tokens'] == 0
+    print(f"  ✅ 报告 {len(build_reports_prefix(state))} 字、发言各 8000 字时经理看到完整辩论")
+
+
+def test_current_round_always_kept():
+    """测试历史超出预算时当前一轮的每次发言都保留，单次发言超出预算时改用摘要"""
+    print("\n🧪 测试当前一轮发言保留...")
+
+    from tradingagents.agents.utils.context_packer import (
+        RISK_DEBATE_SPEAKERS, DebateContextPacker, estimate_tokens)
+
+    packer = DebateContextPacker(token_budget=3000)
+    _, state = _run_debate(packer, rounds=3, reply_chars=5000, report_scale=2)
+    turns = [turn for turn in state["investment_debate_state"]["history"].split("\n") if turn]
+    prompt = _manager_prompt(packer, state)
+    packed = prompt.split("辩论历史：\n", 1)[1]
+
+    # 最后一次看跌发言（约2500 tokens）保留原文；同一轮的看涨发言放不下原文，但保留摘要
+    assert turns[-1] in packed and turns[-2] not in packed
+    assert packed.index("Bull Analyst（摘要）") < packed.index(turns[-1])
+
+    # 单次发言超出预算：只保留摘要
+    huge = "\nBull Analyst: " + "估值偏低。" * 2000 + "\nBear Analyst: " + "估值偏高。" * 4000
+    packed = packer.pack_history("Research Manager", "\nBull Analyst: 开场。\nBear Analyst: 回应。" + huge)
+    assert "Bull Analyst（摘要）" in packed and "Bear Analyst（摘要）" in packed
+    assert estimate_tokens(packed) <= 3000
+
+    # 风险辩论按三方一轮：三次发言都在
+    risk_history = "".join(f"\n{name} Analyst: " + "观点。" * 3000
+                           for name in ("Risky", "Safe", "Neutral") * 2)
+    packed = packer.pack_history("Risk Judge", risk_history, speakers=RISK_DEBATE_SPEAKERS)
+    last_round = packed.split("省略）")[-1]
+    assert all(f"{name} Analyst" in last_round for name in ("Risky", "Safe", "Neutral")), packed[:300]
+
+    # 单轮风险辩论不打包
+    single = risk_history[:len(risk_history) // 2]
+    assert packer.pack_history("Risk Judge", single, speakers=RISK_DEBATE_SPEAKERS) == single
+    print("  ✅ 当前一轮每次发言至少保留摘要")
+
+
+def test_each_turn_summarized_once():
+    """测试每次发言只摘要一次，并在其他节点间复用"""
+    print("\n🧪 测试摘要复用...")
+
+    from tradingagents.agents.utils.context_packer import DebateContextPacker
+
+    summarized = []
+
+    def summarizer(turn):
+        summarized.append(turn)
+        return turn.split(":")[0] + "（摘要）: 要点"
+
+    packer = DebateContextPacker(token_budget=9000, summarizer=summarizer)
+    llm, state = _run_debate(packer, rounds=5)
+    history = state["investment_debate_state"]["history"]
+
+    # 经理节点使用同一个打包器，不再重复摘要
+    before = len(summarized)
+    packer.pack_history("Research Manager", history)
+    assert len(summarized) == len(set(summarized)), "同一次发言被摘要多次"
+    assert len(summarized) - before <= 2
+    assert "（摘要）: 要点" in llm.prompts[-1]
+    print(f"  ✅ {len(summarized)} 次发言各摘要一次")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 辩论上下文打包测试")
+    print("=" * 50)
+
+    test_results = [
+        ("预算内历史不变", _run_test(test_under_budget_unchanged)),
+        ("提示词长度受限", _run_test(test_prompt_size_bounded)),
+        ("默认配置单轮辩论", _run_test(test_default_config_single_round_unchanged)),
+        ("当前一轮发言保留", _run_test(test_current_round_always_kept)),
+        ("摘要复用", _run_test(test_each_turn_summarized_once)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
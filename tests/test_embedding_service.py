@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+共享嵌入服务测试
+验证内容哈希缓存、并发请求合并、批量嵌入和磁盘持久化
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+class FakeEmbeddingsApi:
+    """模拟 OpenAI 兼容客户端的 embeddings.create，记录每次调用的输入"""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, model, input):
+        self.calls.append(input)
+        inputs = input if isinstance(input, list) else [input]
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), 1.0]) for i, text in enumerate(inputs)]
+        return SimpleNamespace(data=data)
+
+
+def _make_memory(client):
+    """构造只包含嵌入相关属性的记忆对象，不依赖ChromaDB"""
+    from tradingagents.agents.utils.memory import FinancialSituationMemory
+
+    memory = FinancialSituationMemory.__new__(FinancialSituationMemory)
+    memory.config = {}
+    memory.llm_provider = "openai"
+    memory.embedding = "text-embedding-3-small"
+    memory.client = SimpleNamespace(embeddings=client, base_url="http://fake/v1")
+    memory.max_embedding_length = 50000
+    memory.enable_embedding_length_check = True
+    memory.fallback_available = False
+    return memory
+
+
+def test_shared_cache_across_memories():
+    """测试多个记忆实例对相同文本只请求一次"""
+    print("🧪 测试跨记忆实例共享嵌入缓存...")
+
+    from tradingagents.agents.utils import embedding_service
+    from tradingagents.agents.utils.embedding_service import EmbeddingService
+
+    embedding_service._embedding_service = EmbeddingService()
+    api = FakeEmbeddingsApi()
+    memories = [_make_memory(api) for _ in range(5)]
+    situation = "市场报告\n\n情绪报告\n\n新闻报告\n\n基本面报告"
+
+    embeddings = [memory.get_embedding(situation) for memory in memories]
+    assert len(api.calls) == 1, f"应只请求一次: {len(api.calls)}"
+    assert all(embedding == embeddings[0] for embedding in embeddings)
+    print(f"  ✅ 5个记忆实例共请求 {len(api.calls)} 次")
+
+
+def test_batch_add_situations_embedding():
+    """测试批量嵌入只对未命中的去重文本发起一次请求"""
+    print("\n🧪 测试批量嵌入...")
+
+    from tradingagents.agents.utils import embedding_service
+    from tradingagents.agents.utils.embedding_service import EmbeddingService
+
+    embedding_service._embedding_service = EmbeddingService()
+    api = FakeEmbeddingsApi()
+    memory = _make_memory(api)
+
+    memory.get_embedding("情况A")
+    embeddings = memory.get_embeddings(["情况A", "情况B", "情况C", "情况B"])
+    assert len(api.calls) == 2
+    assert api.calls[1] == ["情况B", "情况C"], api.calls
+    assert embeddings[1] == embeddings[3]
+    print(f"  ✅ 批量请求输入: {api.calls[1]}")
+
+
+def test_request_coalescing():
+    """测试相同文本的并发请求合并为一次调用"""
+    print("\n🧪 测试并发请求合并...")
+
+    from tradingagents.agents.utils.embedding_service import EmbeddingService
+
+    service = EmbeddingService()
+    calls = []
+
+    def slow_compute(text):
+        calls.append(text)
+        time.sleep(0.2)
+        return [1.0, 2.0]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.get_embedding("m", "同一文本", slow_compute)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = service.get_stats()
+    assert len(calls) == 1, f"应只计算一次: {len(calls)}"
+    assert results == [[1.0, 2.0]] * 5
+    print(f"  ✅ 统计: {stats}")
+
+
+def test_disk_persistence_and_failures():
+    """测试磁盘持久化，以及全零向量（失败）不缓存"""
+    print("\n🧪 测试磁盘持久化...")
+
+    from tradingagents.agents.utils.embedding_service import EmbeddingService
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "embeddings.db")
+        EmbeddingService(persist_path=path).get_embedding("m", "文本", lambda text: [0.5, 0.25])
+
+        calls = []
+        restarted = EmbeddingService(persist_path=path)
+        embedding = restarted.get_embedding("m", "文本", lambda text: calls.append(text) or [9.9])
+        assert embedding == [0.5, 0.25] and not calls
+        assert restarted.get_stats()['disk_hits'] == 1
+
+        restarted.get_embedding("m", "失败文本", lambda text: [0.0, 0.0])
+        restarted.get_embedding("m", "失败文本", lambda text: calls.append(text) or [1.0])
+        assert calls == ["失败文本"]
+        print("  ✅ 重启后从磁盘命中，失败结果未缓存")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 共享嵌入服务测试")
+    print("=" * 50)
+
+    test_results = [
+        ("跨实例共享缓存", _run_test(test_shared_cache_across_memories)),
+        ("批量嵌入", _run_test(test_batch_add_situations_embedding)),
+        ("并发请求合并", _run_test(test_request_coalescing)),
+        ("磁盘持久化", _run_test(test_disk_persistence_and_failures)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
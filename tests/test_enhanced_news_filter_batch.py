@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+增强新闻过滤器批量语义评分测试
+使用可计数的假语义模型，验证批量评分与逐条评分一致、整批只编码一次、
+不同过滤器实例重复过滤同一批新闻时命中embedding缓存
+"""
+
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+class FakeSentenceModel:
+    """按文本哈希生成确定性向量的假模型，记录编码调用"""
+
+    def __init__(self, dim=64, delay_per_call=0.0):
+        self.dim = dim
+        self.delay_per_call = delay_per_call
+        self.calls = []
+
+    def encode(self, texts, batch_size=32):
+        self.calls.append(len(texts))
+        time.sleep(self.delay_per_call)
+        vectors = []
+        for text in texts:
+            seed = int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16)
+            vectors.append(np.random.default_rng(seed).normal(size=self.dim))
+        return np.asarray(vectors)
+
+
+def _make_filter(model, model_name):
+    from tradingagents.utils.enhanced_news_filter import EnhancedNewsFilter
+
+    news_filter = EnhancedNewsFilter("600036", "招商银行", use_semantic=False)
+    news_filter.sentence_model = model
+    news_filter.semantic_model_name = model_name
+    news_filter.use_semantic = True
+    news_filter._prepare_company_embeddings()
+    return news_filter
+
+
+def _make_news(count):
+    return pd.DataFrame({
+        '新闻标题': [f"招商银行第{i}号公告：董事会审议{i % 7}项议案" if i % 3 else f"银行ETF指数基金{i}成分股上涨"
+                 for i in range(count)],
+        '新闻内容': [f"招商银行(600036)第{i}条新闻内容，涉及业绩与分红安排" for i in range(count)],
+    })
+
+
+def _reference_semantic(news_filter, title, content):
+    """逐条编码、逐个公司向量计算余弦相似度的原始做法"""
+    text_embedding = news_filter.sentence_model.encode([f"{title} {content[:200]}"])[0]
+    similarities = [np.dot(text_embedding, company_emb) / (np.linalg.norm(text_embedding) * np.linalg.norm(company_emb))
+                    for company_emb in news_filter.company_embedding]
+    return max(0, min(100, max(similarities) * 100))
+
+
+def test_batch_matches_per_item():
+    """测试批量过滤的各项评分与逐条计算一致"""
+    print("🧪 测试批量评分一致性...")
+
+    model = FakeSentenceModel()
+    news_filter = _make_filter(model, "fake-consistency")
+    news_df = _make_news(200)
+
+    filtered = news_filter.filter_news_enhanced(news_df, min_score=0)
+    assert len(filtered) == len(news_df)
+
+    reference = FakeSentenceModel()
+    reference_filter = _make_filter(reference, "fake-reference")
+    for _, row in filtered.iterrows():
+        expected = _reference_semantic(reference_filter, row['新闻标题'], row['新闻内容'])
+        assert abs(row['semantic_score'] - expected) < 1e-9
+        assert row['rule_score'] == news_filter.calculate_relevance_score(row['新闻标题'], row['新闻内容'])
+        assert abs(row['final_score'] - (0.4 * row['rule_score'] + 0.35 * row['semantic_score'])) < 1e-9
+    assert filtered['final_score'].is_monotonic_decreasing
+
+    single = news_filter.calculate_semantic_similarity(news_df['新闻标题'][0], news_df['新闻内容'][0])
+    assert abs(single - _reference_semantic(reference_filter, news_df['新闻标题'][0], news_df['新闻内容'][0])) < 1e-9
+    print(f"  ✅ {len(filtered)} 条新闻评分一致")
+
+
+def test_single_encode_and_cache_reuse():
+    """测试整批只调用一次编码，不同过滤器实例再次过滤时不再编码"""
+    print("\n🧪 测试批量编码与缓存复用...")
+
+    news_df = _make_news(300)
+    model = FakeSentenceModel(delay_per_call=0.01)
+
+    first = _make_filter(model, "fake-cache")
+    model.calls.clear()
+    first.filter_news_enhanced(news_df, min_score=0)
+    assert model.calls == [300], model.calls
+
+    # 另一个分析师创建的过滤器使用同一模型，重复过滤同一批新闻
+    second = _make_filter(model, "fake-cache")
+    model.calls.clear()
+    second.filter_news_enhanced(news_df, min_score=0)
+    assert model.calls == [], model.calls
+
+    # 新增的新闻只编码未命中的部分
+    more = pd.concat([news_df, _make_news(310).iloc[300:]], ignore_index=True)
+    second.filter_news_enhanced(more, min_score=0)
+    assert model.calls == [10], model.calls
+    print("  ✅ 首次编码1次，重复过滤0次，增量过滤只编码新增的10条")
+
+
+def benchmark_semantic_scoring():
+    """对比逐条编码与批量编码的耗时（假模型每次调用固定开销2毫秒）"""
+    print("\n⚡ 语义评分性能对比...")
+
+    news_df = _make_news(500)
+    titles, contents = news_df['新闻标题'].tolist(), news_df['新闻内容'].tolist()
+
+    per_item_filter = _make_filter(FakeSentenceModel(delay_per_call=0.002), "fake-bench-reference")
+    start = time.time()
+    for title, content in zip(titles, contents):
+        _reference_semantic(per_item_filter, title, content)
+    per_item_time = time.time() - start
+
+    batch_filter = _make_filter(FakeSentenceModel(delay_per_call=0.002), "fake-bench-batch")
+    start = time.time()
+    batch_filter.calculate_semantic_similarities(titles, contents)
+    batch_time = time.time() - start
+
+    start = time.time()
+    batch_filter.calculate_semantic_similarities(titles, contents)
+    cached_time = time.time() - start
+
+    print(f"  📊 逐条编码: {per_item_time:.3f}秒")
+    print(f"  📊 批量编码: {batch_time:.3f}秒")
+    print(f"  📊 缓存命中: {cached_time:.3f}秒")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 增强新闻过滤器批量语义评分测试")
+    print("=" * 50)
+
+    test_results = [
+        ("批量评分一致性", _run_test(test_batch_matches_per_item)),
+        ("批量编码与缓存", _run_test(test_single_encode_and_cache_reuse)),
+        ("性能对比", _run_test(benchmark_semantic_scoring)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+技术指标窗口引擎测试
+验证单次计算的窗口结果与逐日查询一致，并对比两种路径的耗时
+"""
+
+import os
+import sys
+import time
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+SYMBOL = "TEST"
+INDICATORS = ["close_50_sma", "close_200_sma", "macd", "rsi", "boll_ub", "atr"]
+
+
+def _write_synthetic_csv(data_dir, years=10):
+    """生成多年的模拟YFin日线数据"""
+    dates = pd.bdate_range("2015-01-01", periods=252 * years)
+    rng = np.random.default_rng(42)
+    close = 100 + np.cumsum(rng.normal(0, 1, len(dates)))
+    data = pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Open": close + rng.normal(0, 0.5, len(dates)),
+        "High": close + 1,
+        "Low": close - 1,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 5_000_000, len(dates)),
+    })
+    data.to_csv(os.path.join(data_dir, f"{SYMBOL}-YFin-data-2015-01-01-2025-03-25.csv"), index=False)
+    return data
+
+
+def _per_day_values(data_dir, indicator, start_date, end_date):
+    """旧路径：逐日调用 get_stock_stats"""
+    from tradingagents.dataflows.stockstats_utils import StockstatsUtils
+
+    values = {}
+    curr = datetime.strptime(end_date, "%Y-%m-%d")
+    before = datetime.strptime(start_date, "%Y-%m-%d")
+    while curr >= before:
+        date_key = curr.strftime("%Y-%m-%d")
+        value = StockstatsUtils.get_stock_stats(SYMBOL, indicator, date_key, data_dir)
+        if not isinstance(value, str):
+            values[date_key] = value
+        curr -= timedelta(days=1)
+    return values
+
+
+def test_window_matches_per_day():
+    """测试窗口引擎与逐日查询结果一致"""
+    print("🧪 测试窗口引擎结果一致性...")
+
+    from tradingagents.dataflows.stockstats_utils import StockstatsUtils
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        _write_synthetic_csv(data_dir)
+        start_date, end_date = "2023-03-01", "2023-04-30"
+
+        window = StockstatsUtils.get_stock_stats_window(
+            SYMBOL, INDICATORS, start_date, end_date, data_dir
+        )
+        for indicator in INDICATORS:
+            expected = _per_day_values(data_dir, indicator, start_date, end_date)
+            actual = window[indicator]
+            assert set(expected) == set(actual), f"{indicator} 日期不一致"
+            for date_key, value in expected.items():
+                assert str(value) == str(actual[date_key]), f"{indicator} {date_key}: {value} != {actual[date_key]}"
+            print(f"  ✅ {indicator}: {len(actual)} 个交易日一致")
+
+
+
+def test_window_report_format():
+    """测试 get_stock_stats_indicators_window 的输出格式"""
+    print("\n🧪 测试指标窗口报告格式...")
+
+    from tradingagents.dataflows import interface
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        price_dir = os.path.join(data_dir, "market_data", "price_data")
+        os.makedirs(price_dir)
+        _write_synthetic_csv(price_dir)
+
+        original_data_dir = interface.DATA_DIR
+        interface.DATA_DIR = data_dir
+        try:
+            report = interface.get_stock_stats_indicators_window(
+                SYMBOL, "close_50_sma", "2023-04-30", 10, False
+            )
+        finally:
+            interface.DATA_DIR = original_data_dir
+
+    lines = report.split("\n")
+    assert lines[0] == "## close_50_sma values from 2023-04-20 to 2023-04-30:"
+    # 2023-04-30 是周日，离线模式只输出交易日，按日期倒序
+    assert lines[2].startswith("2023-04-28: ")
+    assert "2023-04-29" not in report and "2023-04-30: " not in report
+    assert "50 SMA: A medium-term trend indicator." in report
+    print("  ✅ 报告格式正确")
+
+
+def benchmark_window_engine():
+    """对比逐日路径与窗口引擎的耗时（60天窗口、10年数据）"""
+    print("\n⚡ 指标窗口性能对比...")
+
+    from tradingagents.dataflows.stockstats_utils import StockstatsUtils
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        _write_synthetic_csv(data_dir)
+        end_date = "2024-06-28"
+        start_date = (datetime.strptime(end_date, "%Y-%m-%d") - timedelta(days=60)).strftime("%Y-%m-%d")
+
+        start = time.time()
+        _per_day_values(data_dir, "close_200_sma", start_date, end_date)
+        per_day_time = time.time() - start
+
+        start = time.time()
+        StockstatsUtils.get_stock_stats_window(SYMBOL, "close_200_sma", start_date, end_date, data_dir)
+        window_time = time.time() - start
+
+    print(f"  📊 逐日路径: {per_day_time:.3f}秒")
+    print(f"  📊 窗口引擎: {window_time:.3f}秒")
+    if window_time > 0:
+        print(f"  🚀 提速: {per_day_time / window_time:.1f}x")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 技术指标窗口引擎测试")
+    print("=" * 50)
+
+    test_results = [
+        ("窗口结果一致性", _run_test(test_window_matches_per_day)),
+        ("报告格式", _run_test(test_window_report_format)),
+        ("性能对比", _run_test(benchmark_window_engine)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
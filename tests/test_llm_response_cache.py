@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+LLM响应缓存测试
+验证缓存键规范化、record/replay 模式下适配器不再请求模型（含异步调用）、工具调用结果完整回放，以及按大小淘汰
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import httpx
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+class FakeGeneration:
+    """模拟 dashscope.Generation，记录调用次数"""
+
+    calls = 0
+
+    @classmethod
+    def call(cls, **params):
+        cls.calls += 1
+        return SimpleNamespace(
+            status_code=200,
+            output=SimpleNamespace(choices=[SimpleNamespace(
+                message=SimpleNamespace(content=f"分析结论: {params['messages'][-1]['content']}"))]),
+            usage=SimpleNamespace(input_tokens=100, output_tokens=50),
+        )
+
+
+class OpenAIHandler:
+    """模拟 OpenAI 兼容接口，返回带工具调用的响应"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, request):
+        self.calls += 1
+        body = json.loads(request.content)
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {
+                    "role": "assistant",
+                    "content": "",
+                    "tool_calls": [{
+                        "id": f"call_{self.calls}",
+                        "type": "function",
+                        "function": {"name": "get_stock_data", "arguments": json.dumps({"ticker": "600036"})},
+                    }],
+                },
+                "finish_reason": "tool_calls",
+            }],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+        })
+
+
+def _messages(call_id="call_a"):
+    return [
+        SystemMessage(content="你是一名股票分析师"),
+        HumanMessage(content="分析 600036 "),
+        AIMessage(content="", tool_calls=[{"name": "get_stock_data", "args": {"ticker": "600036"}, "id": call_id}]),
+        ToolMessage(content="收盘价 35.2", tool_call_id=call_id),
+    ]
+
+
+def test_cache_key_normalization():
+    """测试缓存键忽略工具调用ID和会话参数，但区分生成参数与工具定义"""
+    print("🧪 测试缓存键规范化...")
+
+    from tradingagents.llm_adapters.response_cache import LLMResponseCache
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = LLMResponseCache(os.path.join(tmp_dir, "llm.db"), mode="record")
+        base = cache.make_key("dashscope", "qwen-plus", _messages("call_a"), {"temperature": 0.1})
+
+        assert base == cache.make_key("dashscope", "qwen-plus", _messages("call_b"),
+                                      {"temperature": 0.1, "session_id": "s2"})
+        assert base != cache.make_key("dashscope", "qwen-plus", _messages(), {"temperature": 0.7})
+        assert base != cache.make_key("dashscope", "qwen-max", _messages(), {"temperature": 0.1})
+        assert base != cache.make_key("dashscope", "qwen-plus", _messages(),
+                                      {"temperature": 0.1, "tools": [{"name": "get_news"}]})
+        assert LLMResponseCache(os.path.join(tmp_dir, "off.db"), mode="off").make_key(
+            "dashscope", "qwen-plus", _messages(), {}) is None
+    print("  ✅ 缓存键规范化正确")
+
+
+def test_dashscope_record_and_replay():
+    """测试 ChatDashScope 在 record 模式下第二次运行不再请求模型，replay 模式未命中时报错"""
+    print("\n🧪 测试 ChatDashScope record/replay...")
+
+    from tradingagents.llm_adapters import dashscope_adapter
+    from tradingagents.llm_adapters.response_cache import (
+        LLMCacheMissError, LLMResponseCache, set_llm_response_cache)
+
+    original = dashscope_adapter.Generation
+    dashscope_adapter.Generation = FakeGeneration
+    FakeGeneration.calls = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "llm.db")
+            set_llm_response_cache(LLMResponseCache(path, mode="record"))
+            llm = dashscope_adapter.ChatDashScope(model="qwen-plus", api_key="test")
+
+            first = [llm.invoke(f"分析第{i}只股票").content for i in range(5)]
+            second = [llm.invoke(f"分析第{i}只股票").content for i in range(5)]
+            assert FakeGeneration.calls == 5 and first == second, FakeGeneration.calls
+
+            # 新进程以 replay 模式打开同一个缓存文件
+            set_llm_response_cache(LLMResponseCache(path, mode="replay"))
+            replayed = [llm.invoke(f"分析第{i}只股票").content for i in range(5)]
+            assert replayed == first and FakeGeneration.calls == 5
+            try:
+                llm.invoke("缓存中没有的问题")
+                raise AssertionError("replay模式未命中时应抛出异常")
+            except LLMCacheMissError:
+                pass
+    finally:
+        dashscope_adapter.Generation = original
+        set_llm_response_cache(None)
+    print("  ✅ 5次请求后全部命中缓存，replay模式未命中时抛出 LLMCacheMissError")
+
+
+def test_openai_compatible_tool_call_replay():
+    """测试 ChatDeepSeek 的工具调用响应可以完整回放"""
+    print("\n🧪 测试工具调用响应回放...")
+
+    from tradingagents.llm_adapters.deepseek_adapter import ChatDeepSeek
+    from tradingagents.llm_adapters.response_cache import LLMResponseCache, set_llm_response_cache
+
+    handler = OpenAIHandler()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "llm.db")
+            set_llm_response_cache(LLMResponseCache(path, mode="record"))
+            llm = ChatDeepSeek(api_key="test", http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+            tool = {"type": "function", "function": {
+                "name": "get_stock_data", "description": "获取行情",
+                "parameters": {"type": "object", "properties": {"ticker": {"type": "string"}}}}}
+            bound = llm.bind_tools([tool])
+
+            recorded = bound.invoke([HumanMessage(content="分析 600036")])
+            set_llm_response_cache(LLMResponseCache(path, mode="replay"))
+            replayed = bound.invoke([HumanMessage(content="分析 600036")])
+
+            assert handler.calls == 1, handler.calls
+            assert replayed.tool_calls == recorded.tool_calls
+            assert replayed.tool_calls[0]["args"] == {"ticker": "600036"}
+    finally:
+        set_llm_response_cache(None)
+    print("  ✅ 工具调用在回放中保持一致")
+
+
+def test_google_async_record_and_replay():
+    """测试 ChatGoogleOpenAI 的异步调用同样经过响应缓存，replay 模式未命中时报错"""
+    print("\n🧪 测试 Google 适配器异步 record/replay...")
+
+    import asyncio
+    import pytest
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from tradingagents.llm_adapters.google_openai_adapter import ChatGoogleOpenAI
+    from tradingagents.llm_adapters.response_cache import (
+        LLMCacheMissError, LLMResponseCache, set_llm_response_cache)
+
+    calls = []
+
+    async def fake_agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        calls.append(messages[-1].content)
+        message = AIMessage(content=f"分析结论: {messages[-1].content}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    with tempfile.TemporaryDirectory() as tmp_dir, pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(ChatGoogleGenerativeAI, "_agenerate", fake_agenerate)
+        path = os.path.join(tmp_dir, "llm.db")
+        try:
+            set_llm_response_cache(LLMResponseCache(path, mode="record"))
+            llm = ChatGoogleOpenAI(model="gemini-2.5-flash", google_api_key="test")
+
+            async def run_all():
+                return [(await llm.ainvoke(f"分析第{i}只股票")).content for i in range(3)]
+
+            first = asyncio.run(run_all())
+            second = asyncio.run(run_all())
+            assert len(calls) == 3 and first == second, calls
+
+            set_llm_response_cache(LLMResponseCache(path, mode="replay"))
+            assert asyncio.run(run_all()) == first and len(calls) == 3
+            try:
+                asyncio.run(llm.ainvoke("缓存中没有的问题"))
+                raise AssertionError("replay模式未命中时应抛出异常")
+            except LLMCacheMissError:
+                pass
+            assert len(calls) == 3
+        finally:
+            set_llm_response_cache(None)
+    print("  ✅ 异步调用命中缓存，replay模式未命中时抛出 LLMCacheMissError")
+
+
+def test_size_bounded_eviction():
+    """测试总大小超过上限时淘汰最久未访问的记录"""
+    print("\n🧪 测试按大小淘汰...")
+
+    from tradingagents.llm_adapters.response_cache import LLMResponseCache
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = LLMResponseCache(os.path.join(tmp_dir, "llm.db"), mode="record", max_size_mb=0.02)
+
+        def result(i):
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"{i}" + "报告" * 300))])
+
+        keys = [cache.make_key("dashscope", "qwen-plus", [HumanMessage(content=f"问题{i}")]) for i in range(40)]
+        for i, key in enumerate(keys):
+            cache.store(key, result(i))
+            if i > 0:
+                # 一直访问第一条，保持其为最近使用
+                assert cache.lookup(keys[0]) is not None
+
+        stats = cache.get_stats()
+        assert stats['size_bytes'] <= stats['max_bytes'] and stats['evictions'] > 0, stats
+        assert cache.lookup(keys[0]) is not None
+        assert cache.lookup(keys[1]) is None
+        assert cache.lookup(keys[-1]).generations[0].message.content.startswith("39")
+    print(f"  ✅ 保留 {stats['entries']} 条，淘汰 {stats['evictions']} 条")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 LLM响应缓存测试")
+    print("=" * 50)
+
+    test_results = [
+        ("缓存键规范化", _run_test(test_cache_key_normalization)),
+        ("DashScope record/replay", _run_test(test_dashscope_record_and_replay)),
+        ("工具调用回放", _run_test(test_openai_compatible_tool_call_replay)),
+        ("Google异步回放", _run_test(test_google_async_record_and_replay)),
+        ("按大小淘汰", _run_test(test_size_bounded_eviction)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+新闻近似去重测试
+验证转载新闻的标题细微改动能被聚为一簇、只有数字或序数不同的标题不被合并、聚合器记录报道数量、
+过滤器和统一新闻工具的去重，以及大批量新闻的去重耗时
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def test_near_duplicate_clusters():
+    """测试措辞略有差异的标题被聚为同一簇"""
+    print("🧪 测试近似重复聚簇...")
+
+    from tradingagents.utils.news_dedup import NearDuplicateDetector
+
+    titles = [
+        "贵州茅台发布2024年年报，净利润同比增长15%",
+        "【快讯】贵州茅台发布2024年年报,净利润同比增长15%",
+        "Apple reports record quarterly revenue driven by iPhone sales",
+        "【转载】贵州茅台发布2024年年报：净利润同比增长15%",
+        "Apple reports record quarterly revenue, driven by iPhone sales",
+        "平安银行召开年度股东大会审议分红方案",
+    ]
+    clusters = NearDuplicateDetector().cluster(titles)
+    assert clusters == [[0, 1, 3], [2, 4], [5]], clusters
+    print(f"  ✅ {len(titles)} 条标题聚为 {len(clusters)} 簇: {clusters}")
+
+
+def test_numbers_and_ordinals_not_merged():
+    """测试只有数字、日期或序数不同的标题不会被合并"""
+    print("\n🧪 测试数字与序数区分...")
+
+    from tradingagents.utils.news_dedup import NearDuplicateDetector
+
+    titles = [
+        "平安银行发布一季度业绩报告，净利润增长",
+        "平安银行发布三季度业绩报告，净利润增长",
+        "平安银行召开第一次临时股东大会",
+        "平安银行召开第二次临时股东大会",
+        "Apple Q1 2025 earnings beat expectations",
+        "Apple Q3 2025 earnings beat expectations",
+        "Tesla holds first shareholder meeting of the year",
+        "Tesla holds second shareholder meeting of the year",
+        "贵州茅台2024-03-01公告：回购股份进展",
+        "贵州茅台2024-04-01公告：回购股份进展",
+    ]
+    # 即使阈值放得很低，区分性记号不同也不合并
+    clusters = NearDuplicateDetector(threshold=0.3).cluster(titles)
+    assert clusters == [[i] for i in range(len(titles))], clusters
+    print(f"  ✅ {len(titles)} 条仅数字/序数不同的标题保持独立")
+
+
+def test_numeral_characters_in_words_ignored():
+    """测试普通词语中的数字字（万得、统一）不算区分性记号，改写后的转载仍被合并"""
+    print("\n🧪 测试词语中的数字字...")
+
+    from tradingagents.utils.news_dedup import NearDuplicateDetector, distinguishing_tokens
+
+    assert distinguishing_tokens("万得数据显示机构统一看好白酒板块") == frozenset()
+    assert distinguishing_tokens("平安银行一季度净利润增长三成") == {"一季度", "三成"}
+    assert distinguishing_tokens("召开第二次临时股东大会，回购三万股") == {"第二", "三万股"}
+
+    titles = [
+        "【万得】机构统一看好白酒板块，北向资金连续五日净流入白酒龙头股",
+        "机构统一看好白酒板块，北向资金连续五日净流入白酒龙头股",
+    ]
+    clusters = NearDuplicateDetector().cluster(titles)
+    assert clusters == [[0, 1]], clusters
+    print("  ✅ 词语中的数字字不影响合并")
+
+
+def test_aggregator_records_source_count():
+    """测试实时新闻聚合器保留相关性最高的代表并记录报道数量"""
+    print("\n🧪 测试聚合器去重...")
+
+    from tradingagents.dataflows.realtime_news_utils import NewsItem, RealtimeNewsAggregator
+
+    now = datetime.now()
+
+    def item(title, source, score):
+        return NewsItem(title=title, content="", source=source, publish_time=now,
+                        url="", urgency="low", relevance_score=score)
+
+    news = [
+        item("Apple reports record quarterly revenue driven by iPhone sales", "FinnHub", 0.6),
+        item("Apple reports record quarterly revenue, driven by iPhone sales", "NewsAPI", 0.9),
+        item("Apple Reports Record Quarterly Revenue Driven By iPhone Sales!", "Alpha Vantage", 0.5),
+        item("Microsoft announces new Azure data centers in Europe", "FinnHub", 0.3),
+        item("AAPL up", "FinnHub", 0.9),
+    ]
+    aggregator = RealtimeNewsAggregator()
+    unique = aggregator._deduplicate_news(news)
+
+    assert len(unique) == 2, [n.title for n in unique]
+    assert unique[0].source == "NewsAPI" and unique[0].source_count == 3
+    assert unique[0].sources == ["FinnHub", "NewsAPI", "Alpha Vantage"]
+    assert unique[1].source_count == 1
+    # 再次去重不会重复累加
+    again = aggregator._deduplicate_news(news)
+    assert again[0].source_count == 3 and news[1].source_count == 1
+    for n in unique:
+        n.urgency = 'medium'
+    assert "等3条报道" in aggregator.format_news_report(unique, "AAPL")
+    print(f"  ✅ 代表来源: {unique[0].source}，报道数量: {unique[0].source_count}")
+
+
+def test_filter_and_text_dedup():
+    """测试相关性过滤器和统一新闻工具的近似去重"""
+    print("\n🧪 测试过滤器与文本段落去重...")
+
+    from tradingagents.utils.news_filter import NewsRelevanceFilter
+    from tradingagents.utils.news_dedup import deduplicate_text_blocks
+
+    news_df = pd.DataFrame([
+        {'新闻标题': '平安银行发布一季度业绩报告，净利润增长', '新闻内容': '平安银行一季度业绩'},
+        {'新闻标题': '平安银行发布一季度业绩报告,净利润增长', '新闻内容': '平安银行(000001)一季度业绩公告'},
+        {'新闻标题': '平安银行召开年度股东大会审议分红方案', '新闻内容': '平安银行股东大会'},
+    ])
+    news_filter = NewsRelevanceFilter("000001", "平安银行")
+    filtered = news_filter.filter_news(news_df, min_score=0, deduplicate=True)
+    assert len(filtered) == 2, filtered
+    assert sorted(filtered['source_count'].tolist()) == [1, 2]
+    # 默认不去重，保持原有行为
+    assert len(news_filter.filter_news(news_df, min_score=0)) == 3
+
+    text = "\n\n".join([
+        "# 新闻汇总",
+        "### 平安银行发布一季度业绩报告，净利润同比增长显著超预期",
+        "### 平安银行发布一季度业绩报告,净利润同比增长显著超预期",
+        "### 平安银行召开年度股东大会审议分红方案并公布派息安排",
+    ])
+    deduplicated = deduplicate_text_blocks(text)
+    assert deduplicated.count("一季度业绩报告") == 1 and "股东大会" in deduplicated
+    print(f"  ✅ 过滤器保留 {len(filtered)} 条，文本段落 4 -> {len(deduplicated.split(chr(10) * 2))}")
+
+
+def benchmark_large_batch():
+    """大批量新闻的去重耗时"""
+    print("\n⚡ 大批量去重性能...")
+
+    from tradingagents.utils.news_dedup import NearDuplicateDetector
+
+    rng = random.Random(7)
+    pool = "上证指数银行证券保险地产医药科技能源汽车芯片消费基金债券期货外汇黄金原油业绩财报增长下跌回购分红并购重组监管"
+    titles = []
+    for i in range(5000):
+        base = "".join(rng.choice(pool) for _ in range(24))
+        titles.append(base)
+        if i % 5 == 0:
+            titles.append("【转载】" + base)
+
+    start = time.time()
+    clusters = NearDuplicateDetector().cluster(titles)
+    elapsed = time.time() - start
+
+    assert len(clusters) == 5000, len(clusters)
+    print(f"  📊 {len(titles)} 条标题去重耗时 {elapsed:.2f}秒")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 新闻近似去重测试")
+    print("=" * 50)
+
+    test_results = [
+        ("近似重复聚簇", _run_test(test_near_duplicate_clusters)),
+        ("数字与序数区分", _run_test(test_numbers_and_ordinals_not_merged)),
+        ("词语中的数字字", _run_test(test_numeral_characters_in_words_ignored)),
+        ("聚合器去重", _run_test(test_aggregator_records_source_count)),
+        ("过滤器与文本去重", _run_test(test_filter_and_text_dedup)),
+        ("性能测试", _run_test(benchmark_large_batch)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
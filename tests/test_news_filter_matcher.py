@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+新闻相关性过滤器关键词匹配测试
+验证批量评分与逐条逐关键词扫描的评分一致，并在几千条合成新闻上对比耗时
+"""
+
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def _reference_score(news_filter, title, content):
+    """逐个关键词扫描标题和内容的原始评分规则"""
+    score = 0
+    title_lower, content_lower = title.lower(), content.lower()
+    if news_filter.company_name in title:
+        score += 50
+    elif news_filter.company_name in content:
+        score += 25
+    if news_filter.stock_code in title:
+        score += 40
+    elif news_filter.stock_code in content:
+        score += 20
+    for keywords, title_points, content_points in ((news_filter.strong_keywords, 30, 15),
+                                                  (news_filter.include_keywords, 15, 8),
+                                                  (news_filter.exclude_keywords, -40, -20)):
+        for keyword in keywords:
+            if keyword in title_lower:
+                score += title_points
+            elif keyword in content_lower:
+                score += content_points
+    if (news_filter.company_name not in title and news_filter.stock_code not in title and
+            any(keyword in title_lower for keyword in news_filter.exclude_keywords)):
+        score -= 30
+    return max(0, min(100, score))
+
+
+def _make_news(news_filter, count, content_length, seed=1):
+    """生成合成新闻，正文中稀疏地出现关键词、公司名称和股票代码"""
+    rng = random.Random(seed)
+    keywords = news_filter.strong_keywords + news_filter.include_keywords + news_filter.exclude_keywords
+    common = list("的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就年分对成会可主发市场经济企业产品")
+    specials = keywords + [news_filter.company_name, news_filter.stock_code, 'ETF', 'Index Fund']
+
+    def text(length, density):
+        return "".join(rng.choice(specials) if rng.random() < density else rng.choice(common)
+                       for _ in range(length))
+
+    return pd.DataFrame({
+        '新闻标题': [text(20, 0.1) for _ in range(count)],
+        '新闻内容': [text(content_length, 0.004) for _ in range(count)],
+    })
+
+
+def test_batch_scores_match_reference():
+    """测试批量评分、单条评分与原始规则一致"""
+    print("🧪 测试评分一致性...")
+
+    from tradingagents.utils.news_filter import NewsRelevanceFilter
+
+    news_filter = NewsRelevanceFilter("600036", "招商银行")
+    news_df = _make_news(news_filter, 500, 300)
+    titles, contents = news_df['新闻标题'].tolist(), news_df['新闻内容'].tolist()
+    expected = [_reference_score(news_filter, t, c) for t, c in zip(titles, contents)]
+
+    assert news_filter.score_batch(titles, contents) == expected
+    assert [news_filter.calculate_relevance_score(t, c) for t, c in zip(titles, contents)] == expected
+
+    # 不使用自动机的子串扫描方式结果相同
+    matcher = news_filter._get_matcher()
+    matcher._automaton = None
+    assert news_filter.score_batch(titles, contents) == expected
+
+    filtered = news_filter.filter_news(news_df, min_score=30, deduplicate=False)
+    assert sorted(filtered['relevance_score'].tolist()) == sorted(s for s in expected if s >= 30)
+
+    # 关键词列表修改后匹配器自动重建
+    news_filter.include_keywords.append('的一')
+    assert news_filter.calculate_relevance_score('的一', '') == 15
+    print(f"  ✅ {len(expected)} 条新闻评分一致，过滤后保留 {len(filtered)} 条")
+
+
+def benchmark_filter_news():
+    """对比逐行逐关键词评分与批量评分的耗时"""
+    print("\n⚡ 过滤性能对比...")
+
+    import logging
+    from tradingagents.utils.news_filter import AHOCORASICK_AVAILABLE, NewsRelevanceFilter
+
+    news_filter = NewsRelevanceFilter("600036", "招商银行")
+    news_df = _make_news(news_filter, 3000, 2000, seed=2)
+
+    previous_level = logging.getLogger('tradingagents.utils.news_filter').level
+    logging.getLogger('tradingagents.utils.news_filter').setLevel(logging.WARNING)
+    try:
+        start = time.time()
+        reference = [_reference_score(news_filter, row['新闻标题'], row['新闻内容'])
+                     for _, row in news_df.iterrows()]
+        reference_time = time.time() - start
+
+        start = time.time()
+        filtered = news_filter.filter_news(news_df, min_score=0, deduplicate=False)
+        batch_time = time.time() - start
+    finally:
+        logging.getLogger('tradingagents.utils.news_filter').setLevel(previous_level)
+
+    assert sorted(filtered['relevance_score'].tolist()) == sorted(s for s in reference if s >= 0)
+    mode = "Aho-Corasick" if AHOCORASICK_AVAILABLE else "批量子串扫描"
+    print(f"  📊 逐行逐关键词: {reference_time:.3f}秒")
+    print(f"  📊 批量评分({mode}): {batch_time:.3f}秒")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 新闻过滤器关键词匹配测试")
+    print("=" * 50)
+
+    test_results = [
+        ("评分一致性", _run_test(test_batch_scores_match_reference)),
+        ("性能对比", _run_test(benchmark_filter_news)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
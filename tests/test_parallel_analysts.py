@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+分析师并行运行测试
+使用假的分析师/工具节点，验证并行拓扑与串行拓扑产出相同的报告，且总耗时接近最慢的分析师
+"""
+
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+ANALYST_DELAY = 0.3
+
+
+def _fake_analyst(report_field, tool_name):
+    """第一次调用发起工具调用，拿到工具结果后生成报告"""
+    from langchain_core.messages import AIMessage, ToolMessage
+
+    def node(state):
+        last_message = state["messages"][-1]
+        time.sleep(ANALYST_DELAY / 2)
+        if isinstance(last_message, ToolMessage):
+            report = f"{report_field}: {state['company_of_interest']} {state['trade_date']} {last_message.content}"
+            return {"messages": [AIMessage(content=report)], report_field: report}
+        tool_call = {"name": tool_name, "args": {"ticker": state["company_of_interest"]}, "id": f"call_{tool_name}"}
+        return {"messages": [AIMessage(content="", tool_calls=[tool_call])]}
+
+    return lambda llm, toolkit: node
+
+
+def _fake_tool_node(tool_name):
+    from langchain_core.tools import tool
+    from langgraph.prebuilt import ToolNode
+
+    @tool(tool_name)
+    def fake_tool(ticker: str) -> str:
+        """返回固定的工具数据"""
+        return f"{tool_name}({ticker})"
+
+    return ToolNode([fake_tool])
+
+
+def _patch_graph_nodes(monkeypatch, setup_module):
+    """把所有LLM节点替换为假节点，辩论各只进行一轮；测试结束后由 monkeypatch 还原"""
+    monkeypatch.setattr(setup_module, "create_market_analyst", _fake_analyst("market_report", "market_tool"))
+    monkeypatch.setattr(setup_module, "create_social_media_analyst", _fake_analyst("sentiment_report", "social_tool"))
+    monkeypatch.setattr(setup_module, "create_news_analyst", _fake_analyst("news_report", "news_tool"))
+    monkeypatch.setattr(setup_module, "create_fundamentals_analyst",
+                        _fake_analyst("fundamentals_report", "fundamentals_tool"))
+
+    def researcher(llm, memory, context_packer=None):
+        return lambda state: {"investment_debate_state": {
+            **state["investment_debate_state"], "count": 2, "current_response": "Bull: ok"}}
+
+    monkeypatch.setattr(setup_module, "create_bull_researcher", researcher)
+    monkeypatch.setattr(setup_module, "create_bear_researcher", researcher)
+    monkeypatch.setattr(setup_module, "create_research_manager",
+                        lambda llm, memory, context_packer=None: lambda state: {"investment_plan": "plan"})
+    monkeypatch.setattr(setup_module, "create_trader",
+                        lambda llm, memory: lambda state: {"trader_investment_plan": "trade"})
+
+    def debator(llm, context_packer=None):
+        return lambda state: {"risk_debate_state": {
+            **state["risk_debate_state"], "count": 3, "latest_speaker": "Risky"}}
+
+    monkeypatch.setattr(setup_module, "create_risky_debator", debator)
+    monkeypatch.setattr(setup_module, "create_safe_debator", debator)
+    monkeypatch.setattr(setup_module, "create_neutral_debator", debator)
+    monkeypatch.setattr(setup_module, "create_risk_manager",
+                        lambda llm, memory, context_packer=None: lambda state: {"final_trade_decision": "BUY"})
+
+
+def _build_graph(monkeypatch, parallel, patch_nodes=True):
+    from tradingagents.graph import setup as setup_module
+    from tradingagents.graph.conditional_logic import ConditionalLogic
+
+    if patch_nodes:
+        _patch_graph_nodes(monkeypatch, setup_module)
+    tool_nodes = {name: _fake_tool_node(f"{name}_tool") for name in ("market", "social", "news", "fundamentals")}
+    graph_setup = setup_module.GraphSetup(
+        None, None, None, tool_nodes, None, None, None, None, None,
+        ConditionalLogic(), config={"parallel_analysts": parallel},
+    )
+    return graph_setup.setup_graph(["market", "social", "news", "fundamentals"])
+
+
+def _run(graph, config=None):
+    from tradingagents.graph.propagation import Propagator
+
+    state = Propagator().create_initial_state("000001", "2025-01-02")
+    start = time.time()
+    final_state = graph.invoke(state, config={"recursion_limit": 100, **(config or {})})
+    return final_state, time.time() - start
+
+
+def test_parallel_reports_match_serial(monkeypatch):
+    """测试并行模式与串行模式的报告一致，且耗时接近单个分析师"""
+    print("🧪 测试分析师并行运行...")
+
+    serial_state, serial_time = _run(_build_graph(monkeypatch, parallel=False))
+    parallel_state, parallel_time = _run(_build_graph(monkeypatch, parallel=True))
+
+    for field in ("market_report", "sentiment_report", "news_report", "fundamentals_report"):
+        assert parallel_state[field], f"{field} 为空"
+        assert parallel_state[field] == serial_state[field], f"{field} 不一致"
+    assert parallel_state["final_trade_decision"] == serial_state["final_trade_decision"] == "BUY"
+    assert parallel_time < serial_time / 2, f"并行未加速: {parallel_time:.2f}s vs {serial_time:.2f}s"
+    print(f"  ✅ 串行 {serial_time:.2f}秒，并行 {parallel_time:.2f}秒")
+
+
+def test_parallel_branches_isolate_messages(monkeypatch):
+    """测试各分支使用独立的消息列表，工具调用不会泄漏到主图"""
+    print("\n🧪 测试分支消息隔离...")
+
+    from langchain_core.messages import ToolMessage
+
+    final_state, _ = _run(_build_graph(monkeypatch, parallel=True))
+    assert not any(isinstance(m, ToolMessage) for m in final_state["messages"])
+    assert len(final_state["messages"]) == 1, final_state["messages"]
+    print("  ✅ 主图消息未被分支污染")
+
+
+def test_branches_inherit_parent_config(monkeypatch):
+    """测试分支子图沿用主图的运行配置（追踪标签、递归上限等）"""
+    print("\n🧪 测试分支沿用主图配置...")
+
+    from tradingagents.graph import setup as setup_module
+
+    seen = []
+    market_node = _fake_analyst("market_report", "market_tool")(None, None)
+
+    def recording_analyst(llm, toolkit):
+        def node(state, config):
+            seen.append((config.get("recursion_limit"), config.get("tags")))
+            return market_node(state)
+        return node
+
+    _patch_graph_nodes(monkeypatch, setup_module)
+    monkeypatch.setattr(setup_module, "create_market_analyst", recording_analyst)
+    graph = _build_graph(monkeypatch, parallel=True, patch_nodes=False)
+    _run(graph, config={"recursion_limit": 77, "tags": ["parent-run"]})
+
+    assert seen, "分支内的分析师未运行"
+    for recursion_limit, tags in seen:
+        assert recursion_limit == 77, recursion_limit
+        assert "parent-run" in (tags or []), tags
+    print("  ✅ 分支内节点收到主图的递归上限和追踪标签")
+
+
+def _run_test(test):
+    """脚本方式运行时为测试提供 monkeypatch，结束后还原被替换的节点"""
+    import pytest
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        try:
+            test(monkeypatch)
+            return True
+        except Exception as e:
+            print(f"❌ {test.__doc__} 失败: {e}")
+            return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 分析师并行运行测试")
+    print("=" * 50)
+
+    test_results = [
+        ("并行与串行一致", _run_test(test_parallel_reports_match_serial)),
+        ("分支消息隔离", _run_test(test_parallel_branches_isolate_messages)),
+        ("分支沿用主图配置", _run_test(test_branches_inherit_parent_config)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
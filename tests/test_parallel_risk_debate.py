@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+风险辩论首轮并行测试
+使用真实的三位风险分析师节点和按角色延迟的假模型，验证并行首轮的状态合并顺序固定、
+与依次发言的状态结构一致，后续轮次可依次或并行发言，首轮耗时接近单次模型调用，
+并且并行发言沿用主图的运行配置
+"""
+
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+# 让中性分析师最先返回、激进分析师最后返回，检验合并顺序不依赖完成顺序
+ROLE_DELAYS = {"激进": 0.3, "安全": 0.2, "中性": 0.1}
+
+
+class RoleDelayLLM:
+    """根据提示词中的角色等待不同时间，返回该角色的固定发言"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def invoke(self, prompt):
+        role = next(role for role in ROLE_DELAYS if f"作为{role}" in prompt)
+        time.sleep(ROLE_DELAYS[role])
+        with self.lock:
+            self.calls += 1
+        return SimpleNamespace(content=f"{role}观点")
+
+
+def _build_graph(monkeypatch, config, rounds, llm, captured):
+    from tradingagents.graph import setup as setup_module
+    from tradingagents.graph.conditional_logic import ConditionalLogic
+
+    def analyst(report_field):
+        from langchain_core.messages import AIMessage
+        return lambda llm, toolkit: lambda state: {
+            "messages": [AIMessage(content=report_field)], report_field: f"{report_field}内容"}
+
+    monkeypatch.setattr(setup_module, "create_market_analyst", analyst("market_report"))
+
+    def researcher(llm, memory, context_packer=None):
+        return lambda state: {"investment_debate_state": {
+            **state["investment_debate_state"], "count": 2, "current_response": "Bull: ok"}}
+
+    def risk_manager(llm, memory, context_packer=None):
+        def node(state):
+            captured.append(state["risk_debate_state"])
+            return {"final_trade_decision": "持有"}
+        return node
+
+    # 通过 monkeypatch 替换，测试结束后还原，避免假节点影响同一进程中的其他测试
+    monkeypatch.setattr(setup_module, "create_bull_researcher", researcher)
+    monkeypatch.setattr(setup_module, "create_bear_researcher", researcher)
+    monkeypatch.setattr(setup_module, "create_research_manager",
+                        lambda llm, memory, context_packer=None: lambda state: {"investment_plan": "plan"})
+    monkeypatch.setattr(setup_module, "create_trader",
+                        lambda llm, memory: lambda state: {"trader_investment_plan": "买入100股"})
+    monkeypatch.setattr(setup_module, "create_risk_manager", risk_manager)
+
+    graph_setup = setup_module.GraphSetup(
+        llm, llm, None, {"market": lambda state: {}}, None, None, None, None, None,
+        ConditionalLogic(max_risk_discuss_rounds=rounds,
+                         parallel_risk_rounds=config.get("parallel_risk_rounds", False)),
+        config=config,
+    )
+    return graph_setup.setup_graph(["market"])
+
+
+def _run(monkeypatch, config, rounds=1, llm=None, run_config=None):
+    from tradingagents.graph.propagation import Propagator
+
+    llm, captured = llm or RoleDelayLLM(), []
+    graph = _build_graph(monkeypatch, config, rounds, llm, captured)
+    state = Propagator().create_initial_state("000001", "2025-01-02")
+    start = time.time()
+    graph.invoke(state, config={"recursion_limit": 100, **(run_config or {})})
+    return captured[-1], time.time() - start, llm.calls
+
+
+def _speakers(history):
+    return [line.split(":")[0] for line in history.strip().split("\n")]
+
+
+def test_parallel_opening_matches_sequential(monkeypatch):
+    """测试并行首轮与依次发言得到相同结构的状态，且耗时接近最慢的一次调用"""
+    print("🧪 测试风险辩论首轮并行...")
+
+    sequential, sequential_time, _ = _run(monkeypatch, {})
+    parallel, parallel_time, calls = _run(monkeypatch, {"parallel_risk_opening": True})
+
+    assert calls == 3
+    for field in ("risky_history", "safe_history", "neutral_history", "current_risky_response",
+                  "current_safe_response", "current_neutral_response", "latest_speaker"):
+        assert parallel[field] and parallel[field] == sequential[field], field
+    assert parallel["count"] == sequential["count"] == 3
+    assert _speakers(parallel["history"]) == ["Risky Analyst", "Safe Analyst", "Neutral Analyst"]
+    assert _speakers(parallel["history"]) == _speakers(sequential["history"])
+    assert parallel_time < sequential_time * 0.7, f"{parallel_time:.2f}s vs {sequential_time:.2f}s"
+    print(f"  ✅ 依次发言 {sequential_time:.2f}秒，首轮并行 {parallel_time:.2f}秒")
+
+
+def test_later_rounds_sequential_or_parallel(monkeypatch):
+    """测试首轮并行后，后续轮次按配置依次或并行发言"""
+    print("\n🧪 测试后续轮次模式...")
+
+    mixed, mixed_time, _ = _run(monkeypatch, {"parallel_risk_opening": True}, rounds=2)
+    all_parallel, all_time, calls = _run(
+        monkeypatch, {"parallel_risk_opening": True, "parallel_risk_rounds": True}, rounds=2)
+
+    expected = ["Risky Analyst", "Safe Analyst", "Neutral Analyst"] * 2
+    assert _speakers(mixed["history"]) == expected and mixed["count"] == 6
+    assert _speakers(all_parallel["history"]) == expected and all_parallel["count"] == 6
+    assert calls == 6
+    assert all_parallel["risky_history"].count("Risky Analyst") == 2
+    assert all_time < mixed_time, f"{all_time:.2f}s vs {mixed_time:.2f}s"
+    print(f"  ✅ 首轮并行+依次 {mixed_time:.2f}秒，全部并行 {all_time:.2f}秒")
+
+
+def test_parallel_round_inherits_run_config(monkeypatch):
+    """测试并行发言时分析师的模型调用沿用主图的追踪标签和回调"""
+    print("\n🧪 测试并行发言沿用主图配置...")
+
+    from langchain_core.callbacks import BaseCallbackHandler
+    from langchain_core.runnables.config import ensure_config
+
+    class ConfigRecordingLLM(RoleDelayLLM):
+        def __init__(self):
+            super().__init__()
+            self.seen = []
+
+        def invoke(self, prompt):
+            config = ensure_config()
+            callbacks = config.get("callbacks")
+            handlers = getattr(callbacks, "handlers", callbacks) or []
+            with self.lock:
+                self.seen.append((config.get("tags") or [], handlers))
+            return super().invoke(prompt)
+
+    handler = BaseCallbackHandler()
+    llm = ConfigRecordingLLM()
+    _run(monkeypatch, {"parallel_risk_opening": True, "parallel_risk_rounds": True}, rounds=2,
+         llm=llm, run_config={"tags": ["parent-run"], "callbacks": [handler]})
+
+    assert len(llm.seen) == 6
+    for tags, handlers in llm.seen:
+        assert "parent-run" in tags, tags
+        assert handler in handlers, handlers
+    print("  ✅ 并行发言的模型调用收到主图的追踪标签和回调")
+
+
+def _run_test(test):
+    """脚本方式运行时为测试提供 monkeypatch，结束后还原被替换的节点"""
+    import pytest
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        try:
+            test(monkeypatch)
+            return True
+        except Exception as e:
+            print(f"❌ {test.__doc__} 失败: {e}")
+            return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 风险辩论首轮并行测试")
+    print("=" * 50)
+
+    test_results = [
+        ("首轮并行与依次一致", _run_test(test_parallel_opening_matches_sequential)),
+        ("后续轮次模式", _run_test(test_later_rounds_sequential_or_parallel)),
+        ("并行发言沿用主图配置", _run_test(test_parallel_round_inherits_run_config)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+进程内价格数据存储测试
+验证CSV只解析一次、mtime失效、LRU内存预算和数值列类型压缩
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def _write_csv(path, days=500, start="2020-01-01"):
+    dates = pd.bdate_range(start, periods=days)
+    close = np.linspace(10, 20, days)
+    pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+        "Adj Close": close, "Volume": np.arange(days) * 100,
+    }).to_csv(path, index=False)
+
+
+def test_frame_loaded_once():
+    """测试同一文件只解析一次，且返回日期索引、压缩类型的帧"""
+    print("🧪 测试价格数据只读取一次...")
+
+    from tradingagents.dataflows.price_frame_store import PriceFrameStore
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "AAPL-YFin-data-2015-01-01-2025-03-25.csv")
+        _write_csv(path)
+
+        store = PriceFrameStore(max_memory_mb=64)
+        frame = store.get_frame("AAPL", "yfin", "2015-01-01-2025-03-25", path)
+        store.get_frame("AAPL", "yfin", "2015-01-01-2025-03-25", path)
+        store.get_window("AAPL", "yfin", "2015-01-01-2025-03-25", path, "2020-03-02", "2020-03-06")
+
+        stats = store.get_stats()
+        assert stats['misses'] == 1 and stats['hits'] == 2, stats
+        assert isinstance(frame.index, pd.DatetimeIndex)
+        assert frame["Close"].dtype == np.float32
+        assert frame["Volume"].dtype == np.int64
+
+        window = store.get_window("AAPL", "yfin", "2015-01-01-2025-03-25", path, "2020-03-02", "2020-03-06")
+        expected = pd.read_csv(path)
+        expected = expected[(expected["Date"] >= "2020-03-02") & (expected["Date"] <= "2020-03-06")]
+        assert list(window.index) == list(expected.index)
+        assert list(window["Date"]) == list(expected["Date"])
+        print(f"  ✅ 统计: {stats}")
+
+
+
+def test_mtime_invalidation():
+    """测试文件被改写后自动重新加载"""
+    print("\n🧪 测试mtime失效...")
+
+    from tradingagents.dataflows.price_frame_store import PriceFrameStore
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "AAPL.csv")
+        _write_csv(path, days=100)
+
+        store = PriceFrameStore()
+        assert len(store.get_frame("AAPL", "yfin", "r", path)) == 100
+
+        _write_csv(path, days=120)
+        future = time.time() + 10
+        os.utime(path, (future, future))
+        assert len(store.get_frame("AAPL", "yfin", "r", path)) == 120
+        assert store.get_stats()['reloads'] == 1
+        print("  ✅ 文件改写后已重新加载")
+
+
+
+def test_lru_memory_budget():
+    """测试超过内存预算时按LRU淘汰"""
+    print("\n🧪 测试LRU内存预算...")
+
+    from tradingagents.dataflows.price_frame_store import PriceFrameStore
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for symbol in ("A", "B", "C"):
+            path = os.path.join(tmp_dir, f"{symbol}.csv")
+            _write_csv(path, days=2000)
+            paths.append((symbol, path))
+
+        store = PriceFrameStore()
+        frame_size = store.get_frame("A", "yfin", "r", paths[0][1]).memory_usage(index=True, deep=True).sum()
+        store.max_memory_bytes = int(frame_size * 2.5)
+
+        for symbol, path in paths:
+            store.get_frame(symbol, "yfin", "r", path)
+        stats = store.get_stats()
+        assert stats['frames'] == 2 and stats['evictions'] == 1, stats
+        assert ("A", "yfin", "r") not in store._frames
+        print(f"  ✅ 统计: {stats}")
+
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 价格数据存储测试")
+    print("=" * 50)
+
+    test_results = [
+        ("只读取一次", _run_test(test_frame_loaded_once)),
+        ("mtime失效", _run_test(test_mtime_invalidation)),
+        ("LRU内存预算", _run_test(test_lru_memory_budget)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
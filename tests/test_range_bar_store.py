@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+区间K线存储测试
+验证子区间直接切片、只获取缺口、滑动窗口回测不重复请求重叠历史、
+空结果不被永久缓存、不同股票互不阻塞、内存按LRU淘汰，以及Yahoo Finance数据按统一基准复权
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+class FakeDailyApi:
+    """模拟按日期区间返回日线的数据源，记录每次请求的区间"""
+
+    def __init__(self):
+        dates = pd.bdate_range("2022-01-03", "2024-12-31")
+        self.frame = pd.DataFrame({
+            "trade_date": dates.strftime("%Y%m%d"),
+            "close": np.round(10 + np.cumsum(np.random.default_rng(3).normal(0, 0.1, len(dates))), 2),
+        })
+        self.calls = []
+
+    def fetch(self, symbol, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        start, end = start_date.replace('-', ''), end_date.replace('-', '')
+        mask = (self.frame["trade_date"] >= start) & (self.frame["trade_date"] <= end)
+        return self.frame[mask].iloc[::-1].reset_index(drop=True)
+
+
+def _expected(api, start, end):
+    start, end = start.replace('-', ''), end.replace('-', '')
+    mask = (api.frame["trade_date"] >= start) & (api.frame["trade_date"] <= end)
+    return api.frame[mask].reset_index(drop=True)
+
+
+def test_sub_range_served_from_store():
+    """测试已覆盖区间的子区间不再请求数据源"""
+    print("🧪 测试子区间切片...")
+
+    from tradingagents.dataflows.range_bar_store import RangeBarStore
+
+    api = FakeDailyApi()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = RangeBarStore(tmp_dir)
+        store.get_bars("000001.SZ", "2023-01-01", "2024-12-31", api.fetch, "fake", "trade_date")
+        result = store.get_bars("000001.SZ", "2024-01-01", "2024-06-30", api.fetch, "fake", "trade_date")
+
+        assert len(api.calls) == 1, api.calls
+        pd.testing.assert_frame_equal(result, _expected(api, "2024-01-01", "2024-06-30"))
+
+        # 重新打开后从磁盘读取
+        reopened = RangeBarStore(tmp_dir)
+        again = reopened.get_range("000001.SZ", "2023-03-01", "2023-03-31", "fake", "trade_date")
+        pd.testing.assert_frame_equal(again, _expected(api, "2023-03-01", "2023-03-31"))
+    print("  ✅ 子区间直接从存储返回")
+
+
+def test_only_gaps_are_fetched():
+    """测试只请求未覆盖的缺口，并合并回存储"""
+    print("\n🧪 测试缺口获取与合并...")
+
+    from tradingagents.dataflows.range_bar_store import RangeBarStore
+
+    api = FakeDailyApi()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = RangeBarStore(tmp_dir)
+        store.get_bars("000001.SZ", "2023-03-01", "2023-06-30", api.fetch, "fake", "trade_date")
+        store.get_bars("000001.SZ", "2023-09-01", "2023-10-31", api.fetch, "fake", "trade_date")
+        api.calls.clear()
+
+        result = store.get_bars("000001.SZ", "2023-01-01", "2023-12-31", api.fetch, "fake", "trade_date")
+        assert api.calls == [
+            ("2023-01-01", "2023-02-28"),
+            ("2023-07-01", "2023-08-31"),
+            ("2023-11-01", "2023-12-31"),
+        ], api.calls
+        pd.testing.assert_frame_equal(result, _expected(api, "2023-01-01", "2023-12-31"))
+        assert store.missing_ranges("000001.SZ", "2023-01-01", "2023-12-31", "fake") == []
+    print(f"  ✅ 缺口请求: {api.calls}")
+
+
+def test_sliding_window_backtest():
+    """测试滑动窗口回测时每一步只请求新增的日期"""
+    print("\n🧪 测试滑动窗口回测...")
+
+    from tradingagents.dataflows.range_bar_store import RangeBarStore
+
+    api = FakeDailyApi()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = RangeBarStore(tmp_dir)
+        days = pd.date_range("2024-03-01", periods=60, freq="D")
+        for day in days:
+            start = (day - pd.Timedelta(days=365)).strftime("%Y-%m-%d")
+            store.get_bars("000001.SZ", start, day.strftime("%Y-%m-%d"), api.fetch, "fake", "trade_date")
+
+        fetched_days = sum((pd.Timestamp(e) - pd.Timestamp(s)).days + 1 for s, e in api.calls)
+        # 第一个窗口完整获取（含两端共366天），之后每一步只获取新增的一天
+        assert fetched_days == 366 + len(days) - 1, fetched_days
+    print(f"  ✅ {len(days)} 个窗口共请求 {len(api.calls)} 次，{fetched_days} 个日历日")
+
+
+def test_empty_gap_not_cached():
+    """测试含工作日的缺口返回空数据时不记为已覆盖，只有周末的缺口照常记为已覆盖"""
+    print("\n🧪 测试空结果处理...")
+
+    import pytest
+    from tradingagents.dataflows import range_bar_store
+    from tradingagents.dataflows.range_bar_store import RangeBarStore
+
+    api = FakeDailyApi()
+    calls = []
+
+    def empty_fetch(symbol, start_date, end_date):
+        calls.append((start_date, end_date))
+        return pd.DataFrame()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = RangeBarStore(tmp_dir)
+        # 周末没有交易日，空结果即为完整数据
+        assert store.get_bars("000001.SZ", "2024-03-02", "2024-03-03", empty_fetch, "fake", "trade_date").empty
+        assert store.missing_ranges("000001.SZ", "2024-03-02", "2024-03-03", "fake") == []
+
+        # 工作日返回空数据（如被限流）：短期内不重复请求，但不记为已覆盖
+        store.get_bars("000001.SZ", "2024-03-04", "2024-03-08", empty_fetch, "fake", "trade_date")
+        store.get_bars("000001.SZ", "2024-03-04", "2024-03-08", empty_fetch, "fake", "trade_date")
+        assert len(calls) == 2, calls
+        assert store.missing_ranges("000001.SZ", "2024-03-04", "2024-03-08", "fake") == [("2024-03-04", "2024-03-08")]
+
+        # 记录过期后重新请求，拿到数据后正常缓存
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            monkeypatch.setattr(range_bar_store, "EMPTY_RESULT_TTL", 0)
+            store.get_bars("000001.SZ", "2024-03-11", "2024-03-15", empty_fetch, "fake", "trade_date")
+        time.sleep(0.01)
+        result = store.get_bars("000001.SZ", "2024-03-11", "2024-03-15", api.fetch, "fake", "trade_date")
+        pd.testing.assert_frame_equal(result, _expected(api, "2024-03-11", "2024-03-15"))
+
+        # 重新打开后空结果记录不保留
+        reopened = RangeBarStore(tmp_dir)
+        api.calls.clear()
+        reopened.get_bars("000001.SZ", "2024-03-04", "2024-03-08", api.fetch, "fake", "trade_date")
+        assert api.calls == [("2024-03-04", "2024-03-08")], api.calls
+    print("  ✅ 空结果不会被永久缓存")
+
+
+def test_slow_symbol_does_not_block_others():
+    """测试一只股票的慢请求不阻塞其他股票"""
+    print("\n🧪 测试按股票加锁...")
+
+    from tradingagents.dataflows.range_bar_store import RangeBarStore
+
+    api = FakeDailyApi()
+    started = threading.Event()
+
+    def slow_fetch(symbol, start_date, end_date):
+        started.set()
+        time.sleep(1.0)
+        return api.fetch(symbol, start_date, end_date)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = RangeBarStore(tmp_dir)
+        slow = threading.Thread(target=store.get_bars,
+                                args=("000001.SZ", "2024-01-01", "2024-03-31", slow_fetch, "fake", "trade_date"))
+        slow.start()
+        started.wait(5)
+        start = time.time()
+        store.get_bars("600036.SH", "2024-01-01", "2024-03-31", api.fetch, "fake", "trade_date")
+        elapsed = time.time() - start
+        slow.join()
+        assert elapsed < 0.5, f"{elapsed:.2f}s"
+    print(f"  ✅ 其他股票 {elapsed:.3f}秒返回")
+
+
+class FakeYahooTicker:
+    """模拟 yfinance：Adj Close 按请求时已公布的分红复权"""
+
+    dividend_date = pd.Timestamp("2024-05-15")
+    dividend_factor = 0.98
+    announced = False
+    calls = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, start, end, auto_adjust=True):
+        assert auto_adjust is False, "存储中只应保存未复权数据"
+        FakeYahooTicker.calls.append((start, end))
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name="Date")
+        close = pd.Series([100.0 + (d - pd.Timestamp("2024-01-01")).days for d in dates], index=dates, dtype=float)
+        factor = pd.Series(1.0, index=dates)
+        dividends = pd.Series(0.0, index=dates)
+        if self.announced:
+            factor[dates < self.dividend_date] = self.dividend_factor
+            if self.dividend_date in dates:
+                dividends[self.dividend_date] = 2.0
+        return pd.DataFrame({
+            "Open": close - 1, "High": close + 1, "Low": close - 2, "Close": close,
+            "Adj Close": close * factor, "Volume": 1000, "Dividends": dividends, "Stock Splits": 0.0,
+        }, index=dates)
+
+
+def _yahoo_provider(monkeypatch, store):
+    """返回使用假 yfinance 和指定存储的美股数据提供器"""
+    from types import SimpleNamespace
+    from tradingagents.dataflows import optimized_us_data
+    from tradingagents.dataflows.rate_limiter import RateLimiter
+
+    FakeYahooTicker.calls = []
+    FakeYahooTicker.announced = False
+    monkeypatch.setattr(optimized_us_data, "get_range_bar_store", lambda: store)
+    monkeypatch.setattr(optimized_us_data, "yf", SimpleNamespace(Ticker=FakeYahooTicker))
+    provider = optimized_us_data.OptimizedUSDataProvider.__new__(optimized_us_data.OptimizedUSDataProvider)
+    provider.rate_limiter = RateLimiter(rules={})
+    return provider
+
+
+def _raw_close(index):
+    return np.array([100.0 + (d - pd.Timestamp("2024-01-01")).days for d in index])
+
+
+def test_yfinance_bars_share_adjustment_basis():
+    """测试存储未复权数据，新出现分红时重新获取，返回的序列复权基准一致"""
+    print("\n🧪 测试Yahoo Finance复权基准...")
+
+    import pytest
+    from tradingagents.dataflows.range_bar_store import RangeBarStore
+
+    with tempfile.TemporaryDirectory() as tmp_dir, pytest.MonkeyPatch.context() as monkeypatch:
+        store = RangeBarStore(tmp_dir)
+        provider = _yahoo_provider(monkeypatch, store)
+
+        early = provider._get_yfinance_history("AAPL", "2024-01-02", "2024-04-01")
+        assert "Adj Close" not in early.columns and len(early) > 0
+
+        # 5月分红公布后，之前存储的K线复权基准已过期
+        FakeYahooTicker.announced = True
+        full = provider._get_yfinance_history("AAPL", "2024-01-02", "2024-07-01")
+        assert FakeYahooTicker.calls[-1] == ("2024-01-02", "2024-07-01"), FakeYahooTicker.calls
+
+        before = full[full.index < FakeYahooTicker.dividend_date]
+        after = full[full.index >= FakeYahooTicker.dividend_date]
+        raw_close = _raw_close(before.index)
+        assert np.allclose(before["Close"], raw_close * FakeYahooTicker.dividend_factor)
+        assert np.allclose(before["Open"], (raw_close - 1) * FakeYahooTicker.dividend_factor)
+        assert np.allclose(after["Close"], _raw_close(after.index))
+    print(f"  ✅ 请求记录: {FakeYahooTicker.calls}")
+
+
+def test_yfinance_gap_before_stored_range():
+    """测试分红发生在已存储区间之后、新缺口位于已存储区间之前时，同样重新获取"""
+    print("\n🧪 测试存储区间之前的缺口...")
+
+    import pytest
+    from tradingagents.dataflows.range_bar_store import RangeBarStore
+
+    with tempfile.TemporaryDirectory() as tmp_dir, pytest.MonkeyPatch.context() as monkeypatch:
+        store = RangeBarStore(tmp_dir)
+        provider = _yahoo_provider(monkeypatch, store)
+        provider._get_yfinance_history("AAPL", "2024-03-01", "2024-04-01")
+
+        # 5月分红公布；新缺口（1-2月）里没有分红记录，但3月已存储的K线复权基准已过期
+        FakeYahooTicker.announced = True
+        full = provider._get_yfinance_history("AAPL", "2024-01-02", "2024-04-01")
+        assert FakeYahooTicker.calls[-1] == ("2024-01-02", "2024-04-01"), FakeYahooTicker.calls
+        assert np.allclose(full["Close"], _raw_close(full.index) * FakeYahooTicker.dividend_factor)
+
+        # 没有新的分红时，缺口只多取一根相邻的已存储K线，不重新获取整个区间
+        calls = len(FakeYahooTicker.calls)
+        provider._get_yfinance_history("AAPL", "2024-01-02", "2024-04-16")
+        assert FakeYahooTicker.calls[calls:] == [("2024-03-29", "2024-04-16")], FakeYahooTicker.calls
+    print(f"  ✅ 请求记录: {FakeYahooTicker.calls}")
+
+
+def test_memory_budget_evicts_least_recent():
+    """测试内存中的数据按LRU淘汰，被淘汰的股票从磁盘重新读取，不重新请求数据源"""
+    print("\n🧪 测试内存淘汰...")
+
+    from tradingagents.dataflows.range_bar_store import RangeBarStore
+
+    api = FakeDailyApi()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = RangeBarStore(tmp_dir, max_memory_mb=0.05)
+        symbols = [f"00000{i}.SZ" for i in range(5)]
+        for symbol in symbols:
+            store.get_bars(symbol, "2023-01-01", "2023-12-31", api.fetch, "fake", "trade_date")
+
+        stats = store.get_stats()
+        assert stats['evictions'] > 0 and stats['symbols'] < len(symbols), stats
+        assert stats['memory_mb'] <= 0.05 or stats['symbols'] == 1, stats
+
+        api.calls.clear()
+        result = store.get_bars(symbols[0], "2023-03-01", "2023-03-31", api.fetch, "fake", "trade_date")
+        assert api.calls == []
+        pd.testing.assert_frame_equal(result, _expected(api, "2023-03-01", "2023-03-31"))
+    print(f"  ✅ 淘汰 {stats['evictions']} 次，内存中保留 {stats['symbols']} 只股票")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 区间K线存储测试")
+    print("=" * 50)
+
+    test_results = [
+        ("子区间切片", _run_test(test_sub_range_served_from_store)),
+        ("缺口获取", _run_test(test_only_gaps_are_fetched)),
+        ("滑动窗口", _run_test(test_sliding_window_backtest)),
+        ("空结果处理", _run_test(test_empty_gap_not_cached)),
+        ("按股票加锁", _run_test(test_slow_symbol_does_not_block_others)),
+        ("复权基准一致", _run_test(test_yfinance_bars_share_adjustment_basis)),
+        ("存储区间之前的缺口", _run_test(test_yfinance_gap_before_stored_range)),
+        ("内存淘汰", _run_test(test_memory_budget_evicts_least_recent)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
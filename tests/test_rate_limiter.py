@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+共享限流服务测试
+验证令牌桶的突发与补充、接口权重、不等待的 try_acquire 与等待时间估计、
+SQLite后端在多个进程之间共享配额，以及配额超限后的统一退避
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def _worker(db_path, duration, queue):
+    """子进程：在 duration 秒内尽可能多地获取令牌"""
+    sys.path.insert(0, project_root)
+    from tradingagents.dataflows.rate_limiter import RateLimiter, RateLimitRule, SQLiteBucketBackend
+
+    limiter = RateLimiter(SQLiteBucketBackend(db_path), {'tushare': RateLimitRule(rate=20, burst=5)})
+    granted = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        if limiter.try_acquire('tushare'):
+            granted += 1
+        else:
+            time.sleep(0.005)
+    queue.put(granted)
+
+
+def test_bucket_burst_and_weights():
+    """测试突发容量、补充速度和接口权重"""
+    print("🧪 测试令牌桶与接口权重...")
+
+    from tradingagents.dataflows.rate_limiter import DEFAULT_RULES, RateLimiter, RateLimitRule
+
+    # 默认规则保持原有的每秒一次 FINNHUB 行情+公司信息查询
+    finnhub = DEFAULT_RULES['finnhub']
+    assert finnhub.rate / finnhub.cost('quote_profile') == 1.0
+
+    limiter = RateLimiter(rules={'finnhub': RateLimitRule(rate=10, burst=3, weights={'quote_profile': 2})})
+    assert [limiter.try_acquire('finnhub') for _ in range(4)] == [True, True, True, False]
+    wait = limiter.estimate_wait('finnhub')
+    assert 0 < wait <= 0.1, wait
+    assert 0.1 < limiter.estimate_wait('finnhub', 'quote_profile') <= 0.2
+    # 估计等待时间不消耗令牌
+    time.sleep(0.21)
+    assert limiter.try_acquire('finnhub', 'quote_profile')
+    assert not limiter.try_acquire('finnhub', 'quote_profile')
+
+    # 没有规则的提供方不限流；单次消耗不超过桶容量
+    assert all(limiter.try_acquire('akshare') for _ in range(100))
+    assert limiter.estimate_wait('finnhub', cost=50) <= 0.3
+    print("  ✅ 突发、补充与权重正确")
+
+
+def test_acquire_waits_or_gives_up():
+    """测试 acquire 等待令牌，以及超过 max_wait 时立即放弃"""
+    print("\n🧪 测试等待与放弃...")
+
+    from tradingagents.dataflows.rate_limiter import RateLimiter, RateLimitRule
+
+    limiter = RateLimiter(rules={'yfinance': RateLimitRule(rate=20, burst=1)})
+    start = time.time()
+    for _ in range(5):
+        assert limiter.acquire('yfinance')
+    elapsed = time.time() - start
+    assert 0.18 <= elapsed < 0.5, f"{elapsed:.2f}s"
+
+    limiter.report_throttled('yfinance', 2)
+    start = time.time()
+    assert limiter.acquire('yfinance', max_wait=0.5) is False
+    assert time.time() - start < 0.05
+    assert limiter.estimate_wait('yfinance') > 1.5
+    print(f"  ✅ 5次调用耗时 {elapsed:.2f}秒；配额超限后立即放弃而不是等待")
+
+
+def test_sqlite_shared_across_processes():
+    """测试SQLite后端在多个进程之间共享同一个令牌桶"""
+    print("\n🧪 测试跨进程共享配额...")
+
+    from tradingagents.dataflows.rate_limiter import RateLimiter, RateLimitRule, SQLiteBucketBackend
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "rate_limits.db")
+        SQLiteBucketBackend(db_path)
+
+        duration = 1.0
+        queue = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_worker, args=(db_path, duration, queue)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+        total = sum(queue.get(timeout=5) for _ in processes)
+
+        # 4个进程共享 rate=20、burst=5 的令牌桶；进程启动时间不同，允许一定误差
+        assert total <= 5 + 20 * (duration + 0.5), total
+        assert total >= 15, total
+
+        limiter = RateLimiter(SQLiteBucketBackend(db_path), {'tushare': RateLimitRule(rate=20, burst=5)})
+        other = RateLimiter(SQLiteBucketBackend(db_path), {'tushare': RateLimitRule(rate=20, burst=5)})
+        limiter.report_throttled('tushare', 3)
+        assert not other.try_acquire('tushare') and other.estimate_wait('tushare') > 2.5
+    print(f"  ✅ 4个进程在{duration:.0f}秒内共获取 {total} 个令牌（共享上限约25个，各自限流时约100个）")
+
+
+def test_provider_skips_exhausted_finnhub():
+    """测试美股数据提供器在FINNHUB配额用尽时直接改用备用数据源"""
+    print("\n🧪 测试配额用尽时改用备用数据源...")
+
+    from tradingagents.dataflows.optimized_us_data import OptimizedUSDataProvider
+    from tradingagents.dataflows.rate_limiter import RateLimiter, RateLimitRule
+
+    class FakeCache:
+        def find_cached_stock_data(self, **kwargs):
+            return None
+
+        def save_stock_data(self, **kwargs):
+            pass
+
+    provider = OptimizedUSDataProvider.__new__(OptimizedUSDataProvider)
+    provider.cache = FakeCache()
+    provider.rate_limiter = RateLimiter(rules={'finnhub': RateLimitRule(rate=1, burst=5)})
+    provider.finnhub_max_wait = 1.0
+    provider.rate_limiter.report_throttled('finnhub', 30)
+
+    calls = []
+    provider._get_data_from_finnhub = lambda *args: calls.append('finnhub') or "finnhub 数据"
+    provider._get_yfinance_history = lambda *args: calls.append('yfinance') or __import__('pandas').DataFrame()
+    provider._generate_fallback_data = lambda *args: "备用数据"
+
+    start = time.time()
+    assert provider.get_stock_data("AAPL", "2025-01-01", "2025-02-01") == "备用数据"
+    assert calls == ['yfinance'] and time.time() - start < 1
+    print("  ✅ 未等待FINNHUB配额，直接请求Yahoo Finance")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 共享限流服务测试")
+    print("=" * 50)
+
+    test_results = [
+        ("令牌桶与接口权重", _run_test(test_bucket_burst_and_weights)),
+        ("等待与放弃", _run_test(test_acquire_waits_or_gives_up)),
+        ("跨进程共享配额", _run_test(test_sqlite_shared_across_processes)),
+        ("配额用尽改用备用数据源", _run_test(test_provider_skips_exhausted_finnhub)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+报告全文检索测试
+验证中文二元分词的子串匹配（含中英文相邻的“A股”“5G手机”）、按相关度排序分页、增量更新与删除、
+历史目录刷新时同步建索引，以及大量报告下的查询耗时
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+FILLER = ["营收保持稳定增长", "毛利率小幅回落", "均线呈多头排列", "成交量温和放大", "北向资金持续流入",
+          "行业景气度回升", "估值处于历史中位", "现金流状况良好", "Revenue growth remains solid"]
+
+
+def _report(rng, extra=""):
+    return "，".join(rng.choice(FILLER) for _ in range(30)) + extra
+
+
+def test_tokenize_and_match():
+    """测试中文二元分词与短语匹配"""
+    print("🧪 测试中文分词与匹配...")
+
+    from web.utils.report_search_index import ReportSearchIndex, build_match_query, tokenize
+
+    assert tokenize("大股东减持") == ["大", "大股", "股东", "东减", "减持", "持"]
+    assert tokenize("AAPL 财报 EPS增长15%") == ["aapl", "财", "财报", "报", "eps", "增", "增长", "长", "15"]
+    assert build_match_query("减持 计划") == '"减持" AND "计划"'
+    assert build_match_query("A股") == '"a 股"'
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ReportSearchIndex(os.path.join(tmp_dir, "search.db"))
+        index.index_analysis("a1", {"news_report": "公司公告：控股股东拟减持不超过2%股份。"}, "600036")
+        index.index_analysis("a2", {"news_report": "公司发布增持计划，管理层看好长期发展。"}, "000001")
+        index.index_analysis("a3", {"market_report": "Apple revenue beat estimates"}, "AAPL")
+
+        assert [h["analysis_id"] for h in index.search("减持")] == ["a1"]
+        assert [h["analysis_id"] for h in index.search("增持计划")] == ["a2"]
+        # 原文中不连续的词组不应命中
+        assert index.search("股东减持") == []
+        assert [h["analysis_id"] for h in index.search("REVENUE")] == ["a3"]
+        assert [h["analysis_id"] for h in index.search("600036")] == ["a1"]
+        assert index.search("减持")[0]["matched_reports"] == ["news_report"]
+        assert {h["analysis_id"] for h in index.search("减")} == {"a1"}
+
+        # 单个汉字与字母数字相邻
+        index.index_analysis("a4", {"market_report": "本周A股市场震荡上行，5G手机概念走强，机构看好5G。"}, "000063")
+        for query in ("A股", "a股市场", "本周A股", "5G手机", "看好5G", "好5G", "股市"):
+            assert [h["analysis_id"] for h in index.search(query)] == ["a4"], query
+        assert index.search("B股") == [] and index.search("A股下跌") == []
+    print("  ✅ 中文子串、中英文相邻、英文大小写和股票代码均可检索")
+
+
+def test_ranking_pagination_and_updates():
+    """测试按相关度排序分页、重复保存替换旧索引以及删除"""
+    print("\n🧪 测试排序分页与增量更新...")
+
+    from web.utils.report_search_index import ReportSearchIndex
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ReportSearchIndex(os.path.join(tmp_dir, "search.db"))
+        for i in range(30):
+            mentions = "；股东减持" * (i % 5)
+            index.index_analysis(f"a{i:02d}", {"news_report": _report(rng, mentions),
+                                               "final_trade_decision": _report(rng)}, "600036", timestamp=i)
+
+        hits = index.search("减持", limit=100)
+        assert len(hits) == index.count("减持") == 24
+        scores = [h["score"] for h in hits]
+        assert scores == sorted(scores, reverse=True)
+        assert hits[0]["analysis_id"] in {f"a{i:02d}" for i in range(4, 30, 5)}
+
+        page1 = index.search("减持", limit=10)
+        page2 = index.search("减持", limit=10, offset=10)
+        assert [h["analysis_id"] for h in page1 + page2] == [h["analysis_id"] for h in hits[:20]]
+        assert [h["analysis_id"] for h in index.search("减持", analysis_ids=["a01", "a05"])] == ["a01"]
+
+        # 重新保存同一分析会替换旧的报告
+        index.index_analysis("a01", {"news_report": "公司回购股份"}, "600036")
+        assert "a01" not in {h["analysis_id"] for h in index.search("减持", limit=100)}
+        assert [h["analysis_id"] for h in index.search("回购")] == ["a01"]
+        index.remove_analysis("a01")
+        assert index.search("回购") == []
+    print(f"  ✅ {len(hits)} 个命中按相关度排序，分页和更新正确")
+
+
+def test_catalog_keeps_index_in_sync():
+    """测试本地历史目录首次刷新时回填索引，之后随文件增删增量更新"""
+    print("\n🧪 测试历史目录同步索引...")
+
+    import shutil
+    from web.utils.analysis_history_catalog import AnalysisHistoryCatalog
+    from web.utils.report_search_index import ReportSearchIndex
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        detailed_dir = os.path.join(tmp_dir, "detailed")
+
+        def write(stock, date_str, text):
+            reports_dir = os.path.join(detailed_dir, stock, date_str, "reports")
+            os.makedirs(reports_dir)
+            with open(os.path.join(reports_dir, "news_report.md"), "w", encoding="utf-8") as f:
+                f.write(text)
+
+        write("600036", "2025-01-02", "控股股东计划减持")
+        write("000001", "2025-01-02", "业绩预告大幅增长")
+
+        index = ReportSearchIndex(os.path.join(tmp_dir, "search.db"))
+        catalog = AnalysisHistoryCatalog(os.path.join(tmp_dir, "catalog.db"), None, detailed_dir,
+                                         refresh_interval=0, search_index=index)
+        catalog.refresh(force=True)
+        assert index.is_backfilled("file_system")
+        assert [h["stock_symbol"] for h in index.search("减持")] == ["600036"]
+
+        time.sleep(0.01)
+        write("000858", "2025-01-03", "大股东减持套现")
+        shutil.rmtree(os.path.join(detailed_dir, "600036"))
+        catalog.refresh(force=True)
+        assert [h["stock_symbol"] for h in index.search("减持")] == ["000858"]
+    print("  ✅ 新增和删除的分析同步到检索索引")
+
+
+def test_search_latency():
+    """测试大量报告下的查询耗时"""
+    print("\n🧪 测试查询耗时...")
+
+    from web.utils.report_search_index import ReportSearchIndex
+
+    rng = random.Random(7)
+    analyses = 5000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = ReportSearchIndex(os.path.join(tmp_dir, "search.db"))
+        start = time.time()
+        for i in range(analyses):
+            extra = "；大股东减持" if i % 50 == 0 else ""
+            index.index_analysis(f"a{i}", {"news_report": _report(rng, extra),
+                                           "fundamentals_report": _report(rng),
+                                           "final_trade_decision": _report(rng)}, f"{i:06d}", timestamp=i,
+                                 commit=False)
+        index.commit()
+        build_time = time.time() - start
+
+        start = time.time()
+        for _ in range(20):
+            hits = index.search("减持", limit=20)
+        search_ms = (time.time() - start) / 20 * 1000
+        assert len(hits) == 20 and index.count("减持") == analyses // 50
+        assert search_ms < 50, f"{search_ms:.1f}ms"
+    print(f"  ✅ {analyses} 个分析建索引 {build_time:.1f}秒，单次查询 {search_ms:.2f}毫秒")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def test_reindex_on_tokenizer_change():
+    """测试分词方式变化后清空旧索引并要求重新回填"""
+    print("\n🧪 测试分词版本升级...")
+
+    import sqlite3
+    from web.utils.report_search_index import ReportSearchIndex
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "search.db")
+        index = ReportSearchIndex(db_path)
+        index.index_analysis("a1", {"news_report": "本周A股市场走强"}, "600036")
+        index.mark_backfilled("file_system", 1)
+        index._db.close()
+
+        # 模拟旧版本分词建立的索引
+        db = sqlite3.connect(db_path)
+        db.execute("UPDATE search_meta SET value = '1' WHERE key = 'tokenizer_version'")
+        db.commit()
+        db.close()
+
+        reopened = ReportSearchIndex(db_path)
+        assert not reopened.is_backfilled("file_system")
+        assert reopened.get_stats()["documents"] == 0
+
+        # 版本一致时保留索引
+        reopened.index_analysis("a1", {"news_report": "本周A股市场走强"}, "600036")
+        reopened.mark_backfilled("file_system", 1)
+        reopened._db.close()
+        again = ReportSearchIndex(db_path)
+        assert again.is_backfilled("file_system") and [h["analysis_id"] for h in again.search("A股")] == ["a1"]
+    print("  ✅ 分词方式变化后重建索引")
+
+
+def main():
+    """主测试函数"""
+    print("🚀 报告全文检索测试")
+    print("=" * 50)
+
+    test_results = [
+        ("中文分词与匹配", _run_test(test_tokenize_and_match)),
+        ("排序分页与增量更新", _run_test(test_ranking_pagination_and_updates)),
+        ("历史目录同步索引", _run_test(test_catalog_keeps_index_in_sync)),
+        ("查询耗时", _run_test(test_search_latency)),
+        ("分词版本升级", _run_test(test_reindex_on_tokenizer_change)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+状态日志测试
+验证只追加写入、按日期随机读取、流式读取、压缩模式和索引重建
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def _make_state(trade_date, size=2000):
+    return {
+        "company_of_interest": "000001",
+        "trade_date": trade_date,
+        "market_report": f"市场报告 {trade_date} " + "x" * size,
+        "final_trade_decision": "买入",
+    }
+
+
+def test_append_and_random_access():
+    """测试追加写入后按日期读取与流式读取"""
+    print("🧪 测试追加写入与随机读取...")
+
+    from tradingagents.graph.state_log import StateLogStore
+
+    for compress in (False, True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = StateLogStore(tmp_dir, compress=compress)
+            dates = [f"2025-01-{day:02d}" for day in range(1, 11)]
+            for trade_date in dates:
+                store.append(trade_date, _make_state(trade_date))
+            store.append("2025-01-05", _make_state("2025-01-05-rerun"))
+
+            assert store.get("2025-01-03") == _make_state("2025-01-03")
+            assert store.get("2025-01-05")["trade_date"] == "2025-01-05-rerun"
+            assert store.get("2024-12-31") is None
+            assert store.dates() == dates and len(store) == 10
+
+            streamed = list(store.iter_states())
+            assert len(streamed) == 11 and streamed[0] == ("2025-01-01", _make_state("2025-01-01"))
+            print(f"  ✅ compress={compress}: {os.path.getsize(store.log_path)} 字节")
+
+
+def test_index_rebuild():
+    """测试索引丢失或落后时从日志重建"""
+    print("\n🧪 测试索引重建...")
+
+    from tradingagents.graph.state_log import StateLogStore
+
+    for compress in (False, True):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = StateLogStore(tmp_dir, compress=compress)
+            for day in range(1, 6):
+                store.append(f"2025-02-{day:02d}", _make_state(f"2025-02-{day:02d}"))
+            os.remove(store.index_path)
+
+            reopened = StateLogStore(tmp_dir, compress=compress)
+            assert reopened.get("2025-02-04") == _make_state("2025-02-04")
+            assert len(reopened) == 5 and os.path.exists(reopened.index_path)
+    print("  ✅ 索引已重建")
+
+
+def benchmark_append_vs_rewrite():
+    """对比每次重写整个JSON与追加写入的耗时"""
+    print("\n⚡ 状态日志写入性能对比...")
+
+    import json
+    from tradingagents.graph.state_log import StateLogStore
+
+    runs = 300
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_states = {}
+        start = time.time()
+        for i in range(runs):
+            log_states[str(i)] = _make_state(str(i))
+            with open(os.path.join(tmp_dir, "full_states_log.json"), "w") as f:
+                json.dump(log_states, f, indent=4)
+        rewrite_time = time.time() - start
+
+        store = StateLogStore(tmp_dir)
+        start = time.time()
+        for i in range(runs):
+            store.append(str(i), _make_state(str(i)))
+        append_time = time.time() - start
+
+    print(f"  📊 整体重写: {rewrite_time:.3f}秒")
+    print(f"  📊 追加写入: {append_time:.3f}秒")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 状态日志测试")
+    print("=" * 50)
+
+    test_results = [
+        ("追加与随机读取", _run_test(test_append_and_random_access)),
+        ("索引重建", _run_test(test_index_rebuild)),
+        ("性能对比", _run_test(benchmark_append_vs_rewrite)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+通达信连接池测试
+使用本地TCP服务器桩和假的pytdx API，验证并发借还、服务器排序、存活探测，
+以及单个提供器断开时不关闭共享连接池
+"""
+
+import os
+import sys
+import socket
+import socketserver
+import threading
+import time
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+class _HoldHandler(socketserver.BaseRequestHandler):
+    """保持连接直到客户端关闭"""
+
+    def handle(self):
+        try:
+            while self.request.recv(1024):
+                pass
+        except OSError:
+            pass
+
+
+class FakeTdxServer(socketserver.ThreadingTCPServer):
+    """本地通达信服务器桩"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _HoldHandler)
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class FakeTdxApi:
+    """模拟 TdxHq_API，connect 时与服务器桩建立真实TCP连接"""
+
+    def __init__(self):
+        self.sock = None
+        self.alive = True
+
+    def connect(self, ip, port):
+        try:
+            self.sock = socket.create_connection((ip, port), timeout=1)
+            return True
+        except OSError:
+            return False
+
+    def disconnect(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def get_security_count(self, market):
+        return 5000 if self.sock and self.alive else None
+
+    def get_security_bars(self, category, market, code, start, count):
+        time.sleep(0.01)
+        return [{'datetime': '2025-01-02 15:00', 'open': 10.0, 'high': 10.5, 'low': 9.8, 'close': 10.2, 'vol': 1000, 'amount': 10200}]
+
+
+def _closed_port():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def test_concurrent_checkout():
+    """测试多线程并发借还时连接数不超过上限"""
+    print("🧪 测试连接池并发借还...")
+
+    server = FakeTdxServer()
+    try:
+        from tradingagents.dataflows.tdx_utils import TdxConnectionPool
+
+        pool = TdxConnectionPool([{'ip': '127.0.0.1', 'port': server.port}], max_size=3,
+                                 api_factory=FakeTdxApi, start_prober=False)
+        in_use = []
+        peak = [0]
+        lock = threading.Lock()
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(5):
+                    with pool.connection(timeout=5) as api:
+                        with lock:
+                            in_use.append(api)
+                            peak[0] = max(peak[0], len(in_use))
+                        assert api.get_security_bars(9, 0, '000001', 0, 1)
+                        with lock:
+                            in_use.remove(api)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = pool.get_stats()
+        pool.close()
+        assert not errors, errors
+        assert peak[0] <= 3, f"并发连接数超过上限: {peak[0]}"
+        assert stats['created'] <= 3 and stats['in_use'] == 0, stats
+        print(f"  ✅ 峰值并发 {peak[0]}，新建连接 {stats['created']}，复用 {stats['reused']}")
+    finally:
+        server.stop()
+
+
+def test_server_ranking_and_failover():
+    """测试不可用服务器排在后面，新连接落在可用服务器上"""
+    print("\n🧪 测试服务器排序与故障转移...")
+
+    server = FakeTdxServer()
+    try:
+        from tradingagents.dataflows.tdx_utils import TdxConnectionPool
+
+        dead = {'ip': '127.0.0.1', 'port': _closed_port()}
+        live = {'ip': '127.0.0.1', 'port': server.port}
+        pool = TdxConnectionPool([dead, live], max_size=2, api_factory=FakeTdxApi,
+                                 probe_timeout=0.5, start_prober=False)
+
+        conn = pool.acquire()
+        assert conn.server['port'] == server.port
+        pool.release(conn)
+
+        pool.probe()
+        ranked = pool.ranked_servers()
+        assert ranked[0]['port'] == server.port and ranked[0]['latency'] is not None
+        assert ranked[-1]['port'] == dead['port'] and ranked[-1]['failures'] > 0
+        pool.close()
+        print("  ✅ 不可用服务器已降级")
+    finally:
+        server.stop()
+
+
+def test_probe_discards_dead_connections():
+    """测试探测时丢弃失效的空闲连接，失败的调用不会归还到池中"""
+    print("\n🧪 测试存活探测...")
+
+    server = FakeTdxServer()
+    try:
+        from tradingagents.dataflows.tdx_utils import TdxConnectionPool
+
+        pool = TdxConnectionPool([{'ip': '127.0.0.1', 'port': server.port}], max_size=2,
+                                 api_factory=FakeTdxApi, start_prober=False)
+        first, second = pool.acquire(), pool.acquire()
+        first.api.alive = False
+        pool.release(first)
+        pool.release(second)
+        assert pool.get_stats()['idle'] == 2
+
+        pool.probe()
+        stats = pool.get_stats()
+        assert stats['idle'] == 1 and stats['total'] == 1, stats
+
+        try:
+            with pool.connection():
+                raise RuntimeError("模拟调用失败")
+        except RuntimeError:
+            pass
+        assert pool.get_stats()['total'] == 0
+        pool.close()
+        print("  ✅ 失效连接已丢弃")
+    finally:
+        server.stop()
+
+
+def test_probe_keeps_capacity_accounted():
+    """测试探测期间的连接仍计入上限，并发借出不会新建超出上限的连接"""
+    print("\n🧪 测试探测期间的连接数上限...")
+
+    server = FakeTdxServer()
+    try:
+        from tradingagents.dataflows.tdx_utils import TdxConnectionPool
+
+        class SlowProbeApi(FakeTdxApi):
+            def get_security_count(self, market):
+                time.sleep(0.3)
+                return super().get_security_count(market)
+
+        pool = TdxConnectionPool([{'ip': '127.0.0.1', 'port': server.port}], max_size=2,
+                                 api_factory=SlowProbeApi, start_prober=False)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        prober = threading.Thread(target=pool.probe)
+        prober.start()
+        time.sleep(0.1)
+        try:
+            pool.acquire(timeout=0.05)
+            raise AssertionError("探测期间不应新建连接")
+        except TimeoutError:
+            pass
+        prober.join()
+
+        stats = pool.get_stats()
+        assert stats['created'] == 2 and stats['total'] == 2 and stats['idle'] == 2, stats
+        pool.close()
+        print("  ✅ 探测中的连接计入上限，未超出 max_size")
+    finally:
+        server.stop()
+
+
+def test_provider_disconnect_keeps_shared_pool():
+    """测试提供器断开只释放自己的引用，共享连接池继续服务其他提供器，并合并新服务器"""
+    print("\n🧪 测试共享连接池生命周期...")
+
+    import pytest
+    from tradingagents.dataflows import tdx_utils
+    from tradingagents.dataflows.tdx_utils import TdxConnectionPool, TongDaXinDataProvider
+
+    server = FakeTdxServer()
+    try:
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            shared = TdxConnectionPool([{'ip': '127.0.0.1', 'port': server.port}], max_size=2,
+                                       api_factory=FakeTdxApi, start_prober=False)
+            monkeypatch.setattr(tdx_utils, "_tdx_pool", shared)
+
+            providers = []
+            for _ in range(2):
+                provider = TongDaXinDataProvider.__new__(TongDaXinDataProvider)
+                provider.pool = tdx_utils.get_tdx_connection_pool([{'ip': '127.0.0.1', 'port': server.port}])
+                provider.connected = True
+                providers.append(provider)
+            assert all(provider.pool is shared for provider in providers)
+
+            providers[0].disconnect()
+            assert providers[0].pool is None and not providers[0].is_connected()
+            assert not shared.closed
+            with providers[1]._connection() as api:
+                assert api.get_security_count(0) == 5000
+
+            # 连接池已存在时合并新的服务器，已有服务器不重复
+            extra = {'ip': '127.0.0.1', 'port': _closed_port()}
+            assert tdx_utils.get_tdx_connection_pool([extra, {'ip': '127.0.0.1', 'port': server.port}]) is shared
+            assert len(shared.get_stats()['servers']) == 2
+
+            # 由模块级函数关闭
+            tdx_utils.close_tdx_connection_pool()
+            assert shared.closed and tdx_utils._tdx_pool is None
+        print("  ✅ 断开提供器不影响共享连接池，新服务器被合并")
+    finally:
+        server.stop()
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 通达信连接池测试")
+    print("=" * 50)
+
+    test_results = [
+        ("并发借还", _run_test(test_concurrent_checkout)),
+        ("服务器排序", _run_test(test_server_ranking_and_failover)),
+        ("存活探测", _run_test(test_probe_discards_dead_connections)),
+        ("探测期间连接数上限", _run_test(test_probe_keeps_capacity_accounted)),
+        ("共享连接池生命周期", _run_test(test_provider_disconnect_keeps_shared_pool)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+通达信技术指标测试
+验证指标直接基于已获取的历史数据计算，预热K线不足时只增量补取
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+class FakeBarsApi:
+    """模拟 TdxHq_API.get_security_bars，按偏移量从最新K线向前返回"""
+
+    def __init__(self, total_bars=800):
+        dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=total_bars)
+        close = 10 + np.cumsum(np.random.default_rng(7).normal(0, 0.2, total_bars))
+        self.bars = [
+            {'datetime': d.strftime('%Y-%m-%d 15:00'), 'open': c, 'high': c + 0.1, 'low': c - 0.1,
+             'close': c, 'vol': 1000.0, 'amount': c * 1000}
+            for d, c in zip(dates, close)
+        ]
+        self.calls = []
+
+    def connect(self, ip, port):
+        return True
+
+    def disconnect(self):
+        pass
+
+    def get_security_count(self, market):
+        return 5000
+
+    def get_security_bars(self, category, market, code, start, count):
+        self.calls.append((start, count))
+        end = len(self.bars) - start
+        return self.bars[max(0, end - count):end]
+
+
+def _make_provider(api):
+    from tradingagents.dataflows import tdx_utils
+
+    tdx_utils.TDX_AVAILABLE = True
+    provider = tdx_utils.TongDaXinDataProvider()
+    provider.pool = tdx_utils.TdxConnectionPool([{'ip': '127.0.0.1', 'port': 7709}], max_size=1,
+                                                api_factory=lambda: api, start_prober=False)
+    provider.connected = True
+    return provider
+
+
+def _reference_indicators(df):
+    """原实现的指标计算，作为对照"""
+    indicators = {}
+    indicators['MA5'] = df['Close'].rolling(5).mean().iloc[-1] if len(df) >= 5 else None
+    indicators['MA10'] = df['Close'].rolling(10).mean().iloc[-1] if len(df) >= 10 else None
+    indicators['MA20'] = df['Close'].rolling(20).mean().iloc[-1] if len(df) >= 20 else None
+    if len(df) >= 14:
+        delta = df['Close'].diff()
+        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        indicators['RSI'] = (100 - (100 / (1 + gain / loss))).iloc[-1]
+    if len(df) >= 26:
+        macd = df['Close'].ewm(span=12).mean() - df['Close'].ewm(span=26).mean()
+        signal = macd.ewm(span=9).mean()
+        indicators['MACD'] = macd.iloc[-1]
+        indicators['MACD_Signal'] = signal.iloc[-1]
+        indicators['MACD_Histogram'] = (macd - signal).iloc[-1]
+    if len(df) >= 20:
+        sma = df['Close'].rolling(20).mean()
+        std = df['Close'].rolling(20).std()
+        indicators['BB_Upper'] = (sma + 2 * std).iloc[-1]
+        indicators['BB_Middle'] = sma.iloc[-1]
+        indicators['BB_Lower'] = (sma - 2 * std).iloc[-1]
+    return indicators
+
+
+def test_indicators_match_reference():
+    """测试向量化指标计算与原实现一致"""
+    print("🧪 测试技术指标计算一致性...")
+
+    from tradingagents.dataflows.tdx_utils import calculate_technical_indicators
+
+    api = FakeBarsApi(total_bars=60)
+    df = pd.DataFrame(api.bars).rename(columns={'close': 'Close'})
+    expected = _reference_indicators(df)
+    actual = calculate_technical_indicators(df)
+    assert set(expected) == set(actual)
+    for key, value in expected.items():
+        assert np.isclose(actual[key], value), f"{key}: {actual[key]} != {value}"
+    print("  ✅ 指标结果一致")
+
+
+def test_indicators_reuse_history():
+    """测试常见情况下指标复用已获取的历史数据，不再请求网络"""
+    print("\n🧪 测试指标复用历史数据...")
+
+    api = FakeBarsApi()
+    provider = _make_provider(api)
+    end_date = pd.Timestamp.today().strftime('%Y-%m-%d')
+    start_date = (pd.Timestamp.today() - pd.Timedelta(days=60)).strftime('%Y-%m-%d')
+
+    history = provider.get_stock_history_data('000001', start_date, end_date)
+    assert len(api.calls) == 1
+    indicators = provider.get_stock_technical_indicators('000001', history=history)
+    assert len(api.calls) == 1, f"不应再次请求: {api.calls}"
+    assert np.isclose(indicators['MA5'], history['Close'].tail(5).mean())
+    assert 'MACD' in indicators
+    print(f"  ✅ 请求次数: {len(api.calls)}")
+
+
+def test_short_history_fetches_only_missing_bars():
+    """测试短区间时只增量获取缺少的预热K线"""
+    print("\n🧪 测试预热K线增量补取...")
+
+    from tradingagents.dataflows.tdx_utils import INDICATOR_WARMUP_BARS, calculate_technical_indicators
+
+    api = FakeBarsApi()
+    provider = _make_provider(api)
+    end_date = pd.Timestamp.today().strftime('%Y-%m-%d')
+    start_date = (pd.Timestamp.today() - pd.Timedelta(days=3)).strftime('%Y-%m-%d')
+
+    history = provider.get_stock_history_data('000001', start_date, end_date)
+    first_start, first_count = api.calls[0]
+    indicators = provider.get_stock_technical_indicators('000001', history=history)
+
+    full = pd.DataFrame(api.bars[-INDICATOR_WARMUP_BARS:]).rename(columns={'close': 'Close'})
+    expected = calculate_technical_indicators(full)
+    assert len(api.calls) <= 2
+    if len(api.calls) == 2:
+        # 与已有最早K线重叠一根，用于确认偏移量未变化
+        start, count = api.calls[1]
+        assert start == first_start + first_count - 1
+        assert count == INDICATOR_WARMUP_BARS - first_count + 1
+    assert np.isclose(indicators['MACD'], expected['MACD'])
+    print(f"  ✅ 请求记录: {api.calls}")
+
+
+def test_warmup_survives_new_bars():
+    """测试记录K线后又生成新K线时，预热数据没有缺口；之前交易日的记录不再使用"""
+    print("\n🧪 测试新K线生成后的预热数据...")
+
+    from datetime import date, timedelta
+    from tradingagents.dataflows.tdx_utils import INDICATOR_WARMUP_BARS
+
+    api = FakeBarsApi()
+    provider = _make_provider(api)
+    end_date = pd.Timestamp.today().strftime('%Y-%m-%d')
+    start_date = (pd.Timestamp.today() - pd.Timedelta(days=3)).strftime('%Y-%m-%d')
+    history = provider.get_stock_history_data('000001', start_date, end_date)
+
+    # 获取历史数据之后生成了一根新K线，原偏移量整体后移一位
+    last = pd.Timestamp(api.bars[-1]['datetime'])
+    api.bars.append(dict(api.bars[-1], datetime=(last + pd.offsets.BDay(1)).strftime('%Y-%m-%d 15:00')))
+
+    df = provider._get_warmup_history('000001', history, INDICATOR_WARMUP_BARS)
+    expected_dates = pd.to_datetime([bar['datetime'] for bar in api.bars])
+    start = expected_dates.get_loc(df.index[0])
+    assert list(df.index) == list(expected_dates[start:start + len(df)]), "预热数据中出现缺口"
+    assert len(df) == INDICATOR_WARMUP_BARS
+
+    # 之前交易日记录的K线被丢弃，重新从最新K线获取
+    provider._recent_bars[('000001', 9)]['fetched_on'] = date.today() - timedelta(days=1)
+    assert provider._get_recent_bars('000001', 9) is None
+    print(f"  ✅ 预热数据连续，请求记录: {api.calls}")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 通达信技术指标测试")
+    print("=" * 50)
+
+    test_results = [
+        ("指标一致性", _run_test(test_indicators_match_reference)),
+        ("复用历史数据", _run_test(test_indicators_reuse_history)),
+        ("增量预热", _run_test(test_short_history_fetches_only_missing_bars)),
+        ("新K线生成后的预热数据", _run_test(test_warmup_survives_new_bars)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
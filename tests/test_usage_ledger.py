@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Token使用记录账本测试
+验证追加写入、按日汇总统计、旧版usage.json迁移、多进程并发写入，以及与整体重写JSON的耗时对比
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+
+def _record(provider, cost, timestamp=None, session_id="s1"):
+    return {
+        "timestamp": (timestamp or datetime.now()).isoformat(),
+        "provider": provider,
+        "model_name": "model",
+        "input_tokens": 100,
+        "output_tokens": 50,
+        "cost": cost,
+        "session_id": session_id,
+        "analysis_type": "stock_analysis",
+    }
+
+
+def _write_records(directory, worker, count):
+    from tradingagents.config.usage_ledger import UsageLedger
+
+    ledger = UsageLedger(directory, flush_threshold=25)
+    for i in range(count):
+        ledger.append(_record(f"provider{worker % 2}", 0.01, session_id=f"w{worker}"))
+    ledger.close()
+
+
+def test_statistics_from_rollups():
+    """测试统计结果来自汇总，并包含尚未落盘的记录"""
+    print("🧪 测试按日汇总统计...")
+
+    from tradingagents.config.usage_ledger import UsageLedger
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ledger = UsageLedger(tmp_dir, flush_interval=60)
+        old = datetime.now() - timedelta(days=10)
+        for i in range(30):
+            ledger.append(_record("dashscope", 0.1))
+        for i in range(20):
+            ledger.append(_record("deepseek", 0.2, timestamp=old))
+
+        # 尚未落盘时统计也包含缓冲区中的记录
+        today = ledger.get_statistics(1)
+        assert today["total_requests"] == 30 and abs(today["total_cost"] - 3.0) < 1e-9, today
+
+        ledger.flush()
+        with open(os.path.join(tmp_dir, "usage.jsonl"), encoding="utf-8") as f:
+            assert len(f.readlines()) == 50
+
+        month = ledger.get_statistics(30)
+        assert month["total_requests"] == 50
+        assert month["provider_stats"]["deepseek"]["requests"] == 20
+        assert month["total_input_tokens"] == 5000 and month["total_output_tokens"] == 2500
+        assert ledger.get_statistics(1)["total_requests"] == 30
+
+        # 重新打开后从汇总文件读取
+        reopened = UsageLedger(tmp_dir)
+        assert reopened.get_statistics(30) == month
+        assert len(reopened.load_records()) == 50
+        ledger.close()
+        reopened.close()
+    print("  ✅ 汇总统计正确")
+
+
+def test_config_manager_and_migration():
+    """测试ConfigManager使用账本，并迁移旧版usage.json"""
+    print("\n🧪 测试ConfigManager集成与旧数据迁移...")
+
+    from tradingagents.config.config_manager import ConfigManager
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with open(os.path.join(tmp_dir, "usage.json"), "w", encoding="utf-8") as f:
+            json.dump([_record("google", 1.0) for _ in range(5)], f)
+
+        manager = ConfigManager(tmp_dir)
+        assert os.path.exists(os.path.join(tmp_dir, "usage.json.migrated"))
+        for _ in range(3):
+            manager.add_usage_record("dashscope", "qwen-turbo", 1000, 500, "session")
+
+        stats = manager.get_usage_statistics(1)
+        assert stats["total_requests"] == 8, stats
+        assert stats["provider_stats"]["google"]["cost"] == 5.0
+        assert len(manager.load_usage_records()) == 8
+
+        manager.save_usage_records([])
+        assert manager.get_usage_statistics(30)["total_requests"] == 0
+        assert manager.load_usage_records() == []
+        manager.usage_ledger.close()
+    print("  ✅ 迁移5条旧记录，新增记录与清空操作正常")
+
+
+def test_concurrent_processes():
+    """测试多个进程同时写入同一个账本"""
+    print("\n🧪 测试多进程并发写入...")
+
+    from tradingagents.config.usage_ledger import UsageLedger
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        workers = [multiprocessing.Process(target=_write_records, args=(tmp_dir, i, 200)) for i in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=60)
+
+        ledger = UsageLedger(tmp_dir)
+        records = ledger.load_records()
+        stats = ledger.get_statistics(1)
+        assert len(records) == 800, len(records)
+        assert stats["total_requests"] == 800, stats
+        assert stats["provider_stats"]["provider0"]["requests"] == 400
+        ledger.close()
+    print("  ✅ 4个进程共写入800条，记录与汇总一致")
+
+
+def benchmark_append():
+    """对比每次读取并重写整个JSON文件与追加写入账本的耗时"""
+    print("\n⚡ 写入性能对比...")
+
+    from tradingagents.config.usage_ledger import UsageLedger
+
+    count = 500
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "usage.json")
+        start = time.time()
+        for i in range(count):
+            records = []
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    records = json.load(f)
+            records.append(_record("dashscope", 0.01))
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False, indent=2)
+        rewrite_time = time.time() - start
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ledger = UsageLedger(tmp_dir)
+        start = time.time()
+        for i in range(count):
+            ledger.append(_record("dashscope", 0.01))
+            ledger.get_statistics(1)
+        append_time = time.time() - start
+        ledger.close()
+        assert ledger.get_statistics(1)["total_requests"] == count
+
+    print(f"  📊 整体重写JSON: {rewrite_time:.3f}秒")
+    print(f"  📊 追加写入账本(含每次统计): {append_time:.3f}秒")
+
+
+def _run_test(test):
+    """脚本方式运行时捕获失败并打印，pytest 运行时断言直接失败"""
+    try:
+        test()
+        return True
+    except Exception as e:
+        print(f"❌ {test.__doc__} 失败: {e}")
+        return False
+
+
+def main():
+    """主测试函数"""
+    print("🚀 Token使用记录账本测试")
+    print("=" * 50)
+
+    test_results = [
+        ("按日汇总统计", _run_test(test_statistics_from_rollups)),
+        ("ConfigManager集成", _run_test(test_config_manager_and_migration)),
+        ("多进程并发写入", _run_test(test_concurrent_processes)),
+        ("性能对比", _run_test(benchmark_append)),
+    ]
+
+    print("\n" + "=" * 50)
+    print("📋 测试结果汇总:")
+    passed = 0
+    for test_name, result in test_results:
+        status = "✅ 通过" if result else "❌ 失败"
+        print(f"  {test_name}: {status}")
+        if result:
+            passed += 1
+
+    print(f"\n🎯 总体结果: {passed}/{len(test_results)} 测试通过")
+
+
+if __name__ == "__main__":
+    main()
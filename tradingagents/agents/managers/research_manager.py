@@ -1,12 +1,16 @@
 import time
 import json
 
+from tradingagents.agents.utils.context_packer import DebateContextPacker, build_reports_prefix
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
-def create_research_manager(llm, memory):
+def create_research_manager(llm, memory, context_packer=None):
+    context_packer = context_packer or DebateContextPacker()
+
     def research_manager_node(state) -> dict:
         history = state["investment_debate_state"].get("history", "")
         market_research_report = state["market_report"]
@@ -29,7 +33,11 @@ def create_research_manager(llm, memory):
         for i, rec in enumerate(past_memories, 1):
             past_memory_str += rec["recommendation"] + "\n\n"
 
-        prompt = f"""作为投资组合经理和辩论主持人，您的职责是批判性地评估这轮辩论并做出明确决策：支持看跌分析师、看涨分析师，或者仅在基于所提出论点有强有力理由时选择持有。
+        # 报告作为所有节点共享的前缀（不计入历史预算），辩论历史按节点预算打包
+        reports_prefix = build_reports_prefix(state)
+        packed_history = context_packer.pack_history("Research Manager", history)
+
+        prompt = reports_prefix + f"""作为投资组合经理和辩论主持人，您的职责是批判性地评估这轮辩论并做出明确决策：支持看跌分析师、看涨分析师，或者仅在基于所提出论点有强有力理由时选择持有。
 
 简洁地总结双方的关键观点，重点关注最有说服力的证据或推理。您的建议——买入、卖出或持有——必须明确且可操作。避免仅仅因为双方都有有效观点就默认选择持有；要基于辩论中最强有力的论点做出承诺。
 
@@ -52,18 +60,11 @@ def create_research_manager(llm, memory):
 以下是您对错误的过去反思：
 \"{past_memory_str}\"
 
-以下是综合分析报告：
-市场研究：{market_research_report}
-
-情绪分析：{sentiment_report}
-
-新闻分析：{news_report}
-
-基本面分析：{fundamentals_report}
+综合分析报告见上文。
 
 以下是辩论：
 辩论历史：
-{history}
+{packed_history}
 
 请用中文撰写所有分析内容和建议。"""
         response = llm.invoke(prompt)
@@ -2,12 +2,16 @@ from langchain_core.messages import AIMessage
 import time
 import json
 
+from tradingagents.agents.utils.context_packer import DebateContextPacker, build_reports_prefix
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
 
-def create_bear_researcher(llm, memory):
+def create_bear_researcher(llm, memory, context_packer=None):
+    context_packer = context_packer or DebateContextPacker()
+
     def bear_node(state) -> dict:
         investment_debate_state = state["investment_debate_state"]
         history = investment_debate_state.get("history", "")
@@ -43,7 +47,11 @@ def create_bear_researcher(llm, memory):
         for i, rec in enumerate(past_memories, 1):
             past_memory_str += rec["recommendation"] + "\n\n"
 
-        prompt = f"""你是一位看跌分析师，负责论证不投资股票 {company_name} 的理由。
+        # 报告作为所有节点共享的前缀（不计入历史预算），辩论历史按节点预算打包
+        reports_prefix = build_reports_prefix(state)
+        packed_history = context_packer.pack_history("Bear Researcher", history)
+
+        prompt = reports_prefix + f"""你是一位看跌分析师，负责论证不投资股票 {company_name} 的理由。
 
 ⚠️ 重要提醒：当前分析的是 {market_info['market_name']}，所有价格和估值请使用 {currency}（{currency_symbol}）作为单位。
 
@@ -57,13 +65,9 @@ def create_bear_researcher(llm, memory):
 - 反驳看涨观点：用具体数据和合理推理批判性分析看涨论点，揭露弱点或过度乐观的假设
 - 参与讨论：以对话风格呈现你的论点，直接回应看涨分析师的观点并进行有效辩论，而不仅仅是列举事实
 
-可用资源：
+可用资源（除上述综合报告外）：
 
-市场研究报告：{market_research_report}
-社交媒体情绪报告：{sentiment_report}
-最新世界事务新闻：{news_report}
-公司基本面报告：{fundamentals_report}
-辩论对话历史：{history}
+辩论对话历史：{packed_history}
 最后的看涨论点：{current_response}
 类似情况的反思和经验教训：{past_memory_str}
 
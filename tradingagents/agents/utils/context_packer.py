@@ -0,0 +1,219 @@
+"""
+辩论提示词上下文打包
+
+研究员、风险分析师和两位经理每次发言都会把四份完整报告和不断增长的辩论历史拼进提示词，
+单次提示词长度随轮数线性增长，总token随 max_debate_rounds / max_risk_discuss_rounds 平方增长。
+这里为每个节点的辩论历史提供单独的token预算：
+- 四份报告以固定格式放在提示词最前面，所有节点共享同一前缀，便于模型服务端的前缀缓存；
+  报告前缀不计入历史预算，报告再长也不会挤占辩论历史
+- 只有一轮发言时历史原样保留（默认配置下各节点看到的内容不变）
+- 辩论历史超出预算时，保留最近几次发言原文，更早的发言替换为摘要；
+  当前一轮的每次发言至少保留摘要，单次发言本身超出预算时也改用摘要
+- 每次发言只摘要一次（按内容哈希缓存），后续轮次和其他节点直接复用
+- 统计每个节点原始/实际的历史token数，供每次分析结束时报告节省量
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.utils.context_packer")
+
+# 与适配器中的估算保持一致：保守按2字符/token估算
+CHARS_PER_TOKEN = 2
+# 每轮发言人数：投资辩论为多空两方，风险辩论为激进/中性/保守三方
+INVEST_DEBATE_SPEAKERS = 2
+RISK_DEBATE_SPEAKERS = 3
+
+# 辩论历史中每次发言以 "<角色> Analyst:" 开头
+_TURN_PATTERN = re.compile(r"(?m)^(?=(?:Bull|Bear|Risky|Safe|Neutral) Analyst:)")
+_SENTENCE_PATTERN = re.compile(r"[^。！？!?；;\n]+[。！？!?；;]?")
+
+
+def estimate_tokens(*texts: str) -> int:
+    """估算文本的token数量"""
+    return sum(len(text or "") for text in texts) // CHARS_PER_TOKEN
+
+
+def build_reports_prefix(state) -> str:
+    """把四份报告组织成所有节点一致的提示词前缀"""
+    return (
+        "以下是本次分析的综合报告：\n\n"
+        f"市场研究报告：{state.get('market_report', '')}\n\n"
+        f"社交媒体情绪报告：{state.get('sentiment_report', '')}\n\n"
+        f"最新世界事务新闻：{state.get('news_report', '')}\n\n"
+        f"公司基本面报告：{state.get('fundamentals_report', '')}\n\n"
+        "---\n\n"
+    )
+
+
+def split_turns(history: str) -> List[str]:
+    """把辩论历史拆分为逐次发言"""
+    return [turn.strip() for turn in _TURN_PATTERN.split(history or "") if turn.strip()]
+
+
+def extractive_summary(turn: str, max_chars: int = 300) -> str:
+    """抽取式摘要：保留发言角色和开头的若干句，不额外调用模型"""
+    speaker, _, content = turn.partition(":")
+    if not content:
+        speaker, content = "", turn
+    summary = ""
+    for sentence in _SENTENCE_PATTERN.findall(content):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if summary and len(summary) + len(sentence) > max_chars:
+            break
+        summary += sentence
+    summary = summary[:max_chars]
+    return f"{speaker}（摘要）: {summary}" if speaker else summary
+
+
+class DebateContextPacker:
+    """按节点token预算打包辩论历史"""
+
+    def __init__(self, token_budget: int = 12000, node_budgets: Optional[Dict[str, int]] = None,
+                 keep_recent_turns: int = 2, summary_chars: int = 300,
+                 summarizer: Optional[Callable[[str], str]] = None, max_cached_summaries: int = 2048):
+        self.token_budget = token_budget
+        self.node_budgets = node_budgets or {}
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.summary_chars = summary_chars
+        self.summarizer = summarizer
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def budget_for(self, node_name: str) -> int:
+        return self.node_budgets.get(node_name, self.token_budget)
+
+    def pack_history(self, node_name: str, history: str, speakers: int = INVEST_DEBATE_SPEAKERS) -> str:
+        """
+        在节点的历史预算内返回辩论历史
+
+        Args:
+            node_name: 节点名称，用于查找单独的预算和统计
+            history: 完整辩论历史
+            speakers: 每轮发言人数，最后 speakers 次发言为当前一轮
+        """
+        original_tokens = estimate_tokens(history)
+        budget = self.budget_for(node_name)
+        turns = split_turns(history)
+
+        # 只有一轮发言时不打包
+        if original_tokens <= budget or len(turns) <= speakers:
+            self._record(node_name, original_tokens, original_tokens)
+            return history
+
+        # 从最后一次发言往前，预算内的最近发言保留原文；单次发言超出预算时改用摘要
+        recent_count = 0
+        for count in range(1, min(self.keep_recent_turns, len(turns)) + 1):
+            if estimate_tokens(*turns[-count:]) > budget:
+                break
+            recent_count = count
+        recent = turns[len(turns) - recent_count:]
+        summarized = turns[:len(turns) - recent_count]
+
+        # 当前一轮的发言至少保留摘要；更早轮次的摘要超出预算时从最早的开始省略
+        current_round_start = len(turns) - speakers
+        required = [self._summarize(turn) for turn in summarized[current_round_start:]]
+        optional = [self._summarize(turn) for turn in summarized[:current_round_start]]
+        remaining = budget - estimate_tokens(*recent, *required)
+        omitted = 0
+        while optional and estimate_tokens(*optional) > remaining:
+            optional.pop(0)
+            omitted += 1
+        summaries = optional + required
+
+        parts = []
+        if omitted:
+            parts.append(f"（更早的 {omitted} 次发言已省略）")
+        if summaries:
+            parts.append("（以下为较早发言的摘要）")
+            parts.extend(summaries)
+            if recent:
+                parts.append("（以下为最近发言原文）")
+        parts.extend(recent)
+        packed = "\n" + "\n".join(parts)
+
+        packed_tokens = estimate_tokens(packed)
+        self._record(node_name, original_tokens, packed_tokens)
+        logger.debug(f"📦 [上下文打包] {node_name}: 历史 {original_tokens} -> {packed_tokens} tokens, "
+                     f"摘要 {len(summaries)} 次发言, 省略 {omitted} 次")
+        return packed
+
+    def get_stats(self) -> Dict:
+        """获取各节点的历史token统计和总节省量"""
+        with self._lock:
+            nodes = {name: dict(stats, saved_tokens=stats['original_tokens'] - stats['packed_tokens'])
+                     for name, stats in self._stats.items()}
+        return {
+            'nodes': nodes,
+            'original_tokens': sum(s['original_tokens'] for s in nodes.values()),
+            'packed_tokens': sum(s['packed_tokens'] for s in nodes.values()),
+            'saved_tokens': sum(s['saved_tokens'] for s in nodes.values()),
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {}
+
+    def _summarize(self, turn: str) -> str:
+        key = hashlib.md5(turn.encode('utf-8')).hexdigest()
+        with self._lock:
+            if key in self._summaries:
+                self._summaries.move_to_end(key)
+                return self._summaries[key]
+
+        summary = None
+        if self.summarizer is not None:
+            try:
+                summary = self.summarizer(turn)
+            except Exception as e:
+                logger.warning(f"⚠️ [上下文打包] 摘要生成失败，改用抽取式摘要: {e}")
+        if not summary:
+            summary = extractive_summary(turn, self.summary_chars)
+
+        with self._lock:
+            self._summaries[key] = summary
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def _record(self, node_name: str, original_tokens: int, packed_tokens: int):
+        with self._lock:
+            stats = self._stats.setdefault(node_name, {'calls': 0, 'original_tokens': 0, 'packed_tokens': 0})
+            stats['calls'] += 1
+            stats['original_tokens'] += original_tokens
+            stats['packed_tokens'] += packed_tokens
+
+
+def create_llm_summarizer(llm, max_chars: int = 300) -> Callable[[str], str]:
+    """使用模型为单次发言生成摘要"""
+    def summarize(turn: str) -> str:
+        speaker, _, content = turn.partition(":")
+        prompt = (f"请用不超过{max_chars}字的中文概括以下辩论发言的核心论点和关键数据，"
+                  f"只输出摘要本身：\n\n{content or turn}")
+        summary = llm.invoke(prompt).content.strip()[:max_chars]
+        return f"{speaker}（摘要）: {summary}" if content else summary
+    return summarize
+
+
+def create_context_packer(config: Optional[Dict] = None, summary_llm=None) -> DebateContextPacker:
+    """根据配置创建上下文打包器"""
+    config = config or {}
+    summarizer = None
+    if config.get("debate_context_summarizer", "extractive") == "llm" and summary_llm is not None:
+        summarizer = create_llm_summarizer(summary_llm, config.get("debate_context_summary_chars", 300))
+    return DebateContextPacker(
+        token_budget=config.get("debate_context_token_budget", 12000),
+        node_budgets=config.get("debate_context_node_budgets"),
+        keep_recent_turns=config.get("debate_context_recent_turns", 2),
+        summary_chars=config.get("debate_context_summary_chars", 300),
+        summarizer=summarizer,
+    )
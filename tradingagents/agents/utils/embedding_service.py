@@ -0,0 +1,217 @@
+"""
+共享嵌入服务
+
+多个 FinancialSituationMemory 实例（多头/空头/交易员/投资裁判/风险经理）在同一次分析中
+通常会对完全相同的情况文本做嵌入。这里提供一个进程内共享的嵌入缓存：
+- 按 (模型标识, 文本内容哈希) 做LRU缓存，可选持久化到本地SQLite
+- 同一文本的并发请求合并为一次API调用
+- 批量接口只对未命中的文本调用一次批量嵌入函数
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.utils.embedding_service")
+
+
+class _InFlight:
+    """正在计算中的嵌入请求，供并发的相同请求等待结果"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class EmbeddingService:
+    """进程内共享的嵌入缓存服务"""
+
+    def __init__(self, max_entries: int = 2048, persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0, 'api_calls': 0}
+        self._db = None
+
+        if persist_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(persist_path)), exist_ok=True)
+                self._db = sqlite3.connect(persist_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, embedding TEXT NOT NULL)"
+                )
+                self._db.commit()
+                logger.info(f"📚 [嵌入缓存] 启用磁盘持久化: {persist_path}")
+            except Exception as e:
+                logger.warning(f"⚠️ [嵌入缓存] 磁盘持久化不可用，仅使用内存缓存: {e}")
+                self._db = None
+
+    @staticmethod
+    def make_key(model_key: str, text: str) -> str:
+        """根据模型标识和文本内容生成缓存键"""
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return f"{model_key}:{digest}"
+
+    def get_embedding(self, model_key: str, text: str,
+                      compute_fn: Callable[[str], List[float]]) -> List[float]:
+        """
+        获取单个文本的嵌入，未命中时调用 compute_fn
+
+        同一文本的并发请求只会调用一次 compute_fn，其余请求等待其结果。
+        """
+        key = self.make_key(model_key, text)
+
+        with self._lock:
+            cached = self._get_cached(key)
+            if cached is not None:
+                return cached
+            in_flight = self._in_flight.get(key)
+            if in_flight is None:
+                in_flight = _InFlight()
+                self._in_flight[key] = in_flight
+                owner = True
+                self._stats['misses'] += 1
+            else:
+                owner = False
+                self._stats['coalesced'] += 1
+
+        if not owner:
+            in_flight.event.wait()
+            if in_flight.result is not None:
+                return in_flight.result
+            # 发起请求的线程失败了，自行计算
+            return compute_fn(text)
+
+        result = None
+        try:
+            result = compute_fn(text)
+            with self._lock:
+                self._stats['api_calls'] += 1
+            self._store(key, result)
+            return result
+        finally:
+            in_flight.result = result
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.event.set()
+
+    def get_embeddings(self, model_key: str, texts: Sequence[str],
+                       batch_compute_fn: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """
+        批量获取嵌入，只对未命中缓存的（去重后的）文本调用一次 batch_compute_fn
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        pending: "OrderedDict[str, List[int]]" = OrderedDict()
+        pending_texts: Dict[str, str] = {}
+
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = self.make_key(model_key, text)
+                cached = self._get_cached(key)
+                if cached is not None:
+                    results[i] = cached
+                    continue
+                if key not in pending:
+                    self._stats['misses'] += 1
+                pending.setdefault(key, []).append(i)
+                pending_texts[key] = text
+
+        if pending:
+            keys = list(pending)
+            embeddings = batch_compute_fn([pending_texts[key] for key in keys])
+            with self._lock:
+                self._stats['api_calls'] += 1
+            for key, embedding in zip(keys, embeddings):
+                self._store(key, embedding)
+                for i in pending[key]:
+                    results[i] = embedding
+
+        return results
+
+    def clear(self):
+        """清空内存缓存（磁盘缓存保留）"""
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._cache)
+            stats['persistent'] = self._db is not None
+            return stats
+
+    def _get_cached(self, key: str) -> Optional[List[float]]:
+        """在持有 self._lock 时调用：先查内存，再查磁盘"""
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self._stats['hits'] += 1
+            return self._cache[key]
+
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    row = self._db.execute("SELECT embedding FROM embeddings WHERE key = ?", (key,)).fetchone()
+            except Exception as e:
+                logger.debug(f"⚠️ [嵌入缓存] 读取磁盘缓存失败: {e}")
+                row = None
+            if row:
+                embedding = json.loads(row[0])
+                self._put_memory(key, embedding)
+                self._stats['disk_hits'] += 1
+                return embedding
+        return None
+
+    def _store(self, key: str, embedding: List[float]):
+        # 全零向量表示嵌入失败或记忆功能降级，不缓存，下次重试
+        if not embedding or not any(embedding):
+            return
+        with self._lock:
+            self._put_memory(key, embedding)
+        if self._db is not None:
+            try:
+                with self._db_lock:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, embedding) VALUES (?, ?)",
+                        (key, json.dumps(list(embedding))),
+                    )
+                    self._db.commit()
+            except Exception as e:
+                logger.debug(f"⚠️ [嵌入缓存] 写入磁盘缓存失败: {e}")
+
+    def _put_memory(self, key: str, embedding: List[float]):
+        self._cache[key] = embedding
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+
+_embedding_service = None
+_embedding_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """获取全局共享的嵌入服务
+
+    环境变量:
+        EMBEDDING_CACHE_MAX_ENTRIES: 内存缓存条数上限，默认2048
+        EMBEDDING_CACHE_PATH: 设置后将嵌入持久化到该SQLite文件
+    """
+    global _embedding_service
+    if _embedding_service is None:
+        with _embedding_service_lock:
+            if _embedding_service is None:
+                _embedding_service = EmbeddingService(
+                    max_entries=int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', '2048')),
+                    persist_path=os.getenv('EMBEDDING_CACHE_PATH') or None,
+                )
+    return _embedding_service
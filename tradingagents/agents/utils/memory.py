@@ -26,10 +26,15 @@ import threading
 import hashlib
 from typing import Dict, Optional
 
+from tradingagents.agents.utils.embedding_service import get_embedding_service
+
 # 导入统一日志系统
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("agents.utils.memory")
 
+# DashScope text-embedding-v3 单次批量请求的文本数上限
+DASHSCOPE_EMBEDDING_BATCH_SIZE = 10
+
 
 class ChromaDBManager:
     """单例ChromaDB管理器，避免并发创建集合的冲突"""
@@ -381,7 +386,79 @@ class FinancialSituationMemory:
         logger.warning(f"⚠️ 强制截断：保留首尾关键信息，{len(text)}字符截断为{len(truncated)}字符")
         return truncated, True
 
+    def _embedding_model_key(self):
+        """嵌入缓存使用的模型标识；记忆功能禁用时返回None（不走缓存）"""
+        if self.client == "DISABLED" or not hasattr(self, 'embedding'):
+            return None
+        if self._use_dashscope_embedding():
+            return f"dashscope:{self.embedding}"
+        base_url = getattr(self.client, 'base_url', '')
+        return f"{self.llm_provider}:{base_url}:{self.embedding}"
+
+    def _use_dashscope_embedding(self):
+        """当前配置是否使用阿里百炼的嵌入模型"""
+        return (self.llm_provider == "dashscope" or
+                self.llm_provider == "alibaba" or
+                self.llm_provider == "qianfan" or
+                (self.llm_provider == "google" and self.client is None) or
+                (self.llm_provider == "deepseek" and self.client is None) or
+                (self.llm_provider == "openrouter" and self.client is None))
+
     def get_embedding(self, text):
+        """Get embedding for a text, served from the shared embedding cache when possible"""
+        model_key = self._embedding_model_key()
+        if model_key is None or not text or not isinstance(text, str):
+            return self._compute_embedding(text)
+        return get_embedding_service().get_embedding(model_key, text, self._compute_embedding)
+
+    def get_embeddings(self, texts):
+        """批量获取嵌入：命中缓存的直接返回，其余文本一次批量请求"""
+        texts = list(texts)
+        model_key = self._embedding_model_key()
+        if model_key is None:
+            return [self._compute_embedding(text) for text in texts]
+        return get_embedding_service().get_embeddings(model_key, texts, self._compute_embeddings_batch)
+
+    def _compute_embeddings_batch(self, texts):
+        """批量调用嵌入API；无效或超长的文本以及批量调用失败时逐条处理"""
+        batchable = [
+            i for i, text in enumerate(texts)
+            if text and isinstance(text, str) and not (
+                self.enable_embedding_length_check and len(text) > self.max_embedding_length)
+        ]
+        embeddings = [None] * len(texts)
+
+        if len(batchable) > 1:
+            batch_texts = [texts[i] for i in batchable]
+            try:
+                if self._use_dashscope_embedding():
+                    from dashscope import TextEmbedding
+
+                    batch_embeddings = []
+                    for start in range(0, len(batch_texts), DASHSCOPE_EMBEDDING_BATCH_SIZE):
+                        chunk = batch_texts[start:start + DASHSCOPE_EMBEDDING_BATCH_SIZE]
+                        response = TextEmbedding.call(model=self.embedding, input=chunk)
+                        if response.status_code != 200:
+                            raise RuntimeError(f"{response.code} - {response.message}")
+                        items = sorted(response.output['embeddings'], key=lambda item: item['text_index'])
+                        batch_embeddings.extend(item['embedding'] for item in items)
+                else:
+                    response = self.client.embeddings.create(model=self.embedding, input=batch_texts)
+                    batch_embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+                if len(batch_embeddings) == len(batchable):
+                    for i, embedding in zip(batchable, batch_embeddings):
+                        embeddings[i] = embedding
+                    logger.debug(f"✅ 批量embedding成功，数量: {len(batchable)}")
+            except Exception as e:
+                logger.warning(f"⚠️ 批量embedding失败，改为逐条处理: {str(e)}")
+
+        return [
+            embedding if embedding is not None else self._compute_embedding(text)
+            for text, embedding in zip(texts, embeddings)
+        ]
+
+    def _compute_embedding(self, text):
         """Get embedding for a text using the configured provider"""
 
         # 检查记忆功能是否被禁用
@@ -429,12 +506,7 @@ class FinancialSituationMemory:
             'strategy': 'no_truncation_with_fallback'  # 标记策略
         }
 
-        if (self.llm_provider == "dashscope" or
-            self.llm_provider == "alibaba" or
-            self.llm_provider == "qianfan" or
-            (self.llm_provider == "google" and self.client is None) or
-            (self.llm_provider == "deepseek" and self.client is None) or
-            (self.llm_provider == "openrouter" and self.client is None)):
+        if self._use_dashscope_embedding():
             # 使用阿里百炼的嵌入模型
             try:
                 # 导入DashScope模块
@@ -595,7 +667,6 @@ class FinancialSituationMemory:
         situations = []
         advice = []
         ids = []
-        embeddings = []
 
         offset = self.situation_collection.count()
 
@@ -603,7 +674,9 @@ class FinancialSituationMemory:
             situations.append(situation)
             advice.append(recommendation)
             ids.append(str(offset + i))
-            embeddings.append(self.get_embedding(situation))
+
+        # 一次批量嵌入，已缓存的情况文本不再请求
+        embeddings = self.get_embeddings(situations)
 
         self.situation_collection.add(
             documents=situations,
@@ -20,6 +20,9 @@ from tradingagents.utils.logging_init import get_logger
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
+from .usage_ledger import UsageLedger
+from .usage_writer import AsyncUsageWriter
+
 try:
     from .mongodb_storage import MongoDBStorage
     MONGODB_AVAILABLE = True
@@ -72,7 +75,7 @@ class ConfigManager:
 
         self.models_file = self.config_dir / "models.json"
         self.pricing_file = self.config_dir / "pricing.json"
-        self.usage_file = self.config_dir / "usage.json"
+        self.usage_file = self.config_dir / UsageLedger.RECORDS_FILE
         self.settings_file = self.config_dir / "settings.json"
 
         # 加载.env文件（保持向后兼容）
@@ -84,6 +87,12 @@ class ConfigManager:
 
         self._init_default_configs()
 
+        # 本地使用记录账本（MongoDB不可用时使用）
+        self.usage_ledger = UsageLedger(
+            self.config_dir,
+            max_records=self.load_settings().get("max_usage_records", 10000),
+        )
+
     def _load_env_file(self):
         """加载.env文件（保持向后兼容）"""
         # 尝试从项目根目录加载.env文件
@@ -348,11 +357,7 @@ class ConfigManager:
     def load_usage_records(self) -> List[UsageRecord]:
         """加载使用记录"""
         try:
-            if not self.usage_file.exists():
-                return []
-            with open(self.usage_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [UsageRecord(**item) for item in data]
+            return [UsageRecord(**item) for item in self.usage_ledger.load_records()]
         except Exception as e:
             logger.error(f"加载使用记录失败: {e}")
             return []
@@ -360,19 +365,25 @@ class ConfigManager:
     def save_usage_records(self, records: List[UsageRecord]):
         """保存使用记录"""
         try:
-            data = [asdict(record) for record in records]
-            with open(self.usage_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.usage_ledger.rewrite([asdict(record) for record in records])
         except Exception as e:
             logger.error(f"保存使用记录失败: {e}")
     
     def add_usage_record(self, provider: str, model_name: str, input_tokens: int,
                         output_tokens: int, session_id: str, analysis_type: str = "stock_analysis"):
-        """添加使用记录"""
-        # 计算成本
+        """添加使用记录（同步写入存储）"""
+        record = self.build_usage_record(provider, model_name, input_tokens, output_tokens,
+                                         session_id, analysis_type)
+        self.save_usage_batch([record])
+        return record
+    
+    def build_usage_record(self, provider: str, model_name: str, input_tokens: int,
+                           output_tokens: int, session_id: str,
+                           analysis_type: str = "stock_analysis") -> UsageRecord:
+        """计算成本并生成使用记录（不写入存储）"""
         cost = self.calculate_cost(provider, model_name, input_tokens, output_tokens)
         
-        record = UsageRecord(
+        return UsageRecord(
             timestamp=datetime.now().isoformat(),
             provider=provider,
             model_name=model_name,
@@ -382,27 +393,22 @@ class ConfigManager:
             session_id=session_id,
             analysis_type=analysis_type
         )
+    
+    def save_usage_batch(self, records: List[UsageRecord]):
+        """批量写入使用记录：优先一次性写入MongoDB，未写入的记录回退到本地账本"""
+        if not records:
+            return
         
-        # 优先使用MongoDB存储
+        # 优先使用MongoDB存储；部分失败时只回退未写入的记录，避免重复计数
         if self.mongodb_storage and self.mongodb_storage.is_connected():
-            success = self.mongodb_storage.save_usage_record(record)
-            if success:
-                return record
-            else:
-                logger.error(f"⚠️ MongoDB保存失败，回退到JSON文件存储")
+            records = self.mongodb_storage.save_usage_records(records)
+            if not records:
+                return
+            logger.error(f"⚠️ MongoDB保存失败，{len(records)} 条记录回退到本地文件存储")
         
-        # 回退到JSON文件存储
-        records = self.load_usage_records()
-        records.append(record)
-        
-        # 限制记录数量
-        settings = self.load_settings()
-        max_records = settings.get("max_usage_records", 10000)
-        if len(records) > max_records:
-            records = records[-max_records:]
-        
-        self.save_usage_records(records)
-        return record
+        # 回退到本地账本：追加到缓冲区，由账本的后台线程批量落盘
+        for record in records:
+            self.usage_ledger.append(asdict(record))
     
     def calculate_cost(self, provider: str, model_name: str, input_tokens: int, output_tokens: int) -> float:
         """计算使用成本"""
@@ -498,6 +504,8 @@ class ConfigManager:
 
     def save_settings(self, settings: Dict[str, Any]):
         """保存设置"""
+        if getattr(self, "usage_ledger", None) is not None:
+            self.usage_ledger.max_records = settings.get("max_usage_records", self.usage_ledger.max_records)
         try:
             with open(self.settings_file, 'w', encoding='utf-8') as f:
                 json.dump(settings, f, ensure_ascii=False, indent=2)
@@ -534,52 +542,8 @@ class ConfigManager:
             except Exception as e:
                 logger.error(f"⚠️ MongoDB统计获取失败，回退到JSON文件: {e}")
         
-        # 回退到JSON文件统计
-        records = self.load_usage_records()
-        
-        # 过滤最近N天的记录
-        from datetime import datetime, timedelta
-
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        recent_records = []
-        for record in records:
-            try:
-                record_date = datetime.fromisoformat(record.timestamp)
-                if record_date >= cutoff_date:
-                    recent_records.append(record)
-            except:
-                continue
-        
-        # 统计数据
-        total_cost = sum(record.cost for record in recent_records)
-        total_input_tokens = sum(record.input_tokens for record in recent_records)
-        total_output_tokens = sum(record.output_tokens for record in recent_records)
-        
-        # 按供应商统计
-        provider_stats = {}
-        for record in recent_records:
-            if record.provider not in provider_stats:
-                provider_stats[record.provider] = {
-                    "cost": 0,
-                    "input_tokens": 0,
-                    "output_tokens": 0,
-                    "requests": 0
-                }
-            provider_stats[record.provider]["cost"] += record.cost
-            provider_stats[record.provider]["input_tokens"] += record.input_tokens
-            provider_stats[record.provider]["output_tokens"] += record.output_tokens
-            provider_stats[record.provider]["requests"] += 1
-        
-        return {
-            "period_days": days,
-            "total_cost": round(total_cost, 4),
-            "total_input_tokens": total_input_tokens,
-            "total_output_tokens": total_output_tokens,
-            "total_requests": len(recent_records),
-            "provider_stats": provider_stats,
-            "records_count": len(recent_records)
-        }
+        # 回退到本地账本的按日汇总（最近 days 个自然日，含今天）
+        return self.usage_ledger.get_statistics(days)
     
     def get_data_dir(self) -> str:
         """获取数据目录路径"""
@@ -651,10 +615,29 @@ class ConfigManager:
 
 
 class TokenTracker:
-    """Token使用跟踪器"""
+    """Token使用跟踪器
+
+    默认异步写入：track_usage 只计算成本并把记录放入有界队列，由后台线程批量写入存储，
+    成本警告在每批记录写入后检查。
 
-    def __init__(self, config_manager: ConfigManager):
+    环境变量:
+        TOKEN_TRACKING_ASYNC: 是否异步写入，默认 true
+        TOKEN_TRACKING_QUEUE_SIZE: 队列容量，默认 10000
+        TOKEN_TRACKING_BATCH_SIZE: 每批最多写入条数，默认 200
+    """
+
+    def __init__(self, config_manager: ConfigManager, async_writes: Optional[bool] = None):
         self.config_manager = config_manager
+        if async_writes is None:
+            async_writes = os.getenv("TOKEN_TRACKING_ASYNC", "true").lower() not in ("false", "0", "no")
+        self.usage_writer = None
+        if async_writes:
+            self.usage_writer = AsyncUsageWriter(
+                self._write_batch,
+                max_queue_size=int(os.getenv("TOKEN_TRACKING_QUEUE_SIZE", "10000")),
+                batch_size=int(os.getenv("TOKEN_TRACKING_BATCH_SIZE", "200")),
+                name="token-usage-writer",
+            )
 
     def track_usage(self, provider: str, model_name: str, input_tokens: int,
                    output_tokens: int, session_id: str = None, analysis_type: str = "stock_analysis"):
@@ -669,8 +652,8 @@ class TokenTracker:
         if not cost_tracking_enabled:
             return None
 
-        # 添加使用记录
-        record = self.config_manager.add_usage_record(
+        # 生成使用记录（成本在调用方线程计算，便于立即记录日志）
+        record = self.config_manager.build_usage_record(
             provider=provider,
             model_name=model_name,
             input_tokens=input_tokens,
@@ -679,12 +662,33 @@ class TokenTracker:
             analysis_type=analysis_type
         )
 
-        # 检查成本警告
-        if record:
-            self._check_cost_alert(record.cost)
+        if self.usage_writer is not None:
+            # 放入队列，由后台线程写入并检查成本警告
+            self.usage_writer.submit(record)
+        else:
+            self._write_batch([record])
 
         return record
 
+    def _write_batch(self, records: List[UsageRecord]):
+        """写入一批使用记录，并检查成本警告"""
+        self.config_manager.save_usage_batch(records)
+        self._check_cost_alert(records[-1].cost)
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """等待队列中的使用记录全部写入存储"""
+        if self.usage_writer is None:
+            return True
+        return self.usage_writer.flush(timeout)
+
+    def get_pipeline_metrics(self) -> Dict[str, Any]:
+        """获取异步写入队列的指标（队列深度、背压等待、丢弃数量等）"""
+        if self.usage_writer is None:
+            return {'async': False}
+        metrics = self.usage_writer.get_metrics()
+        metrics['async'] = True
+        return metrics
+
     def _check_cost_alert(self, current_cost: float):
         """检查成本警告"""
         settings = self.config_manager.load_settings()
@@ -700,6 +704,7 @@ class TokenTracker:
 
     def get_session_cost(self, session_id: str) -> float:
         """获取会话成本"""
+        self.flush()
         records = self.config_manager.load_usage_records()
         session_cost = sum(record.cost for record in records if record.session_id == session_id)
         return session_cost
@@ -16,7 +16,7 @@ logger = get_logger('agents')
 
 try:
     from pymongo import MongoClient
-    from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+    from pymongo.errors import BulkWriteError, ConnectionFailure, ServerSelectionTimeoutError
     MONGODB_AVAILABLE = True
 except ImportError:
     MONGODB_AVAILABLE = False
@@ -126,6 +126,53 @@ class MongoDBStorage:
             logger.error(f"保存记录到MongoDB失败: {e}")
             return False
     
+    def save_usage_records(self, records: List[UsageRecord]) -> List[UsageRecord]:
+        """
+        批量保存使用记录到MongoDB（一次 insert_many）
+
+        Returns:
+            List[UsageRecord]: 未能写入的记录（全部写入时为空列表），调用方只需回退这些记录，避免重复计数
+        """
+        if not self._connected:
+            return list(records)
+        if not records:
+            return []
+        
+        created_at = datetime.now()
+        documents = []
+        for record in records:
+            record_dict = asdict(record)
+            record_dict['_created_at'] = created_at
+            documents.append(record_dict)
+        
+        try:
+            self.collection.insert_many(documents, ordered=False)
+            return []
+            
+        except BulkWriteError as e:
+            # ordered=False 时其余文档照常写入，只有 writeErrors 中列出的文档失败；
+            # 主键重复说明该文档已经写入过
+            failed = sorted({error['index'] for error in e.details.get('writeErrors', [])
+                             if error.get('code') != 11000})
+            logger.error(f"MongoDB批量插入部分失败: {len(failed)}/{len(documents)} 条未写入")
+            return [records[index] for index in failed]
+            
+        except Exception as e:
+            logger.error(f"批量保存记录到MongoDB失败: {e}")
+            return self._unsaved_records(records, documents)
+    
+    def _unsaved_records(self, records: List[UsageRecord], documents: List[Dict]) -> List[UsageRecord]:
+        """批量写入中途出错时，按 insert_many 分配的 _id 查询哪些文档已写入，无法确认时全部视为未写入"""
+        ids = [document.get('_id') for document in documents]
+        if any(document_id is None for document_id in ids):
+            return list(records)
+        try:
+            saved = {doc['_id'] for doc in self.collection.find({'_id': {'$in': ids}}, {'_id': 1})}
+        except Exception as e:
+            logger.error(f"确认MongoDB已写入的记录失败: {e}")
+            return list(records)
+        return [record for record, document_id in zip(records, ids) if document_id not in saved]
+    
     def load_usage_records(self, limit: int = 10000, days: int = None) -> List[UsageRecord]:
         """从MongoDB加载使用记录"""
         if not self._connected:
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Token使用记录账本
+MongoDB不可用时的本地存储：记录追加写入 usage.jsonl，按天、按供应商维护增量汇总，
+统计查询直接读取汇总，不再扫描全部记录
+"""
+
+import atexit
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class _InterProcessLock:
+    """基于锁文件的跨进程互斥锁（同时在进程内用线程锁互斥）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._file = None
+        self._depth = 0
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        self._depth += 1
+        if self._depth == 1:
+            self._file = open(self.path, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self._depth -= 1
+            if self._depth == 0:
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                    elif msvcrt is not None:
+                        self._file.seek(0)
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+                finally:
+                    self._file.close()
+                    self._file = None
+        finally:
+            self._thread_lock.release()
+
+
+def _empty_bucket() -> Dict[str, float]:
+    return {"cost": 0.0, "input_tokens": 0, "output_tokens": 0, "requests": 0}
+
+
+class UsageLedger:
+    """
+    追加写入的使用记录账本
+
+    - append() 只写入内存缓冲区，后台线程每隔 flush_interval 秒（或缓冲区达到 flush_threshold 条时）
+      在文件锁内把缓冲记录追加到 usage.jsonl
+    - usage_rollups.json 保存 {日期: {供应商: 汇总}} 以及已汇总到的文件偏移，
+      每次写入时只读取偏移之后的新记录（包括其他进程写入的记录）更新汇总
+    - 记录数超过 max_records 的 1.2 倍时压缩为最近 max_records 条，汇总数据保留
+    """
+
+    RECORDS_FILE = "usage.jsonl"
+    ROLLUPS_FILE = "usage_rollups.json"
+    LOCK_FILE = "usage.lock"
+    LEGACY_FILE = "usage.json"
+
+    def __init__(self, directory, max_records: int = 10000,
+                 flush_interval: float = 2.0, flush_threshold: int = 100):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.records_path = self.directory / self.RECORDS_FILE
+        self.rollups_path = self.directory / self.ROLLUPS_FILE
+        self.max_records = max_records
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._file_lock = _InterProcessLock(self.directory / self.LOCK_FILE)
+        self._buffer_lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self._rollups_cache: Optional[Dict[str, Any]] = None
+        self._rollups_signature = None
+
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+
+        self._migrate_legacy_file()
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def append(self, record: Dict[str, Any]):
+        """追加一条记录（异步落盘）"""
+        with self._buffer_lock:
+            self._buffer.append(record)
+            pending = len(self._buffer)
+            self._ensure_flusher()
+        if pending >= self.flush_threshold:
+            self._wakeup.set()
+
+    def flush(self):
+        """把缓冲区中的记录写入文件并更新汇总"""
+        with self._buffer_lock:
+            if not self._buffer:
+                return
+        # 锁顺序：文件锁 -> 缓冲区锁。读取方同样先持有文件锁，
+        # 因此不会看到"已离开缓冲区但尚未计入汇总"的记录
+        with self._file_lock:
+            with self._buffer_lock:
+                pending, self._buffer = self._buffer, []
+            if not pending:
+                return
+            try:
+                with open(self.records_path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in pending))
+                rollups = self._update_rollups()
+                if rollups["record_count"] > self.max_records * 1.2:
+                    self._compact(rollups)
+            except Exception as e:
+                logger.error(f"❌ [使用记录] 写入失败，记录保留在缓冲区: {e}")
+                with self._buffer_lock:
+                    self._buffer = pending + self._buffer
+
+    def rewrite(self, records: List[Dict[str, Any]]):
+        """用给定记录整体替换账本，并重建汇总"""
+        with self._file_lock:
+            with self._buffer_lock:
+                self._buffer = []
+            self._write_records(records)
+            rollups = self._new_rollups()
+            self._apply_records(rollups, records)
+            rollups["offset"] = self.records_path.stat().st_size
+            rollups["record_count"] = len(records)
+            self._save_rollups(rollups)
+
+    def close(self):
+        """停止后台线程并写入剩余记录"""
+        self._closed = True
+        self._wakeup.set()
+        flusher = self._flusher
+        if flusher is not None and flusher is not threading.current_thread():
+            flusher.join(timeout=5)
+        self.flush()
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+    def load_records(self) -> List[Dict[str, Any]]:
+        """读取全部记录（包括尚未落盘的）"""
+        records = []
+        with self._file_lock:
+            if self.records_path.exists():
+                with open(self.records_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            logger.debug(f"⚠️ [使用记录] 跳过损坏的记录行")
+            with self._buffer_lock:
+                records.extend(self._buffer)
+        return records
+
+    def get_statistics(self, days: int = 30) -> Dict[str, Any]:
+        """
+        按汇总数据统计最近 days 个自然日（含今天）的使用情况
+        """
+        first_day = (datetime.now() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+        with self._file_lock:
+            daily = self._read_rollups()["daily"]
+            with self._buffer_lock:
+                pending = list(self._buffer)
+
+        provider_stats: Dict[str, Dict[str, float]] = {}
+        for day, providers in daily.items():
+            if day >= first_day:
+                for provider, bucket in providers.items():
+                    self._add_bucket(provider_stats.setdefault(provider, _empty_bucket()), bucket)
+
+        for record in pending:
+            if self._record_day(record) >= first_day:
+                self._add_record(provider_stats.setdefault(record.get("provider", ""), _empty_bucket()), record)
+
+        total_requests = sum(stats["requests"] for stats in provider_stats.values())
+        return {
+            "period_days": days,
+            "total_cost": round(sum(stats["cost"] for stats in provider_stats.values()), 4),
+            "total_input_tokens": sum(stats["input_tokens"] for stats in provider_stats.values()),
+            "total_output_tokens": sum(stats["output_tokens"] for stats in provider_stats.values()),
+            "total_requests": total_requests,
+            "provider_stats": provider_stats,
+            "records_count": total_requests,
+        }
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+    def _ensure_flusher(self):
+        """在持有 self._buffer_lock 时调用"""
+        if self._flusher is None or not self._flusher.is_alive():
+            self._closed = False
+            self._flusher = threading.Thread(target=self._flush_loop, name="usage-ledger-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    @staticmethod
+    def _new_rollups() -> Dict[str, Any]:
+        return {"offset": 0, "record_count": 0, "daily": {}}
+
+    @staticmethod
+    def _record_day(record: Dict[str, Any]) -> str:
+        return str(record.get("timestamp", ""))[:10]
+
+    @staticmethod
+    def _add_record(bucket: Dict[str, float], record: Dict[str, Any]):
+        bucket["cost"] += record.get("cost", 0) or 0
+        bucket["input_tokens"] += record.get("input_tokens", 0) or 0
+        bucket["output_tokens"] += record.get("output_tokens", 0) or 0
+        bucket["requests"] += 1
+
+    @staticmethod
+    def _add_bucket(target: Dict[str, float], bucket: Dict[str, float]):
+        for key in ("cost", "input_tokens", "output_tokens", "requests"):
+            target[key] += bucket.get(key, 0)
+
+    def _apply_records(self, rollups: Dict[str, Any], records: List[Dict[str, Any]]):
+        for record in records:
+            providers = rollups["daily"].setdefault(self._record_day(record), {})
+            self._add_record(providers.setdefault(record.get("provider", ""), _empty_bucket()), record)
+
+    def _load_rollups(self) -> Dict[str, Any]:
+        """在持有文件锁时调用"""
+        if self.rollups_path.exists():
+            try:
+                with open(self.rollups_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ [使用记录] 汇总文件损坏，将重新汇总: {e}")
+        return self._new_rollups()
+
+    def _save_rollups(self, rollups: Dict[str, Any]):
+        """在持有文件锁时调用"""
+        tmp_path = self.rollups_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(rollups, f, ensure_ascii=False)
+        os.replace(tmp_path, self.rollups_path)
+        self._rollups_cache = rollups
+        self._rollups_signature = self._file_signature(self.rollups_path)
+
+    def _update_rollups(self) -> Dict[str, Any]:
+        """在持有文件锁时调用：把汇总偏移之后的新记录计入汇总"""
+        rollups = self._load_rollups()
+        size = self.records_path.stat().st_size if self.records_path.exists() else 0
+        if rollups["offset"] > size:
+            # 记录文件被外部替换，重新汇总
+            rollups = self._new_rollups()
+
+        new_records = []
+        with open(self.records_path, 'rb') as f:
+            f.seek(rollups["offset"])
+            data = f.read(size - rollups["offset"])
+        # 只处理完整的行，未写完的行留到下次
+        complete = data[:data.rfind(b'\n') + 1]
+        for line in complete.splitlines():
+            if line.strip():
+                try:
+                    new_records.append(json.loads(line))
+                except ValueError:
+                    logger.debug(f"⚠️ [使用记录] 跳过损坏的记录行")
+
+        self._apply_records(rollups, new_records)
+        rollups["offset"] += len(complete)
+        rollups["record_count"] += len(new_records)
+        self._save_rollups(rollups)
+        return rollups
+
+    @staticmethod
+    def _file_signature(path: Path):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_rollups(self) -> Dict[str, Any]:
+        """在持有文件锁时调用：汇总文件未被其他进程修改时使用内存中的副本"""
+        signature = self._file_signature(self.rollups_path)
+        if signature is None:
+            # 汇总文件丢失时从记录文件重新汇总
+            return self._update_rollups() if self.records_path.exists() else self._new_rollups()
+        if self._rollups_cache is None or signature != self._rollups_signature:
+            self._rollups_cache = self._load_rollups()
+            self._rollups_signature = signature
+        return self._rollups_cache
+
+    def _write_records(self, records: List[Dict[str, Any]]):
+        """在持有文件锁时调用：原子地替换记录文件"""
+        tmp_path = self.records_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records))
+        os.replace(tmp_path, self.records_path)
+
+    def _compact(self, rollups: Dict[str, Any]):
+        """在持有文件锁时调用：只保留最近 max_records 条记录，汇总数据不变"""
+        records = []
+        with open(self.records_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    records.append(line if line.endswith('\n') else line + '\n')
+        kept = records[-self.max_records:]
+        tmp_path = self.records_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(kept))
+        os.replace(tmp_path, self.records_path)
+
+        rollups["offset"] = self.records_path.stat().st_size
+        rollups["record_count"] = len(kept)
+        self._save_rollups(rollups)
+        logger.debug(f"🗜️ [使用记录] 压缩记录文件: {len(records)} -> {len(kept)} 条")
+
+    def _migrate_legacy_file(self):
+        """把旧版 usage.json 中的记录导入账本（只执行一次）"""
+        legacy_path = self.directory / self.LEGACY_FILE
+        if not legacy_path.exists():
+            return
+        try:
+            with self._file_lock:
+                if not legacy_path.exists():
+                    return
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    legacy_records = json.load(f)
+                existing = self.load_records() if self.records_path.exists() else []
+                self.rewrite(legacy_records + existing)
+                os.replace(legacy_path, legacy_path.with_suffix('.json.migrated'))
+            logger.info(f"📦 [使用记录] 已将 {len(legacy_records)} 条旧记录迁移到 {self.RECORDS_FILE}")
+        except Exception as e:
+            logger.error(f"❌ [使用记录] 迁移旧记录失败: {e}")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+异步使用记录写入器
+LLM调用路径上只把使用记录放入有界队列，由后台线程批量写入存储（MongoDB insert_many 或本地账本），
+存储延迟不再叠加到LLM调用延迟上
+"""
+
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+class AsyncUsageWriter:
+    """
+    有界队列 + 后台批量写入
+
+    - submit() 不阻塞地放入队列；队列已满时最多等待 block_timeout 秒（背压），仍然满则丢弃并计数
+    - 后台线程每次最多取 batch_size 条，调用 write_batch(records) 一次写入
+    - flush() 等待队列中已提交的记录全部写完；进程退出时自动 close()
+    """
+
+    def __init__(self, write_batch: Callable[[List[Any]], None], max_queue_size: int = 10000,
+                 batch_size: int = 200, flush_interval: float = 0.5, block_timeout: float = 0.05,
+                 name: str = "usage-writer"):
+        self.write_batch = write_batch
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+        self.name = name
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0  # 已提交但尚未写完的记录数
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {
+            'submitted': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed': 0,
+            'batches': 0,
+            'backpressure_waits': 0,
+            'max_queue_depth': 0,
+            'last_batch_seconds': 0.0,
+        }
+        atexit.register(self.close)
+
+    def submit(self, record: Any) -> bool:
+        """提交一条记录，返回是否进入队列"""
+        if self._closed:
+            # 已关闭时同步写入，保证记录不丢
+            self._write([record], queued=False)
+            return True
+
+        self._ensure_thread()
+        # 先计数再入队，避免后台线程写完时计数尚未增加
+        with self._lock:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._metrics['backpressure_waits'] += 1
+            try:
+                self._queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                with self._idle:
+                    self._pending -= 1
+                    self._metrics['dropped'] += 1
+                    self._idle.notify_all()
+                logger.warning(f"⚠️ [使用记录] 写入队列已满({self.max_queue_size})，丢弃一条记录")
+                return False
+
+        with self._lock:
+            self._metrics['submitted'] += 1
+            self._metrics['max_queue_depth'] = max(self._metrics['max_queue_depth'], self._queue.qsize())
+        return True
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """等待已提交的记录全部写完，返回是否在超时前完成"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._idle:
+            while self._pending > 0:
+                if self._thread is None or not self._thread.is_alive():
+                    break
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(0.1 if remaining is None else min(remaining, 0.1))
+        # 后台线程不在运行时（例如已关闭），在当前线程写完剩余记录
+        self._drain()
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """写完剩余记录并停止后台线程"""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=max(self.flush_interval * 2, 1.0))
+        self._drain()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """获取队列深度、丢弃数量等指标"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['queue_depth'] = self._queue.qsize()
+            metrics['pending'] = self._pending
+            metrics['max_queue_size'] = self.max_queue_size
+            return metrics
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _take_batch(self, first) -> List[Any]:
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._closed:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._write(self._take_batch(first))
+
+    def _drain(self):
+        while True:
+            try:
+                first = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._write(self._take_batch(first))
+
+    def _write(self, batch: List[Any], queued: bool = True):
+        start = time.time()
+        try:
+            self.write_batch(batch)
+            with self._lock:
+                self._metrics['written'] += len(batch)
+        except Exception as e:
+            with self._lock:
+                self._metrics['failed'] += len(batch)
+            logger.error(f"❌ [使用记录] 批量写入 {len(batch)} 条记录失败: {e}")
+        finally:
+            with self._idle:
+                self._metrics['batches'] += 1
+                self._metrics['last_batch_seconds'] = time.time() - start
+                if queued:
+                    self._pending -= len(batch)
+                self._idle.notify_all()
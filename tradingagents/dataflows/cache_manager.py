@@ -7,6 +7,8 @@
 import os
 import json
 import pickle
+import sqlite3
+import threading
 import pandas as pd
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -18,6 +20,116 @@ from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
 
+class CacheMetadataIndex:
+    """
+    缓存元数据的SQLite索引
+
+    元数据JSON文件仍是权威来源，索引只用于按 股票/数据类型/市场/数据源 快速查找候选缓存键，
+    避免每次未精确命中时打开并解析全部 *_meta.json 文件。
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    cache_key TEXT PRIMARY KEY,
+                    symbol TEXT,
+                    data_type TEXT,
+                    market_type TEXT,
+                    data_source TEXT,
+                    start_date TEXT,
+                    end_date TEXT,
+                    cached_at TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_cache_lookup
+                ON cache_entries (symbol, data_type, market_type, data_source, cached_at)
+            """)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS index_info (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def is_migrated(self) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM index_info WHERE key = 'migrated'").fetchone()
+        return row is not None
+
+    def migrate(self, metadata_dir: Path) -> int:
+        """一次性导入已有的元数据文件"""
+        rows = []
+        for metadata_file in metadata_dir.glob("*_meta.json"):
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                rows.append(self._to_row(metadata_file.stem[:-len('_meta')], metadata))
+            except Exception:
+                continue
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO index_info (key, value) VALUES ('migrated', ?)",
+                (datetime.now().isoformat(),)
+            )
+        return len(rows)
+
+    def upsert(self, cache_key: str, metadata: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                self._to_row(cache_key, metadata)
+            )
+
+    def remove(self, cache_key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache_entries WHERE cache_key = ?", (cache_key,))
+
+    def find(self, symbol: str, data_type: str, market_type: str = None,
+             data_source: str = None, cached_after: str = None,
+             start_date: str = None, end_date: str = None) -> List[str]:
+        """返回匹配条件的缓存键，最新的在前；指定日期时只返回区间覆盖所请求日期的缓存"""
+        sql = "SELECT cache_key FROM cache_entries WHERE symbol = ? AND data_type = ?"
+        params: List[Any] = [symbol, data_type]
+        if market_type is not None:
+            sql += " AND market_type = ?"
+            params.append(market_type)
+        if data_source is not None:
+            sql += " AND data_source = ?"
+            params.append(data_source)
+        if cached_after is not None:
+            sql += " AND cached_at >= ?"
+            params.append(cached_after)
+        if start_date is not None:
+            sql += " AND REPLACE(start_date, '-', '') <= ?"
+            params.append(str(start_date).replace('-', ''))
+        if end_date is not None:
+            sql += " AND REPLACE(end_date, '-', '') >= ?"
+            params.append(str(end_date).replace('-', ''))
+        sql += " ORDER BY cached_at DESC"
+
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    @staticmethod
+    def _to_row(cache_key: str, metadata: Dict[str, Any]) -> tuple:
+        return (
+            cache_key,
+            metadata.get('symbol'),
+            metadata.get('data_type'),
+            metadata.get('market_type'),
+            metadata.get('data_source'),
+            metadata.get('start_date'),
+            metadata.get('end_date'),
+            metadata.get('cached_at'),
+        )
+
+
 class StockDataCache:
     """股票数据缓存管理器 - 支持美股和A股数据缓存优化"""
 
@@ -92,11 +204,72 @@ class StockDataCache:
             'enable_length_check': os.getenv('ENABLE_CACHE_LENGTH_CHECK', 'false').lower() == 'true'  # 文件缓存默认不限制
         }
 
+        # 元数据索引，首次使用时从已有元数据文件迁移
+        self.metadata_index = self._init_metadata_index()
+
         logger.info(f"📁 缓存管理器初始化完成，缓存目录: {self.cache_dir}")
         logger.info(f"🗄️ 数据库缓存管理器初始化完成")
         logger.info(f"   美股数据: ✅ 已配置")
         logger.info(f"   A股数据: ✅ 已配置")
 
+    def _init_metadata_index(self) -> Optional[CacheMetadataIndex]:
+        """初始化元数据索引，不可用时返回None并回退到扫描元数据文件"""
+        try:
+            index = CacheMetadataIndex(self.metadata_dir / "cache_index.db")
+            if not index.is_migrated():
+                migrated = index.migrate(self.metadata_dir)
+                logger.info(f"🗂️ 已将 {migrated} 条缓存元数据导入索引")
+            return index
+        except Exception as e:
+            logger.warning(f"⚠️ 缓存元数据索引不可用，将扫描元数据文件: {e}")
+            return None
+
+    @staticmethod
+    def _covers_range(metadata: Dict[str, Any], start_date: str = None, end_date: str = None) -> bool:
+        """缓存的日期区间是否覆盖请求的区间（日期格式兼容 YYYY-MM-DD 和 YYYYMMDD）"""
+        if start_date is not None:
+            cached_start = metadata.get('start_date')
+            if not cached_start or str(cached_start).replace('-', '') > str(start_date).replace('-', ''):
+                return False
+        if end_date is not None:
+            cached_end = metadata.get('end_date')
+            if not cached_end or str(cached_end).replace('-', '') < str(end_date).replace('-', ''):
+                return False
+        return True
+
+    def _find_candidate_keys(self, symbol: str, data_type: str, market_type: str,
+                             data_source: str = None, max_age_hours: int = None,
+                             start_date: str = None, end_date: str = None) -> List[str]:
+        """查找候选缓存键：优先查询索引，索引不可用时扫描元数据文件
+
+        指定 start_date/end_date 时只返回日期区间覆盖请求区间的缓存，避免把不同区间的数据当作命中。
+        """
+        if self.metadata_index is not None:
+            cached_after = None
+            if max_age_hours is not None:
+                cached_after = (datetime.now() - timedelta(hours=max_age_hours)).isoformat()
+            try:
+                return self.metadata_index.find(symbol, data_type, market_type, data_source,
+                                                cached_after, start_date, end_date)
+            except Exception as e:
+                logger.warning(f"⚠️ 查询缓存元数据索引失败，改为扫描元数据文件: {e}")
+
+        candidates = []
+        for metadata_file in self.metadata_dir.glob("*_meta.json"):
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+
+                if (metadata.get('symbol') == symbol and
+                    metadata.get('data_type') == data_type and
+                    metadata.get('market_type') == market_type and
+                    (data_source is None or metadata.get('data_source') == data_source) and
+                    self._covers_range(metadata, start_date, end_date)):
+                    candidates.append(metadata_file.stem.replace('_meta', ''))
+            except Exception:
+                continue
+        return candidates
+
     def _determine_market_type(self, symbol: str) -> str:
         """根据股票代码确定市场类型"""
         import re
@@ -216,6 +389,12 @@ class StockDataCache:
         
         with open(metadata_path, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+        if self.metadata_index is not None:
+            try:
+                self.metadata_index.upsert(cache_key, metadata)
+            except Exception as e:
+                logger.warning(f"⚠️ 更新缓存元数据索引失败: {e}")
     
     def _load_metadata(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """加载元数据"""
@@ -387,22 +566,15 @@ class StockDataCache:
             logger.info(f"🎯 找到精确匹配的{desc}: {symbol} -> {search_key}")
             return search_key
 
-        # 如果没有精确匹配，查找部分匹配（相同股票代码的其他缓存）
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
+        # 如果没有精确匹配，查找覆盖所请求区间的其他缓存（相同股票代码）
+        for cache_key in self._find_candidate_keys(symbol, 'stock_data', market_type,
+                                                   data_source, max_age_hours,
+                                                   start_date, end_date):
             try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'stock_data' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'stock_data'):
-                        desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
-                        logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
-                        return cache_key
+                if self.is_cache_valid(cache_key, max_age_hours, symbol, 'stock_data'):
+                    desc = self.cache_config.get(f"{market_type}_stock_data", {}).get('description', '数据')
+                    logger.info(f"📋 找到部分匹配的{desc}: {symbol} -> {cache_key}")
+                    return cache_key
             except Exception:
                 continue
 
@@ -529,21 +701,13 @@ class StockDataCache:
             max_age_hours = self.cache_config.get(cache_type, {}).get('ttl_hours', 24)
         
         # 查找匹配的缓存
-        for metadata_file in self.metadata_dir.glob(f"*_meta.json"):
+        for cache_key in self._find_candidate_keys(symbol, 'fundamentals', market_type,
+                                                   data_source, max_age_hours):
             try:
-                with open(metadata_file, 'r', encoding='utf-8') as f:
-                    metadata = json.load(f)
-                
-                if (metadata.get('symbol') == symbol and
-                    metadata.get('data_type') == 'fundamentals' and
-                    metadata.get('market_type') == market_type and
-                    (data_source is None or metadata.get('data_source') == data_source)):
-                    
-                    cache_key = metadata_file.stem.replace('_meta', '')
-                    if self.is_cache_valid(cache_key, max_age_hours, symbol, 'fundamentals'):
-                        desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
-                        logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
-                        return cache_key
+                if self.is_cache_valid(cache_key, max_age_hours, symbol, 'fundamentals'):
+                    desc = self.cache_config.get(f"{market_type}_fundamentals", {}).get('description', '基本面数据')
+                    logger.info(f"🎯 找到匹配的{desc}缓存: {symbol} ({data_source}) -> {cache_key}")
+                    return cache_key
             except Exception:
                 continue
         
@@ -570,6 +734,8 @@ class StockDataCache:
                     
                     # 删除元数据文件
                     metadata_file.unlink()
+                    if self.metadata_index is not None:
+                        self.metadata_index.remove(metadata_file.stem.replace('_meta', ''))
                     cleared_count += 1
                     
             except Exception as e:
@@ -6,6 +6,7 @@
 
 import os
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Dict, List, Optional, Any
 from enum import Enum
 import warnings
@@ -20,6 +21,8 @@ warnings.filterwarnings('ignore')
 from tradingagents.utils.logging_init import setup_dataflow_logging
 logger = setup_dataflow_logging()
 
+from .source_latency import SourceLatencyTracker
+
 
 class ChinaDataSource(Enum):
     """中国股票数据源枚举"""
@@ -41,6 +44,15 @@ class DataSourceManager:
         self.available_sources = self._check_available_sources()
         self.current_source = self.default_source
 
+        # 对冲请求：当前数据源超过其p95延迟仍未返回时，并行请求下一个数据源
+        self.hedge_enabled = os.getenv('DATA_SOURCE_HEDGE_ENABLED', 'false').lower() == 'true'
+        self.hedge_timeout = float(os.getenv('DATA_SOURCE_HEDGE_TIMEOUT', '60'))
+        self.latency_tracker = SourceLatencyTracker(
+            default_delay=float(os.getenv('DATA_SOURCE_HEDGE_DELAY', '3')),
+            min_delay=float(os.getenv('DATA_SOURCE_HEDGE_MIN_DELAY', '0.5')),
+            max_delay=float(os.getenv('DATA_SOURCE_HEDGE_MAX_DELAY', '10')),
+        )
+
         logger.info(f"📊 数据源管理器初始化完成")
         logger.info(f"   默认数据源: {self.default_source.value}")
         logger.info(f"   可用数据源: {[s.value for s in self.available_sources]}")
@@ -322,26 +334,19 @@ class DataSourceManager:
         logger.info(f"🔍 [股票代码追踪] 股票代码字符: {list(str(symbol))}")
         logger.info(f"🔍 [股票代码追踪] 当前数据源: {self.current_source.value}")
 
+        if self.hedge_enabled:
+            return self._get_stock_data_hedged(symbol, start_date, end_date)
+
         start_time = time.time()
 
         try:
             # 根据数据源调用相应的获取方法
-            if self.current_source == ChinaDataSource.TUSHARE:
-                logger.info(f"🔍 [股票代码追踪] 调用 Tushare 数据源，传入参数: symbol='{symbol}'")
-                result = self._get_tushare_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.AKSHARE:
-                result = self._get_akshare_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.BAOSTOCK:
-                result = self._get_baostock_data(symbol, start_date, end_date)
-            elif self.current_source == ChinaDataSource.TDX:
-                result = self._get_tdx_data(symbol, start_date, end_date)
-            else:
-                result = f"❌ 不支持的数据源: {self.current_source.value}"
+            result = self._fetch_from_source(self.current_source, symbol, start_date, end_date)
 
             # 记录详细的输出结果
             duration = time.time() - start_time
             result_length = len(result) if result else 0
-            is_success = result and "❌" not in result and "错误" not in result
+            is_success = self._is_valid_result(result)
 
             if is_success:
                 logger.info(f"✅ [数据获取] 成功获取股票数据",
@@ -371,7 +376,7 @@ class DataSourceManager:
 
                 # 数据质量异常时也尝试降级到其他数据源
                 fallback_result = self._try_fallback_sources(symbol, start_date, end_date)
-                if fallback_result and "❌" not in fallback_result and "错误" not in fallback_result:
+                if self._is_valid_result(fallback_result):
                     logger.info(f"✅ [数据获取] 降级成功获取数据")
                     return fallback_result
                 else:
@@ -589,17 +594,7 @@ class DataSourceManager:
                     logger.info(f"🔄 尝试备用数据源: {source.value}")
 
                     # 直接调用具体的数据源方法，避免递归
-                    if source == ChinaDataSource.TUSHARE:
-                        result = self._get_tushare_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.AKSHARE:
-                        result = self._get_akshare_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.BAOSTOCK:
-                        result = self._get_baostock_data(symbol, start_date, end_date)
-                    elif source == ChinaDataSource.TDX:
-                        result = self._get_tdx_data(symbol, start_date, end_date)
-                    else:
-                        logger.warning(f"⚠️ 未知数据源: {source.value}")
-                        continue
+                    result = self._fetch_from_source(source, symbol, start_date, end_date)
 
                     if "❌" not in result:
                         logger.info(f"✅ 备用数据源{source.value}获取成功")
@@ -613,6 +608,123 @@ class DataSourceManager:
         
         return f"❌ 所有数据源都无法获取{symbol}的数据"
     
+    @staticmethod
+    def _is_valid_result(result: Optional[str]) -> bool:
+        """判断数据源返回的是否为有效数据"""
+        return bool(result) and "❌" not in result and "错误" not in result
+
+    def _fetch_from_source(self, source: ChinaDataSource, symbol: str, start_date: str, end_date: str) -> str:
+        """调用指定数据源，并记录耗时和成功与否"""
+        start_time = time.time()
+        success = False
+        try:
+            if source == ChinaDataSource.TUSHARE:
+                logger.info(f"🔍 [股票代码追踪] 调用 Tushare 数据源，传入参数: symbol='{symbol}'")
+                result = self._get_tushare_data(symbol, start_date, end_date)
+            elif source == ChinaDataSource.AKSHARE:
+                result = self._get_akshare_data(symbol, start_date, end_date)
+            elif source == ChinaDataSource.BAOSTOCK:
+                result = self._get_baostock_data(symbol, start_date, end_date)
+            elif source == ChinaDataSource.TDX:
+                result = self._get_tdx_data(symbol, start_date, end_date)
+            else:
+                result = f"❌ 不支持的数据源: {source.value}"
+            success = self._is_valid_result(result)
+            return result
+        finally:
+            self.latency_tracker.record(source.value, time.time() - start_time, success)
+
+    def _hedge_candidates(self) -> List[ChinaDataSource]:
+        """对冲请求的数据源顺序：按延迟和错误率自动排序，统计不足时当前数据源优先"""
+        default_order = [self.current_source] + [
+            source for source in (ChinaDataSource.AKSHARE, ChinaDataSource.TUSHARE,
+                                  ChinaDataSource.BAOSTOCK, ChinaDataSource.TDX)
+            if source != self.current_source
+        ]
+        candidates = [source for source in default_order
+                      if source == self.current_source or source in self.available_sources]
+        return self.latency_tracker.rank(candidates)
+
+    def _get_stock_data_hedged(self, symbol: str, start_date: str, end_date: str) -> str:
+        """
+        对冲请求模式
+
+        先请求排在最前的数据源；若超过其p95延迟仍未返回、或返回失败，就启动下一个数据源，
+        多个请求并行进行，取第一个有效结果，其余请求取消或放弃。
+
+        每次请求使用自己的线程池（每个数据源一个线程），被放弃的慢请求在后台结束，
+        不会占用其他请求的线程。
+        """
+        candidates = self._hedge_candidates()
+        logger.info(f"🔀 [对冲请求] {symbol} 数据源顺序: {[s.value for s in candidates]}")
+
+        executor = ThreadPoolExecutor(max_workers=max(1, len(candidates)), thread_name_prefix="data-source-hedge")
+        try:
+            return self._run_hedged(executor, candidates, symbol, start_date, end_date)
+        finally:
+            # 不等待被放弃的请求
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_hedged(self, executor: ThreadPoolExecutor, candidates: List[ChinaDataSource],
+                    symbol: str, start_date: str, end_date: str) -> str:
+        """对冲请求的调度循环"""
+        start_time = time.time()
+        deadline = start_time + self.hedge_timeout
+        pending = {}
+        next_index = 0
+        next_launch_at = start_time
+        last_result = None
+
+        while True:
+            now = time.time()
+            if next_index < len(candidates) and (now >= next_launch_at or not pending):
+                source = candidates[next_index]
+                next_index += 1
+                if pending:
+                    logger.info(f"🔀 [对冲请求] 已等待 {now - start_time:.2f}s，并行启动: {source.value}")
+                future = executor.submit(self._fetch_from_source, source, symbol, start_date, end_date)
+                pending[future] = source
+                next_launch_at = now + self.latency_tracker.hedge_delay(source.value)
+                continue
+
+            if not pending:
+                break
+            if now >= deadline:
+                logger.error(f"❌ [对冲请求] {symbol} 超过 {self.hedge_timeout:.0f}s 仍无有效结果")
+                break
+
+            timeout = deadline - now
+            if next_index < len(candidates):
+                timeout = min(timeout, max(0.0, next_launch_at - now))
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ [对冲请求] {source.value} 失败: {e}")
+                    # 失败后立即启动下一个数据源，不再等待对冲延迟
+                    next_launch_at = time.time()
+                    continue
+                if self._is_valid_result(result):
+                    for other in pending:
+                        other.cancel()
+                    logger.info(f"✅ [对冲请求] 采用 {source.value} 的结果，耗时 {time.time() - start_time:.2f}s"
+                                f"{'，放弃 ' + str([s.value for s in pending.values()]) if pending else ''}")
+                    return result
+                logger.warning(f"⚠️ [对冲请求] {source.value} 返回无效结果")
+                last_result = result
+                next_launch_at = time.time()
+
+        for future in pending:
+            future.cancel()
+        return last_result or f"❌ 所有数据源都无法获取{symbol}的数据"
+
+    def get_source_latency_stats(self) -> Dict[str, Dict]:
+        """各数据源的延迟分位数、错误率和耗时直方图"""
+        return self.latency_tracker.get_stats()
+
     def get_stock_info(self, symbol: str) -> Dict:
         """获取股票基本信息，支持降级机制"""
         logger.info(f"📊 [股票信息] 开始获取{symbol}基本信息...")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+DataFrame 二进制编码
+数据库缓存原来把 DataFrame 存为 to_json(orient='records') 字符串，再用 pd.read_json 还原：
+解析慢、丢失 dtype 和索引，体积也比原始数据大数倍。这里提供可插拔的编码层：
+- arrow: Arrow IPC 流，保留 dtype 和索引，压缩由 Arrow 内部完成（需要 pyarrow）
+- parquet: Parquet 列式文件（需要 pyarrow）
+- json_table: pandas 的 table 格式 JSON，带 schema，可保留 dtype 和索引；无 pyarrow 时使用
+压缩支持 zstd / lz4 / zlib / none。编码结果带版本和编码信息，旧的 JSON 缓存仍可读取。
+"""
+
+import io
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+# 二进制帧: 魔数 + 版本 + 头部长度 + JSON头部 + 数据
+FRAME_MAGIC = b"TADF"
+FRAME_VERSION = 1
+_FRAME_HEADER = struct.Struct(">4sBI")
+
+CODECS = ("arrow", "parquet", "json_table")
+COMPRESSIONS = ("zstd", "lz4", "zlib", "none")
+
+
+class DataFrameCodecError(ValueError):
+    """无法编码或解码的数据"""
+
+
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if compression == "lz4":
+        return lz4.frame.compress(data)
+    if compression == "zlib":
+        return zlib.compress(data, 6)
+    return data
+
+
+def _decompress(data: bytes, compression: str) -> bytes:
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise DataFrameCodecError("缓存使用zstd压缩，但未安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == "lz4":
+        if not LZ4_AVAILABLE:
+            raise DataFrameCodecError("缓存使用lz4压缩，但未安装 lz4")
+        return lz4.frame.decompress(data)
+    if compression == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+def _compression_available(compression: str, codec: str) -> bool:
+    if compression == "none" or compression == "zlib":
+        # Arrow IPC 不支持 zlib，由外层压缩
+        return True
+    if codec in ("arrow", "parquet"):
+        return PYARROW_AVAILABLE
+    return ZSTD_AVAILABLE if compression == "zstd" else LZ4_AVAILABLE
+
+
+def _encode_arrow(df: pd.DataFrame, compression: str) -> Tuple[bytes, str]:
+    """返回 (数据, 外层压缩方式)"""
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    inner = compression if compression in ("zstd", "lz4") else None
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=inner)
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    payload = sink.getvalue().to_pybytes()
+    outer = "none" if inner else compression
+    return _compress(payload, outer), outer
+
+
+def _decode_arrow(payload: bytes) -> pd.DataFrame:
+    return pa.ipc.open_stream(pa.py_buffer(payload)).read_all().to_pandas()
+
+
+def _encode_parquet(df: pd.DataFrame, compression: str) -> Tuple[bytes, str]:
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    inner = compression if compression in ("zstd", "lz4") else "none"
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink, compression=inner)
+    payload = sink.getvalue().to_pybytes()
+    outer = "none" if inner != "none" else compression
+    return _compress(payload, outer), outer
+
+
+def _decode_parquet(payload: bytes) -> pd.DataFrame:
+    return pq.read_table(pa.BufferReader(payload)).to_pandas()
+
+
+def _encode_json_table(df: pd.DataFrame, compression: str) -> Tuple[bytes, str]:
+    payload = df.to_json(orient='table', date_format='iso', date_unit='ns', force_ascii=False).encode('utf-8')
+    return _compress(payload, compression), compression
+
+
+def _decode_json_table(payload: bytes) -> pd.DataFrame:
+    return pd.read_json(io.StringIO(payload.decode('utf-8')), orient='table')
+
+
+_ENCODERS = {"arrow": _encode_arrow, "parquet": _encode_parquet, "json_table": _encode_json_table}
+_DECODERS = {"arrow": _decode_arrow, "parquet": _decode_parquet, "json_table": _decode_json_table}
+
+
+class DataFrameCodec:
+    """DataFrame 编解码器"""
+
+    def __init__(self, codec: str = "auto", compression: str = "auto"):
+        if codec == "auto":
+            codec = "arrow" if PYARROW_AVAILABLE else "json_table"
+        if codec not in CODECS:
+            raise ValueError(f"不支持的缓存编码: {codec}，可选: {', '.join(CODECS)}")
+        if codec in ("arrow", "parquet") and not PYARROW_AVAILABLE:
+            logger.warning(f"⚠️ 未安装 pyarrow，缓存编码 {codec} 改为 json_table")
+            codec = "json_table"
+
+        if compression == "auto":
+            compression = "zstd" if _compression_available("zstd", codec) else "zlib"
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩方式: {compression}，可选: {', '.join(COMPRESSIONS)}")
+        if not _compression_available(compression, codec):
+            logger.warning(f"⚠️ 压缩方式 {compression} 不可用，改为 zlib")
+            compression = "zlib"
+
+        self.codec = codec
+        self.compression = compression
+
+    def encode(self, df: pd.DataFrame) -> Tuple[bytes, Dict[str, Any]]:
+        """编码 DataFrame，返回 (数据, 元信息)"""
+        try:
+            payload, compression = _ENCODERS[self.codec](df, self.compression)
+        except Exception as e:
+            raise DataFrameCodecError(f"{self.codec} 编码失败: {e}") from e
+        return payload, {"codec": self.codec, "compression": compression, "codec_version": FRAME_VERSION}
+
+    @staticmethod
+    def decode(payload: bytes, meta: Dict[str, Any]) -> pd.DataFrame:
+        """按元信息解码，不依赖当前配置的编码方式"""
+        codec = meta.get("codec")
+        if codec not in _DECODERS:
+            raise DataFrameCodecError(f"未知的缓存编码: {codec}")
+        if codec in ("arrow", "parquet") and not PYARROW_AVAILABLE:
+            raise DataFrameCodecError(f"缓存使用 {codec} 编码，但未安装 pyarrow")
+        try:
+            return _DECODERS[codec](_decompress(bytes(payload), meta.get("compression", "none")))
+        except DataFrameCodecError:
+            raise
+        except Exception as e:
+            raise DataFrameCodecError(f"{codec} 解码失败: {e}") from e
+
+
+def pack_frame(header: Dict[str, Any], payload: bytes) -> bytes:
+    """把元信息和数据打包为单个二进制值（用于Redis）"""
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    return _FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, len(header_bytes)) + header_bytes + payload
+
+
+def unpack_frame(blob: bytes) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """解析二进制帧；不是二进制帧（旧的JSON缓存）时返回None"""
+    if not isinstance(blob, (bytes, bytearray)) or not blob.startswith(FRAME_MAGIC):
+        return None
+    _, version, header_len = _FRAME_HEADER.unpack_from(blob)
+    if version > FRAME_VERSION:
+        raise DataFrameCodecError(f"不支持的缓存帧版本: {version}")
+    start = _FRAME_HEADER.size
+    header = json.loads(blob[start:start + header_len].decode('utf-8'))
+    return header, bytes(blob[start + header_len:])
+
+
+def get_dataframe_codec() -> Optional[DataFrameCodec]:
+    """根据环境变量创建编解码器；DB_CACHE_CODEC=json 时返回None，沿用旧的JSON格式
+
+    环境变量:
+        DB_CACHE_CODEC: auto(默认) / arrow / parquet / json_table / json
+        DB_CACHE_COMPRESSION: auto(默认) / zstd / lz4 / zlib / none
+    """
+    codec = os.getenv("DB_CACHE_CODEC", "auto").strip().lower() or "auto"
+    if codec == "json":
+        return None
+    compression = os.getenv("DB_CACHE_COMPRESSION", "auto").strip().lower() or "auto"
+    try:
+        return DataFrameCodec(codec, compression)
+    except ValueError as e:
+        logger.warning(f"⚠️ {e}，使用默认缓存编码")
+        return DataFrameCodec()
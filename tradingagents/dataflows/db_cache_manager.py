@@ -4,6 +4,7 @@ MongoDB + Redis 数据库缓存管理器
 提供高性能的股票数据缓存和持久化存储
 """
 
+import io
 import os
 import json
 import pickle
@@ -16,6 +17,9 @@ import pandas as pd
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
+from .dataframe_codec import (DataFrameCodec, DataFrameCodecError, get_dataframe_codec,
+                              pack_frame, unpack_frame)
+
 # MongoDB
 try:
     from pymongo import MongoClient
@@ -67,6 +71,11 @@ class DatabaseCacheManager:
         self.mongodb_client = None
         self.mongodb_db = None
         self.redis_client = None
+        # 股票数据以二进制存入Redis，需要不解码响应的客户端
+        self.redis_binary_client = None
+
+        # DataFrame编码方式，None表示沿用JSON字符串
+        self.codec = get_dataframe_codec()
         
         self._init_mongodb()
         self._init_redis()
@@ -115,12 +124,20 @@ class DatabaseCacheManager:
             )
             # 测试连接
             self.redis_client.ping()
+            self.redis_binary_client = redis.from_url(
+                self.redis_url,
+                db=self.redis_db,
+                socket_timeout=5,
+                socket_connect_timeout=5,
+                decode_responses=False
+            )
             
             logger.info(f"✅ Redis连接成功: {self.redis_url}")
             
         except Exception as e:
             logger.error(f"❌ Redis连接失败: {e}")
             self.redis_client = None
+            self.redis_binary_client = None
     
     def _create_mongodb_indexes(self):
         """创建MongoDB索引"""
@@ -216,12 +233,9 @@ class DatabaseCacheManager:
         }
         
         # 处理数据格式
-        if isinstance(data, pd.DataFrame):
-            doc["data"] = data.to_json(orient='records', date_format='iso')
-            doc["data_format"] = "dataframe_json"
-        else:
-            doc["data"] = str(data)
-            doc["data_format"] = "text"
+        payload, meta = self._encode_stock_payload(data)
+        doc["data"] = payload
+        doc.update(meta)
         
         # 保存到MongoDB（持久化）
         if self.mongodb_db is not None:
@@ -235,39 +249,60 @@ class DatabaseCacheManager:
         # 保存到Redis（快速缓存，6小时过期）
         if self.redis_client:
             try:
-                redis_data = {
-                    "data": doc["data"],
-                    "data_format": doc["data_format"],
-                    "symbol": symbol,
-                    "data_source": data_source,
-                    "created_at": doc["created_at"].isoformat()
-                }
-                self.redis_client.setex(
-                    cache_key,
-                    6 * 3600,  # 6小时过期
-                    json.dumps(redis_data, ensure_ascii=False)
-                )
+                self._cache_stock_in_redis(cache_key, payload, meta, symbol, data_source, doc["created_at"])
                 logger.info(f"⚡ 股票数据已缓存到Redis: {symbol} -> {cache_key}")
             except Exception as e:
                 logger.error(f"⚠️ Redis缓存失败: {e}")
         
         return cache_key
+
+    def _encode_stock_payload(self, data: Union[pd.DataFrame, str]):
+        """编码股票数据，返回 (数据, 格式元信息)"""
+        if isinstance(data, pd.DataFrame):
+            if self.codec is not None:
+                try:
+                    payload, meta = self.codec.encode(data)
+                    return payload, dict(meta, data_format="dataframe_binary")
+                except DataFrameCodecError as e:
+                    logger.warning(f"⚠️ DataFrame二进制编码失败，改用JSON: {e}")
+            return data.to_json(orient='records', date_format='iso'), {"data_format": "dataframe_json"}
+        return str(data), {"data_format": "text"}
+
+    @staticmethod
+    def _decode_stock_payload(data, meta: Dict[str, Any]) -> Union[pd.DataFrame, str]:
+        """按格式元信息解码股票数据，兼容旧的JSON缓存"""
+        data_format = meta.get("data_format")
+        if data_format == "dataframe_binary":
+            return DataFrameCodec.decode(data, meta)
+        if data_format == "dataframe_json":
+            return pd.read_json(io.StringIO(data), orient='records')
+        return data
+
+    def _cache_stock_in_redis(self, cache_key: str, payload, meta: Dict[str, Any],
+                              symbol: str, data_source: str, created_at: datetime):
+        """写入Redis：二进制数据打包为单个帧，其他格式保持原有JSON结构"""
+        header = dict(meta, symbol=symbol, data_source=data_source, created_at=created_at.isoformat())
+        if meta.get("data_format") == "dataframe_binary":
+            self.redis_binary_client.setex(cache_key, 6 * 3600, pack_frame(header, payload))
+        else:
+            header["data"] = payload
+            self.redis_client.setex(cache_key, 6 * 3600, json.dumps(header, ensure_ascii=False))
     
     def load_stock_data(self, cache_key: str) -> Optional[Union[pd.DataFrame, str]]:
         """从Redis或MongoDB加载股票数据"""
         
         # 首先尝试从Redis加载（更快）
-        if self.redis_client:
+        if self.redis_binary_client:
             try:
-                redis_data = self.redis_client.get(cache_key)
+                redis_data = self.redis_binary_client.get(cache_key)
                 if redis_data:
-                    data_dict = json.loads(redis_data)
                     logger.info(f"⚡ 从Redis加载数据: {cache_key}")
-                    
-                    if data_dict["data_format"] == "dataframe_json":
-                        return pd.read_json(data_dict["data"], orient='records')
-                    else:
-                        return data_dict["data"]
+                    frame = unpack_frame(redis_data)
+                    if frame is not None:
+                        header, payload = frame
+                        return self._decode_stock_payload(payload, header)
+                    data_dict = json.loads(redis_data.decode('utf-8'))
+                    return self._decode_stock_payload(data_dict["data"], data_dict)
             except Exception as e:
                 logger.error(f"⚠️ Redis加载失败: {e}")
         
@@ -279,30 +314,19 @@ class DatabaseCacheManager:
                 
                 if doc:
                     logger.info(f"💾 从MongoDB加载数据: {cache_key}")
+                    meta = {key: doc[key] for key in ("data_format", "codec", "compression", "codec_version")
+                            if key in doc}
                     
                     # 同时更新到Redis缓存
                     if self.redis_client:
                         try:
-                            redis_data = {
-                                "data": doc["data"],
-                                "data_format": doc["data_format"],
-                                "symbol": doc["symbol"],
-                                "data_source": doc["data_source"],
-                                "created_at": doc["created_at"].isoformat()
-                            }
-                            self.redis_client.setex(
-                                cache_key,
-                                6 * 3600,
-                                json.dumps(redis_data, ensure_ascii=False)
-                            )
+                            self._cache_stock_in_redis(cache_key, doc["data"], meta, doc["symbol"],
+                                                       doc["data_source"], doc["created_at"])
                             logger.info(f"⚡ 数据已同步到Redis缓存")
                         except Exception as e:
                             logger.error(f"⚠️ Redis同步失败: {e}")
                     
-                    if doc["data_format"] == "dataframe_json":
-                        return pd.read_json(doc["data"], orient='records')
-                    else:
-                        return doc["data"]
+                    return self._decode_stock_payload(doc["data"], meta)
                         
             except Exception as e:
                 logger.error(f"⚠️ MongoDB加载失败: {e}")
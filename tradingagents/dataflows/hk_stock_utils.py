@@ -10,6 +10,8 @@ from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 import os
 
+from .rate_limiter import get_rate_limiter
+
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
@@ -21,24 +23,16 @@ class HKStockProvider:
 
     def __init__(self):
         """初始化港股数据提供器"""
-        self.last_request_time = 0
-        self.min_request_interval = 2.0  # 增加请求间隔到2秒
+        self.rate_limiter = get_rate_limiter()  # 与美股共享Yahoo Finance调用配额
         self.timeout = 60  # 请求超时时间（增加到60秒）
         self.max_retries = 3  # 增加重试次数
         self.rate_limit_wait = 60  # 遇到限制时等待时间
 
         logger.info(f"🇭🇰 港股数据提供器初始化完成")
     
-    def _wait_for_rate_limit(self):
-        """等待速率限制"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last_request
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+    def _wait_for_rate_limit(self, endpoint: str = None) -> bool:
+        """等待速率限制（跨进程共享的令牌桶）"""
+        return self.rate_limiter.acquire("yfinance", endpoint)
     
     def get_stock_data(self, symbol: str, start_date: str = None, end_date: str = None) -> Optional[pd.DataFrame]:
         """
@@ -67,7 +61,7 @@ class HKStockProvider:
             # 多次重试获取数据
             for attempt in range(self.max_retries):
                 try:
-                    self._wait_for_rate_limit()
+                    self._wait_for_rate_limit("history")
                     
                     # 使用yfinance获取数据
                     ticker = yf.Ticker(symbol)
@@ -94,8 +88,9 @@ class HKStockProvider:
                     # 检查是否是频率限制错误
                     if "Rate limited" in error_msg or "Too Many Requests" in error_msg:
                         if attempt < self.max_retries - 1:
+                            # 通知所有进程退避，下一次尝试在获取令牌时等待
                             logger.info(f"⏳ 检测到频率限制，等待{self.rate_limit_wait}秒...")
-                            time.sleep(self.rate_limit_wait)
+                            self.rate_limiter.report_throttled("yfinance", self.rate_limit_wait)
                         else:
                             logger.error(f"❌ 频率限制，跳过重试")
                             break
@@ -125,7 +120,7 @@ class HKStockProvider:
             
             logger.info(f"🇭🇰 获取港股信息: {symbol}")
             
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit("info")
             
             ticker = yf.Ticker(symbol)
             info = ticker.info
@@ -174,7 +169,7 @@ class HKStockProvider:
         try:
             symbol = self._normalize_hk_symbol(symbol)
             
-            self._wait_for_rate_limit()
+            self._wait_for_rate_limit("history")
             
             ticker = yf.Ticker(symbol)
             
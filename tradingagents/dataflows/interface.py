@@ -62,6 +62,7 @@ except ImportError as e:
     yf = None
     YF_AVAILABLE = False
 from .config import get_config, set_config, DATA_DIR
+from .price_frame_store import get_price_frame_store
 
 
 def get_finnhub_news(
@@ -590,39 +591,36 @@ def get_stock_stats_indicators_window(
     curr_date = datetime.strptime(curr_date, "%Y-%m-%d")
     before = curr_date - relativedelta(days=look_back_days)
 
-    if not online:
-        # read from YFin data
-        data = pd.read_csv(
-            os.path.join(
-                DATA_DIR,
-                f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-            )
+    # 价格数据只读取一次、指标序列只计算一次，再按日期切出窗口
+    try:
+        window_values = StockstatsUtils.get_stock_stats_window(
+            symbol,
+            indicator,
+            before.strftime("%Y-%m-%d"),
+            end_date,
+            os.path.join(DATA_DIR, "market_data", "price_data"),
+            online=online,
+        )[indicator]
+    except Exception as e:
+        if not online:
+            raise
+        logger.error(
+            f"Error getting stockstats indicator data for indicator {indicator} from {before.strftime('%Y-%m-%d')} to {end_date}: {e}"
         )
-        data["Date"] = pd.to_datetime(data["Date"], utc=True)
-        dates_in_df = data["Date"].astype(str).str[:10]
-
-        ind_string = ""
-        while curr_date >= before:
-            # only do the trading dates
-            if curr_date.strftime("%Y-%m-%d") in dates_in_df.values:
-                indicator_value = get_stockstats_indicator(
-                    symbol, indicator, curr_date.strftime("%Y-%m-%d"), online
-                )
-
-                ind_string += f"{curr_date.strftime('%Y-%m-%d')}: {indicator_value}\n"
-
-            curr_date = curr_date - relativedelta(days=1)
-    else:
-        # online gathering
-        ind_string = ""
-        while curr_date >= before:
-            indicator_value = get_stockstats_indicator(
-                symbol, indicator, curr_date.strftime("%Y-%m-%d"), online
-            )
+        window_values = None
 
-            ind_string += f"{curr_date.strftime('%Y-%m-%d')}: {indicator_value}\n"
+    ind_string = ""
+    while curr_date >= before:
+        date_key = curr_date.strftime("%Y-%m-%d")
+        if window_values is None:
+            ind_string += f"{date_key}: \n"
+        elif date_key in window_values:
+            ind_string += f"{date_key}: {window_values[date_key]}\n"
+        elif online:
+            # 在线模式保留非交易日行，与逐日查询的输出格式一致
+            ind_string += f"{date_key}: {NOT_TRADING_DAY}\n"
 
-            curr_date = curr_date - relativedelta(days=1)
+        curr_date = curr_date - relativedelta(days=1)
 
     result_str = (
         f"## {indicator} values from {before.strftime('%Y-%m-%d')} to {end_date}:\n\n"
@@ -663,6 +661,21 @@ def get_stockstats_indicator(
     return str(indicator_value)
 
 
+def _get_yfin_offline_window(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    """通过进程内价格数据存储读取离线YFin数据的日期区间，同一CSV只解析一次"""
+    return get_price_frame_store().get_window(
+        symbol,
+        "yfin",
+        "2015-01-01-2025-03-25",
+        os.path.join(
+            DATA_DIR,
+            f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
+        ),
+        start_date,
+        end_date,
+    )
+
+
 def get_YFin_data_window(
     symbol: Annotated[str, "ticker symbol of the company"],
     curr_date: Annotated[str, "Start date in yyyy-mm-dd format"],
@@ -673,24 +686,8 @@ def get_YFin_data_window(
     before = date_obj - relativedelta(days=look_back_days)
     start_date = before.strftime("%Y-%m-%d")
 
-    # read in data
-    data = pd.read_csv(
-        os.path.join(
-            DATA_DIR,
-            f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-        )
-    )
-
-    # Extract just the date part for comparison
-    data["DateOnly"] = data["Date"].str[:10]
-
-    # Filter data between the start and end dates (inclusive)
-    filtered_data = data[
-        (data["DateOnly"] >= start_date) & (data["DateOnly"] <= curr_date)
-    ]
-
-    # Drop the temporary column we created
-    filtered_data = filtered_data.drop("DateOnly", axis=1)
+    # read in data (filtered between the start and end dates, inclusive)
+    filtered_data = _get_yfin_offline_window(symbol, start_date, curr_date)
 
     # Set pandas display options to show the full DataFrame
     with pd.option_context(
@@ -754,29 +751,13 @@ def get_YFin_data(
     start_date: Annotated[str, "Start date in yyyy-mm-dd format"],
     end_date: Annotated[str, "End date in yyyy-mm-dd format"],
 ) -> str:
-    # read in data
-    data = pd.read_csv(
-        os.path.join(
-            DATA_DIR,
-            f"market_data/price_data/{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-        )
-    )
-
     if end_date > "2025-03-25":
         raise Exception(
             f"Get_YFin_Data: {end_date} is outside of the data range of 2015-01-01 to 2025-03-25"
         )
 
-    # Extract just the date part for comparison
-    data["DateOnly"] = data["Date"].str[:10]
-
-    # Filter data between the start and end dates (inclusive)
-    filtered_data = data[
-        (data["DateOnly"] >= start_date) & (data["DateOnly"] <= end_date)
-    ]
-
-    # Drop the temporary column we created
-    filtered_data = filtered_data.drop("DateOnly", axis=1)
+    # read in data (filtered between the start and end dates, inclusive)
+    filtered_data = _get_yfin_offline_window(symbol, start_date, end_date)
 
     # remove the index from the dataframe
     filtered_data = filtered_data.reset_index(drop=True)
@@ -11,6 +11,7 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from .cache_manager import get_cache
 from .config import get_config
+from .rate_limiter import get_rate_limiter
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -23,21 +24,13 @@ class OptimizedChinaDataProvider:
     def __init__(self):
         self.cache = get_cache()
         self.config = get_config()
-        self.last_api_call = 0
-        self.min_api_interval = 0.5  # Tushare数据接口调用间隔较短
+        self.rate_limiter = get_rate_limiter()  # 跨进程共享的令牌桶
         
         logger.info(f"📊 优化A股数据提供器初始化完成")
     
-    def _wait_for_rate_limit(self):
-        """等待API限制"""
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_api_call
-        
-        if time_since_last_call < self.min_api_interval:
-            wait_time = self.min_api_interval - time_since_last_call
-            time.sleep(wait_time)
-        
-        self.last_api_call = time.time()
+    def _wait_for_rate_limit(self, endpoint: str = None) -> bool:
+        """等待API限制（所有进程共享Tushare的调用配额）"""
+        return self.rate_limiter.acquire("tushare", endpoint)
     
     def get_stock_data(self, symbol: str, start_date: str, end_date: str, 
                       force_refresh: bool = False) -> str:
@@ -10,37 +10,87 @@ import random
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from .cache_manager import get_cache
 from .config import get_config
+from .range_bar_store import get_range_bar_store
+from .rate_limiter import get_rate_limiter
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
 logger = get_logger('agents')
 
 
+# 复权基准比对用的已存储K线与缺口相距不超过这么多天时，直接扩展缺口请求；更远时单独请求这一天
+ANCHOR_EXTEND_DAYS = 14
+
+
+def _adjustment_anchor(store, symbol: str, source: str, gap_start: str, gap_end: str):
+    """
+    返回离缺口最近的一根已覆盖K线（日期Timestamp, Close, Adj Close），存储为空时返回None
+
+    存储中的K线复权基准一致，新获取的数据在这根K线上的 Close / Adj Close 与存储不同，
+    说明存储之后又有分红或拆股（无论发生在缺口内外），存储的复权基准已过期。
+    """
+    gap_start, gap_end = pd.Timestamp(gap_start), pd.Timestamp(gap_end)
+    candidates = []
+    for covered_start, covered_end in store.coverage(symbol, source):
+        covered_start, covered_end = pd.Timestamp(covered_start), pd.Timestamp(covered_end)
+        if covered_end < gap_start:
+            window_start = max(covered_start, covered_end - pd.Timedelta(days=ANCHOR_EXTEND_DAYS))
+            candidates.append((gap_start - covered_end, window_start, covered_end, -1))
+        elif covered_start > gap_end:
+            window_end = min(covered_end, covered_start + pd.Timedelta(days=ANCHOR_EXTEND_DAYS))
+            candidates.append((covered_start - gap_end, covered_start, window_end, 0))
+
+    for _, window_start, window_end, position in sorted(candidates, key=lambda item: item[0]):
+        window = store.get_range(symbol, window_start.strftime('%Y-%m-%d'), window_end.strftime('%Y-%m-%d'), source)
+        if window is not None and len(window) > 0 and "Adj Close" in window.columns:
+            bar = window.iloc[position]
+            return pd.Timestamp(window.index[position]), bar["Close"], bar["Adj Close"]
+    return None
+
+
+def _bar_on(data: pd.DataFrame, day: pd.Timestamp):
+    """返回 yfinance 数据中某一天的K线，没有则返回None"""
+    if data is None or data.empty:
+        return None
+    index = pd.DatetimeIndex(data.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    matches = data[index.normalize() == day]
+    return matches.iloc[-1] if len(matches) > 0 else None
+
+
+def _apply_yfinance_adjustment(data: pd.DataFrame) -> pd.DataFrame:
+    """按 Adj Close / Close 复权开高低收，与 yfinance 的 auto_adjust=True 一致"""
+    if data.empty or "Adj Close" not in data.columns:
+        return data
+    data = data.copy()
+    ratio = (data["Adj Close"] / data["Close"]).where(data["Close"] != 0, 1.0)
+    for column in ("Open", "High", "Low"):
+        if column in data.columns:
+            data[column] = data[column] * ratio
+    data["Close"] = data["Adj Close"]
+    return data.drop(columns=["Adj Close"])
+
+
 class OptimizedUSDataProvider:
     """优化的美股数据提供器 - 集成缓存和API限制处理"""
     
     def __init__(self):
         self.cache = get_cache()
         self.config = get_config()
-        self.last_api_call = 0
-        self.min_api_interval = 1.0  # 最小API调用间隔（秒）
+        self.rate_limiter = get_rate_limiter()  # 跨进程共享的令牌桶
+        self.finnhub_max_wait = 5.0  # FINNHUB配额需要等待更久时直接使用备用数据源
         
         logger.info(f"📊 优化美股数据提供器初始化完成")
     
-    def _wait_for_rate_limit(self):
-        """等待API限制"""
-        current_time = time.time()
-        time_since_last_call = current_time - self.last_api_call
-        
-        if time_since_last_call < self.min_api_interval:
-            wait_time = self.min_api_interval - time_since_last_call
-            logger.info(f"⏳ API限制等待 {wait_time:.1f}s...")
-            time.sleep(wait_time)
-        
-        self.last_api_call = time.time()
+    def _wait_for_rate_limit(self, provider: str = "yfinance", endpoint: str = None,
+                             max_wait: float = None) -> bool:
+        """等待API限制，预计等待超过 max_wait 秒时返回False"""
+        return self.rate_limiter.acquire(provider, endpoint, max_wait=max_wait)
     
     def get_stock_data(self, symbol: str, start_date: str, end_date: str, 
                       force_refresh: bool = False) -> str:
@@ -90,9 +140,11 @@ class OptimizedUSDataProvider:
         # 尝试FINNHUB API（优先）
         try:
             logger.info(f"🌐 从FINNHUB API获取数据: {symbol}")
-            self._wait_for_rate_limit()
-
-            formatted_data = self._get_data_from_finnhub(symbol, start_date, end_date)
+            if not self._wait_for_rate_limit("finnhub", "quote_profile", max_wait=self.finnhub_max_wait):
+                logger.warning(f"⚠️ FINNHUB调用配额暂时用尽，直接使用备用数据源")
+                formatted_data = None
+            else:
+                formatted_data = self._get_data_from_finnhub(symbol, start_date, end_date)
             if formatted_data and "❌" not in formatted_data:
                 data_source = "finnhub"
                 logger.info(f"✅ FINNHUB数据获取成功: {symbol}")
@@ -143,11 +195,9 @@ class OptimizedUSDataProvider:
                 else:
                     # 美股使用Yahoo Finance
                     logger.info(f"🇺🇸 从Yahoo Finance API获取美股数据: {symbol}")
-                    self._wait_for_rate_limit()
 
-                    # 获取数据
-                    ticker = yf.Ticker(symbol.upper())
-                    data = ticker.history(start=start_date, end=end_date)
+                    # 获取数据：按区间存储，只请求尚未覆盖的日期缺口
+                    data = self._get_yfinance_history(symbol.upper(), start_date, end_date)
 
                     if data.empty:
                         error_msg = f"未找到股票 '{symbol}' 在 {start_date} 到 {end_date} 期间的数据"
@@ -179,6 +229,56 @@ class OptimizedUSDataProvider:
 
         return formatted_data
     
+    def _get_yfinance_history(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        通过区间K线存储获取Yahoo Finance日线（end_date 与 yfinance 一致，不包含）
+
+        存储中保存未复权的K线（auto_adjust=False，带 Adj Close 和分红拆股列），切片后再复权，
+        返回格式与 auto_adjust=True 一致。获取缺口时同时取回离缺口最近的一根已存储K线，
+        其 Close / Adj Close 与存储不一致说明之后有过分红或拆股，已存储的K线复权基准已过期，
+        丢弃该股票的存储并重新获取整个区间，保证同一序列的复权基准一致。
+        """
+        last_date = (pd.Timestamp(end_date) - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        if last_date < start_date:
+            self._wait_for_rate_limit()
+            return yf.Ticker(symbol).history(start=start_date, end=end_date)
+
+        store = get_range_bar_store()
+        source = "yfinance_raw"
+        stale = []
+
+        def history(gap_symbol, first_day, last_day):
+            self._wait_for_rate_limit()
+            stop = (last_day + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+            return yf.Ticker(gap_symbol).history(start=first_day.strftime('%Y-%m-%d'), end=stop, auto_adjust=False)
+
+        def fetch_gap(gap_symbol, gap_start, gap_end):
+            first_day, last_day = pd.Timestamp(gap_start), pd.Timestamp(gap_end)
+            anchor = None if stale else _adjustment_anchor(store, gap_symbol, source, gap_start, gap_end)
+            if anchor is not None and abs(anchor[0] - first_day).days <= ANCHOR_EXTEND_DAYS + 1:
+                first_day = min(first_day, anchor[0])
+            if anchor is not None and abs(anchor[0] - last_day).days <= ANCHOR_EXTEND_DAYS + 1:
+                last_day = max(last_day, anchor[0])
+            data = history(gap_symbol, first_day, last_day)
+
+            if anchor is not None:
+                anchor_day, stored_close, stored_adj_close = anchor
+                fresh = _bar_on(data, anchor_day)
+                if fresh is None:
+                    fresh = _bar_on(history(gap_symbol, anchor_day, anchor_day), anchor_day)
+                if fresh is not None and not (
+                        np.isclose(fresh["Close"], stored_close, rtol=1e-5)
+                        and np.isclose(fresh["Adj Close"], stored_adj_close, rtol=1e-5)):
+                    stale.append(anchor_day.strftime('%Y-%m-%d'))
+            return data
+
+        data = store.get_bars(symbol, start_date, last_date, fetch_fn=fetch_gap, source=source)
+        if stale:
+            logger.info(f"🔄 {symbol} 在 {stale[0]} 之后有分红或拆股，重新获取未复权K线")
+            store.invalidate(symbol, source)
+            data = store.get_bars(symbol, start_date, last_date, fetch_fn=fetch_gap, source=source)
+        return _apply_yfinance_adjustment(data)
+
     def _format_stock_data(self, symbol: str, data: pd.DataFrame, 
                           start_date: str, end_date: str) -> str:
         """格式化股票数据为字符串"""
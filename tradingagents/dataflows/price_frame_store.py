@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+进程内价格数据存储
+同一个价格CSV在进程内只解析一次，供 StockstatsUtils 和 interface 中的读取函数共享
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+import numpy as np
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# 价格列压缩为float32，成交量压缩为int64
+PRICE_COLUMNS = ("Open", "High", "Low", "Close", "Adj Close")
+VOLUME_COLUMNS = ("Volume",)
+
+
+class PriceFrameStore:
+    """价格数据帧存储 - 按 (symbol, source, range) 缓存已解析的DataFrame
+
+    - 日期只解析一次，帧以DatetimeIndex为索引，同时保留原始Date列用于输出
+    - 价格列使用float32、成交量使用int64，减少内存占用
+    - 按LRU淘汰，总内存不超过 max_memory_mb
+    - 每次读取检查源文件mtime，文件被改写后自动重新加载
+
+    返回的帧在多个调用方之间共享，调用方不得原地修改；需要修改时使用 get_window 或自行copy。
+    """
+
+    def __init__(self, max_memory_mb: float = 256):
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        # (symbol, source, date_range) -> 帧及其元信息
+        self._frames: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._memory_bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'reloads': 0, 'evictions': 0}
+
+    def get_frame(self, symbol: str, source: str, date_range: str, path: str) -> pd.DataFrame:
+        """
+        获取价格数据帧
+
+        Args:
+            symbol: 股票代码
+            source: 数据来源标识，如 yfin / yfin_online
+            date_range: 数据文件覆盖的日期范围，如 2015-01-01-2025-03-25
+            path: CSV文件路径
+
+        Returns:
+            pd.DataFrame: 以日期为索引的共享数据帧（只读）
+
+        Raises:
+            FileNotFoundError: 文件不存在
+        """
+        key = (symbol, source, date_range)
+        mtime = os.stat(path).st_mtime
+
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None and entry['path'] == path and entry['mtime'] == mtime:
+                self._frames.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry['frame']
+
+            if entry is not None:
+                self._stats['reloads'] += 1
+                self._remove(key)
+            else:
+                self._stats['misses'] += 1
+
+            frame = self._load_csv(path)
+            size = int(frame.memory_usage(index=True, deep=True).sum())
+            self._frames[key] = {'frame': frame, 'path': path, 'mtime': mtime, 'size': size}
+            self._memory_bytes += size
+            self._evict(keep=key)
+            logger.debug(f"📦 价格数据已载入内存: {symbol} [{source}] {date_range}, {len(frame)}行, {size / 1024:.1f}KB")
+            return frame
+
+    def get_window(self, symbol: str, source: str, date_range: str, path: str,
+                   start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        获取日期区间内（含两端）的数据副本
+
+        返回帧的索引为行在源文件中的序号，与直接 pd.read_csv 后过滤的结果一致
+
+        Args:
+            start_date: 开始日期 YYYY-mm-dd，None表示不限
+            end_date: 结束日期 YYYY-mm-dd，None表示不限
+        """
+        frame = self.get_frame(symbol, source, date_range, path)
+        mask = np.ones(len(frame), dtype=bool)
+        if start_date:
+            mask &= frame.index >= pd.Timestamp(start_date)
+        if end_date:
+            mask &= frame.index <= pd.Timestamp(end_date)
+        window = frame[mask].copy()
+        window.index = pd.RangeIndex(len(frame))[mask]
+        return window
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """清除指定股票（或全部）的缓存帧"""
+        with self._lock:
+            for key in list(self._frames):
+                if symbol is None or key[0] == symbol:
+                    self._remove(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['frames'] = len(self._frames)
+            stats['memory_mb'] = round(self._memory_bytes / 1024 / 1024, 2)
+            stats['max_memory_mb'] = round(self.max_memory_bytes / 1024 / 1024, 2)
+            return stats
+
+    def _remove(self, key):
+        entry = self._frames.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry['size']
+
+    def _evict(self, keep):
+        """按LRU顺序淘汰，直到内存不超过预算（刚载入的帧保留）"""
+        while self._memory_bytes > self.max_memory_bytes and len(self._frames) > 1:
+            oldest = next(iter(self._frames))
+            if oldest == keep:
+                break
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+
+    @staticmethod
+    def _load_csv(path: str) -> pd.DataFrame:
+        """读取CSV，解析日期索引并压缩数值列类型"""
+        data = pd.read_csv(path)
+
+        for col in PRICE_COLUMNS:
+            if col in data.columns and pd.api.types.is_float_dtype(data[col]):
+                data[col] = data[col].astype(np.float32)
+        for col in VOLUME_COLUMNS:
+            if col in data.columns and pd.api.types.is_numeric_dtype(data[col]) and not data[col].isna().any():
+                data[col] = data[col].astype(np.int64)
+
+        if "Date" in data.columns:
+            # 只取日期部分解析，兼容带时区的时间戳字符串
+            data.index = pd.DatetimeIndex(pd.to_datetime(data["Date"].astype(str).str[:10]), name=None)
+        return data
+
+
+# 全局存储实例
+_store_instance = None
+_store_lock = threading.Lock()
+
+
+def get_price_frame_store() -> PriceFrameStore:
+    """获取全局价格数据帧存储实例"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                max_memory_mb = float(os.getenv("TRADINGAGENTS_PRICE_FRAME_STORE_MB", "256"))
+                _store_instance = PriceFrameStore(max_memory_mb=max_memory_mb)
+    return _store_instance
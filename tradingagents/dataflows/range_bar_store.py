@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+区间感知的K线存储
+按 (数据源, 股票代码) 保存一份合并后的日线数据，并记录已覆盖的日期区间：
+任意子区间直接切片返回，只从数据源获取尚未覆盖的缺口，获取结果合并回存储
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+
+# fetch_fn(symbol, start_date, end_date) -> DataFrame，日期为 YYYY-MM-DD，两端都包含
+FetchFunction = Callable[[str, str, str], Optional[pd.DataFrame]]
+
+# 含工作日的缺口返回空数据时（可能是限流或临时故障），只在内存中记住这么久，过期后重新获取
+EMPTY_RESULT_TTL = 600
+
+
+def _to_date(value) -> date:
+    """解析 YYYY-MM-DD / YYYYMMDD / datetime 为日期"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return pd.Timestamp(str(value)).date()
+
+
+def merge_intervals(intervals: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    """合并重叠或相邻（相差一天）的闭区间"""
+    merged: List[Tuple[date, date]] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def has_weekdays(start: date, end: date) -> bool:
+    """[start, end] 中是否有工作日；只有周末的区间确定没有交易日"""
+    return start <= end and np.busday_count(start, end + timedelta(days=1)) > 0
+
+
+def subtract_intervals(start: date, end: date,
+                       covered: List[Tuple[date, date]]) -> List[Tuple[date, date]]:
+    """返回 [start, end] 中未被 covered 覆盖的缺口"""
+    gaps = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, min(end, covered_start - timedelta(days=1))))
+        cursor = max(cursor, covered_end + timedelta(days=1))
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class RangeBarStore:
+    """区间感知的日线数据存储
+
+    - 每个 (source, symbol) 一份按日期排序、去重的DataFrame（pickle持久化）和一份覆盖区间清单
+    - 覆盖区间记录的是"已向数据源请求过"的日历区间，因此节假日不会被当作缺口反复请求
+    - 今天及以后的日期不计入覆盖区间，当日数据可能尚未收盘，下次请求会重新获取
+    - 缺口返回空数据时不记为已覆盖（只有周末的缺口除外），只在内存中短期记住，避免一次失败永久缓存为无数据
+    - 每个 (source, symbol) 单独加锁，一只股票的慢请求不会阻塞其他股票
+    - 内存中的数据按LRU淘汰，总内存不超过 max_memory_mb，被淘汰的股票下次使用时从磁盘重新读取
+    """
+
+    def __init__(self, cache_dir: str = None, max_memory_mb: float = 256):
+        if cache_dir is None:
+            cache_dir = Path(__file__).parent / "data_cache" / "bar_store"
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._key_locks: Dict[Tuple[str, str], threading.RLock] = {}
+        # 保护 _entries、_key_locks 和统计信息；获取数据时只持有对应股票的锁
+        self._lock = threading.RLock()
+        self._memory_bytes = 0
+        self._stats = {'hits': 0, 'partial_hits': 0, 'misses': 0, 'fetched_gaps': 0, 'empty_gaps': 0,
+                       'evictions': 0}
+
+    def get_bars(self, symbol: str, start_date: str, end_date: str,
+                 fetch_fn: FetchFunction, source: str = "default",
+                 date_column: Optional[str] = None) -> pd.DataFrame:
+        """
+        获取 [start_date, end_date] 的日线数据，只对缺口调用 fetch_fn
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期（包含）
+            fetch_fn: 获取缺口数据的函数，参数为 (symbol, 缺口开始, 缺口结束)
+            source: 数据源标识，不同数据源分别存储
+            date_column: 日期所在列名，None表示日期在索引上
+
+        Returns:
+            pd.DataFrame: 区间内的数据副本，格式与 fetch_fn 返回的一致
+        """
+        start, end = _to_date(start_date), _to_date(end_date)
+        key = (source, symbol)
+
+        with self._key_lock(key):
+            entry = self._load_entry(key)
+            gaps = [gap for gap in subtract_intervals(start, end, entry['coverage'])
+                    if not self._recently_empty(entry, *gap)]
+
+            if not gaps:
+                self._count('hits')
+            else:
+                self._count('partial_hits' if entry['coverage'] else 'misses')
+                try:
+                    for gap_start, gap_end in gaps:
+                        logger.debug(f"📥 [K线存储] 获取缺口: {symbol} [{source}] {gap_start} ~ {gap_end}")
+                        fetched = fetch_fn(symbol, gap_start.isoformat(), gap_end.isoformat())
+                        self._count('fetched_gaps')
+                        if (fetched is not None and len(fetched) > 0) or not has_weekdays(gap_start, gap_end):
+                            self._merge(entry, fetched, date_column)
+                            self._add_coverage(entry, gap_start, gap_end)
+                        else:
+                            # 有工作日却没有数据：可能是限流或临时故障，也可能是节假日，短期内不再请求
+                            self._count('empty_gaps')
+                            entry['empty'].append((gap_start, gap_end, time.time() + EMPTY_RESULT_TTL))
+                            logger.debug(f"📭 [K线存储] 缺口无数据，不记为已覆盖: {symbol} [{source}] {gap_start} ~ {gap_end}")
+                finally:
+                    # 即使某个缺口获取失败，已获取的部分也保存下来
+                    self._save_entry(key, entry)
+                    self._track(key, entry)
+
+            return self._slice(entry, start, end, date_column)
+
+    def get_range(self, symbol: str, start_date: str, end_date: str,
+                  source: str = "default", date_column: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """区间完全被覆盖时返回切片，否则返回None（不会请求数据源）"""
+        start, end = _to_date(start_date), _to_date(end_date)
+        key = (source, symbol)
+        with self._key_lock(key):
+            entry = self._load_entry(key)
+            if subtract_intervals(start, end, entry['coverage']):
+                return None
+            self._count('hits')
+            return self._slice(entry, start, end, date_column)
+
+    def missing_ranges(self, symbol: str, start_date: str, end_date: str,
+                       source: str = "default") -> List[Tuple[str, str]]:
+        """返回尚未覆盖的日期缺口"""
+        start, end = _to_date(start_date), _to_date(end_date)
+        key = (source, symbol)
+        with self._key_lock(key):
+            entry = self._load_entry(key)
+            return [(s.isoformat(), e.isoformat()) for s, e in subtract_intervals(start, end, entry['coverage'])]
+
+    def coverage(self, symbol: str, source: str = "default") -> List[Tuple[str, str]]:
+        """已覆盖的日期区间"""
+        key = (source, symbol)
+        with self._key_lock(key):
+            entry = self._load_entry(key)
+            return [(s.isoformat(), e.isoformat()) for s, e in entry['coverage']]
+
+    def put(self, symbol: str, data: pd.DataFrame, start_date: str, end_date: str,
+            source: str = "default", date_column: Optional[str] = None):
+        """写入已获取的 [start_date, end_date] 数据"""
+        key = (source, symbol)
+        with self._key_lock(key):
+            entry = self._load_entry(key)
+            self._merge(entry, data, date_column)
+            self._add_coverage(entry, _to_date(start_date), _to_date(end_date))
+            self._save_entry(key, entry)
+            self._track(key, entry)
+
+    def invalidate(self, symbol: str, source: str = "default"):
+        """删除某只股票的存储"""
+        key = (source, symbol)
+        with self._key_lock(key):
+            with self._lock:
+                self._remove(key)
+            for path in self._paths(key):
+                if path.exists():
+                    path.unlink()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['symbols'] = len(self._entries)
+            stats['memory_mb'] = round(self._memory_bytes / 1024 / 1024, 2)
+            stats['max_memory_mb'] = round(self.max_memory_bytes / 1024 / 1024, 2)
+            return stats
+
+    def _paths(self, key: Tuple[str, str]) -> Tuple[Path, Path]:
+        source, symbol = key
+        safe_name = re.sub(r'[^0-9A-Za-z._-]', '_', f"{source}_{symbol}")
+        return self.cache_dir / f"{safe_name}.pkl", self.cache_dir / f"{safe_name}.coverage.json"
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.RLock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.RLock()
+            return lock
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _load_entry(self, key: Tuple[str, str]) -> Dict:
+        """在持有该股票的锁时调用"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        data_path, coverage_path = self._paths(key)
+        entry = {'frame': None, 'coverage': [], 'empty': []}
+        if data_path.exists() and coverage_path.exists():
+            try:
+                entry['frame'] = pd.read_pickle(data_path)
+                with open(coverage_path, 'r', encoding='utf-8') as f:
+                    entry['coverage'] = [(_to_date(s), _to_date(e)) for s, e in json.load(f)]
+            except Exception as e:
+                logger.warning(f"⚠️ [K线存储] 读取 {key} 失败，将重新获取: {e}")
+                entry = {'frame': None, 'coverage': [], 'empty': []}
+        self._track(key, entry)
+        return entry
+
+    def _track(self, key: Tuple[str, str], entry: Dict):
+        """登记（或更新）内存中的数据大小并按LRU淘汰；在持有该股票的锁时调用"""
+        frame = entry['frame']
+        size = int(frame.memory_usage(index=True, deep=True).sum()) if frame is not None else 0
+        with self._lock:
+            # 获取缺口期间可能已被淘汰，重新登记
+            self._remove(key)
+            entry['size'] = size
+            self._entries[key] = entry
+            self._memory_bytes += entry['size']
+            self._evict(keep=key)
+
+    def _remove(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry['size']
+
+    def _evict(self, keep: Tuple[str, str]):
+        """按LRU顺序淘汰，直到内存不超过预算（刚使用的股票保留）；数据已保存在磁盘上"""
+        while self._memory_bytes > self.max_memory_bytes and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+
+    @staticmethod
+    def _recently_empty(entry: Dict, start: date, end: date) -> bool:
+        """该缺口最近请求过且没有数据（记录未过期）"""
+        now = time.time()
+        entry['empty'] = [record for record in entry['empty'] if record[2] > now]
+        return any(s <= start and end <= e for s, e, _ in entry['empty'])
+
+    def _save_entry(self, key: Tuple[str, str], entry: Dict):
+        data_path, coverage_path = self._paths(key)
+        try:
+            if entry['frame'] is not None:
+                tmp_path = data_path.with_suffix(".tmp")
+                entry['frame'].to_pickle(tmp_path)
+                os.replace(tmp_path, data_path)
+            tmp_path = coverage_path.with_suffix(".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump([(s.isoformat(), e.isoformat()) for s, e in entry['coverage']], f)
+            os.replace(tmp_path, coverage_path)
+        except Exception as e:
+            logger.warning(f"⚠️ [K线存储] 保存 {key} 失败: {e}")
+
+    @staticmethod
+    def _add_coverage(entry: Dict, start: date, end: date):
+        # 当日及未来的数据可能不完整，不记为已覆盖
+        end = min(end, date.today() - timedelta(days=1))
+        if start <= end:
+            entry['coverage'] = merge_intervals(entry['coverage'] + [(start, end)])
+
+    @staticmethod
+    def _merge(entry: Dict, data: Optional[pd.DataFrame], date_column: Optional[str]):
+        if data is None or len(data) == 0:
+            return
+        frame = data.copy()
+        index_name = None if date_column is not None else frame.index.name
+        if date_column is not None:
+            index = pd.to_datetime(frame[date_column].astype(str))
+        else:
+            index = pd.to_datetime(frame.index)
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        frame.index = index.normalize().rename(index_name)
+
+        if entry['frame'] is not None:
+            frame = pd.concat([entry['frame'], frame])
+        # 同一日期以最新获取的为准
+        frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+        entry['frame'] = frame
+
+    @staticmethod
+    def _slice(entry: Dict, start: date, end: date, date_column: Optional[str]) -> pd.DataFrame:
+        frame = entry['frame']
+        if frame is None:
+            return pd.DataFrame()
+        window = frame.loc[pd.Timestamp(start):pd.Timestamp(end)].copy()
+        if date_column is not None:
+            return window.reset_index(drop=True)
+        return window
+
+
+_store_instance = None
+_store_lock = threading.Lock()
+
+
+def get_range_bar_store() -> RangeBarStore:
+    """获取全局K线存储实例
+
+    环境变量:
+        TRADINGAGENTS_BAR_STORE_DIR: 存储目录，默认 dataflows/data_cache/bar_store
+        TRADINGAGENTS_BAR_STORE_MB: 内存中保留的数据上限（MB），默认 256
+    """
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                max_memory_mb = float(os.getenv("TRADINGAGENTS_BAR_STORE_MB", "256"))
+                _store_instance = RangeBarStore(os.getenv("TRADINGAGENTS_BAR_STORE_DIR") or None,
+                                                max_memory_mb=max_memory_mb)
+    return _store_instance
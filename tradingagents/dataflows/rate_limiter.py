@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+共享的数据接口限流服务
+各数据提供器原来各自保存上次调用时间并 sleep，限制只在单个对象内生效，
+多个Web进程或命令行进程同时运行时仍会超出 Tushare / FinnHub 的调用配额。
+这里按数据提供方维护令牌桶，由所有线程和进程共享：
+- 每个提供方一个令牌桶：rate 为每秒补充的令牌数，burst 为桶容量（允许的突发调用数）
+- 不同接口可以设置权重，一次调用消耗对应数量的令牌
+- 后端: sqlite（默认，同一台机器的多进程共享）、redis（多台机器共享）、memory（仅当前进程）
+- try_acquire 不等待，estimate_wait 返回需要等待的时间，调用方可以据此改用其他数据源
+- 遇到配额超限时调用 report_throttled，所有进程一起退避
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# 导入日志模块
+from tradingagents.utils.logging_manager import get_logger
+logger = get_logger('agents')
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+@dataclass
+class RateLimitRule:
+    """令牌桶规则"""
+    rate: float                                    # 每秒补充的令牌数
+    burst: float = 1.0                             # 桶容量
+    weights: Dict[str, float] = field(default_factory=dict)  # 接口权重，未列出的接口消耗1个令牌
+
+    def cost(self, endpoint: Optional[str] = None) -> float:
+        # 单次消耗不超过桶容量，否则永远无法获取
+        return min(self.weights.get(endpoint, 1.0), self.burst)
+
+
+# 默认规则，与各提供器原有的调用间隔一致，可通过 RATE_LIMIT_<PROVIDER>=rate,burst 覆盖
+DEFAULT_RULES: Dict[str, RateLimitRule] = {
+    'tushare': RateLimitRule(rate=2.0, burst=2),
+    # 行情+公司信息为两次请求，每秒2个令牌即原来的每秒一次 get_stock_data
+    'finnhub': RateLimitRule(rate=2.0, burst=5, weights={'quote_profile': 2}),
+    # 美股和港股共用 Yahoo Finance 配额；ticker.info 会发出多个请求
+    'yfinance': RateLimitRule(rate=1.0, burst=2, weights={'info': 2}),
+}
+
+
+def _refill(tokens: float, updated: float, now: float, rule: RateLimitRule) -> float:
+    return min(rule.burst, tokens + max(0.0, now - updated) * rule.rate)
+
+
+def _take(tokens: float, cost: float, rule: RateLimitRule, consume: bool) -> Tuple[bool, float, float]:
+    """返回 (是否获取成功, 需要等待的秒数, 剩余令牌)"""
+    if tokens >= cost:
+        return True, 0.0, tokens - cost if consume else tokens
+    return False, (cost - tokens) / rule.rate, tokens
+
+
+class MemoryBucketBackend:
+    """进程内令牌桶，仅在当前进程的线程之间共享"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, key: str, cost: float, rule: RateLimitRule, consume: bool = True) -> Tuple[bool, float]:
+        with self._lock:
+            now = time.time()
+            tokens, updated = self._buckets.get(key, (rule.burst, now))
+            granted, wait, tokens = _take(_refill(tokens, updated, now, rule), cost, rule, consume)
+            self._buckets[key] = (tokens, now)
+        return granted, wait
+
+    def penalize(self, key: str, seconds: float, rule: RateLimitRule):
+        with self._lock:
+            self._buckets[key] = (-seconds * rule.rate, time.time())
+
+
+class SQLiteBucketBackend:
+    """SQLite令牌桶，同一台机器上的所有进程共享；每次获取在 BEGIN IMMEDIATE 事务中完成"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _transaction(self, key: str, update):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                now = time.time()
+                tokens, result = update(row, now)
+                self._db.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                                 (key, tokens, now))
+                self._db.execute("COMMIT")
+                return result
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def take(self, key: str, cost: float, rule: RateLimitRule, consume: bool = True) -> Tuple[bool, float]:
+        def update(row, now):
+            tokens = _refill(row[0], row[1], now, rule) if row else rule.burst
+            granted, wait, tokens = _take(tokens, cost, rule, consume)
+            return tokens, (granted, wait)
+
+        return self._transaction(key, update)
+
+    def penalize(self, key: str, seconds: float, rule: RateLimitRule):
+        self._transaction(key, lambda row, now: (-seconds * rule.rate, None))
+
+
+# 在Redis中原子地补充并获取令牌，使用Redis服务器时间，避免多台机器时钟不一致
+_REDIS_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local consume = tonumber(ARGV[4])
+local penalty = tonumber(ARGV[5])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = burst
+else
+    tokens = math.min(burst, tokens + math.max(0, now - tonumber(state[2])) * rate)
+end
+local granted = 0
+local wait = 0
+if penalty > 0 then
+    tokens = -penalty * rate
+elseif tokens >= cost then
+    granted = 1
+    if consume == 1 then tokens = tokens - cost end
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 60)
+return {granted, tostring(wait)}
+"""
+
+
+class RedisBucketBackend:
+    """Redis令牌桶，多台机器共享"""
+
+    name = 'redis'
+
+    def __init__(self, client, prefix: str = 'tradingagents:rate_limit:'):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(_REDIS_TAKE_SCRIPT)
+
+    def _run(self, key: str, rule: RateLimitRule, cost: float, consume: bool, penalty: float):
+        granted, wait = self._script(keys=[self.prefix + key],
+                                     args=[rule.rate, rule.burst, cost, int(consume), penalty])
+        return bool(int(granted)), float(wait)
+
+    def take(self, key: str, cost: float, rule: RateLimitRule, consume: bool = True) -> Tuple[bool, float]:
+        return self._run(key, rule, cost, consume, 0)
+
+    def penalize(self, key: str, seconds: float, rule: RateLimitRule):
+        self._run(key, rule, 0, False, seconds)
+
+
+class RateLimiter:
+    """按数据提供方限流，没有配置规则的提供方不限流"""
+
+    def __init__(self, backend=None, rules: Optional[Dict[str, RateLimitRule]] = None):
+        self.backend = backend or MemoryBucketBackend()
+        self.rules = dict(DEFAULT_RULES if rules is None else rules)
+        self._fallback = None
+
+    def get_rule(self, provider: str) -> Optional[RateLimitRule]:
+        return self.rules.get(provider)
+
+    def _take(self, provider: str, endpoint: Optional[str], cost: Optional[float],
+              consume: bool) -> Tuple[bool, float]:
+        rule = self.rules.get(provider)
+        if rule is None:
+            return True, 0.0
+        cost = rule.cost(endpoint) if cost is None else min(cost, rule.burst)
+        try:
+            return self.backend.take(provider, cost, rule, consume)
+        except Exception as e:
+            # 共享后端不可用时退回进程内限流，不阻断数据获取
+            if self._fallback is None:
+                logger.warning(f"⚠️ [限流] {self.backend.name} 后端不可用，改用进程内限流: {e}")
+                self._fallback = MemoryBucketBackend()
+            return self._fallback.take(provider, cost, rule, consume)
+
+    def try_acquire(self, provider: str, endpoint: Optional[str] = None, cost: Optional[float] = None) -> bool:
+        """不等待地获取令牌，成功返回True"""
+        return self._take(provider, endpoint, cost, consume=True)[0]
+
+    def estimate_wait(self, provider: str, endpoint: Optional[str] = None, cost: Optional[float] = None) -> float:
+        """获取令牌前需要等待的秒数（不消耗令牌），0 表示可以立即调用"""
+        return self._take(provider, endpoint, cost, consume=False)[1]
+
+    def acquire(self, provider: str, endpoint: Optional[str] = None, cost: Optional[float] = None,
+                max_wait: Optional[float] = None) -> bool:
+        """
+        获取令牌，必要时等待
+
+        Args:
+            max_wait: 最多等待的秒数；预计等待时间超过该值时立即返回False，调用方可以改用其他数据源
+        """
+        deadline = None if max_wait is None else time.time() + max_wait
+        while True:
+            granted, wait = self._take(provider, endpoint, cost, consume=True)
+            if granted:
+                return True
+            if deadline is not None and time.time() + wait > deadline:
+                logger.info(f"⏳ [限流] {provider} 需要等待 {wait:.1f}s，超过 {max_wait:.1f}s，放弃本次调用")
+                return False
+            if wait > 1:
+                logger.info(f"⏳ [限流] {provider} 等待 {wait:.1f}s...")
+            # 少量随机抖动，避免多个进程同时醒来争抢
+            time.sleep(wait + random.uniform(0, 0.02))
+
+    def report_throttled(self, provider: str, retry_after: float):
+        """数据源返回配额超限时调用：清空令牌桶，所有进程在 retry_after 秒内都不再调用"""
+        rule = self.rules.get(provider)
+        if rule is None:
+            return
+        logger.warning(f"🚦 [限流] {provider} 配额超限，所有进程暂停 {retry_after:.0f}s")
+        try:
+            self.backend.penalize(provider, retry_after, rule)
+        except Exception as e:
+            logger.warning(f"⚠️ [限流] 记录 {provider} 配额超限失败: {e}")
+
+
+def _rules_from_env() -> Dict[str, RateLimitRule]:
+    """RATE_LIMIT_<PROVIDER>=rate,burst 覆盖默认规则，例如 RATE_LIMIT_TUSHARE=3,5"""
+    rules = {name: RateLimitRule(rule.rate, rule.burst, dict(rule.weights)) for name, rule in DEFAULT_RULES.items()}
+    for key, value in os.environ.items():
+        if not key.startswith('RATE_LIMIT_') or key in ('RATE_LIMIT_BACKEND', 'RATE_LIMIT_DB_PATH',
+                                                         'RATE_LIMIT_REDIS_URL'):
+            continue
+        provider = key[len('RATE_LIMIT_'):].lower()
+        try:
+            parts = [float(part) for part in value.split(',')]
+            rate, burst = parts[0], parts[1] if len(parts) > 1 else 1.0
+            if rate <= 0 or burst <= 0:
+                raise ValueError("rate 和 burst 必须大于0")
+        except (ValueError, IndexError) as e:
+            logger.warning(f"⚠️ [限流] 忽略无效配置 {key}={value}: {e}")
+            continue
+        weights = rules[provider].weights if provider in rules else {}
+        rules[provider] = RateLimitRule(rate, burst, weights)
+    return rules
+
+
+def _create_backend():
+    backend = os.getenv('RATE_LIMIT_BACKEND', 'sqlite').strip().lower()
+    if backend == 'redis':
+        if REDIS_AVAILABLE:
+            try:
+                redis_url = os.getenv('RATE_LIMIT_REDIS_URL') or os.getenv('REDIS_URL') or 'redis://localhost:6379'
+                client = redis.from_url(redis_url, socket_timeout=5, socket_connect_timeout=5)
+                client.ping()
+                logger.info(f"✅ [限流] 使用Redis共享令牌桶")
+                return RedisBucketBackend(client)
+            except Exception as e:
+                logger.warning(f"⚠️ [限流] Redis连接失败，改用SQLite: {e}")
+        else:
+            logger.warning("⚠️ [限流] 未安装 redis，改用SQLite")
+        backend = 'sqlite'
+    if backend == 'sqlite':
+        db_path = os.getenv('RATE_LIMIT_DB_PATH') or str(Path(__file__).parent / "data_cache" / "rate_limits.db")
+        try:
+            return SQLiteBucketBackend(db_path)
+        except Exception as e:
+            logger.warning(f"⚠️ [限流] SQLite令牌桶不可用，改用进程内限流: {e}")
+    return MemoryBucketBackend()
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取全局限流器
+
+    环境变量:
+        RATE_LIMIT_BACKEND: sqlite(默认) / redis / memory
+        RATE_LIMIT_DB_PATH: SQLite文件，默认 dataflows/data_cache/rate_limits.db
+        RATE_LIMIT_REDIS_URL: Redis地址，默认使用 REDIS_URL
+        RATE_LIMIT_<PROVIDER>: rate,burst，例如 RATE_LIMIT_FINNHUB=2,5
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(_create_backend(), _rules_from_env())
+    return _rate_limiter
@@ -5,18 +5,24 @@
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import time
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
+from tradingagents.utils.news_dedup import get_near_duplicate_detector
 logger = get_logger('agents')
 
 
+# 并发模式下视为高相关性的分数阈值（代码或公司名出现在标题中）
+HIGH_RELEVANCE_THRESHOLD = 0.8
+
 
 @dataclass
 class NewsItem:
@@ -28,6 +34,8 @@ class NewsItem:
     url: str
     urgency: str  # high, medium, low
     relevance_score: float
+    source_count: int = 1  # 近似去重后该簇包含的新闻数量
+    sources: List[str] = field(default_factory=list)  # 该簇涉及的新闻来源
 
 
 class RealtimeNewsAggregator:
@@ -42,8 +50,28 @@ class RealtimeNewsAggregator:
         self.finnhub_key = os.getenv('FINNHUB_API_KEY')
         self.alpha_vantage_key = os.getenv('ALPHA_VANTAGE_API_KEY')
         self.newsapi_key = os.getenv('NEWSAPI_KEY')
-        
-    def get_realtime_stock_news(self, ticker: str, hours_back: int = 6, max_news: int = 10) -> List[NewsItem]:
+
+        # API地址（测试时可指向本地桩服务）
+        self.finnhub_url = "https://finnhub.io/api/v1/company-news"
+        self.alpha_vantage_url = "https://www.alphavantage.co/query"
+        self.newsapi_url = "https://newsapi.org/v2/everything"
+
+        # 共享连接池的HTTP会话，并发请求复用连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # 并发模式配置
+        self.concurrent = os.getenv('REALTIME_NEWS_CONCURRENT', 'false').lower() == 'true'
+        self.source_timeout = float(os.getenv('REALTIME_NEWS_SOURCE_TIMEOUT', '10'))
+        self.time_budget = float(os.getenv('REALTIME_NEWS_TIME_BUDGET', '15'))
+
+        # 最近一次获取的各新闻源耗时统计
+        self.last_source_timings: Dict[str, Dict] = {}
+
+    def get_realtime_stock_news(self, ticker: str, hours_back: int = 6, max_news: int = 10,
+                                concurrent: Optional[bool] = None) -> List[NewsItem]:
         """
         获取实时股票新闻
         优先级：专业API > 新闻API > 搜索引擎
@@ -52,10 +80,17 @@ class RealtimeNewsAggregator:
             ticker: 股票代码
             hours_back: 回溯小时数
             max_news: 最大新闻数量，默认10条
+            concurrent: 是否并发获取各新闻源，None时使用 REALTIME_NEWS_CONCURRENT 配置
         """
+        if concurrent is None:
+            concurrent = self.concurrent
+        if concurrent:
+            return self.get_realtime_stock_news_concurrent(ticker, hours_back, max_news)
+
         logger.info(f"[新闻聚合器] 开始获取 {ticker} 的实时新闻，回溯时间: {hours_back}小时")
         start_time = datetime.now()
         all_news = []
+        self.last_source_timings = {}
         
         # 1. FinnHub实时新闻 (最高优先级)
         logger.info(f"[新闻聚合器] 尝试从 FinnHub 获取 {ticker} 的新闻")
@@ -68,6 +103,7 @@ class RealtimeNewsAggregator:
         else:
             logger.info(f"[新闻聚合器] FinnHub 未返回新闻，耗时: {finnhub_time:.2f}秒")
             
+        self._record_timing('finnhub', finnhub_time, finnhub_news)
         all_news.extend(finnhub_news)
         
         # 2. Alpha Vantage新闻
@@ -81,6 +117,7 @@ class RealtimeNewsAggregator:
         else:
             logger.info(f"[新闻聚合器] Alpha Vantage 未返回新闻，耗时: {av_time:.2f}秒")
             
+        self._record_timing('alpha_vantage', av_time, av_news)
         all_news.extend(av_news)
         
         # 3. NewsAPI (如果配置了)
@@ -95,6 +132,7 @@ class RealtimeNewsAggregator:
             else:
                 logger.info(f"[新闻聚合器] NewsAPI 未返回新闻，耗时: {newsapi_time:.2f}秒")
                 
+            self._record_timing('newsapi', newsapi_time, newsapi_news)
             all_news.extend(newsapi_news)
         else:
             logger.info(f"[新闻聚合器] NewsAPI 密钥未配置，跳过此新闻源")
@@ -110,8 +148,100 @@ class RealtimeNewsAggregator:
         else:
             logger.info(f"[新闻聚合器] 未获取到中文财经新闻，耗时: {chinese_time:.2f}秒")
             
+        self._record_timing('chinese', chinese_time, chinese_news)
         all_news.extend(chinese_news)
         
+        return self._finalize_news(all_news, ticker, max_news, start_time)
+
+    def get_realtime_stock_news_concurrent(self, ticker: str, hours_back: int = 6, max_news: int = 10,
+                                           source_timeout: Optional[float] = None,
+                                           time_budget: Optional[float] = None) -> List[NewsItem]:
+        """
+        并发获取各新闻源的实时新闻
+
+        各新闻源在线程池中同时请求（共享连接池会话），单个新闻源受 source_timeout 限制，
+        整体受 time_budget 限制；已获得 max_news 条高相关性新闻时不再等待其余新闻源。
+
+        Args:
+            ticker: 股票代码
+            hours_back: 回溯小时数
+            max_news: 最大新闻数量
+            source_timeout: 单个新闻源的请求超时（秒）
+            time_budget: 整体时间预算（秒）
+        """
+        source_timeout = self.source_timeout if source_timeout is None else source_timeout
+        time_budget = self.time_budget if time_budget is None else time_budget
+
+        logger.info(f"[新闻聚合器] 并发获取 {ticker} 的实时新闻，单源超时: {source_timeout}秒，总预算: {time_budget}秒")
+        start_time = datetime.now()
+        deadline = time.monotonic() + time_budget
+        self.last_source_timings = {}
+
+        sources = {}
+        if self.finnhub_key:
+            sources['finnhub'] = lambda: self._get_finnhub_realtime_news(ticker, hours_back, timeout=source_timeout)
+        if self.alpha_vantage_key:
+            sources['alpha_vantage'] = lambda: self._get_alpha_vantage_news(ticker, hours_back, timeout=source_timeout)
+        if self.newsapi_key:
+            sources['newsapi'] = lambda: self._get_newsapi_news(ticker, hours_back, timeout=source_timeout)
+        sources['chinese'] = lambda: self._get_chinese_finance_news(ticker, hours_back)
+
+        all_news = []
+        unfinished_status = 'timeout'
+        executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="news_source")
+        try:
+            submitted_at = time.monotonic()
+            pending = {executor.submit(fetch): name for name, fetch in sources.items()}
+            while pending:
+                remaining = min(deadline, submitted_at + source_timeout) - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    elapsed = time.monotonic() - submitted_at
+                    try:
+                        items = future.result()
+                    except Exception as e:
+                        logger.error(f"[新闻聚合器] {name} 获取失败: {e}")
+                        self._record_timing(name, elapsed, [], status='error')
+                        continue
+                    self._record_timing(name, elapsed, items)
+                    all_news.extend(items)
+
+                high_relevance = [n for n in self._deduplicate_news(all_news)
+                                  if n.relevance_score >= HIGH_RELEVANCE_THRESHOLD]
+                if pending and len(high_relevance) >= max_news:
+                    logger.info(f"[新闻聚合器] 已获得 {len(high_relevance)} 条高相关性新闻，提前返回")
+                    unfinished_status = 'skipped'
+                    break
+
+            for name in pending.values():
+                self._record_timing(name, time.monotonic() - submitted_at, [], status=unfinished_status)
+                if unfinished_status == 'timeout':
+                    logger.warning(f"[新闻聚合器] {name} 未在时限内返回，已跳过")
+        finally:
+            # 不等待未完成的新闻源，其请求会在各自超时后结束
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return self._finalize_news(all_news, ticker, max_news, start_time)
+
+    def get_source_timings(self) -> Dict[str, Dict]:
+        """获取最近一次新闻获取中各新闻源的耗时、条数和状态"""
+        return dict(self.last_source_timings)
+
+    def _record_timing(self, source: str, elapsed: float, items: List[NewsItem], status: str = None):
+        if status is None:
+            status = 'ok' if items else 'empty'
+        self.last_source_timings[source] = {
+            'elapsed': round(elapsed, 3),
+            'count': len(items),
+            'status': status,
+        }
+
+    def _finalize_news(self, all_news: List[NewsItem], ticker: str, max_news: int,
+                       start_time: datetime) -> List[NewsItem]:
+        """去重、排序并截取最新的 max_news 条新闻"""
         # 去重和排序
         logger.info(f"[新闻聚合器] 开始对 {len(all_news)} 条新闻进行去重和排序")
         dedup_start = datetime.now()
@@ -140,7 +270,7 @@ class RealtimeNewsAggregator:
         
         return sorted_news
     
-    def _get_finnhub_realtime_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
+    def _get_finnhub_realtime_news(self, ticker: str, hours_back: int, timeout: float = 30) -> List[NewsItem]:
         """获取FinnHub实时新闻"""
         if not self.finnhub_key:
             return []
@@ -151,7 +281,7 @@ class RealtimeNewsAggregator:
             start_time = end_time - timedelta(hours=hours_back)
             
             # FinnHub API调用
-            url = "https://finnhub.io/api/v1/company-news"
+            url = self.finnhub_url
             params = {
                 'symbol': ticker,
                 'from': start_time.strftime('%Y-%m-%d'),
@@ -160,7 +290,7 @@ class RealtimeNewsAggregator:
             }
 
             try:
-                response = requests.get(url, params=params, headers=self.headers, timeout=30)
+                response = self.session.get(url, params=params, headers=self.headers, timeout=timeout)
                 response.raise_for_status()
             except requests.exceptions.Timeout:
                 logger.error(f"[FinnHub] 请求超时: {ticker}")
@@ -203,13 +333,13 @@ class RealtimeNewsAggregator:
             logger.error(f"FinnHub新闻获取失败: {e}")
             return []
     
-    def _get_alpha_vantage_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
+    def _get_alpha_vantage_news(self, ticker: str, hours_back: int, timeout: float = 30) -> List[NewsItem]:
         """获取Alpha Vantage新闻"""
         if not self.alpha_vantage_key:
             return []
         
         try:
-            url = "https://www.alphavantage.co/query"
+            url = self.alpha_vantage_url
             params = {
                 'function': 'NEWS_SENTIMENT',
                 'tickers': ticker,
@@ -218,7 +348,7 @@ class RealtimeNewsAggregator:
             }
 
             try:
-                response = requests.get(url, params=params, headers=self.headers, timeout=30)
+                response = self.session.get(url, params=params, headers=self.headers, timeout=timeout)
                 response.raise_for_status()
             except requests.exceptions.Timeout:
                 logger.error(f"[Alpha Vantage] 请求超时: {ticker}")
@@ -267,7 +397,7 @@ class RealtimeNewsAggregator:
             logger.error(f"Alpha Vantage新闻获取失败: {e}")
             return []
     
-    def _get_newsapi_news(self, ticker: str, hours_back: int) -> List[NewsItem]:
+    def _get_newsapi_news(self, ticker: str, hours_back: int, timeout: float = 30) -> List[NewsItem]:
         """获取NewsAPI新闻"""
         try:
             # 构建搜索查询
@@ -281,7 +411,7 @@ class RealtimeNewsAggregator:
             
             query = f"{ticker} OR {company_names.get(ticker, ticker)}"
             
-            url = "https://newsapi.org/v2/everything"
+            url = self.newsapi_url
             params = {
                 'q': query,
                 'language': 'en',
@@ -291,7 +421,7 @@ class RealtimeNewsAggregator:
             }
             
             try:
-                response = requests.get(url, params=params, headers=self.headers, timeout=30)
+                response = self.session.get(url, params=params, headers=self.headers, timeout=timeout)
                 response.raise_for_status()
             except requests.exceptions.Timeout:
                 logger.error(f"[NewsAPI] 请求超时: {ticker}")
@@ -606,31 +736,34 @@ class RealtimeNewsAggregator:
         logger.info(f"[新闻去重] 开始对 {len(news_items)} 条新闻进行去重处理")
         start_time = datetime.now()
         
-        seen_titles = set()
-        unique_news = []
-        duplicate_count = 0
+        candidates = []
         short_title_count = 0
-        
+
         for item in news_items:
-            # 简单的标题去重
-            title_key = item.title.lower().strip()
-            
             # 检查标题长度
-            if len(title_key) <= 10:
+            if len(item.title.lower().strip()) <= 10:
                 logger.debug(f"[新闻去重] 跳过标题过短的新闻: '{item.title}'，来源: {item.source}")
                 short_title_count += 1
                 continue
-                
-            # 检查是否重复
-            if title_key in seen_titles:
-                logger.debug(f"[新闻去重] 检测到重复新闻: '{item.title[:50]}...'，来源: {item.source}")
-                duplicate_count += 1
-                continue
-                
-            # 添加到结果集
-            seen_titles.add(title_key)
-            unique_news.append(item)
-        
+            candidates.append(item)
+
+        # 近似重复聚簇：转载时标题的细微改动也视为同一条新闻，每簇保留相关性最高的一条
+        unique_news = []
+        for cluster in get_near_duplicate_detector().deduplicate(
+                candidates, text_fn=lambda n: n.title, rank_fn=lambda n: n.relevance_score):
+            item = cluster['item']
+            members = cluster['members']
+            if len(members) > 1:
+                logger.debug(f"[新闻去重] 合并 {len(members) - 1} 条近似重复新闻: '{item.title[:50]}...'")
+            # 生成副本，避免重复去重时对同一对象累加计数
+            unique_news.append(replace(
+                item,
+                source_count=sum(member.source_count for member in members),
+                sources=list(dict.fromkeys(
+                    source for member in members for source in (member.sources or [member.source]))),
+            ))
+        duplicate_count = len(candidates) - len(unique_news)
+
         # 记录去重结果
         time_taken = (datetime.now() - start_time).total_seconds()
         logger.info(f"[新闻去重] 去重完成，原始新闻: {len(news_items)}条，去重后: {len(unique_news)}条，")
@@ -638,6 +771,13 @@ class RealtimeNewsAggregator:
         
         return unique_news
     
+    @staticmethod
+    def _format_sources(news: NewsItem) -> str:
+        """来源说明，多家媒体报道同一新闻时注明报道数量"""
+        if news.source_count <= 1:
+            return news.source
+        return f"{news.source} 等{news.source_count}条报道"
+
     def format_news_report(self, news_items: List[NewsItem], ticker: str) -> str:
         """格式化新闻报告"""
         logger.info(f"[新闻报告] 开始为 {ticker} 生成新闻报告")
@@ -675,14 +815,14 @@ class RealtimeNewsAggregator:
             report += "## 🚨 紧急新闻\n\n"
             for news in high_urgency[:3]:  # 最多显示3条
                 report += f"### {news.title}\n"
-                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}\n"
+                report += f"**来源**: {self._format_sources(news)} | **时间**: {news.publish_time.strftime('%H:%M')}\n"
                 report += f"{news.content}\n\n"
         
         if medium_urgency:
             report += "## 📢 重要新闻\n\n"
             for news in medium_urgency[:5]:  # 最多显示5条
                 report += f"### {news.title}\n"
-                report += f"**来源**: {news.source} | **时间**: {news.publish_time.strftime('%H:%M')}\n"
+                report += f"**来源**: {self._format_sources(news)} | **时间**: {news.publish_time.strftime('%H:%M')}\n"
                 report += f"{news.content}\n\n"
         
         # 添加时效性说明
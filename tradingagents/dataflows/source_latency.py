@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+数据源延迟统计
+记录每个数据源最近的调用耗时和成功/失败情况，用于：
+- 对冲请求：主数据源超过其 p95 延迟仍未返回时，并行启动下一个数据源
+- 自动排序：按“期望成功耗时”（中位延迟 / 成功率）排列数据源
+- 统计展示：按耗时区间的直方图和错误率
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+# 直方图区间上限（秒）
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 30, float('inf'))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class SourceLatencyTracker:
+    """按数据源记录最近的延迟和错误"""
+
+    def __init__(self, window: int = 200, min_samples: int = 5, default_delay: float = 3.0,
+                 min_delay: float = 0.5, max_delay: float = 10.0):
+        """
+        Args:
+            window: 每个数据源保留的最近调用次数
+            min_samples: 少于该次数时使用 default_delay，排序时保持默认顺序
+            default_delay: 没有足够统计时的对冲等待时间（秒）
+            min_delay / max_delay: 对冲等待时间的上下限（秒）
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._outcomes: Dict[str, deque] = {}
+        self._histograms: Dict[str, List[int]] = {}
+
+    def record(self, source: str, duration: float, success: bool):
+        """记录一次调用"""
+        with self._lock:
+            outcomes = self._outcomes.setdefault(source, deque(maxlen=self.window))
+            outcomes.append(bool(success))
+            histogram = self._histograms.setdefault(source, [0] * len(LATENCY_BUCKETS))
+            histogram[next(i for i, bound in enumerate(LATENCY_BUCKETS) if duration <= bound)] += 1
+            if success:
+                self._latencies.setdefault(source, deque(maxlen=self.window)).append(duration)
+
+    def latency_percentile(self, source: str, q: float) -> Optional[float]:
+        """成功调用耗时的分位数；样本不足时返回None"""
+        with self._lock:
+            latencies = list(self._latencies.get(source, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        return _percentile(latencies, q)
+
+    def error_rate(self, source: str) -> float:
+        with self._lock:
+            outcomes = list(self._outcomes.get(source, ()))
+        if not outcomes:
+            return 0.0
+        return outcomes.count(False) / len(outcomes)
+
+    def hedge_delay(self, source: str) -> float:
+        """等待该数据源多久后启动下一个数据源：取其 p95 延迟，限制在上下限之内"""
+        p95 = self.latency_percentile(source, 0.95)
+        if p95 is None:
+            return self.default_delay
+        return min(self.max_delay, max(self.min_delay, p95))
+
+    def expected_latency(self, source: str) -> float:
+        """期望成功耗时：中位延迟 / 成功率；样本不足时按默认等待时间估计"""
+        p50 = self.latency_percentile(source, 0.5)
+        if p50 is None:
+            p50 = self.default_delay
+        return p50 / max(1.0 - self.error_rate(source), 0.05)
+
+    def rank(self, sources: Iterable) -> List:
+        """按期望成功耗时排序，相同时保持传入顺序；sources 可以是枚举（使用 .value）或字符串"""
+        sources = list(sources)
+
+        def key(item):
+            index, source = item
+            return self.expected_latency(getattr(source, 'value', source)), index
+
+        return [source for _, source in sorted(enumerate(sources), key=key)]
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """各数据源的延迟分位数、错误率和耗时直方图"""
+        with self._lock:
+            sources = list(self._outcomes)
+            histograms = {source: list(counts) for source, counts in self._histograms.items()}
+        stats = {}
+        for source in sources:
+            labels = [f"<={bound}s" if bound != float('inf') else f">{LATENCY_BUCKETS[-2]}s"
+                      for bound in LATENCY_BUCKETS]
+            stats[source] = {
+                'calls': sum(histograms.get(source, [])),
+                'error_rate': round(self.error_rate(source), 4),
+                'p50': self.latency_percentile(source, 0.5),
+                'p95': self.latency_percentile(source, 0.95),
+                'hedge_delay': self.hedge_delay(source),
+                'histogram': dict(zip(labels, histograms.get(source, []))),
+            }
+        return stats
@@ -1,12 +1,87 @@
 import pandas as pd
 import yfinance as yf
 from stockstats import wrap
-from typing import Annotated
+from typing import Annotated, Dict, List, Union
 import os
 from .config import get_config
+from .price_frame_store import get_price_frame_store
+
+
+NOT_TRADING_DAY = "N/A: Not a trading day (weekend or holiday)"
 
 
 class StockstatsUtils:
+    @staticmethod
+    def _get_price_frame(symbol: str, data_dir: str, online: bool = False) -> pd.DataFrame:
+        """从进程内价格数据存储获取共享的、以日期为索引的数据帧（只读）"""
+        store = get_price_frame_store()
+
+        if not online:
+            data_file = os.path.join(
+                data_dir,
+                f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
+            )
+            try:
+                return store.get_frame(symbol, "yfin", "2015-01-01-2025-03-25", data_file)
+            except FileNotFoundError:
+                raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
+
+        # Get today's date as YYYY-mm-dd to add to cache
+        today_date = pd.Timestamp.today()
+
+        end_date = today_date
+        start_date = today_date - pd.DateOffset(years=15)
+        start_date = start_date.strftime("%Y-%m-%d")
+        end_date = end_date.strftime("%Y-%m-%d")
+
+        # Get config and ensure cache directory exists
+        config = get_config()
+        os.makedirs(config["data_cache_dir"], exist_ok=True)
+
+        data_file = os.path.join(
+            config["data_cache_dir"],
+            f"{symbol}-YFin-data-{start_date}-{end_date}.csv",
+        )
+
+        if not os.path.exists(data_file):
+            data = yf.download(
+                symbol,
+                start=start_date,
+                end=end_date,
+                multi_level_index=False,
+                progress=False,
+                auto_adjust=True,
+            )
+            data = data.reset_index()
+            data.to_csv(data_file, index=False)
+
+        return store.get_frame(symbol, "yfin_online", f"{start_date}-{end_date}", data_file)
+
+    @staticmethod
+    def load_price_data(
+        symbol: Annotated[str, "ticker symbol for the company"],
+        data_dir: Annotated[
+            str,
+            "directory where the stock data is stored.",
+        ],
+        online: Annotated[
+            bool,
+            "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
+        ] = False,
+    ) -> pd.DataFrame:
+        """
+        读取（或在线下载）股票价格数据，返回未经stockstats包装的DataFrame副本
+
+        离线模式读取本地YFin CSV；在线模式使用data_cache_dir下按日期命名的缓存文件，
+        缓存不存在时通过yfinance下载并写入缓存。CSV经由进程内价格数据存储读取，
+        同一文件只解析一次。在线模式下Date列为datetime类型，与下载的数据一致。
+        """
+        frame = StockstatsUtils._get_price_frame(symbol, data_dir, online=online)
+        data = frame.copy()
+        if online:
+            data["Date"] = frame.index
+        return data.reset_index(drop=True)
+
     @staticmethod
     def get_stock_stats(
         symbol: Annotated[str, "ticker symbol for the company"],
@@ -25,57 +100,11 @@ class StockstatsUtils:
             "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
         ] = False,
     ):
-        df = None
-        data = None
-
-        if not online:
-            try:
-                data = pd.read_csv(
-                    os.path.join(
-                        data_dir,
-                        f"{symbol}-YFin-data-2015-01-01-2025-03-25.csv",
-                    )
-                )
-                df = wrap(data)
-            except FileNotFoundError:
-                raise Exception("Stockstats fail: Yahoo Finance data not fetched yet!")
-        else:
-            # Get today's date as YYYY-mm-dd to add to cache
-            today_date = pd.Timestamp.today()
-            curr_date = pd.to_datetime(curr_date)
-
-            end_date = today_date
-            start_date = today_date - pd.DateOffset(years=15)
-            start_date = start_date.strftime("%Y-%m-%d")
-            end_date = end_date.strftime("%Y-%m-%d")
-
-            # Get config and ensure cache directory exists
-            config = get_config()
-            os.makedirs(config["data_cache_dir"], exist_ok=True)
-
-            data_file = os.path.join(
-                config["data_cache_dir"],
-                f"{symbol}-YFin-data-{start_date}-{end_date}.csv",
-            )
-
-            if os.path.exists(data_file):
-                data = pd.read_csv(data_file)
-                data["Date"] = pd.to_datetime(data["Date"])
-            else:
-                data = yf.download(
-                    symbol,
-                    start=start_date,
-                    end=end_date,
-                    multi_level_index=False,
-                    progress=False,
-                    auto_adjust=True,
-                )
-                data = data.reset_index()
-                data.to_csv(data_file, index=False)
-
-            df = wrap(data)
+        data = StockstatsUtils.load_price_data(symbol, data_dir, online=online)
+        df = wrap(data)
+        if online:
             df["Date"] = df["Date"].dt.strftime("%Y-%m-%d")
-            curr_date = curr_date.strftime("%Y-%m-%d")
+            curr_date = pd.to_datetime(curr_date).strftime("%Y-%m-%d")
 
         df[indicator]  # trigger stockstats to calculate the indicator
         matching_rows = df[df["Date"].str.startswith(curr_date)]
@@ -84,4 +113,52 @@ class StockstatsUtils:
             indicator_value = matching_rows[indicator].values[0]
             return indicator_value
         else:
-            return "N/A: Not a trading day (weekend or holiday)"
+            return NOT_TRADING_DAY
+
+    @staticmethod
+    def get_stock_stats_window(
+        symbol: Annotated[str, "ticker symbol for the company"],
+        indicators: Annotated[
+            Union[str, List[str]],
+            "one or more quantitative indicators to compute in a single pass",
+        ],
+        start_date: Annotated[str, "window start date, YYYY-mm-dd"],
+        end_date: Annotated[str, "window end date, YYYY-mm-dd"],
+        data_dir: Annotated[
+            str,
+            "directory where the stock data is stored.",
+        ],
+        online: Annotated[
+            bool,
+            "whether to use online tools to fetch data or offline tools. If True, will use online tools.",
+        ] = False,
+    ) -> Dict[str, Dict[str, object]]:
+        """
+        一次性计算窗口内的指标值
+
+        价格数据只读取一次，每个指标序列只计算一次，然后按日期切出窗口。
+        返回 {indicator: {"YYYY-mm-dd": value}}，只包含窗口内的交易日；
+        同一日期出现多行时与 get_stock_stats 一致，取第一行。
+        """
+        if isinstance(indicators, str):
+            indicators = [indicators]
+
+        frame = StockstatsUtils._get_price_frame(symbol, data_dir, online=online)
+        # 日期键直接取自已解析的索引，按位置与指标序列对齐
+        date_keys = frame.index.strftime("%Y-%m-%d").values
+        in_window = (date_keys >= start_date) & (date_keys <= end_date)
+        window_dates = date_keys[in_window]
+
+        data = frame.copy()
+        if online:
+            data["Date"] = date_keys
+        df = wrap(data.reset_index(drop=True))
+
+        results = {indicator: {} for indicator in indicators}
+        for indicator in indicators:
+            values = df[indicator].values[in_window]
+            series_values = results[indicator]
+            for date_key, value in zip(window_dates, values):
+                if date_key not in series_values:
+                    series_values[date_key] = value
+        return results
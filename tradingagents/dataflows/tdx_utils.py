@@ -6,8 +6,15 @@ Tushare数据接口数据获取工具
 
 import pandas as pd
 import numpy as np
+import atexit
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Callable, Any
 import warnings
 
 # 导入日志模块
@@ -51,14 +58,366 @@ except ImportError:
     logger.info(f"💡 安装命令: pip install pytdx")
 
 
+# 默认服务器列表（未找到 tdx_servers_config.json 时使用）
+DEFAULT_TDX_SERVERS = [
+    {'ip': '115.238.56.198', 'port': 7709},
+    {'ip': '115.238.90.165', 'port': 7709},
+    {'ip': '180.153.18.170', 'port': 7709},
+    {'ip': '119.147.212.81', 'port': 7709},  # 备用
+]
+
+
+class _PooledConnection:
+    """连接池中的单个连接"""
+
+    def __init__(self, api, server: Dict):
+        self.api = api
+        self.server = server
+        self.created_at = time.time()
+        self.last_used = self.created_at
+
+
+class TdxConnectionPool:
+    """通达信连接池
+
+    - 连接数不超过 max_size，分布在多个服务器上
+    - 新连接优先选择延迟低、当前连接少、近期无失败的服务器
+    - 后台线程定期探测服务器延迟，并对空闲连接做存活检查
+    - acquire/release 线程安全；推荐使用 with pool.connection() as api
+    """
+
+    def __init__(self, servers: List[Dict], max_size: int = 4,
+                 api_factory: Optional[Callable[[], Any]] = None,
+                 probe_interval: float = 30.0, probe_timeout: float = 3.0,
+                 start_prober: bool = True):
+        if not servers:
+            raise ValueError("通达信服务器列表为空")
+
+        self.max_size = max(1, int(max_size))
+        self.api_factory = api_factory or TdxHq_API
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+
+        self._servers = [
+            {'ip': server['ip'], 'port': int(server['port']),
+             'latency': None, 'failures': 0, 'active': 0}
+            for server in servers
+        ]
+        self._idle: List[_PooledConnection] = []
+        self._total = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._stats = {'created': 0, 'reused': 0, 'discarded': 0, 'wait_timeouts': 0}
+
+        self._prober = None
+        if start_prober and probe_interval > 0:
+            self._prober = threading.Thread(target=self._probe_loop, name="tdx-pool-prober", daemon=True)
+            self._prober.start()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def acquire(self, timeout: float = 10.0) -> _PooledConnection:
+        """
+        借出一个连接
+
+        Raises:
+            TimeoutError: 超时仍无可用连接
+            ConnectionError: 所有服务器都无法连接
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise ConnectionError("通达信连接池已关闭")
+                if self._idle:
+                    conn = self._idle.pop()
+                    conn.server['active'] += 1
+                    self._stats['reused'] += 1
+                    return conn
+                if self._total < self.max_size:
+                    self._total += 1
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._stats['wait_timeouts'] += 1
+                    raise TimeoutError(f"等待通达信连接超时 ({timeout}秒)")
+                self._cond.wait(remaining)
+
+        # 建立新连接放在锁外，避免阻塞其他线程归还连接
+        try:
+            conn = self._open_connection()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            conn.server['active'] += 1
+            self._stats['created'] += 1
+        return conn
+
+    def release(self, conn: _PooledConnection, broken: bool = False):
+        """归还连接；broken=True 时关闭该连接并记录服务器失败"""
+        with self._cond:
+            conn.server['active'] = max(0, conn.server['active'] - 1)
+            conn.last_used = time.time()
+            if broken:
+                conn.server['failures'] += 1
+            discard = broken or self._closed
+            if discard:
+                self._total -= 1
+                self._stats['discarded'] += 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+        if discard:
+            self._disconnect(conn)
+
+    @contextmanager
+    def connection(self, timeout: float = 10.0):
+        """借出连接的上下文管理器，调用过程中抛出异常时丢弃该连接"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn.api
+        except Exception:
+            self.release(conn, broken=True)
+            raise
+        else:
+            self.release(conn)
+
+    def ranked_servers(self) -> List[Dict]:
+        """按优先级排序的服务器列表：近期无失败 > 当前连接少 > 延迟低"""
+        with self._cond:
+            return sorted(self._servers, key=self._server_score)
+
+    def probe(self):
+        """执行一次探测：测量服务器延迟并检查空闲连接是否存活"""
+        for server in list(self._servers):
+            latency = self._measure_latency(server)
+            with self._cond:
+                if latency is None:
+                    server['failures'] += 1
+                else:
+                    # 指数平滑，避免单次抖动影响排序
+                    previous = server['latency']
+                    server['latency'] = latency if previous is None else previous * 0.7 + latency * 0.3
+                    server['failures'] = 0
+
+        # 检查中的连接视为已借出，仍计入 _total，避免并发 acquire 超出 max_size
+        with self._cond:
+            idle, self._idle = self._idle, []
+
+        healthy = []
+        for conn in idle:
+            if self._is_alive(conn):
+                healthy.append(conn)
+            else:
+                logger.debug(f"🔍 [DEBUG] 丢弃失效的通达信连接: {conn.server['ip']}:{conn.server['port']}")
+                self._disconnect(conn)
+
+        with self._cond:
+            stale = healthy if self._closed else []
+            if not self._closed:
+                self._idle.extend(healthy)
+            self._total -= len(idle) - len(healthy) + len(stale)
+            self._stats['discarded'] += len(idle) - len(healthy)
+            self._cond.notify_all()
+        for conn in stale:
+            self._disconnect(conn)
+
+    def add_servers(self, servers: List[Dict]) -> int:
+        """合并新的服务器（按 ip:port 去重），返回新增数量"""
+        with self._cond:
+            known = {(server['ip'], server['port']) for server in self._servers}
+            added = 0
+            for server in servers or []:
+                key = (server['ip'], int(server['port']))
+                if key in known:
+                    continue
+                known.add(key)
+                self._servers.append({'ip': key[0], 'port': key[1], 'latency': None, 'failures': 0, 'active': 0})
+                added += 1
+            return added
+
+    def close(self):
+        """关闭连接池和后台探测线程"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        self._stop_event.set()
+        for conn in idle:
+            self._disconnect(conn)
+
+    def get_stats(self) -> Dict:
+        """获取连接池统计信息"""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'total': self._total,
+                'idle': len(self._idle),
+                'in_use': self._total - len(self._idle),
+                'closed': self._closed,
+                'servers': [dict(server) for server in sorted(self._servers, key=self._server_score)],
+                **self._stats,
+            }
+
+    def _server_score(self, server: Dict):
+        latency = server['latency'] if server['latency'] is not None else float('inf')
+        return (server['failures'] > 0, server['active'], latency)
+
+    def _open_connection(self) -> _PooledConnection:
+        for server in self.ranked_servers():
+            api = self.api_factory()
+            start = time.time()
+            try:
+                result = api.connect(server['ip'], server['port'])
+            except Exception as e:
+                result = False
+                logger.debug(f"🔍 [DEBUG] 服务器 {server['ip']}:{server['port']} 连接异常: {e}")
+
+            with self._cond:
+                if result:
+                    elapsed = time.time() - start
+                    if server['latency'] is None:
+                        server['latency'] = elapsed
+                    server['failures'] = 0
+                else:
+                    server['failures'] += 1
+
+            if result:
+                logger.debug(f"🔍 [DEBUG] 新建通达信连接: {server['ip']}:{server['port']}")
+                return _PooledConnection(api, server)
+            logger.warning(f"⚠️ 服务器 {server['ip']}:{server['port']} 连接失败")
+
+        raise ConnectionError("所有数据服务器连接失败")
+
+    def _measure_latency(self, server: Dict) -> Optional[float]:
+        start = time.time()
+        try:
+            with socket.create_connection((server['ip'], server['port']), timeout=self.probe_timeout):
+                return time.time() - start
+        except OSError:
+            return None
+
+    @staticmethod
+    def _is_alive(conn: _PooledConnection) -> bool:
+        try:
+            result = conn.api.get_security_count(0)
+            return result is not None and result > 0
+        except Exception:
+            return False
+
+    @staticmethod
+    def _disconnect(conn: _PooledConnection):
+        try:
+            conn.api.disconnect()
+        except Exception:
+            pass
+
+    def _probe_loop(self):
+        while not self._stop_event.wait(self.probe_interval):
+            try:
+                self.probe()
+            except Exception as e:
+                logger.debug(f"🔍 [DEBUG] 通达信连接池探测失败: {e}")
+
+
+_tdx_pool = None
+_tdx_pool_lock = threading.Lock()
+
+
+def get_tdx_connection_pool(servers: Optional[List[Dict]] = None) -> TdxConnectionPool:
+    """获取全局通达信连接池（已关闭时重新创建）；连接池已存在时合并传入的新服务器"""
+    global _tdx_pool
+    with _tdx_pool_lock:
+        if _tdx_pool is None or _tdx_pool.closed:
+            pool_size = int(os.getenv('TRADINGAGENTS_TDX_POOL_SIZE', '4'))
+            _tdx_pool = TdxConnectionPool(servers or DEFAULT_TDX_SERVERS, max_size=pool_size)
+        elif servers:
+            added = _tdx_pool.add_servers(servers)
+            if added:
+                logger.info(f"📡 通达信连接池新增 {added} 个服务器")
+        return _tdx_pool
+
+
+def close_tdx_connection_pool():
+    """关闭全局通达信连接池（进程退出时自动调用）；单个提供器断开时不关闭共享连接池"""
+    global _tdx_pool
+    with _tdx_pool_lock:
+        pool, _tdx_pool = _tdx_pool, None
+    if pool is not None and not pool.closed:
+        pool.close()
+
+
+atexit.register(close_tdx_connection_pool)
+
+
+# 技术指标需要的最少K线数（MACD慢线周期）
+INDICATOR_WARMUP_BARS = 26
+# 每个提供器保留的最近K线数据份数
+RECENT_BARS_LIMIT = 32
+
+
+def calculate_technical_indicators(df: pd.DataFrame) -> Dict:
+    """
+    基于已获取的K线一次性计算所有技术指标（取最后一根K线的值）
+
+    Args:
+        df: 包含Close列、按时间升序排列的DataFrame
+    Returns:
+        Dict: MA5/MA10/MA20、RSI、MACD及布林带指标；数据不足的指标不返回或为None
+    """
+    close = df['Close'].astype(float)
+    n = len(close)
+    indicators = {}
+
+    # 移动平均线
+    for window in (5, 10, 20):
+        indicators[f'MA{window}'] = close.rolling(window).mean().iloc[-1] if n >= window else None
+
+    # RSI
+    if n >= 14:
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0).rolling(14).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        rs = gain / loss
+        indicators['RSI'] = (100 - (100 / (1 + rs))).iloc[-1]
+
+    # MACD
+    if n >= 26:
+        macd = close.ewm(span=12).mean() - close.ewm(span=26).mean()
+        signal = macd.ewm(span=9).mean()
+        indicators['MACD'] = macd.iloc[-1]
+        indicators['MACD_Signal'] = signal.iloc[-1]
+        indicators['MACD_Histogram'] = macd.iloc[-1] - signal.iloc[-1]
+
+    # 布林带
+    if n >= 20:
+        sma = indicators['MA20']
+        std = close.iloc[-20:].std()
+        indicators['BB_Upper'] = sma + 2 * std
+        indicators['BB_Middle'] = sma
+        indicators['BB_Lower'] = sma - 2 * std
+
+    return indicators
+
+
 class TongDaXinDataProvider:
     """通达信数据提供器"""
     
     def __init__(self):
         logger.debug(f"🔍 [DEBUG] 初始化通达信数据提供器...")
-        self.api = None
-        self.exapi = None  # 扩展行情API
+        self.pool = None  # 共享的通达信连接池
         self.connected = False
+        self._recent_bars = OrderedDict()  # 最近获取的未筛选K线，用于技术指标预热
+        self._recent_bars_lock = threading.Lock()
 
         logger.debug(f"🔍 [DEBUG] 检查pytdx库可用性: {TDX_AVAILABLE}")
         if not TDX_AVAILABLE:
@@ -68,7 +427,7 @@ class TongDaXinDataProvider:
         logger.debug(f"✅ [DEBUG] pytdx库检查通过")
     
     def connect(self):
-        """连接数据服务器"""
+        """连接数据服务器（初始化共享连接池并验证至少一个服务器可用）"""
         logger.debug(f"🔍 [DEBUG] 开始连接数据服务器...")
         try:
             # 尝试从配置文件加载可用服务器
@@ -78,36 +437,19 @@ class TongDaXinDataProvider:
             # 如果没有配置文件，使用默认服务器列表
             if not working_servers:
                 logger.debug(f"🔍 [DEBUG] 未找到配置文件，使用默认服务器列表")
-                working_servers = [
-                    {'ip': '115.238.56.198', 'port': 7709},
-                    {'ip': '115.238.90.165', 'port': 7709},
-                    {'ip': '180.153.18.170', 'port': 7709},
-                    {'ip': '119.147.212.81', 'port': 7709},  # 备用
-                ]
+                working_servers = DEFAULT_TDX_SERVERS
             else:
                 logger.debug(f"🔍 [DEBUG] 从配置文件加载了 {len(working_servers)} 个服务器")
 
-            # 尝试连接可用服务器
-            logger.debug(f"🔍 [DEBUG] 创建Tushare数据接口实例...")
-            self.api = TdxHq_API()
-            logger.debug(f"🔍 [DEBUG] 开始尝试连接服务器...")
+            self.pool = get_tdx_connection_pool(working_servers)
 
-            for i, server in enumerate(working_servers):
-                try:
-                    logger.debug(f"🔍 [DEBUG] 尝试连接服务器 {i+1}/{len(working_servers)}: {server['ip']}:{server['port']}")
-                    result = self.api.connect(server['ip'], server['port'])
-                    logger.debug(f"🔍 [DEBUG] 连接结果: {result}")
-                    if result:
-                        logger.info(f"✅ Tushare数据接口连接成功: {server['ip']}:{server['port']}")
-                        self.connected = True
-                        return True
-                except Exception as e:
-                    logger.error(f"⚠️ 服务器 {server['ip']}:{server['port']} 连接失败: {e}")
-                    continue
+            # 借出并归还一个连接，验证至少一个服务器可用
+            with self.pool.connection():
+                pass
 
-            logger.error(f"❌ 所有数据服务器连接失败")
-            self.connected = False
-            return False
+            logger.info(f"✅ Tushare数据接口连接成功，连接池服务器数: {len(working_servers)}")
+            self.connected = True
+            return True
 
         except Exception as e:
             logger.error(f"❌ Tushare数据接口连接失败: {e}")
@@ -129,13 +471,14 @@ class TongDaXinDataProvider:
             pass
         return []
     
+    def _connection(self):
+        """从连接池借出一个连接（上下文管理器）"""
+        return self.pool.connection()
+
     def disconnect(self):
-        """断开连接"""
+        """断开连接（只释放对共享连接池的引用，连接池由 close_tdx_connection_pool 关闭）"""
         try:
-            if self.api:
-                self.api.disconnect()
-            if self.exapi:
-                self.exapi.disconnect()
+            self.pool = None
             self.connected = False
             logger.info(f"✅ Tushare数据接口连接已断开")
         except:
@@ -143,13 +486,14 @@ class TongDaXinDataProvider:
 
     def is_connected(self):
         """检查连接状态"""
-        if not self.connected or not self.api:
+        if not self.connected or not self.pool or self.pool.closed:
             return False
 
         # 尝试简单的API调用来验证连接是否有效
         try:
             # 获取市场信息作为连接测试
-            result = self.api.get_security_count(0)  # 获取深圳市场股票数量
+            with self._connection() as api:
+                result = api.get_security_count(0)  # 获取深圳市场股票数量
             return result is not None and result > 0
         except Exception as e:
             logger.error(f"🔍 [DEBUG] 连接测试失败: {e}")
@@ -195,15 +539,16 @@ class TongDaXinDataProvider:
             market = self._get_market_code(stock_code)
             if market == 0:  # 深圳市场
                 try:
-                    for start_pos in range(0, 2000, 1000):  # 分批获取
-                        stock_list = self.api.get_security_list(market, start_pos)
-                        if stock_list:
-                            for stock_info in stock_list:
-                                if stock_info.get('code') == stock_code:
-                                    stock_name = stock_info.get('name', '').strip()
-                                    if stock_name:
-                                        _stock_name_cache[stock_code] = stock_name
-                                        return stock_name
+                    with self._connection() as api:
+                        for start_pos in range(0, 2000, 1000):  # 分批获取
+                            stock_list = api.get_security_list(market, start_pos)
+                            if stock_list:
+                                for stock_info in stock_list:
+                                    if stock_info.get('code') == stock_code:
+                                        stock_name = stock_info.get('name', '').strip()
+                                        if stock_name:
+                                            _stock_name_cache[stock_code] = stock_name
+                                            return stock_name
                 except Exception as e:
                     logger.error(f"⚠️ 获取深圳股票列表失败: {e}")
             
@@ -234,7 +579,8 @@ class TongDaXinDataProvider:
             market = self._get_market_code(stock_code)
             
             # 获取实时数据
-            data = self.api.get_security_quotes([(market, stock_code)])
+            with self._connection() as api:
+                data = api.get_security_quotes([(market, stock_code)])
 
             if not data:
                 return {}
@@ -284,8 +630,6 @@ class TongDaXinDataProvider:
                 return pd.DataFrame()
         
         try:
-            market = self._get_market_code(stock_code)
-            
             # 计算需要获取的数据量
             start_dt = datetime.strptime(start_date, '%Y-%m-%d')
             end_dt = datetime.strptime(end_date, '%Y-%m-%d')
@@ -305,95 +649,148 @@ class TongDaXinDataProvider:
             category_map = {'D': 9, 'W': 5, 'M': 6}
             category = category_map.get(period, 9)
             
-            data = self.api.get_security_bars(category, market, stock_code, 0, count)
+            df = self._fetch_bars(stock_code, category, 0, count)
             
-            if not data:
+            if df.empty:
                 return pd.DataFrame()
             
-            # 转换为DataFrame
-            df = pd.DataFrame(data)
-            
-            # 处理数据格式
-            df['datetime'] = pd.to_datetime(df['datetime'])
-            df = df.set_index('datetime')
-            df = df.sort_index()
+            # 保留未筛选的K线，计算技术指标时用作预热数据，避免再次请求
+            self._remember_bars(stock_code, category, df, fetched=count)
             
             # 筛选日期范围
-            df = df[start_date:end_date]
-            
-            # 重命名列以匹配Yahoo Finance格式
-            df = df.rename(columns={
-                'open': 'Open',
-                'high': 'High', 
-                'low': 'Low',
-                'close': 'Close',
-                'vol': 'Volume',
-                'amount': 'Amount'
-            })
-            
-            # 添加股票代码信息
-            df['Symbol'] = stock_code
-            
-            return df
+            return df[start_date:end_date]
             
         except Exception as e:
             logger.error(f"获取历史数据失败: {e}")
             return pd.DataFrame()
+
+    def _fetch_bars(self, stock_code: str, category: int, start: int, count: int) -> pd.DataFrame:
+        """
+        获取K线并转换为Yahoo Finance格式的DataFrame
+
+        Args:
+            start: 距最新一根K线的偏移量（0表示从最新开始向前）
+            count: 获取数量
+        """
+        market = self._get_market_code(stock_code)
+        with self._connection() as api:
+            data = api.get_security_bars(category, market, stock_code, start, count)
+
+        if not data:
+            return pd.DataFrame()
+
+        # 转换为DataFrame
+        df = pd.DataFrame(data)
+
+        # 处理数据格式
+        df['datetime'] = pd.to_datetime(df['datetime'])
+        df = df.set_index('datetime')
+        df = df.sort_index()
+
+        # 重命名列以匹配Yahoo Finance格式
+        df = df.rename(columns={
+            'open': 'Open',
+            'high': 'High', 
+            'low': 'Low',
+            'close': 'Close',
+            'vol': 'Volume',
+            'amount': 'Amount'
+        })
+
+        # 添加股票代码信息
+        df['Symbol'] = stock_code
+
+        return df
+
+    def _remember_bars(self, stock_code: str, category: int, df: pd.DataFrame, fetched: int):
+        """记录最近获取的K线；fetched为已请求的、从最新K线起算的数量"""
+        key = (stock_code, category)
+        with self._recent_bars_lock:
+            self._recent_bars.pop(key, None)
+            self._recent_bars[key] = {'frame': df, 'fetched': fetched,
+                                      'fetched_on': datetime.now().date()}
+            while len(self._recent_bars) > RECENT_BARS_LIMIT:
+                self._recent_bars.popitem(last=False)
+
+    def _get_recent_bars(self, stock_code: str, category: int) -> Optional[Dict]:
+        """获取当天记录的K线；之前交易日的记录已有新K线生成，偏移量失效，直接丢弃"""
+        key = (stock_code, category)
+        with self._recent_bars_lock:
+            recent = self._recent_bars.get(key)
+            if recent is not None and recent['fetched_on'] != datetime.now().date():
+                del self._recent_bars[key]
+                return None
+            return recent
+
+    def _get_warmup_history(self, stock_code: str, history: pd.DataFrame, min_bars: int,
+                            category: int = 9) -> pd.DataFrame:
+        """
+        为已获取的历史数据补足指标预热所需的K线
+
+        优先使用 get_stock_history_data 留下的未筛选K线；仍不足时只增量获取缺少的更早K线。
+        """
+        if len(history) >= min_bars:
+            return history
+
+        first_bar, last_bar = history.index[0], history.index[-1]
+        recent = self._get_recent_bars(stock_code, category)
+        if recent is None:
+            # 没有可用的原始K线（历史数据来自外部），一次性获取覆盖预热期的K线
+            bars = self._fetch_bars(stock_code, category, 0, min(800, min_bars + 40))
+            if bars.empty:
+                return history
+            self._remember_bars(stock_code, category, bars, fetched=min(800, min_bars + 40))
+            recent = self._get_recent_bars(stock_code, category)
+
+        bars = recent['frame']
+        earlier = bars[bars.index < first_bar]
+        missing = min_bars - len(history) - len(earlier)
+        # 已有K线少于请求数量时说明没有更早的数据
+        if missing > 0 and len(bars) >= recent['fetched'] and recent['fetched'] < 800:
+            fetched = min(800, recent['fetched'] + missing)
+            # 多取一根与已有最早K线重叠，用于确认偏移量没有因新K线生成而变化
+            extra = self._fetch_bars(stock_code, category, recent['fetched'] - 1, fetched - recent['fetched'] + 1)
+            if not extra.empty and extra.index[-1] == bars.index[0]:
+                bars = pd.concat([extra, bars])
+                bars = bars[~bars.index.duplicated(keep='last')].sort_index()
+            else:
+                # 偏移量已变化，从最新K线起重新获取整个窗口（多取10根容纳新生成的K线），避免预热数据中出现缺口
+                fetched = min(800, fetched + 10)
+                logger.debug(f"🔍 [DEBUG] {stock_code} K线偏移量已变化，重新获取 {fetched} 根K线")
+                bars = self._fetch_bars(stock_code, category, 0, fetched)
+            if not bars.empty:
+                self._remember_bars(stock_code, category, bars, fetched=fetched)
+                earlier = bars[bars.index < first_bar]
+
+        warmup = earlier.tail(max(0, min_bars - len(history)))
+        return pd.concat([warmup, history[history.index <= last_bar]])
     
-    def get_stock_technical_indicators(self, stock_code: str, period: int = 20) -> Dict:
+    def get_stock_technical_indicators(self, stock_code: str, period: int = 20,
+                                       history: Optional[pd.DataFrame] = None) -> Dict:
         """
         计算技术指标
         Args:
             stock_code: 股票代码
-            period: 计算周期
+            period: 计算周期（未提供history时用于确定获取的数据范围）
+            history: 已获取的历史数据（get_stock_history_data的返回值），
+                     提供时直接基于该数据计算，预热K线不足时只增量补取
         Returns:
             Dict: 技术指标数据
         """
         try:
-            # 获取最近的历史数据
-            end_date = datetime.now().strftime('%Y-%m-%d')
-            start_date = (datetime.now() - timedelta(days=period*2)).strftime('%Y-%m-%d')
-            
-            df = self.get_stock_history_data(stock_code, start_date, end_date)
-            
+            if history is not None and not history.empty:
+                df = self._get_warmup_history(stock_code, history, INDICATOR_WARMUP_BARS)
+            else:
+                # 获取最近的历史数据
+                end_date = datetime.now().strftime('%Y-%m-%d')
+                start_date = (datetime.now() - timedelta(days=period*2)).strftime('%Y-%m-%d')
+
+                df = self.get_stock_history_data(stock_code, start_date, end_date)
+
             if df.empty:
                 return {}
-            
-            # 计算技术指标
-            indicators = {}
-            
-            # 移动平均线
-            indicators['MA5'] = df['Close'].rolling(5).mean().iloc[-1] if len(df) >= 5 else None
-            indicators['MA10'] = df['Close'].rolling(10).mean().iloc[-1] if len(df) >= 10 else None
-            indicators['MA20'] = df['Close'].rolling(20).mean().iloc[-1] if len(df) >= 20 else None
-            
-            # RSI
-            if len(df) >= 14:
-                delta = df['Close'].diff()
-                gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-                loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-                rs = gain / loss
-                indicators['RSI'] = (100 - (100 / (1 + rs))).iloc[-1]
-            
-            # MACD
-            if len(df) >= 26:
-                exp1 = df['Close'].ewm(span=12).mean()
-                exp2 = df['Close'].ewm(span=26).mean()
-                macd = exp1 - exp2
-                signal = macd.ewm(span=9).mean()
-                indicators['MACD'] = macd.iloc[-1]
-                indicators['MACD_Signal'] = signal.iloc[-1]
-                indicators['MACD_Histogram'] = (macd - signal).iloc[-1]
-            
-            # 布林带
-            if len(df) >= 20:
-                sma = df['Close'].rolling(20).mean()
-                std = df['Close'].rolling(20).std()
-                indicators['BB_Upper'] = (sma + 2 * std).iloc[-1]
-                indicators['BB_Middle'] = sma.iloc[-1]
-                indicators['BB_Lower'] = (sma - 2 * std).iloc[-1]
-            
-            return indicators
+
+            return calculate_technical_indicators(df)
             
         except Exception as e:
             logger.error(f"计算技术指标失败: {e}")
@@ -482,19 +879,20 @@ class TongDaXinDataProvider:
             
             market_data = {}
             
-            for name, (market, code) in indices.items():
-                try:
-                    data = self.api.get_security_quotes([(int(market), code)])
-                    if data:
-                        quote = data[0]
-                        market_data[name] = {
-                            'price': quote['price'],
-                            'change': quote['price'] - quote['last_close'],
-                            'change_percent': ((quote['price'] - quote['last_close']) / quote['last_close'] * 100) if quote['last_close'] > 0 else 0,
-                            'volume': quote['vol']
-                        }
-                except:
-                    continue
+            with self._connection() as api:
+                for name, (market, code) in indices.items():
+                    try:
+                        data = api.get_security_quotes([(int(market), code)])
+                        if data:
+                            quote = data[0]
+                            market_data[name] = {
+                                'price': quote['price'],
+                                'change': quote['price'] - quote['last_close'],
+                                'change_percent': ((quote['price'] - quote['last_close']) / quote['last_close'] * 100) if quote['last_close'] > 0 else 0,
+                                'volume': quote['vol']
+                            }
+                    except:
+                        continue
             
             return market_data
             
@@ -696,7 +1094,7 @@ def get_china_stock_data(stock_code: str, start_date: str, end_date: str) -> str
         realtime_data = provider.get_real_time_data(stock_code)
 
         # 获取技术指标
-        indicators = provider.get_stock_technical_indicators(stock_code)
+        indicators = provider.get_stock_technical_indicators(stock_code, history=df)
         
         # 格式化输出
         result = f"""
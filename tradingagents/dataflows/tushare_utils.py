@@ -28,6 +28,8 @@ except ImportError:
     CACHE_AVAILABLE = False
     logger.warning("⚠️ 缓存管理器不可用")
 
+from .range_bar_store import get_range_bar_store
+
 # 导入Tushare
 try:
     import tushare as ts
@@ -206,11 +208,24 @@ class TushareProvider:
 
             # 获取日线数据
             try:
-                data = self.api.daily(
-                    ts_code=ts_code,
-                    start_date=start_date,
-                    end_date=end_date
-                )
+                if self.enable_cache:
+                    # 原始日线按区间存储，只请求尚未覆盖的日期缺口；复权在切片后计算
+                    data = get_range_bar_store().get_bars(
+                        ts_code, start_date, end_date,
+                        fetch_fn=lambda code, gap_start, gap_end: self.api.daily(
+                            ts_code=code,
+                            start_date=gap_start.replace('-', ''),
+                            end_date=gap_end.replace('-', '')
+                        ),
+                        source="tushare_daily",
+                        date_column="trade_date"
+                    )
+                else:
+                    data = self.api.daily(
+                        ts_code=ts_code,
+                        start_date=start_date,
+                        end_date=end_date
+                    )
                 api_duration = time.time() - api_start_time
                 logger.info(f"🔍 [Tushare详细日志] API调用完成，耗时: {api_duration:.3f}秒")
 
@@ -299,65 +314,8 @@ class TushareProvider:
         Returns:
             DataFrame: 包含前复权价格的数据
         """
-        if data.empty or 'pct_chg' not in data.columns:
-            logger.warning("⚠️ 数据为空或缺少pct_chg列，无法计算前复权价格")
-            return data
-
-        try:
-            # 复制数据避免修改原始数据
-            adjusted_data = data.copy()
-
-            # 确保数据按日期排序
-            adjusted_data = adjusted_data.sort_values('trade_date').reset_index(drop=True)
-
-            # 保存原始价格列（用于对比）
-            adjusted_data['close_raw'] = adjusted_data['close'].copy()
-            adjusted_data['open_raw'] = adjusted_data['open'].copy()
-            adjusted_data['high_raw'] = adjusted_data['high'].copy()
-            adjusted_data['low_raw'] = adjusted_data['low'].copy()
-
-            # 从最新的收盘价开始，向前计算前复权价格
-            # 使用最后一天的收盘价作为基准
-            latest_close = float(adjusted_data.iloc[-1]['close'])
-
-            # 计算前复权收盘价
-            adjusted_closes = [latest_close]
-
-            # 从倒数第二天开始向前计算
-            for i in range(len(adjusted_data) - 2, -1, -1):
-                pct_change = float(adjusted_data.iloc[i + 1]['pct_chg']) / 100.0  # 转换为小数
-
-                # 前一天的前复权收盘价 = 今天的前复权收盘价 / (1 + 今天的涨跌幅)
-                prev_close = adjusted_closes[0] / (1 + pct_change)
-                adjusted_closes.insert(0, prev_close)
-
-            # 更新收盘价
-            adjusted_data['close'] = adjusted_closes
-
-            # 计算其他价格的调整比例
-            for i in range(len(adjusted_data)):
-                if adjusted_data.iloc[i]['close_raw'] != 0:  # 避免除零
-                    # 计算调整比例
-                    adjustment_ratio = adjusted_data.iloc[i]['close'] / adjusted_data.iloc[i]['close_raw']
-
-                    # 应用调整比例到其他价格
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('open')] = adjusted_data.iloc[i]['open_raw'] * adjustment_ratio
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('high')] = adjusted_data.iloc[i]['high_raw'] * adjustment_ratio
-                    adjusted_data.iloc[i, adjusted_data.columns.get_loc('low')] = adjusted_data.iloc[i]['low_raw'] * adjustment_ratio
-
-            # 添加标记表示这是前复权价格
-            adjusted_data['price_type'] = 'forward_adjusted'
-
-            logger.info(f"✅ 前复权价格计算完成，数据条数: {len(adjusted_data)}")
-            logger.info(f"📊 价格调整范围: 最早调整比例 {adjusted_data.iloc[0]['close'] / adjusted_data.iloc[0]['close_raw']:.4f}")
-
-            return adjusted_data
+        return calculate_adjusted_prices(data, adjust='forward')
 
-        except Exception as e:
-            logger.error(f"❌ 前复权价格计算失败: {e}")
-            logger.error(f"❌ 返回原始数据")
-            return data
-    
     def get_stock_info(self, symbol: str) -> Dict:
         """
         获取股票基本信息
@@ -546,6 +504,92 @@ class TushareProvider:
             return pd.DataFrame()
 
 
+def calculate_adjusted_prices(data: pd.DataFrame, adjust: str = 'forward',
+                              group_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    基于pct_chg计算复权价格（向量化实现）
+
+    前复权以每只股票最新一天的收盘价为基准向前推算：
+        前一天复权收盘价 = 当天复权收盘价 / (1 + 当天涨跌幅)
+    即 close_adj[i] = close[-1] / prod(1 + pct_chg[j] / 100, j > i)。
+    后复权以最早一天的收盘价为基准向后推算：
+        close_adj[i] = close[0] * prod(1 + pct_chg[j] / 100, 0 < j <= i)。
+    开盘/最高/最低价按当日 复权收盘价 / 原始收盘价 的比例调整（原始收盘价为0时保持不变）。
+
+    Args:
+        data: 包含 trade_date、open/high/low/close 和 pct_chg 的DataFrame
+        adjust: 'forward'（前复权）或 'backward'（后复权）
+        group_column: 多只股票合并在一个DataFrame中时的分组列（如 ts_code），
+                      为None时视为单只股票
+
+    Returns:
+        DataFrame: 按(分组列,)trade_date排序、索引重置的复权数据，
+                   附加 close_raw/open_raw/high_raw/low_raw 和 price_type 列
+    """
+    if data.empty or 'pct_chg' not in data.columns:
+        logger.warning("⚠️ 数据为空或缺少pct_chg列，无法计算复权价格")
+        return data
+
+    if adjust not in ('forward', 'backward'):
+        raise ValueError(f"不支持的复权方式: {adjust}，可选 'forward' 或 'backward'")
+
+    try:
+        sort_columns = [group_column, 'trade_date'] if group_column else ['trade_date']
+        adjusted_data = data.sort_values(sort_columns, kind='mergesort').reset_index(drop=True)
+
+        # 保存原始价格列（用于对比）
+        for col in ('close', 'open', 'high', 'low'):
+            adjusted_data[f'{col}_raw'] = adjusted_data[col].copy()
+
+        close_raw = adjusted_data['close_raw'].to_numpy(dtype=float)
+        growth = 1.0 + adjusted_data['pct_chg'].to_numpy(dtype=float) / 100.0
+        adjusted_closes = np.full(len(adjusted_data), np.nan)
+
+        if group_column:
+            segments = adjusted_data.groupby(group_column, sort=False).indices.values()
+        else:
+            segments = [np.arange(len(adjusted_data))]
+
+        for rows in segments:
+            # 排序后每组的行是连续的，用切片避免花式索引的拷贝
+            start, stop = rows[0], rows[-1] + 1
+            seg_growth = growth[start:stop]
+            if adjust == 'forward':
+                # factor[i] = prod(growth[j], j > i)，最后一天为1
+                factor = np.ones(stop - start)
+                factor[:-1] = np.cumprod(seg_growth[:0:-1])[::-1]
+                adjusted_closes[start:stop] = close_raw[stop - 1] / factor
+            else:
+                # factor[i] = prod(growth[j], 0 < j <= i)，第一天为1
+                factor = np.ones(stop - start)
+                factor[1:] = np.cumprod(seg_growth[1:])
+                adjusted_closes[start:stop] = close_raw[start] * factor
+
+        adjusted_data['close'] = adjusted_closes
+
+        # 按比例调整其他价格，原始收盘价为0的行保持不变
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(close_raw != 0, adjusted_closes / close_raw, np.nan)
+        has_ratio = close_raw != 0
+        for col in ('open', 'high', 'low'):
+            raw_values = adjusted_data[f'{col}_raw'].to_numpy(dtype=float)
+            adjusted_data[col] = np.where(has_ratio, raw_values * ratio, raw_values)
+
+        # 添加标记表示复权类型
+        adjusted_data['price_type'] = f'{adjust}_adjusted'
+
+        adjust_name = '前复权' if adjust == 'forward' else '后复权'
+        logger.info(f"✅ {adjust_name}价格计算完成，数据条数: {len(adjusted_data)}")
+        logger.info(f"📊 价格调整范围: 最早调整比例 {adjusted_data.iloc[0]['close'] / adjusted_data.iloc[0]['close_raw']:.4f}")
+
+        return adjusted_data
+
+    except Exception as e:
+        logger.error(f"❌ 复权价格计算失败: {e}")
+        logger.error(f"❌ 返回原始数据")
+        return data
+
+
 # 全局提供器实例
 _tushare_provider = None
 
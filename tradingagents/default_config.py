@@ -17,6 +17,24 @@ DEFAULT_CONFIG = {
     "max_debate_rounds": 1,
     "max_risk_discuss_rounds": 1,
     "max_recur_limit": 100,
+    # 每个节点辩论历史的token预算（按2字符/token估算，不含报告前缀），超出时较早的发言替换为摘要；
+    # 只有一轮发言时不打包，默认单轮辩论时各节点看到完整历史
+    "debate_context_token_budget": int(os.getenv("DEBATE_CONTEXT_TOKEN_BUDGET", "12000")),
+    # 按节点单独设置预算，例如 {"Research Manager": 20000}
+    "debate_context_node_budgets": {},
+    # 保留原文的最近发言次数
+    "debate_context_recent_turns": 2,
+    # 较早发言的摘要方式：extractive（抽取开头句子，不调用模型）或 llm（快速模型摘要，每次发言只摘要一次）
+    "debate_context_summarizer": os.getenv("DEBATE_CONTEXT_SUMMARIZER", "extractive"),
+    "debate_context_summary_chars": 300,
+    # 分析师并行运行（各分析师独立分支，汇合后进入研究辩论）
+    "parallel_analysts": os.getenv("PARALLEL_ANALYSTS_ENABLED", "false").lower() == "true",
+    # 风险辩论首轮三位分析师同时发言（开场陈述互不依赖）
+    "parallel_risk_opening": os.getenv("PARALLEL_RISK_OPENING_ENABLED", "false").lower() == "true",
+    # 开启首轮并行后，之后各轮是否也同时发言（否则按 激进 -> 保守 -> 中性 依次发言）
+    "parallel_risk_rounds": os.getenv("PARALLEL_RISK_ROUNDS_ENABLED", "false").lower() == "true",
+    # 状态日志（eval_results/{ticker}/TradingAgentsStrategy_logs/full_states_log.jsonl）是否逐条gzip压缩
+    "state_log_compress": False,
     # Tool settings - 从环境变量读取，提供默认值
     "online_tools": os.getenv("ONLINE_TOOLS_ENABLED", "false").lower() == "true",
     "online_news": os.getenv("ONLINE_NEWS_ENABLED", "true").lower() == "true", 
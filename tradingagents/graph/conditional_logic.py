@@ -10,10 +10,11 @@ logger = get_logger("default")
 class ConditionalLogic:
     """Handles conditional logic for determining graph flow."""
 
-    def __init__(self, max_debate_rounds=1, max_risk_discuss_rounds=1):
+    def __init__(self, max_debate_rounds=1, max_risk_discuss_rounds=1, parallel_risk_rounds=False):
         """Initialize with configuration parameters."""
         self.max_debate_rounds = max_debate_rounds
         self.max_risk_discuss_rounds = max_risk_discuss_rounds
+        self.parallel_risk_rounds = parallel_risk_rounds
 
     def should_continue_market(self, state: AgentState):
         """Determine if market analysis should continue."""
@@ -77,3 +78,11 @@ class ConditionalLogic:
         if state["risk_debate_state"]["latest_speaker"].startswith("Safe"):
             return "Neutral Analyst"
         return "Risky Analyst"
+
+    def should_continue_parallel_risk_analysis(self, state: AgentState) -> str:
+        """三位风险分析师同时发言一轮后，决定继续并行、改为依次发言还是进入风险裁判"""
+        if state["risk_debate_state"]["count"] >= 3 * self.max_risk_discuss_rounds:
+            return "Risk Judge"
+        if self.parallel_risk_rounds:
+            return "Risk Debate Round"
+        return "Risky Analyst"
@@ -1,6 +1,8 @@
 # TradingAgents/graph/setup.py
 
 from typing import Dict, Any
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langchain_openai import ChatOpenAI
 from langgraph.graph import END, StateGraph, START
 from langgraph.prebuilt import ToolNode
@@ -24,6 +26,7 @@ from tradingagents.agents import (
 )
 from tradingagents.agents.utils.agent_states import AgentState
 from tradingagents.agents.utils.agent_utils import Toolkit
+from tradingagents.agents.utils.context_packer import DebateContextPacker, create_context_packer
 
 from .conditional_logic import ConditionalLogic
 
@@ -31,6 +34,17 @@ from .conditional_logic import ConditionalLogic
 from tradingagents.utils.logging_init import get_logger
 logger = get_logger("default")
 
+# 各分析师写入的报告字段
+ANALYST_REPORT_FIELDS = {
+    "market": "market_report",
+    "social": "sentiment_report",
+    "news": "news_report",
+    "fundamentals": "fundamentals_report",
+}
+
+# 风险辩论中三位分析师的固定合并顺序：(发言者, 状态字段前缀)
+RISK_DEBATORS = (("Risky", "risky"), ("Safe", "safe"), ("Neutral", "neutral"))
+
 
 class GraphSetup:
     """Handles the setup and configuration of the agent graph."""
@@ -49,6 +63,7 @@ class GraphSetup:
         conditional_logic: ConditionalLogic,
         config: Dict[str, Any] = None,
         react_llm = None,
+        context_packer: DebateContextPacker = None,
     ):
         """Initialize with required components."""
         self.quick_thinking_llm = quick_thinking_llm
@@ -63,6 +78,7 @@ class GraphSetup:
         self.conditional_logic = conditional_logic
         self.config = config or {}
         self.react_llm = react_llm
+        self.context_packer = context_packer or create_context_packer(self.config, quick_thinking_llm)
 
     def setup_graph(
         self, selected_analysts=["market", "social", "news", "fundamentals"]
@@ -75,6 +91,12 @@ class GraphSetup:
                 - "social": Social media analyst
                 - "news": News analyst
                 - "fundamentals": Fundamentals analyst
+
+        配置项 parallel_analysts 为 True 时，各分析师作为独立分支并行运行，
+        在多头研究员之前汇合；否则按 selected_analysts 的顺序串行运行。
+
+        配置项 parallel_risk_opening 为 True 时，风险辩论第一轮三位分析师同时针对交易员计划发言；
+        parallel_risk_rounds 决定之后各轮同时发言还是按 激进 -> 保守 -> 中性 依次发言。
         """
         if len(selected_analysts) == 0:
             raise ValueError("Trading Agents Graph Setup Error: no analysts selected!")
@@ -154,35 +176,27 @@ class GraphSetup:
 
         # Create researcher and manager nodes
         bull_researcher_node = create_bull_researcher(
-            self.quick_thinking_llm, self.bull_memory
+            self.quick_thinking_llm, self.bull_memory, self.context_packer
         )
         bear_researcher_node = create_bear_researcher(
-            self.quick_thinking_llm, self.bear_memory
+            self.quick_thinking_llm, self.bear_memory, self.context_packer
         )
         research_manager_node = create_research_manager(
-            self.deep_thinking_llm, self.invest_judge_memory
+            self.deep_thinking_llm, self.invest_judge_memory, self.context_packer
         )
         trader_node = create_trader(self.quick_thinking_llm, self.trader_memory)
 
         # Create risk analysis nodes
-        risky_analyst = create_risky_debator(self.quick_thinking_llm)
-        neutral_analyst = create_neutral_debator(self.quick_thinking_llm)
-        safe_analyst = create_safe_debator(self.quick_thinking_llm)
+        risky_analyst = create_risky_debator(self.quick_thinking_llm, self.context_packer)
+        neutral_analyst = create_neutral_debator(self.quick_thinking_llm, self.context_packer)
+        safe_analyst = create_safe_debator(self.quick_thinking_llm, self.context_packer)
         risk_manager_node = create_risk_manager(
-            self.deep_thinking_llm, self.risk_manager_memory
+            self.deep_thinking_llm, self.risk_manager_memory, self.context_packer
         )
 
         # Create workflow
         workflow = StateGraph(AgentState)
 
-        # Add analyst nodes to the graph
-        for analyst_type, node in analyst_nodes.items():
-            workflow.add_node(f"{analyst_type.capitalize()} Analyst", node)
-            workflow.add_node(
-                f"Msg Clear {analyst_type.capitalize()}", delete_nodes[analyst_type]
-            )
-            workflow.add_node(f"tools_{analyst_type}", tool_nodes[analyst_type])
-
         # Add other nodes
         workflow.add_node("Bull Researcher", bull_researcher_node)
         workflow.add_node("Bear Researcher", bear_researcher_node)
@@ -194,30 +208,15 @@ class GraphSetup:
         workflow.add_node("Risk Judge", risk_manager_node)
 
         # Define edges
-        # Start with the first analyst
-        first_analyst = selected_analysts[0]
-        workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
-
-        # Connect analysts in sequence
-        for i, analyst_type in enumerate(selected_analysts):
-            current_analyst = f"{analyst_type.capitalize()} Analyst"
-            current_tools = f"tools_{analyst_type}"
-            current_clear = f"Msg Clear {analyst_type.capitalize()}"
-
-            # Add conditional edges for current analyst
-            workflow.add_conditional_edges(
-                current_analyst,
-                getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
-                [current_tools, current_clear],
+        if self.config.get("parallel_analysts", False):
+            logger.info(f"🔀 [图设置] 并行运行分析师: {selected_analysts}")
+            self._add_parallel_analysts(
+                workflow, selected_analysts, analyst_nodes, delete_nodes, tool_nodes
+            )
+        else:
+            self._add_serial_analysts(
+                workflow, selected_analysts, analyst_nodes, delete_nodes, tool_nodes
             )
-            workflow.add_edge(current_tools, current_analyst)
-
-            # Connect to next analyst or to Bull Researcher if this is the last analyst
-            if i < len(selected_analysts) - 1:
-                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
-                workflow.add_edge(current_clear, next_analyst)
-            else:
-                workflow.add_edge(current_clear, "Bull Researcher")
 
         # Add remaining edges
         workflow.add_conditional_edges(
@@ -237,7 +236,25 @@ class GraphSetup:
             },
         )
         workflow.add_edge("Research Manager", "Trader")
-        workflow.add_edge("Trader", "Risky Analyst")
+        if self.config.get("parallel_risk_opening", False):
+            logger.info(f"🔀 [图设置] 风险辩论首轮并行发言，后续轮次"
+                        f"{'并行' if self.config.get('parallel_risk_rounds', False) else '依次'}发言")
+            workflow.add_node(
+                "Risk Debate Round",
+                self._create_parallel_risk_round([risky_analyst, safe_analyst, neutral_analyst]),
+            )
+            workflow.add_edge("Trader", "Risk Debate Round")
+            workflow.add_conditional_edges(
+                "Risk Debate Round",
+                self.conditional_logic.should_continue_parallel_risk_analysis,
+                {
+                    "Risk Debate Round": "Risk Debate Round",
+                    "Risky Analyst": "Risky Analyst",
+                    "Risk Judge": "Risk Judge",
+                },
+            )
+        else:
+            workflow.add_edge("Trader", "Risky Analyst")
         workflow.add_conditional_edges(
             "Risky Analyst",
             self.conditional_logic.should_continue_risk_analysis,
@@ -267,3 +284,123 @@ class GraphSetup:
 
         # Compile and return
         return workflow.compile()
+
+    def _add_analyst_loop(self, workflow, analyst_type, analyst_node, delete_node, tool_node):
+        """添加单个分析师的 分析师 -> 工具 -> 分析师 循环，返回其消息清理节点名"""
+        current_analyst = f"{analyst_type.capitalize()} Analyst"
+        current_tools = f"tools_{analyst_type}"
+        current_clear = f"Msg Clear {analyst_type.capitalize()}"
+
+        workflow.add_node(current_analyst, analyst_node)
+        workflow.add_node(current_clear, delete_node)
+        workflow.add_node(current_tools, tool_node)
+
+        # Add conditional edges for current analyst
+        workflow.add_conditional_edges(
+            current_analyst,
+            getattr(self.conditional_logic, f"should_continue_{analyst_type}"),
+            [current_tools, current_clear],
+        )
+        workflow.add_edge(current_tools, current_analyst)
+        return current_clear
+
+    def _add_serial_analysts(self, workflow, selected_analysts, analyst_nodes, delete_nodes, tool_nodes):
+        """按顺序串联分析师，最后一个分析师连接到多头研究员"""
+        # Start with the first analyst
+        first_analyst = selected_analysts[0]
+        workflow.add_edge(START, f"{first_analyst.capitalize()} Analyst")
+
+        # Connect analysts in sequence
+        for i, analyst_type in enumerate(selected_analysts):
+            current_clear = self._add_analyst_loop(
+                workflow,
+                analyst_type,
+                analyst_nodes[analyst_type],
+                delete_nodes[analyst_type],
+                tool_nodes[analyst_type],
+            )
+
+            # Connect to next analyst or to Bull Researcher if this is the last analyst
+            if i < len(selected_analysts) - 1:
+                next_analyst = f"{selected_analysts[i+1].capitalize()} Analyst"
+                workflow.add_edge(current_clear, next_analyst)
+            else:
+                workflow.add_edge(current_clear, "Bull Researcher")
+
+    def _add_parallel_analysts(self, workflow, selected_analysts, analyst_nodes, delete_nodes, tool_nodes):
+        """每个分析师作为独立分支从START并行出发，全部完成后汇合到多头研究员"""
+        branch_names = []
+        for analyst_type in selected_analysts:
+            branch_name = f"{analyst_type.capitalize()} Analyst"
+            workflow.add_node(
+                branch_name,
+                self._create_analyst_branch(
+                    analyst_type,
+                    analyst_nodes[analyst_type],
+                    delete_nodes[analyst_type],
+                    tool_nodes[analyst_type],
+                ),
+            )
+            workflow.add_edge(START, branch_name)
+            branch_names.append(branch_name)
+
+        # 等待所有分支完成后再进入研究辩论
+        workflow.add_edge(branch_names, "Bull Researcher")
+
+    def _create_analyst_branch(self, analyst_type, analyst_node, delete_node, tool_node):
+        """
+        将分析师的工具循环编译为独立子图
+
+        子图使用自己的消息列表运行，分支之间互不可见对方的工具调用；
+        只把该分析师的报告字段写回主图状态，各分支写入的字段互不重叠。
+        """
+        branch = StateGraph(AgentState)
+        current_clear = self._add_analyst_loop(
+            branch, analyst_type, analyst_node, delete_node, tool_node
+        )
+        branch.add_edge(START, f"{analyst_type.capitalize()} Analyst")
+        branch.add_edge(current_clear, END)
+        compiled_branch = branch.compile()
+
+        report_field = ANALYST_REPORT_FIELDS[analyst_type]
+
+        def analyst_branch(state, config: RunnableConfig):
+            branch_state = dict(state)
+            branch_state["messages"] = list(state["messages"])
+            # 沿用主图的运行配置，保留回调、追踪和递归上限
+            result = compiled_branch.invoke(branch_state, config=config)
+            logger.debug(f"🔀 [图设置] {analyst_type} 分支完成，报告长度: {len(result.get(report_field, '') or '')}")
+            return {report_field: result.get(report_field, "")}
+
+        return analyst_branch
+
+    def _create_parallel_risk_round(self, debator_nodes):
+        """
+        三位风险分析师基于同一状态同时发言
+
+        各分析师只看到本轮开始前的辩论历史；发言按 激进 -> 保守 -> 中性 的固定顺序合并，
+        与依次发言一轮后的状态结构一致，下一轮可以继续并行或从激进分析师开始依次发言。
+        工作线程复制当前上下文，分析师的模型调用沿用主图的回调、追踪标签等运行配置。
+        """
+        def risk_debate_round(state):
+            with ContextThreadPoolExecutor(max_workers=len(debator_nodes), thread_name_prefix="risk-debate") as executor:
+                futures = [executor.submit(node, state) for node in debator_nodes]
+                results = [future.result() for future in futures]
+            return {"risk_debate_state": merge_risk_round(state["risk_debate_state"], results)}
+
+        return risk_debate_round
+
+
+def merge_risk_round(risk_debate_state, results):
+    """按固定顺序把三位分析师同一轮的发言合并到风险辩论状态"""
+    merged = dict(risk_debate_state)
+    history = risk_debate_state.get("history", "")
+    for (speaker, field), result in zip(RISK_DEBATORS, results):
+        argument = result["risk_debate_state"][f"current_{field}_response"]
+        history += "\n" + argument
+        merged[f"{field}_history"] = risk_debate_state.get(f"{field}_history", "") + "\n" + argument
+        merged[f"current_{field}_response"] = argument
+    merged["history"] = history
+    merged["latest_speaker"] = RISK_DEBATORS[-1][0]
+    merged["count"] = risk_debate_state["count"] + len(RISK_DEBATORS)
+    return merged
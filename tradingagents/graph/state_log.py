@@ -0,0 +1,186 @@
+# TradingAgents/graph/state_log.py
+
+"""
+只追加的状态日志
+
+每次 propagate 的完整状态写成一行JSON（可选逐条gzip压缩）追加到日志文件末尾，
+同时在索引文件中记录 交易日期 -> (偏移量, 长度)，支持按日期随机读取和顺序流式读取。
+相比每次重写整个 full_states_log.json，写入开销与历史长度无关，也无需在内存中保留全部历史。
+"""
+
+import gzip
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("default")
+
+
+class StateLogStore:
+    """按 (股票, 交易日期) 追加保存完整状态的日志存储"""
+
+    LOG_NAME = "full_states_log.jsonl"
+
+    def __init__(self, directory, compress: bool = False):
+        self.directory = Path(directory)
+        self.compress = compress
+        self.log_path = self.directory / (self.LOG_NAME + (".gz" if compress else ""))
+        self.index_path = self.log_path.with_name(self.log_path.name + ".index")
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Tuple[int, int]]] = None
+
+    def append(self, trade_date, state: Dict[str, Any]) -> Tuple[int, int]:
+        """追加一条状态记录，返回 (偏移量, 长度)
+
+        记录先完整编码，再通过 O_APPEND 一次写入，避免并发写入交错或留下半行；
+        同一交易日期重复写入时，索引指向最新一条。
+        """
+        key = str(trade_date)
+        line = json.dumps({"trade_date": key, "state": state}, ensure_ascii=False) + "\n"
+        payload = line.encode("utf-8")
+        if self.compress:
+            # 每条记录是独立的gzip成员，整个文件仍是合法的gzip流
+            payload = gzip.compress(payload)
+
+        with self._lock:
+            self._load_index()
+            self.directory.mkdir(parents=True, exist_ok=True)
+            offset = self._append_bytes(self.log_path, payload)
+            entry = {"trade_date": key, "offset": offset, "length": len(payload)}
+            self._append_bytes(self.index_path, (json.dumps(entry) + "\n").encode("utf-8"))
+            self._index[key] = (offset, len(payload))
+        return offset, len(payload)
+
+    def get(self, trade_date) -> Optional[Dict[str, Any]]:
+        """按交易日期读取一条状态记录，不存在时返回None"""
+        with self._lock:
+            location = self._load_index().get(str(trade_date))
+        if location is None:
+            return None
+
+        offset, length = location
+        with open(self.log_path, "rb") as f:
+            f.seek(offset)
+            payload = f.read(length)
+        return self._decode(payload)["state"]
+
+    def dates(self) -> List[str]:
+        """已记录的交易日期（按首次写入顺序）"""
+        with self._lock:
+            return list(self._load_index())
+
+    def iter_states(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """按写入顺序流式读取全部记录，逐条产出 (交易日期, 状态)"""
+        if not self.log_path.exists():
+            return
+        opener = gzip.open if self.compress else open
+        with opener(self.log_path, "rb") as f:
+            for raw_line in f:
+                if not raw_line.strip():
+                    continue
+                try:
+                    record = json.loads(raw_line)
+                except json.JSONDecodeError:
+                    logger.warning(f"⚠️ [状态日志] 跳过损坏的记录: {self.log_path}")
+                    continue
+                yield record["trade_date"], record["state"]
+
+    def __contains__(self, trade_date) -> bool:
+        with self._lock:
+            return str(trade_date) in self._load_index()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load_index())
+
+    @staticmethod
+    def _append_bytes(path: Path, payload: bytes) -> int:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            offset = os.lseek(fd, 0, os.SEEK_END)
+            view = memoryview(payload)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+            return offset
+        finally:
+            os.close(fd)
+
+    def _decode(self, payload: bytes) -> Dict[str, Any]:
+        if self.compress:
+            payload = gzip.decompress(payload)
+        return json.loads(payload)
+
+    def _load_index(self) -> Dict[str, Tuple[int, int]]:
+        """在持有 self._lock 时调用：加载索引，索引缺失或落后于日志文件时重建"""
+        if self._index is not None:
+            return self._index
+
+        index: Dict[str, Tuple[int, int]] = {}
+        indexed_end = 0
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    index[entry["trade_date"]] = (entry["offset"], entry["length"])
+                    indexed_end = max(indexed_end, entry["offset"] + entry["length"])
+
+        log_size = self.log_path.stat().st_size if self.log_path.exists() else 0
+        if indexed_end != log_size:
+            logger.info(f"🔧 [状态日志] 索引与日志不一致，重建索引: {self.log_path}")
+            index = self._rebuild_index()
+
+        self._index = index
+        return index
+
+    def _rebuild_index(self) -> Dict[str, Tuple[int, int]]:
+        """扫描日志文件重建索引，并重写索引文件"""
+        index: Dict[str, Tuple[int, int]] = {}
+        if self.log_path.exists():
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+            for offset, length in self._scan_records(data):
+                try:
+                    record = self._decode(data[offset:offset + length])
+                except (ValueError, OSError, EOFError):
+                    continue
+                index[record["trade_date"]] = (offset, length)
+
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, (offset, length) in index.items():
+                f.write(json.dumps({"trade_date": key, "offset": offset, "length": length}) + "\n")
+        os.replace(tmp_path, self.index_path)
+        return index
+
+    def _scan_records(self, data: bytes) -> Iterator[Tuple[int, int]]:
+        """找出日志中每条记录的 (偏移量, 长度)"""
+        offset = 0
+        if not self.compress:
+            while offset < len(data):
+                end = data.find(b"\n", offset)
+                end = len(data) if end == -1 else end + 1
+                if data[offset:end].strip():
+                    yield offset, end - offset
+                offset = end
+            return
+
+        while offset < len(data):
+            decompressor = zlib.decompressobj(wbits=31)
+            try:
+                decompressor.decompress(data[offset:])
+            except zlib.error:
+                return
+            if not decompressor.eof:
+                return
+            length = len(data) - offset - len(decompressor.unused_data)
+            yield offset, length
+            offset += length
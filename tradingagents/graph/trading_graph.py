@@ -50,6 +50,7 @@ from .setup import GraphSetup
 from .propagation import Propagator
 from .reflection import Reflector
 from .signal_processing import SignalProcessor
+from .state_log import StateLogStore
 
 
 class TradingAgentsGraph:
@@ -273,7 +274,9 @@ class TradingAgentsGraph:
         self.tool_nodes = self._create_tool_nodes()
 
         # Initialize components
-        self.conditional_logic = ConditionalLogic()
+        self.conditional_logic = ConditionalLogic(
+            parallel_risk_rounds=self.config.get("parallel_risk_rounds", False)
+        )
         self.graph_setup = GraphSetup(
             self.quick_thinking_llm,
             self.deep_thinking_llm,
@@ -296,10 +299,12 @@ class TradingAgentsGraph:
         # State tracking
         self.curr_state = None
         self.ticker = None
-        self.log_states_dict = {}  # date to full state dict
+        self._state_logs = {}  # ticker to StateLogStore
 
         # Set up the graph
         self.graph = self.graph_setup.setup_graph(selected_analysts)
+        self.context_packer = self.graph_setup.context_packer
+        self.last_context_stats = None
 
     def _create_tool_nodes(self) -> Dict[str, ToolNode]:
         """Create tool nodes for different data sources."""
@@ -367,6 +372,7 @@ class TradingAgentsGraph:
         logger.debug(f"🔍 [GRAPH DEBUG] 初始状态中的company_of_interest: '{init_agent_state.get('company_of_interest', 'NOT_FOUND')}'")
         logger.debug(f"🔍 [GRAPH DEBUG] 初始状态中的trade_date: '{init_agent_state.get('trade_date', 'NOT_FOUND')}'")
         args = self.propagator.get_graph_args()
+        self.context_packer.reset_stats()
 
         if self.debug:
             # Debug mode with tracing
@@ -386,6 +392,13 @@ class TradingAgentsGraph:
         # Store current state for reflection
         self.curr_state = final_state
 
+        # 报告本次分析辩论上下文打包节省的token
+        self.last_context_stats = self.context_packer.get_stats()
+        if self.last_context_stats['saved_tokens'] > 0:
+            logger.info(f"📦 [上下文打包] 辩论历史 {self.last_context_stats['original_tokens']} -> "
+                        f"{self.last_context_stats['packed_tokens']} tokens，"
+                        f"节省约 {self.last_context_stats['saved_tokens']} tokens")
+
         # Log state
         self._log_state(trade_date, final_state)
 
@@ -393,8 +406,8 @@ class TradingAgentsGraph:
         return final_state, self.process_signal(final_state["final_trade_decision"], company_name)
 
     def _log_state(self, trade_date, final_state):
-        """Log the final state to a JSON file."""
-        self.log_states_dict[str(trade_date)] = {
+        """Append the final state to the ticker's state log."""
+        state_record = {
             "company_of_interest": final_state["company_of_interest"],
             "trade_date": final_state["trade_date"],
             "market_report": final_state["market_report"],
@@ -424,15 +437,17 @@ class TradingAgentsGraph:
             "final_trade_decision": final_state["final_trade_decision"],
         }
 
-        # Save to file
-        directory = Path(f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/")
-        directory.mkdir(parents=True, exist_ok=True)
+        # 追加写入，不再每次重写全部历史
+        self.get_state_log(self.ticker).append(trade_date, state_record)
 
-        with open(
-            f"eval_results/{self.ticker}/TradingAgentsStrategy_logs/full_states_log.json",
-            "w",
-        ) as f:
-            json.dump(self.log_states_dict, f, indent=4)
+    def get_state_log(self, ticker) -> StateLogStore:
+        """获取某只股票的状态日志，可按日期读取或流式读取历史状态"""
+        if ticker not in self._state_logs:
+            self._state_logs[ticker] = StateLogStore(
+                Path(f"eval_results/{ticker}/TradingAgentsStrategy_logs/"),
+                compress=self.config.get("state_log_compress", False),
+            )
+        return self._state_logs[ticker]
 
     def reflect_and_remember(self, returns_losses):
         """Reflect on decisions and update memory based on returns."""
@@ -14,8 +14,9 @@ from langchain_core.tools import BaseTool
 from langchain_core.utils.function_calling import convert_to_openai_tool
 from pydantic import Field, SecretStr
 import dashscope
-from dashscope import Generation
+from dashscope import Generation, AioGeneration
 from ..config.config_manager import token_tracker
+from .response_cache import get_llm_response_cache
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -93,14 +94,13 @@ class ChatDashScope(BaseChatModel):
         
         return dashscope_messages
     
-    def _generate(
+    def _build_request_params(
         self,
         messages: List[BaseMessage],
-        stop: Optional[List[str]] = None,
-        run_manager: Optional[CallbackManagerForLLMRun] = None,
-        **kwargs: Any,
-    ) -> ChatResult:
-        """生成聊天回复"""
+        stop: Optional[List[str]],
+        kwargs: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """构造 Generation.call / AioGeneration.call 的请求参数"""
         
         # 转换消息格式
         dashscope_messages = self._convert_messages_to_dashscope_format(messages)
@@ -121,68 +121,96 @@ class ChatDashScope(BaseChatModel):
         
         # 合并额外参数
         request_params.update(kwargs)
+        return request_params
+    
+    def _build_chat_result(
+        self,
+        response: Any,
+        messages: List[BaseMessage],
+        kwargs: Dict[str, Any],
+    ) -> ChatResult:
+        """解析 DashScope 响应、记录token使用量并生成 ChatResult"""
+        if response.status_code != 200:
+            raise Exception(f"DashScope API error: {response.code} - {response.message}")
+        
+        # 解析响应
+        output = response.output
+        message_content = output.choices[0].message.content
+        
+        # 提取token使用量信息
+        input_tokens = 0
+        output_tokens = 0
+        
+        # DashScope API响应中包含usage信息
+        if hasattr(response, 'usage') and response.usage:
+            usage = response.usage
+            # 根据API文档，usage可能包含input_tokens和output_tokens
+            if hasattr(usage, 'input_tokens'):
+                input_tokens = usage.input_tokens
+            if hasattr(usage, 'output_tokens'):
+                output_tokens = usage.output_tokens
+            # 有些情况下可能是total_tokens
+            elif hasattr(usage, 'total_tokens'):
+                # 估算输入和输出token（如果没有分别提供）
+                total_tokens = usage.total_tokens
+                # 简单估算：假设输入占30%，输出占70%
+                input_tokens = int(total_tokens * 0.3)
+                output_tokens = int(total_tokens * 0.7)
+        
+        # 记录token使用量（TokenTracker只入队，不等待存储写入）
+        if input_tokens > 0 or output_tokens > 0:
+            try:
+                # 生成会话ID（如果没有提供）
+                session_id = kwargs.get('session_id', f"dashscope_{hash(str(messages))%10000}")
+                analysis_type = kwargs.get('analysis_type', 'stock_analysis')
+                
+                # 使用TokenTracker记录使用量
+                token_tracker.track_usage(
+                    provider="dashscope",
+                    model_name=self.model,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    session_id=session_id,
+                    analysis_type=analysis_type
+                )
+            except Exception as track_error:
+                # 记录失败不应该影响主要功能
+                logger.info(f"Token tracking failed: {track_error}")
+        
+        # 创建 AI 消息
+        ai_message = AIMessage(content=message_content)
+        
+        # 创建生成结果
+        generation = ChatGeneration(message=ai_message)
+        
+        return ChatResult(generations=[generation])
+    
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """生成聊天回复"""
+        request_params = self._build_request_params(messages, stop, kwargs)
+
+        # 命中响应缓存时不再请求模型
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, messages, request_params)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
         
         try:
             # 调用 DashScope API
             response = Generation.call(**request_params)
-            
-            if response.status_code == 200:
-                # 解析响应
-                output = response.output
-                message_content = output.choices[0].message.content
-                
-                # 提取token使用量信息
-                input_tokens = 0
-                output_tokens = 0
-                
-                # DashScope API响应中包含usage信息
-                if hasattr(response, 'usage') and response.usage:
-                    usage = response.usage
-                    # 根据API文档，usage可能包含input_tokens和output_tokens
-                    if hasattr(usage, 'input_tokens'):
-                        input_tokens = usage.input_tokens
-                    if hasattr(usage, 'output_tokens'):
-                        output_tokens = usage.output_tokens
-                    # 有些情况下可能是total_tokens
-                    elif hasattr(usage, 'total_tokens'):
-                        # 估算输入和输出token（如果没有分别提供）
-                        total_tokens = usage.total_tokens
-                        # 简单估算：假设输入占30%，输出占70%
-                        input_tokens = int(total_tokens * 0.3)
-                        output_tokens = int(total_tokens * 0.7)
-                
-                # 记录token使用量
-                if input_tokens > 0 or output_tokens > 0:
-                    try:
-                        # 生成会话ID（如果没有提供）
-                        session_id = kwargs.get('session_id', f"dashscope_{hash(str(messages))%10000}")
-                        analysis_type = kwargs.get('analysis_type', 'stock_analysis')
-                        
-                        # 使用TokenTracker记录使用量
-                        token_tracker.track_usage(
-                            provider="dashscope",
-                            model_name=self.model,
-                            input_tokens=input_tokens,
-                            output_tokens=output_tokens,
-                            session_id=session_id,
-                            analysis_type=analysis_type
-                        )
-                    except Exception as track_error:
-                        # 记录失败不应该影响主要功能
-                        logger.info(f"Token tracking failed: {track_error}")
-                
-                # 创建 AI 消息
-                ai_message = AIMessage(content=message_content)
-                
-                # 创建生成结果
-                generation = ChatGeneration(message=ai_message)
-                
-                return ChatResult(generations=[generation])
-            else:
-                raise Exception(f"DashScope API error: {response.code} - {response.message}")
-                
+            result = self._build_chat_result(response, messages, kwargs)
         except Exception as e:
             raise Exception(f"Error calling DashScope API: {str(e)}")
+
+        cache.store(cache_key, result, "dashscope", self.model)
+        return result
     
     async def _agenerate(
         self,
@@ -191,9 +219,34 @@ class ChatDashScope(BaseChatModel):
         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> ChatResult:
-        """异步生成聊天回复"""
-        # 目前使用同步方法，后续可以实现真正的异步
-        return self._generate(messages, stop, run_manager, **kwargs)
+        """
+        异步生成聊天回复
+        
+        使用 AioGeneration 在事件循环中等待响应（复用 DashScope SDK 的共享 aiohttp 连接池），
+        不占用线程；任务被取消时 asyncio.CancelledError 会直接向上传播并中断请求
+        """
+        request_params = self._build_request_params(messages, stop, kwargs)
+
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, messages, request_params)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await AioGeneration.call(**request_params)
+            result = self._build_chat_result(response, messages, kwargs)
+        except Exception as e:
+            raise Exception(f"Error calling DashScope API: {str(e)}")
+
+        cache.store(cache_key, result, "dashscope", self.model)
+        return result
+
+    def _response_cache_key(self, cache, messages: List[BaseMessage], request_params: Dict[str, Any]) -> Optional[str]:
+        """响应缓存键：除消息外的请求参数与绑定的工具都参与计算"""
+        params = {k: v for k, v in request_params.items() if k not in ("model", "messages")}
+        params["tools"] = getattr(self, "_tools", None)
+        return cache.make_key("dashscope", self.model, messages, params)
     
     def bind_tools(
         self,
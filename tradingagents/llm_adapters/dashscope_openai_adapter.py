@@ -10,6 +10,7 @@ from langchain_openai import ChatOpenAI
 from langchain_core.tools import BaseTool
 from pydantic import Field, SecretStr
 from ..config.config_manager import token_tracker
+from .response_cache import get_llm_response_cache
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -51,12 +52,52 @@ class ChatDashScopeOpenAI(ChatOpenAI):
         logger.info(f"   API Base: {api_base}")
     
     def _generate(self, *args, **kwargs):
-        """重写生成方法，添加 token 使用量追踪"""
+        """重写生成方法，添加响应缓存与 token 使用量追踪"""
+
+        # 命中响应缓存时不再请求模型
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, args, kwargs)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
         
         # 调用父类的生成方法
         result = super()._generate(*args, **kwargs)
         
         # 追踪 token 使用量
+        self._track_token_usage(result, args, kwargs)
+
+        cache.store(cache_key, result, "dashscope", self.model_name)
+        
+        return result
+
+    async def _agenerate(self, *args, **kwargs):
+        """重写异步生成方法，通过父类的异步 HTTP 客户端请求，并添加响应缓存与 token 使用量追踪"""
+
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, args, kwargs)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+
+        result = await super()._agenerate(*args, **kwargs)
+
+        self._track_token_usage(result, args, kwargs)
+
+        cache.store(cache_key, result, "dashscope", self.model_name)
+
+        return result
+
+    def _response_cache_key(self, cache, args, kwargs):
+        """响应缓存键：生成参数与绑定的工具定义（在kwargs中）都参与计算"""
+        messages = args[0] if args else kwargs.get("messages", [])
+        stop = args[1] if len(args) > 1 else kwargs.get("stop")
+        params = {k: v for k, v in kwargs.items() if k not in ("messages", "stop", "run_manager")}
+        params.update({"temperature": self.temperature, "max_tokens": self.max_tokens, "stop": stop})
+        return cache.make_key("dashscope", self.model_name, messages, params)
+
+    def _track_token_usage(self, result, args, kwargs):
+        """从结果中提取 token 使用信息并记录"""
         try:
             # 从结果中提取 token 使用信息
             if hasattr(result, 'llm_output') and result.llm_output:
@@ -83,8 +124,6 @@ class ChatDashScopeOpenAI(ChatOpenAI):
         except Exception as track_error:
             # token 追踪失败不应该影响主要功能
             logger.error(f"⚠️ Token 追踪失败: {track_error}")
-        
-        return result
 
 
 # 支持的模型列表
@@ -8,7 +8,7 @@ from typing import Any, Dict, List, Optional, Union
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, SystemMessage
 from langchain_core.outputs import ChatGeneration, ChatResult
 from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.callbacks import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import setup_llm_logging
@@ -27,6 +27,8 @@ except ImportError:
     TOKEN_TRACKING_ENABLED = False
     logger.warning("⚠️ Token跟踪功能未启用")
 
+from tradingagents.llm_adapters.response_cache import get_llm_response_cache
+
 
 class ChatDeepSeek(ChatOpenAI):
     """
@@ -92,72 +94,126 @@ class ChatDeepSeek(ChatOpenAI):
         session_id = kwargs.pop('session_id', None)
         analysis_type = kwargs.pop('analysis_type', None)
 
+        # 命中响应缓存时不再请求模型，也不产生费用
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, messages, stop, kwargs)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             # 调用父类方法生成响应
             result = super()._generate(messages, stop, run_manager, **kwargs)
+            self._track_usage(messages, result, session_id, analysis_type)
+            cache.store(cache_key, result, "deepseek", self.model_name)
+            return result
             
-            # 提取token使用量
-            input_tokens = 0
-            output_tokens = 0
-            
-            # 尝试从响应中提取token使用量
-            if hasattr(result, 'llm_output') and result.llm_output:
-                token_usage = result.llm_output.get('token_usage', {})
-                if token_usage:
-                    input_tokens = token_usage.get('prompt_tokens', 0)
-                    output_tokens = token_usage.get('completion_tokens', 0)
-            
-            # 如果没有获取到token使用量，进行估算
-            if input_tokens == 0 and output_tokens == 0:
-                input_tokens = self._estimate_input_tokens(messages)
-                output_tokens = self._estimate_output_tokens(result)
-                logger.debug(f"🔍 [DeepSeek] 使用估算token: 输入={input_tokens}, 输出={output_tokens}")
-            else:
-                logger.info(f"📊 [DeepSeek] 实际token使用: 输入={input_tokens}, 输出={output_tokens}")
-            
-            # 记录token使用量
-            if TOKEN_TRACKING_ENABLED and (input_tokens > 0 or output_tokens > 0):
-                try:
-                    # 使用提取的参数或生成默认值
-                    if session_id is None:
-                        session_id = f"deepseek_{hash(str(messages))%10000}"
-                    if analysis_type is None:
-                        analysis_type = 'stock_analysis'
+        except Exception as e:
+            logger.error(f"❌ [DeepSeek] 调用失败: {e}", exc_info=True)
+            raise
 
-                    # 记录使用量
-                    usage_record = token_tracker.track_usage(
-                        provider="deepseek",
-                        model_name=self.model_name,
-                        input_tokens=input_tokens,
-                        output_tokens=output_tokens,
-                        session_id=session_id,
-                        analysis_type=analysis_type
-                    )
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        异步生成聊天响应，并记录token使用量
 
-                    if usage_record:
-                        if usage_record.cost == 0.0:
-                            logger.warning(f"⚠️ [DeepSeek] 成本计算为0，可能配置有问题")
-                        else:
-                            logger.info(f"💰 [DeepSeek] 本次调用成本: ¥{usage_record.cost:.6f}")
+        父类通过共享的异步HTTP客户端（连接池）发送请求，不阻塞事件循环；
+        任务被取消时 asyncio.CancelledError 直接向上传播
+        """
 
-                        # 使用统一日志管理器的Token记录方法
-                        logger_manager = get_logger_manager()
-                        logger_manager.log_token_usage(
-                            logger, "deepseek", self.model_name,
-                            input_tokens, output_tokens, usage_record.cost,
-                            session_id
-                        )
-                    else:
-                        logger.warning(f"⚠️ [DeepSeek] 未创建使用记录")
+        session_id = kwargs.pop('session_id', None)
+        analysis_type = kwargs.pop('analysis_type', None)
 
-                except Exception as track_error:
-                    logger.error(f"⚠️ [DeepSeek] Token统计失败: {track_error}", exc_info=True)
-            
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, messages, stop, kwargs)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+            self._track_usage(messages, result, session_id, analysis_type)
+            cache.store(cache_key, result, "deepseek", self.model_name)
             return result
-            
+
         except Exception as e:
-            logger.error(f"❌ [DeepSeek] 调用失败: {e}", exc_info=True)
+            logger.error(f"❌ [DeepSeek] 异步调用失败: {e}", exc_info=True)
             raise
+
+    def _response_cache_key(self, cache, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict) -> Optional[str]:
+        """响应缓存键：生成参数与绑定的工具定义（在kwargs中）都参与计算"""
+        params = {"temperature": self.temperature, "max_tokens": self.max_tokens, "stop": stop, **kwargs}
+        return cache.make_key("deepseek", self.model_name, messages, params)
+
+    def _track_usage(
+        self,
+        messages: List[BaseMessage],
+        result: ChatResult,
+        session_id: Optional[str],
+        analysis_type: Optional[str],
+    ):
+        """提取（或估算）token使用量并记录，同步与异步调用共用"""
+        # 提取token使用量
+        input_tokens = 0
+        output_tokens = 0
+        
+        # 尝试从响应中提取token使用量
+        if hasattr(result, 'llm_output') and result.llm_output:
+            token_usage = result.llm_output.get('token_usage', {})
+            if token_usage:
+                input_tokens = token_usage.get('prompt_tokens', 0)
+                output_tokens = token_usage.get('completion_tokens', 0)
+        
+        # 如果没有获取到token使用量，进行估算
+        if input_tokens == 0 and output_tokens == 0:
+            input_tokens = self._estimate_input_tokens(messages)
+            output_tokens = self._estimate_output_tokens(result)
+            logger.debug(f"🔍 [DeepSeek] 使用估算token: 输入={input_tokens}, 输出={output_tokens}")
+        else:
+            logger.info(f"📊 [DeepSeek] 实际token使用: 输入={input_tokens}, 输出={output_tokens}")
+        
+        # 记录token使用量
+        if TOKEN_TRACKING_ENABLED and (input_tokens > 0 or output_tokens > 0):
+            try:
+                # 使用提取的参数或生成默认值
+                if session_id is None:
+                    session_id = f"deepseek_{hash(str(messages))%10000}"
+                if analysis_type is None:
+                    analysis_type = 'stock_analysis'
+
+                # 记录使用量
+                usage_record = token_tracker.track_usage(
+                    provider="deepseek",
+                    model_name=self.model_name,
+                    input_tokens=input_tokens,
+                    output_tokens=output_tokens,
+                    session_id=session_id,
+                    analysis_type=analysis_type
+                )
+
+                if usage_record:
+                    if usage_record.cost == 0.0:
+                        logger.warning(f"⚠️ [DeepSeek] 成本计算为0，可能配置有问题")
+                    else:
+                        logger.info(f"💰 [DeepSeek] 本次调用成本: ¥{usage_record.cost:.6f}")
+
+                    # 使用统一日志管理器的Token记录方法
+                    logger_manager = get_logger_manager()
+                    logger_manager.log_token_usage(
+                        logger, "deepseek", self.model_name,
+                        input_tokens, output_tokens, usage_record.cost,
+                        session_id
+                    )
+                else:
+                    logger.warning(f"⚠️ [DeepSeek] 未创建使用记录")
+
+            except Exception as track_error:
+                logger.error(f"⚠️ [DeepSeek] Token统计失败: {track_error}", exc_info=True)
     
     def _estimate_input_tokens(self, messages: List[BaseMessage]) -> int:
         """
@@ -231,6 +287,28 @@ class ChatDeepSeek(ChatOpenAI):
         else:
             return AIMessage(content="")
 
+    async def ainvoke(
+        self,
+        input: Union[str, List[BaseMessage]],
+        config: Optional[Dict] = None,
+        **kwargs: Any,
+    ) -> AIMessage:
+        """
+        异步调用模型生成响应，参数与 invoke 相同
+        """
+
+        if isinstance(input, str):
+            messages = [HumanMessage(content=input)]
+        else:
+            messages = input
+
+        result = await self._agenerate(messages, **kwargs)
+
+        if result.generations:
+            return result.generations[0].message
+        else:
+            return AIMessage(content="")
+
 
 def create_deepseek_llm(
     model: str = "deepseek-chat",
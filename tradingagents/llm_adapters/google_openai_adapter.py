@@ -12,6 +12,7 @@ from langchain_core.messages import BaseMessage, AIMessage, HumanMessage, System
 from langchain_core.outputs import LLMResult
 from pydantic import Field, SecretStr
 from ..config.config_manager import token_tracker
+from .response_cache import get_llm_response_cache
 
 # 导入日志模块
 from tradingagents.utils.logging_manager import get_logger
@@ -52,30 +53,68 @@ class ChatGoogleOpenAI(ChatGoogleGenerativeAI):
     
     def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs) -> LLMResult:
         """重写生成方法，优化工具调用处理和内容格式"""
+
+        # 命中响应缓存时不再请求模型
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, messages, stop, kwargs)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
         
         try:
             # 调用父类的生成方法
             result = super()._generate(messages, stop, **kwargs)
+            return self._process_result(result, kwargs, cache, cache_key)
             
-            # 优化返回内容格式
-            if result and result.generations:
-                for generation in result.generations:
-                    if hasattr(generation, 'message') and generation.message:
-                        # 优化消息内容格式
-                        self._optimize_message_content(generation.message)
-            
-            # 追踪 token 使用量
-            self._track_token_usage(result, kwargs)
-            
-            return result
-            
         except Exception as e:
-            logger.error(f"❌ Google AI 生成失败: {e}")
-            # 返回一个包含错误信息的结果，而不是抛出异常
-            from langchain_core.outputs import ChatGeneration
-            error_message = AIMessage(content=f"Google AI 调用失败: {str(e)}")
-            error_generation = ChatGeneration(message=error_message)
-            return LLMResult(generations=[[error_generation]])
+            return self._error_result(e)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs) -> LLMResult:
+        """异步生成方法，与 _generate 使用相同的响应缓存、内容优化和token追踪"""
+
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, messages, stop, kwargs)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            result = await super()._agenerate(messages, stop, **kwargs)
+            return self._process_result(result, kwargs, cache, cache_key)
+
+        except Exception as e:
+            return self._error_result(e)
+
+    def _response_cache_key(self, cache, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict) -> Optional[str]:
+        """响应缓存键：生成参数与绑定的工具定义（在kwargs中）都参与计算"""
+        params = {k: v for k, v in kwargs.items() if k != "run_manager"}
+        params.update({"temperature": self.temperature, "max_tokens": self.max_output_tokens, "stop": stop})
+        return cache.make_key("google", self.model, messages, params)
+
+    def _process_result(self, result, kwargs: Dict[str, Any], cache, cache_key: Optional[str]):
+        """优化返回内容格式、追踪token并写入响应缓存"""
+        if result and result.generations:
+            for generation in result.generations:
+                if hasattr(generation, 'message') and generation.message:
+                    # 优化消息内容格式
+                    self._optimize_message_content(generation.message)
+        
+        # 追踪 token 使用量
+        self._track_token_usage(result, kwargs)
+
+        # 出错时返回的 LLMResult 不会被缓存
+        cache.store(cache_key, result, "google", self.model)
+        
+        return result
+
+    @staticmethod
+    def _error_result(error: Exception) -> LLMResult:
+        """返回一个包含错误信息的结果，而不是抛出异常"""
+        logger.error(f"❌ Google AI 生成失败: {error}")
+        from langchain_core.outputs import ChatGeneration
+        error_message = AIMessage(content=f"Google AI 调用失败: {str(error)}")
+        error_generation = ChatGeneration(message=error_message)
+        return LLMResult(generations=[[error_generation]])
     
     def _optimize_message_content(self, message: BaseMessage):
         """优化消息内容格式，确保包含新闻特征关键词"""
@@ -9,7 +9,7 @@ from typing import Any, Dict, List, Optional, Union
 from langchain_core.messages import BaseMessage
 from langchain_core.outputs import ChatResult
 from langchain_openai import ChatOpenAI
-from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.callbacks import CallbackManagerForLLMRun, AsyncCallbackManagerForLLMRun
 
 # 导入统一日志系统
 from tradingagents.utils.logging_init import setup_llm_logging
@@ -28,6 +28,8 @@ except ImportError:
     TOKEN_TRACKING_ENABLED = False
     logger.warning("⚠️ Token跟踪功能未启用")
 
+from tradingagents.llm_adapters.response_cache import get_llm_response_cache
+
 
 class OpenAICompatibleBase(ChatOpenAI):
     """
@@ -127,15 +129,59 @@ class OpenAICompatibleBase(ChatOpenAI):
         
         # 记录开始时间
         start_time = time.time()
+
+        # 命中响应缓存时不再请求模型
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, messages, stop, kwargs)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
         
         # 调用父类生成方法
         result = super()._generate(messages, stop, run_manager, **kwargs)
         
         # 记录token使用
         self._track_token_usage(result, kwargs, start_time)
+
+        cache.store(cache_key, result, self.provider_name, self.model_name)
         
         return result
 
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """
+        异步生成聊天响应，并记录token使用量
+
+        ChatOpenAI 的异步客户端按 base_url 复用同一个 httpx 连接池，多个分析任务可以共享一个事件循环；
+        任务被取消时 asyncio.CancelledError 直接向上传播并关闭对应请求
+        """
+
+        start_time = time.time()
+
+        cache = get_llm_response_cache()
+        cache_key = self._response_cache_key(cache, messages, stop, kwargs)
+        cached = cache.lookup(cache_key)
+        if cached is not None:
+            return cached
+
+        result = await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+        self._track_token_usage(result, kwargs, start_time)
+
+        cache.store(cache_key, result, self.provider_name, self.model_name)
+
+        return result
+
+    def _response_cache_key(self, cache, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict) -> Optional[str]:
+        """响应缓存键：生成参数与绑定的工具定义（在kwargs中）都参与计算"""
+        params = {"temperature": self.temperature, "max_tokens": self.max_tokens, "stop": stop, **kwargs}
+        return cache.make_key(self.provider_name, self.model_name, messages, params)
+
     def _track_token_usage(self, result: ChatResult, kwargs: Dict, start_time: float):
         """记录token使用量并输出日志"""
         if not TOKEN_TRACKING_ENABLED:
@@ -292,6 +338,19 @@ class ChatQianfanOpenAI(OpenAICompatibleBase):
         # 调用父类的_generate方法
         return super()._generate(truncated_messages, stop, run_manager, **kwargs)
 
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """异步生成聊天响应，包含千帆模型的token截断逻辑"""
+
+        truncated_messages = self._truncate_messages(messages)
+
+        return await super()._agenerate(truncated_messages, stop, run_manager, **kwargs)
+
 
 class ChatCustomOpenAI(OpenAICompatibleBase):
     """自定义OpenAI端点适配器（代理/聚合平台）"""
@@ -0,0 +1,247 @@
+"""
+LLM响应缓存
+
+对同一股票、同一日期重跑分析（崩溃后重跑、界面重复运行、调试下游提示词）时，
+各分析师、研究员和风险管理的LLM调用会被重复计费。这里在适配器层提供可选的响应缓存：
+- 缓存键由 (供应商, 模型, 生成参数, 规范化后的消息, 工具定义) 的内容哈希决定
+- 持久化到本地SQLite，总大小超过上限时按最近访问时间淘汰
+- record 模式：命中直接返回，未命中调用模型并写入缓存
+- replay 模式：只从缓存返回，未命中抛出 LLMCacheMissError（用于离线测试和回放）
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# 导入统一日志系统
+from tradingagents.utils.logging_init import get_logger
+logger = get_logger("agents.llm_adapters.response_cache")
+
+CACHE_MODES = ("off", "record", "replay")
+
+# 只用于会话统计、不影响模型输出的参数，不参与缓存键
+_IGNORED_PARAMS = ("session_id", "analysis_type")
+
+
+class LLMCacheMissError(RuntimeError):
+    """replay 模式下缓存未命中"""
+
+
+class LLMResponseCache:
+    """基于内容哈希的LLM响应缓存"""
+
+    def __init__(self, path: str, mode: str = "record", max_size_mb: float = 512):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"不支持的LLM缓存模式: {mode}，可选: {', '.join(CACHE_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self._db = None
+        self._total_bytes = 0
+
+        if mode == "off":
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, provider TEXT, model TEXT, payload TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+            self._db.commit()
+            self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            logger.info(f"📚 [LLM缓存] 模式: {mode}, 文件: {path}")
+        except Exception as e:
+            logger.warning(f"⚠️ [LLM缓存] 缓存文件不可用，已禁用: {e}")
+            self._db = None
+            self.mode = "off"
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @staticmethod
+    def normalize_messages(messages: Sequence[BaseMessage]) -> List[Dict[str, Any]]:
+        """提取影响模型输出的消息字段；工具调用ID每次运行都不同，不参与缓存键"""
+        normalized = []
+        for message in messages:
+            content = message.content
+            if isinstance(content, str):
+                content = content.strip()
+            item = {'type': message.type, 'content': content}
+            tool_calls = getattr(message, 'tool_calls', None)
+            if tool_calls:
+                item['tool_calls'] = [{'name': call.get('name'), 'args': call.get('args')} for call in tool_calls]
+            name = getattr(message, 'name', None)
+            if name:
+                item['name'] = name
+            normalized.append(item)
+        return normalized
+
+    def make_key(self, provider: str, model: str, messages: Sequence[BaseMessage],
+                 params: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """生成缓存键；缓存关闭时返回None"""
+        if not self.enabled:
+            return None
+        params = {k: v for k, v in (params or {}).items() if k not in _IGNORED_PARAMS and v is not None}
+        content = json.dumps({
+            'provider': provider,
+            'model': model,
+            'params': params,
+            'messages': self.normalize_messages(messages),
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def lookup(self, key: Optional[str]) -> Optional[ChatResult]:
+        """查找缓存；replay 模式下未命中抛出 LLMCacheMissError"""
+        if key is None or self._db is None:
+            return None
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT payload FROM responses WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                    self._db.commit()
+                    self._stats['hits'] += 1
+                else:
+                    self._stats['misses'] += 1
+        except Exception as e:
+            logger.debug(f"⚠️ [LLM缓存] 读取失败: {e}")
+            row = None
+
+        if row:
+            logger.debug(f"📚 [LLM缓存] 命中: {key[:12]}")
+            return self._deserialize(row[0])
+        if self.mode == "replay":
+            raise LLMCacheMissError(f"LLM响应缓存未命中(replay模式): {key[:12]}")
+        return None
+
+    def store(self, key: Optional[str], result: Any, provider: str = "", model: str = ""):
+        """写入缓存，只缓存正常的 ChatResult"""
+        if key is None or self._db is None or self.mode != "record" or not isinstance(result, ChatResult):
+            return
+        try:
+            payload = self._serialize(result)
+        except Exception as e:
+            logger.debug(f"⚠️ [LLM缓存] 结果无法序列化，跳过: {e}")
+            return
+
+        size = len(payload.encode('utf-8'))
+        now = time.time()
+        try:
+            with self._lock:
+                previous = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, provider, model, payload, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, provider, model, payload, size, now, now),
+                )
+                self._total_bytes += size - (previous[0] if previous else 0)
+                self._stats['stores'] += 1
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+                self._db.commit()
+        except Exception as e:
+            logger.debug(f"⚠️ [LLM缓存] 写入失败: {e}")
+
+    def clear(self):
+        """清空缓存"""
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中率与占用空间"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['mode'] = self.mode
+            stats['size_bytes'] = self._total_bytes
+            stats['max_bytes'] = self.max_bytes
+            if self._db is not None:
+                stats['entries'] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return stats
+
+    def _evict(self):
+        """在持有 self._lock 时调用：按最近访问时间淘汰，直到总大小降到上限的90%"""
+        # 其他进程也可能写入同一个文件，先重新统计实际大小
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = int(self.max_bytes * 0.9)
+        if self._total_bytes <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self._stats['evictions'] += len(evicted)
+        logger.debug(f"🧹 [LLM缓存] 淘汰 {len(evicted)} 条记录")
+
+    @staticmethod
+    def _serialize(result: ChatResult) -> str:
+        return json.dumps({
+            'generations': [{
+                'message': message_to_dict(generation.message),
+                'generation_info': generation.generation_info,
+            } for generation in result.generations],
+            'llm_output': result.llm_output,
+        }, ensure_ascii=False, default=str)
+
+    @staticmethod
+    def _deserialize(payload: str) -> ChatResult:
+        data = json.loads(payload)
+        messages = messages_from_dict([item['message'] for item in data['generations']])
+        generations = [ChatGeneration(message=message, generation_info=item.get('generation_info'))
+                       for message, item in zip(messages, data['generations'])]
+        return ChatResult(generations=generations, llm_output=data.get('llm_output'))
+
+
+_llm_response_cache = None
+_llm_response_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """获取全局LLM响应缓存
+
+    环境变量:
+        LLM_RESPONSE_CACHE_MODE: off(默认) / record / replay
+        LLM_RESPONSE_CACHE_PATH: SQLite缓存文件，默认 ./cache/llm_responses.db
+        LLM_RESPONSE_CACHE_MAX_MB: 缓存总大小上限(MB)，默认512
+    """
+    global _llm_response_cache
+    if _llm_response_cache is None:
+        with _llm_response_cache_lock:
+            if _llm_response_cache is None:
+                mode = os.getenv('LLM_RESPONSE_CACHE_MODE', 'off').strip().lower() or 'off'
+                if mode not in CACHE_MODES:
+                    logger.warning(f"⚠️ [LLM缓存] 未知模式 {mode}，已禁用缓存")
+                    mode = 'off'
+                _llm_response_cache = LLMResponseCache(
+                    path=os.getenv('LLM_RESPONSE_CACHE_PATH', './cache/llm_responses.db'),
+                    mode=mode,
+                    max_size_mb=float(os.getenv('LLM_RESPONSE_CACHE_MAX_MB', '512')),
+                )
+    return _llm_response_cache
+
+
+def set_llm_response_cache(cache: Optional[LLMResponseCache]):
+    """替换全局LLM响应缓存（测试或回测脚本中切换模式/文件时使用）"""
+    global _llm_response_cache
+    with _llm_response_cache_lock:
+        _llm_response_cache = cache
@@ -9,6 +9,8 @@ import logging
 from datetime import datetime
 import re
 
+from tradingagents.utils.news_dedup import deduplicate_text_blocks
+
 logger = logging.getLogger(__name__)
 
 class UnifiedNewsAnalyzer:
@@ -243,6 +245,9 @@ class UnifiedNewsAnalyzer:
         logger.info(f"[统一新闻工具] 📋 原始新闻内容预览 (前500字符): {news_content[:500]}")
         logger.info(f"[统一新闻工具] 📊 原始内容长度: {len(news_content)} 字符")
         
+        # 多个新闻源合并的内容中常有同一新闻的转载，先去掉近似重复的段落
+        news_content = deduplicate_text_blocks(news_content)
+        
         # 检测是否为Google/Gemini模型
         is_google_model = any(keyword in model_info.lower() for keyword in ['google', 'gemini', 'gemma'])
         original_length = len(news_content)
@@ -15,6 +15,10 @@ from .news_filter import NewsRelevanceFilter, create_news_filter, get_company_na
 
 logger = logging.getLogger(__name__)
 
+# 语义相似度模型，以及批量编码时每批送入模型的文本数
+SEMANTIC_MODEL_NAME = "paraphrase-multilingual-MiniLM-L12-v2"
+SEMANTIC_ENCODE_BATCH_SIZE = 64
+
 class EnhancedNewsFilter(NewsRelevanceFilter):
     """增强新闻过滤器，集成本地模型和多种过滤策略"""
     
@@ -34,7 +38,9 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         
         # 语义模型相关
         self.sentence_model = None
+        self.semantic_model_name = SEMANTIC_MODEL_NAME
         self.company_embedding = None
+        self.company_embedding_matrix = None  # 按行归一化后的公司文本embedding
         
         # 本地分类模型相关
         self.classification_model = None
@@ -56,20 +62,12 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
                 from sentence_transformers import SentenceTransformer
                 
                 # 使用轻量级中文模型
-                model_name = "paraphrase-multilingual-MiniLM-L12-v2"  # 支持中文的轻量级模型
+                model_name = SEMANTIC_MODEL_NAME  # 支持中文的轻量级模型
                 self.sentence_model = SentenceTransformer(model_name)
+                self.semantic_model_name = model_name
                 
                 # 预计算公司相关的embedding
-                company_texts = [
-                    self.company_name,
-                    f"{self.company_name}股票",
-                    f"{self.company_name}公司",
-                    f"{self.stock_code}",
-                    f"{self.company_name}业绩",
-                    f"{self.company_name}财报"
-                ]
-                
-                self.company_embedding = self.sentence_model.encode(company_texts)
+                self._prepare_company_embeddings()
                 logger.info(f"[增强过滤器] ✅ 语义模型加载成功: {model_name}")
                 
             except ImportError:
@@ -80,6 +78,73 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
             logger.error(f"[增强过滤器] 语义模型初始化失败: {e}")
             self.use_semantic = False
     
+    def _prepare_company_embeddings(self):
+        """计算公司相关文本的embedding，并预先按行归一化"""
+        company_texts = [
+            self.company_name,
+            f"{self.company_name}股票",
+            f"{self.company_name}公司",
+            f"{self.stock_code}",
+            f"{self.company_name}业绩",
+            f"{self.company_name}财报"
+        ]
+        
+        self.company_embedding = self.sentence_model.encode(company_texts)
+        self.company_embedding_matrix = self._normalize_rows(np.asarray(self.company_embedding, dtype=float))
+    
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """按行做L2归一化，零向量保持为零"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """
+        批量编码文本，按内容哈希缓存
+        
+        缓存在进程内共享，不同分析师对同一批新闻重复过滤时不会再次编码；
+        未命中的文本在一次 encode 调用中按 SEMANTIC_ENCODE_BATCH_SIZE 分批送入模型。
+        """
+        from tradingagents.agents.utils.embedding_service import get_embedding_service
+        
+        def encode(pending: List[str]) -> List[List[float]]:
+            logger.debug(f"[增强过滤器] 编码 {len(pending)} 条新闻文本")
+            vectors = self.sentence_model.encode(pending, batch_size=SEMANTIC_ENCODE_BATCH_SIZE)
+            return np.asarray(vectors, dtype=float).tolist()
+        
+        embeddings = get_embedding_service().get_embeddings(
+            f"sentence-transformers:{self.semantic_model_name}", texts, encode)
+        return np.asarray(embeddings, dtype=float)
+    
+    def calculate_semantic_similarities(self, titles: List[str], contents: List[str]) -> np.ndarray:
+        """
+        批量计算语义相似度评分
+        
+        Args:
+            titles: 新闻标题列表
+            contents: 新闻内容列表（与标题一一对应）
+            
+        Returns:
+            np.ndarray: 语义相似度评分 (0-100)
+        """
+        if not self.use_semantic or self.sentence_model is None or not titles:
+            return np.zeros(len(titles))
+        
+        try:
+            # 组合标题和内容的前200字符
+            texts = [f"{title} {content[:200]}" for title, content in zip(titles, contents)]
+            
+            # 一次矩阵乘法得到每条新闻与所有公司文本的余弦相似度，取最高值
+            text_matrix = self._normalize_rows(self._encode_texts(texts))
+            similarities = text_matrix @ self.company_embedding_matrix.T
+            
+            # 转换为0-100评分
+            return np.clip(similarities.max(axis=1) * 100, 0, 100)
+            
+        except Exception as e:
+            logger.error(f"[增强过滤器] 批量语义相似度计算失败: {e}")
+            return np.zeros(len(titles))
+    
     def _init_classification_model(self):
         """初始化本地分类模型"""
         try:
@@ -120,33 +185,9 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         if not self.use_semantic or self.sentence_model is None:
             return 0
         
-        try:
-            # 组合标题和内容的前200字符
-            text = f"{title} {content[:200]}"
-            
-            # 计算文本embedding
-            text_embedding = self.sentence_model.encode([text])
-            
-            # 计算与公司相关文本的相似度
-            similarities = []
-            for company_emb in self.company_embedding:
-                similarity = np.dot(text_embedding[0], company_emb) / (
-                    np.linalg.norm(text_embedding[0]) * np.linalg.norm(company_emb)
-                )
-                similarities.append(similarity)
-            
-            # 取最高相似度
-            max_similarity = max(similarities)
-            
-            # 转换为0-100评分
-            semantic_score = max(0, min(100, max_similarity * 100))
-            
-            logger.debug(f"[增强过滤器] 语义相似度评分: {semantic_score:.1f}")
-            return semantic_score
-            
-        except Exception as e:
-            logger.error(f"[增强过滤器] 语义相似度计算失败: {e}")
-            return 0
+        semantic_score = float(self.calculate_semantic_similarities([title], [content])[0])
+        logger.debug(f"[增强过滤器] 语义相似度评分: {semantic_score:.1f}")
+        return semantic_score
     
     def classify_news_relevance(self, title: str, content: str) -> float:
         """
@@ -234,24 +275,29 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
             scores['classification_score'] = 0
         
         # 4. 综合评分（加权平均）
+        scores['final_score'] = self._combine_scores(rule_score, scores['semantic_score'],
+                                                     scores['classification_score'])
+        final_score = scores['final_score']
+        
+        logger.debug(f"[增强过滤器] 综合评分 - 规则:{rule_score:.1f}, 语义:{scores['semantic_score']:.1f}, "
+                    f"分类:{scores['classification_score']:.1f}, 最终:{final_score:.1f}")
+        
+        return scores
+    
+    @staticmethod
+    def _combine_scores(rule_score, semantic_score, classification_score):
+        """综合评分（加权平均），支持标量和数组"""
         weights = {
             'rule': 0.4,      # 规则过滤权重40%
             'semantic': 0.35,  # 语义相似度权重35%
             'classification': 0.25  # 分类模型权重25%
         }
         
-        final_score = (
+        return (
             weights['rule'] * rule_score +
-            weights['semantic'] * scores['semantic_score'] +
-            weights['classification'] * scores['classification_score']
+            weights['semantic'] * semantic_score +
+            weights['classification'] * classification_score
         )
-        
-        scores['final_score'] = final_score
-        
-        logger.debug(f"[增强过滤器] 综合评分 - 规则:{rule_score:.1f}, 语义:{scores['semantic_score']:.1f}, "
-                    f"分类:{scores['classification_score']:.1f}, 最终:{final_score:.1f}")
-        
-        return scores
     
     def filter_news_enhanced(self, news_df: pd.DataFrame, min_score: float = 40) -> pd.DataFrame:
         """
@@ -270,27 +316,32 @@ class EnhancedNewsFilter(NewsRelevanceFilter):
         
         logger.info(f"[增强过滤器] 开始增强过滤，原始数量: {len(news_df)}条，最低评分阈值: {min_score}")
         
-        filtered_news = []
+        titles = self._text_column(news_df, '新闻标题', '标题')
+        contents = self._text_column(news_df, '新闻内容', '内容')
         
-        for idx, row in news_df.iterrows():
-            title = row.get('新闻标题', row.get('标题', ''))
-            content = row.get('新闻内容', row.get('内容', ''))
-            
-            # 计算增强评分
-            scores = self.calculate_enhanced_relevance_score(title, content)
-            
-            if scores['final_score'] >= min_score:
-                row_dict = row.to_dict()
-                row_dict.update(scores)  # 添加所有评分信息
-                filtered_news.append(row_dict)
-                
-                logger.debug(f"[增强过滤器] 保留新闻 (综合评分: {scores['final_score']:.1f}): {title[:50]}...")
-            else:
-                logger.debug(f"[增强过滤器] 过滤新闻 (综合评分: {scores['final_score']:.1f}): {title[:50]}...")
+        # 规则评分和语义评分都按整批计算
+        rule_scores = np.asarray(self.score_batch(titles, contents), dtype=float)
+        semantic_scores = self.calculate_semantic_similarities(titles, contents)
+        if self.use_local_model:
+            classification_scores = np.asarray(
+                [self.classify_news_relevance(title, content) for title, content in zip(titles, contents)],
+                dtype=float)
+        else:
+            classification_scores = np.zeros(len(titles))
+        final_scores = self._combine_scores(rule_scores, semantic_scores, classification_scores)
+        
+        keep = final_scores >= min_score
+        logger.debug(f"[增强过滤器] 评分完成，{int(keep.sum())}条 达到阈值")
+        
+        filtered_news = news_df[keep].reset_index(drop=True)
+        filtered_news['rule_score'] = rule_scores[keep]
+        filtered_news['semantic_score'] = semantic_scores[keep]
+        filtered_news['classification_score'] = classification_scores[keep]
+        filtered_news['final_score'] = final_scores[keep]
         
         # 创建过滤后的DataFrame
-        if filtered_news:
-            filtered_df = pd.DataFrame(filtered_news)
+        if not filtered_news.empty:
+            filtered_df = filtered_news
             # 按综合评分排序
             filtered_df = filtered_df.sort_values('final_score', ascending=False)
             logger.info(f"[增强过滤器] 增强过滤完成，保留 {len(filtered_df)}条 新闻")
@@ -0,0 +1,216 @@
+"""
+新闻近似重复检测
+基于字符shingle的MinHash签名和LSH分桶，在近似线性时间内把措辞略有差异的转载新闻聚为一簇，
+每簇保留一条代表新闻并记录该簇包含的新闻数量和来源。
+数字、日期和序数不同的标题（如一季度/三季度、第一次/第二次股东大会）即使字面相似也不会合并
+"""
+
+import re
+import zlib
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+import pandas as pd
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 归一化时去掉空白和标点，只保留文字和数字
+_NON_WORD_PATTERN = re.compile(r'[\W_]+', re.UNICODE)
+
+# 区分性记号：阿拉伯数字（含日期、Q1-Q4）、中文序数和带量词的中文数字、英文序数词
+# 中文数字只在"第X"或后接量词/单位时计入，避免"万得"、"统一"等普通词语中的数字字被当作区分性记号
+_CN_NUMERALS = '零〇一二三四五六七八九十百千万亿两'
+_CN_NUMERAL_UNITS = ('季度|季|月|日|号|年|周|天|倍|成|届|次|期|轮|批|项|条|款|个|只|家|名|位|'
+                     '股|手|元|美元|港元|台|辆|笔|%|％')
+_DISTINGUISHING_PATTERN = re.compile(
+    rf'\d+(?:\.\d+)?|第[{_CN_NUMERALS}]+|[{_CN_NUMERALS}]+(?:{_CN_NUMERAL_UNITS})|'
+    r'\b(?:first|second|third|fourth|fifth|sixth|seventh|eighth|ninth|tenth|last)\b',
+    re.IGNORECASE)
+
+
+def normalize_text(text: str) -> str:
+    """小写并去掉空白和标点"""
+    return _NON_WORD_PATTERN.sub('', (text or '').lower())
+
+
+def char_shingles(text: str, size: int = 3) -> Set[str]:
+    """生成字符shingle集合，文本短于size时整体作为一个shingle"""
+    normalized = normalize_text(text)
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def distinguishing_tokens(text: str) -> frozenset:
+    """提取数字、日期和序数记号；这些记号不同的两条文本说的是不同的事件"""
+    return frozenset(token.lower() for token in _DISTINGUISHING_PATTERN.findall(text or ''))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateDetector:
+    """
+    MinHash + LSH 近似重复检测器
+
+    - 每条文本取字符shingle，计算 num_perm 维MinHash签名
+    - 签名分为 bands 段，任一段完全相同的文本成为候选对
+    - 候选对再用精确Jaccard相似度确认（>= threshold），且数字/日期/序数记号完全相同，用并查集聚簇
+    """
+
+    def __init__(self, threshold: float = 0.8, shingle_size: int = 3,
+                 num_perm: int = 60, bands: int = 20, seed: int = 42):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.default_rng(seed)
+        # multiply-shift 哈希族：h(x) = (a * x + b) mod 2^64 >> 32，a 为奇数
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles: Set[str]) -> np.ndarray:
+        """计算MinHash签名"""
+        if not shingles:
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        hashed = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        with np.errstate(over='ignore'):
+            permuted = (np.outer(hashed, self._a) + self._b) >> np.uint64(32)
+        return permuted.min(axis=0)
+
+    def cluster(self, texts: Sequence[str]) -> List[List[int]]:
+        """
+        对文本聚簇
+
+        Returns:
+            List[List[int]]: 每簇内的文本下标，簇按首条文本出现顺序排列，簇内下标升序
+        """
+        shingle_sets = [char_shingles(text, self.shingle_size) for text in texts]
+        token_sets = [distinguishing_tokens(text) for text in texts]
+        parent = list(range(len(texts)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        buckets: Dict[tuple, List[int]] = defaultdict(list)
+        for i, shingles in enumerate(shingle_sets):
+            if not shingles:
+                continue
+            signature = self.signature(shingles)
+            for band in range(self.bands):
+                band_key = (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                bucket = buckets[band_key]
+                for j in bucket:
+                    root_i, root_j = find(i), find(j)
+                    if (root_i != root_j and token_sets[i] == token_sets[j]
+                            and jaccard(shingles, shingle_sets[j]) >= self.threshold):
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+                bucket.append(i)
+
+        clusters: Dict[int, List[int]] = {}
+        for i in range(len(texts)):
+            clusters.setdefault(find(i), []).append(i)
+        return sorted(clusters.values(), key=lambda members: members[0])
+
+    def deduplicate(self, items: Sequence, text_fn: Callable[[object], str],
+                    rank_fn: Optional[Callable[[object], float]] = None) -> List[Dict]:
+        """
+        聚簇并为每簇选出代表
+
+        Args:
+            items: 待去重的对象
+            text_fn: 取出用于比较的文本（通常是标题）
+            rank_fn: 代表选择依据，分数最高者为代表；None时取簇内第一条
+
+        Returns:
+            List[Dict]: 每簇一个字典 {'item': 代表, 'members': 簇内全部对象}，按代表出现顺序排列
+        """
+        clusters = self.cluster([text_fn(item) for item in items])
+        results = []
+        for members in clusters:
+            member_items = [items[i] for i in members]
+            if rank_fn is not None:
+                representative = max(member_items, key=rank_fn)
+            else:
+                representative = member_items[0]
+            results.append({'item': representative, 'members': member_items})
+
+        removed = len(items) - len(results)
+        if removed:
+            logger.debug(f"[近似去重] {len(items)} 条新闻聚为 {len(results)} 簇，合并 {removed} 条近似重复")
+        return results
+
+
+_default_detector = None
+
+
+def get_near_duplicate_detector() -> NearDuplicateDetector:
+    """获取默认参数的检测器（签名哈希参数固定，可安全共享）"""
+    global _default_detector
+    if _default_detector is None:
+        _default_detector = NearDuplicateDetector()
+    return _default_detector
+
+
+def deduplicate_news_frame(news_df: pd.DataFrame, text_column: str,
+                           rank_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    对新闻DataFrame做近似去重
+
+    每簇保留 rank_column 最高（未指定时为最先出现）的一行，并新增 source_count 列记录该簇的新闻数量。
+    保持输入的行顺序。
+    """
+    if news_df.empty or text_column not in news_df.columns:
+        return news_df
+
+    texts = news_df[text_column].fillna('').astype(str).tolist()
+    ranks = news_df[rank_column].tolist() if rank_column else None
+    keep_positions = []
+    counts = []
+    for members in get_near_duplicate_detector().cluster(texts):
+        if ranks is not None:
+            # 分数相同时取最先出现的
+            best = max(members, key=lambda i: (ranks[i], -i))
+        else:
+            best = members[0]
+        keep_positions.append(best)
+        counts.append(len(members))
+
+    order = np.argsort(keep_positions, kind='stable')
+    result = news_df.iloc[[keep_positions[i] for i in order]].copy()
+    result['source_count'] = [counts[i] for i in order]
+    return result
+
+
+def deduplicate_text_blocks(text: str, min_block_length: int = 20) -> str:
+    """
+    去除文本报告中近似重复的段落（以空行分隔），保留首次出现的段落
+
+    短于 min_block_length 的段落（标题、分隔线等）不参与比较。
+    """
+    blocks = re.split(r'\n\s*\n', text)
+    candidates = [i for i, block in enumerate(blocks) if len(normalize_text(block)) >= min_block_length]
+    if len(candidates) < 2:
+        return text
+
+    clusters = get_near_duplicate_detector().cluster([blocks[i] for i in candidates])
+    dropped = {candidates[i] for members in clusters for i in members[1:]}
+    if not dropped:
+        return text
+
+    logger.info(f"[近似去重] 移除 {len(dropped)} 个近似重复的新闻段落")
+    return '\n\n'.join(block for i, block in enumerate(blocks) if i not in dropped)
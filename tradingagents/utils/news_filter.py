@@ -3,14 +3,82 @@
 用于过滤与特定股票/公司不相关的新闻，提高新闻分析质量
 """
 
+import bisect
 import pandas as pd
 import re
-from typing import List, Dict, Tuple
+from typing import Dict, Iterable, List, Set
 from datetime import datetime
 import logging
 
+from tradingagents.utils.news_dedup import deduplicate_news_frame
+
 logger = logging.getLogger(__name__)
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+class KeywordMatcher:
+    """
+    多关键词匹配器，构建一次后重复使用
+    
+    - 安装了 pyahocorasick 时使用 Aho-Corasick 自动机，每条文本只扫描一遍
+    - 否则批量匹配时把所有文本用分隔符拼接，每个关键词在整个语料上做一次子串扫描，
+      命中后直接跳到下一条文本，省去逐条文本、逐个关键词的循环开销
+    
+    两种方式的结果都与逐个关键词做 `keyword in text` 判断相同。
+    """
+    
+    _SEPARATOR = '\x00'
+    
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = [keyword for keyword in dict.fromkeys(keywords)
+                         if keyword and self._SEPARATOR not in keyword]
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and self.keywords:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+    
+    def match(self, text: str) -> Set[str]:
+        """返回文本中出现的关键词"""
+        if self._automaton is not None:
+            return {keyword for _, keyword in self._automaton.iter(text)}
+        return {keyword for keyword in self.keywords if keyword in text}
+    
+    def match_batch(self, texts: List[str]) -> List[Set[str]]:
+        """返回每条文本中出现的关键词"""
+        if any(self._SEPARATOR in text for text in texts):
+            return [self.match(text) for text in texts]
+        
+        hits = [set() for _ in texts]
+        corpus = self._SEPARATOR.join(texts)
+        # ends[i] 为第 i 条文本之后分隔符的位置
+        ends = []
+        position = 0
+        for text in texts:
+            position += len(text)
+            ends.append(position)
+            position += 1
+        
+        if self._automaton is not None:
+            for end_index, keyword in self._automaton.iter(corpus):
+                hits[bisect.bisect_left(ends, end_index)].add(keyword)
+            return hits
+        
+        for keyword in self.keywords:
+            position = corpus.find(keyword)
+            while position != -1:
+                doc = bisect.bisect_left(ends, position)
+                hits[doc].add(keyword)
+                position = corpus.find(keyword, ends[doc] + 1)
+        return hits
+
+
 class NewsRelevanceFilter:
     """基于规则的新闻相关性过滤器"""
     
@@ -48,6 +116,14 @@ class NewsRelevanceFilter:
             '资产重组', '借壳上市', '退市', '摘帽', 'ST'
         ]
     
+    def _get_matcher(self) -> 'KeywordMatcher':
+        """获取关键词匹配器，关键词列表被修改后自动重建"""
+        keywords = tuple(self.strong_keywords) + tuple(self.include_keywords) + tuple(self.exclude_keywords)
+        if getattr(self, '_matcher_keywords', None) != keywords:
+            self._matcher = KeywordMatcher(keywords)
+            self._matcher_keywords = keywords
+        return self._matcher
+
     def calculate_relevance_score(self, title: str, content: str) -> float:
         """
         计算新闻相关性评分
@@ -59,85 +135,116 @@ class NewsRelevanceFilter:
         Returns:
             float: 相关性评分 (0-100)
         """
+        matcher = self._get_matcher()
+        return self._score(title, content, matcher.match(title.lower()), matcher.match(content.lower()),
+                           verbose=True)
+
+    def score_batch(self, titles: List[str], contents: List[str]) -> List[float]:
+        """
+        批量计算相关性评分，结果与逐条调用 calculate_relevance_score 相同
+        
+        Args:
+            titles: 新闻标题列表
+            contents: 新闻内容列表（与标题一一对应）
+            
+        Returns:
+            List[float]: 相关性评分列表
+        """
+        matcher = self._get_matcher()
+        title_hits = matcher.match_batch([title.lower() for title in titles])
+        content_hits = matcher.match_batch([content.lower() for content in contents])
+        return [self._score(title, content, title_matched, content_matched)
+                for title, content, title_matched, content_matched
+                in zip(titles, contents, title_hits, content_hits)]
+
+    def _score(self, title: str, content: str, title_hits: Set[str], content_hits: Set[str],
+               verbose: bool = False) -> float:
+        """根据标题和内容中命中的关键词计算评分"""
         score = 0
-        title_lower = title.lower()
-        content_lower = content.lower()
         
         # 1. 直接提及公司名称
         if self.company_name in title:
             score += 50  # 标题中出现公司名称，高分
-            logger.debug(f"[过滤器] 标题包含公司名称 '{self.company_name}': +50分")
+            if verbose:
+                logger.debug(f"[过滤器] 标题包含公司名称 '{self.company_name}': +50分")
         elif self.company_name in content:
             score += 25  # 内容中出现公司名称，中等分
-            logger.debug(f"[过滤器] 内容包含公司名称 '{self.company_name}': +25分")
+            if verbose:
+                logger.debug(f"[过滤器] 内容包含公司名称 '{self.company_name}': +25分")
             
         # 2. 直接提及股票代码
         if self.stock_code in title:
             score += 40  # 标题中出现股票代码，高分
-            logger.debug(f"[过滤器] 标题包含股票代码 '{self.stock_code}': +40分")
+            if verbose:
+                logger.debug(f"[过滤器] 标题包含股票代码 '{self.stock_code}': +40分")
         elif self.stock_code in content:
             score += 20  # 内容中出现股票代码，中等分
-            logger.debug(f"[过滤器] 内容包含股票代码 '{self.stock_code}': +20分")
+            if verbose:
+                logger.debug(f"[过滤器] 内容包含股票代码 '{self.stock_code}': +20分")
             
         # 3. 强相关关键词检查
         strong_matches = []
         for keyword in self.strong_keywords:
-            if keyword in title_lower:
+            if keyword in title_hits:
                 score += 30
                 strong_matches.append(keyword)
-            elif keyword in content_lower:
+            elif keyword in content_hits:
                 score += 15
                 strong_matches.append(keyword)
         
-        if strong_matches:
+        if strong_matches and verbose:
             logger.debug(f"[过滤器] 强相关关键词匹配: {strong_matches}")
             
         # 4. 包含关键词检查
         include_matches = []
         for keyword in self.include_keywords:
-            if keyword in title_lower:
+            if keyword in title_hits:
                 score += 15
                 include_matches.append(keyword)
-            elif keyword in content_lower:
+            elif keyword in content_hits:
                 score += 8
                 include_matches.append(keyword)
         
-        if include_matches:
+        if include_matches and verbose:
             logger.debug(f"[过滤器] 相关关键词匹配: {include_matches[:3]}...")  # 只显示前3个
             
         # 5. 排除关键词检查（减分）
         exclude_matches = []
         for keyword in self.exclude_keywords:
-            if keyword in title_lower:
+            if keyword in title_hits:
                 score -= 40  # 标题中出现排除词，大幅减分
                 exclude_matches.append(keyword)
-            elif keyword in content_lower:
+            elif keyword in content_hits:
                 score -= 20  # 内容中出现排除词，中等减分
                 exclude_matches.append(keyword)
         
-        if exclude_matches:
+        if exclude_matches and verbose:
             logger.debug(f"[过滤器] 排除关键词匹配: {exclude_matches[:3]}...")
             
         # 6. 特殊规则：如果标题完全不包含公司信息但包含排除词，严重减分
         if (self.company_name not in title and self.stock_code not in title and 
-            any(keyword in title_lower for keyword in self.exclude_keywords)):
+            any(keyword in title_hits for keyword in self.exclude_keywords)):
             score -= 30
-            logger.debug(f"[过滤器] 标题无公司信息但含排除词: -30分")
+            if verbose:
+                logger.debug(f"[过滤器] 标题无公司信息但含排除词: -30分")
         
         # 确保评分在0-100范围内
         final_score = max(0, min(100, score))
         
-        logger.debug(f"[过滤器] 最终评分: {final_score}分 - 标题: {title[:30]}...")
+        if verbose:
+            logger.debug(f"[过滤器] 最终评分: {final_score}分 - 标题: {title[:30]}...")
         
         return final_score
     
-    def filter_news(self, news_df: pd.DataFrame, min_score: float = 30) -> pd.DataFrame:
+    def filter_news(self, news_df: pd.DataFrame, min_score: float = 30,
+                    deduplicate: bool = False) -> pd.DataFrame:
         """
         过滤新闻DataFrame
         
         Args:
             news_df: 原始新闻DataFrame
             min_score: 最低相关性评分阈值
+            deduplicate: 是否合并标题近似重复的转载新闻（保留评分最高的一条，source_count 列记录报道数量）
             
         Returns:
             pd.DataFrame: 过滤后的新闻DataFrame，按相关性评分排序
@@ -148,27 +255,24 @@ class NewsRelevanceFilter:
         
         logger.info(f"[过滤器] 开始过滤新闻，原始数量: {len(news_df)}条，最低评分阈值: {min_score}")
         
-        filtered_news = []
+        titles = self._text_column(news_df, '新闻标题', '标题')
+        contents = self._text_column(news_df, '新闻内容', '内容')
+        scores = self.score_batch(titles, contents)
+        keep = [score >= min_score for score in scores]
+        logger.debug(f"[过滤器] 评分完成，{sum(keep)}条 达到阈值")
         
-        for idx, row in news_df.iterrows():
-            title = row.get('新闻标题', row.get('标题', ''))
-            content = row.get('新闻内容', row.get('内容', ''))
-            
-            # 计算相关性评分
-            score = self.calculate_relevance_score(title, content)
-            
-            if score >= min_score:
-                row_dict = row.to_dict()
-                row_dict['relevance_score'] = score
-                filtered_news.append(row_dict)
-                
-                logger.debug(f"[过滤器] 保留新闻 (评分: {score:.1f}): {title[:50]}...")
-            else:
-                logger.debug(f"[过滤器] 过滤新闻 (评分: {score:.1f}): {title[:50]}...")
+        filtered_news = news_df[keep].reset_index(drop=True)
+        filtered_news['relevance_score'] = [score for score, kept in zip(scores, keep) if kept]
         
         # 创建过滤后的DataFrame
-        if filtered_news:
-            filtered_df = pd.DataFrame(filtered_news)
+        if not filtered_news.empty:
+            filtered_df = filtered_news
+            if deduplicate:
+                title_column = '新闻标题' if '新闻标题' in filtered_df.columns else '标题'
+                before_count = len(filtered_df)
+                filtered_df = deduplicate_news_frame(filtered_df, title_column, rank_column='relevance_score')
+                if len(filtered_df) < before_count:
+                    logger.info(f"[过滤器] 近似去重合并 {before_count - len(filtered_df)}条 重复新闻")
             # 按相关性评分排序
             filtered_df = filtered_df.sort_values('relevance_score', ascending=False)
             logger.info(f"[过滤器] 过滤完成，保留 {len(filtered_df)}条 新闻")
@@ -178,6 +282,17 @@ class NewsRelevanceFilter:
             
         return filtered_df
     
+    @staticmethod
+    def _text_column(news_df: pd.DataFrame, primary: str, fallback: str) -> List[str]:
+        """取出标题/内容列，优先使用 primary 列"""
+        if primary in news_df.columns:
+            column = news_df[primary]
+        elif fallback in news_df.columns:
+            column = news_df[fallback]
+        else:
+            return [''] * len(news_df)
+        return column.fillna('').astype(str).tolist()
+    
     def get_filter_statistics(self, original_df: pd.DataFrame, filtered_df: pd.DataFrame) -> Dict:
         """
         获取过滤统计信息
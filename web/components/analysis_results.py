@@ -122,213 +122,192 @@ def get_analysis_tags(analysis_id):
     tags = load_tags()
     return tags.get(analysis_id, [])
 
+_mongodb_manager = None
+
+
+def get_mongodb_manager():
+    """获取共享的MongoDB报告管理器，避免每次渲染都重新建立连接"""
+    global _mongodb_manager
+    if _mongodb_manager is None and MONGODB_AVAILABLE:
+        _mongodb_manager = MongoDBReportManager()
+    return _mongodb_manager
+
 def load_analysis_results(start_date=None, end_date=None, stock_symbol=None, analyst_type=None,
-                         limit=100, search_text=None, tags_filter=None, favorites_only=False):
-    """加载分析结果 - 优先从MongoDB加载"""
-    all_results = []
-    favorites = load_favorites() if favorites_only else []
+                         limit=100, search_text=None, tags_filter=None, favorites_only=False, offset=0):
+    """
+    加载分析结果摘要 - 优先从MongoDB加载
+
+    过滤、排序和分页下推到MongoDB或本地历史目录(SQLite)，只返回摘要字段；
+    报告正文在展开详情时通过 load_report_detail 读取。
+    """
     tags_data = load_tags()
-    mongodb_loaded = False
+    favorites = load_favorites()
+
+    # 收藏和标签保存在本地文件中，转换为 analysis_id 集合下推给数据源
+    analysis_ids = None
+    if favorites_only:
+        analysis_ids = set(favorites)
+    if tags_filter:
+        tagged_ids = {analysis_id for analysis_id, tags in tags_data.items()
+                      if any(tag in tags for tag in tags_filter)}
+        analysis_ids = tagged_ids if analysis_ids is None else analysis_ids & tagged_ids
+    if analysis_ids is not None and not analysis_ids:
+        return []
+
+    query_kwargs = dict(
+        start_date=start_date,
+        end_date=end_date,
+        stock_symbol=stock_symbol,
+        analyst_type=analyst_type,
+        search_text=search_text,
+        analysis_ids=analysis_ids,
+        skip=offset,
+        limit=limit,
+    )
+
+    results = None
+    mongodb_manager = None
 
     # 优先从MongoDB加载数据
     if MONGODB_AVAILABLE:
         try:
-            print("🔍 [数据加载] 从MongoDB加载分析结果")
-            mongodb_manager = MongoDBReportManager()
-            mongodb_results = mongodb_manager.get_all_reports()
-            print(f"🔍 [数据加载] MongoDB返回 {len(mongodb_results)} 个结果")
-
-            for mongo_result in mongodb_results:
-                # 转换MongoDB结果格式
-                result = {
-                    'analysis_id': mongo_result.get('analysis_id', ''),
-                    'timestamp': mongo_result.get('timestamp', 0),
-                    'stock_symbol': mongo_result.get('stock_symbol', ''),
-                    'analysts': mongo_result.get('analysts', []),
-                    'research_depth': mongo_result.get('research_depth', 1),
-                    'status': mongo_result.get('status', 'completed'),
-                    'summary': mongo_result.get('summary', ''),
-                    'performance': mongo_result.get('performance', {}),
-                    'tags': tags_data.get(mongo_result.get('analysis_id', ''), []),
-                    'is_favorite': mongo_result.get('analysis_id', '') in favorites,
-                    'reports': mongo_result.get('reports', {}),
-                    'source': 'mongodb'  # 标记数据来源
-                }
-                all_results.append(result)
-
-            mongodb_loaded = True
-            print(f"✅ 从MongoDB加载了 {len(mongodb_results)} 个分析结果")
-
+            mongodb_manager = get_mongodb_manager()
+            if not mongodb_manager.connected:
+                mongodb_manager = None
         except Exception as e:
             print(f"❌ MongoDB加载失败: {e}")
             logger.error(f"MongoDB加载失败: {e}")
-            mongodb_loaded = False
+            mongodb_manager = None
     else:
         print("⚠️ MongoDB不可用，将使用文件系统数据")
 
-    # 只有在MongoDB加载失败或不可用时才从文件系统加载
-    if not mongodb_loaded:
-        print("🔄 [备用数据源] 从文件系统加载分析结果")
-
-        # 首先尝试从Web界面的保存位置读取
-        web_results_dir = get_analysis_results_dir()
-        for result_file in web_results_dir.glob("*.json"):
-            if result_file.name in ['favorites.json', 'tags.json']:
-                continue
+    # 关键词搜索走全文检索索引：先按相关度取命中的分析，再与其他条件一起下推查询
+    search_ranks = None
+    if search_text:
+        search_ranks = search_report_index(search_text, analysis_ids, mongodb_manager)
+        if search_ranks is not None:
+            if not search_ranks:
+                return []
+            query_kwargs.update(search_text=None, analysis_ids=list(search_ranks), skip=0, limit=len(search_ranks))
 
-            try:
-                with open(result_file, 'r', encoding='utf-8') as f:
-                    result = json.load(f)
+    if mongodb_manager is not None:
+        try:
+            print("🔍 [数据加载] 从MongoDB查询分析结果")
+            results = mongodb_manager.query_reports(**query_kwargs)
+            print(f"✅ 从MongoDB加载了 {len(results)} 个分析结果")
+        except Exception as e:
+            print(f"❌ MongoDB加载失败: {e}")
+            logger.error(f"MongoDB加载失败: {e}")
+            results = None
 
-                    # 添加标签信息
-                    result['tags'] = tags_data.get(result.get('analysis_id', ''), [])
-                    result['is_favorite'] = result.get('analysis_id', '') in favorites
-                    result['source'] = 'file_system'  # 标记数据来源
+    # 只有在MongoDB加载失败或不可用时才从文件系统加载
+    if results is None:
+        print("🔄 [备用数据源] 从本地历史目录加载分析结果")
+        try:
+            from web.utils.analysis_history_catalog import get_history_catalog
+            results = get_history_catalog().query(**query_kwargs)
+        except Exception as e:
+            st.warning(f"读取本地分析结果失败: {e}")
+            logger.error(f"本地历史目录查询失败: {e}")
+            results = []
+        print(f"🔄 [备用数据源] 从文件系统加载了 {len(results)} 个分析结果")
 
-                    all_results.append(result)
-            except Exception as e:
-                st.warning(f"读取分析结果文件 {result_file.name} 失败: {e}")
+    if search_ranks is not None:
+        # 按相关度排序后再分页
+        results.sort(key=lambda r: search_ranks.get(r.get('analysis_id', ''), len(search_ranks)))
+        results = results[offset:offset + limit]
 
-        # 然后从实际的分析结果保存位置读取
-        project_results_dir = Path(__file__).parent.parent.parent / "data" / "analysis_results" / "detailed"
+    for result in results:
+        result['tags'] = tags_data.get(result.get('analysis_id', ''), [])
+        result['is_favorite'] = result.get('analysis_id', '') in favorites
 
-        if project_results_dir.exists():
-            # 遍历股票代码目录
-            for stock_dir in project_results_dir.iterdir():
-                if not stock_dir.is_dir():
-                    continue
+    return results
 
-                stock_code = stock_dir.name
+def search_report_index(search_text, analysis_ids=None, mongodb_manager=None, max_hits=1000):
+    """
+    在报告全文检索索引中搜索
 
-                # 遍历日期目录
-                for date_dir in stock_dir.iterdir():
-                    if not date_dir.is_dir():
-                        continue
+    Returns:
+        {analysis_id: 相关度名次}；索引不可用时返回None，由数据源退回摘要搜索
+    """
+    try:
+        from web.utils.report_search_index import get_report_search_index
+
+        search_index = get_report_search_index()
+        if not search_index.available:
+            return None
+        # 首次使用时回填历史报告
+        if mongodb_manager is not None:
+            if not mongodb_manager.ensure_search_index(search_index):
+                return None
+        else:
+            from web.utils.analysis_history_catalog import get_history_catalog
+            get_history_catalog().refresh(force=not search_index.is_backfilled("file_system"))
 
-                    date_str = date_dir.name
-                    reports_dir = date_dir / "reports"
+        hits = search_index.search(search_text, limit=max_hits, analysis_ids=analysis_ids)
+        print(f"🔍 [全文检索] '{search_text}' 命中 {len(hits)} 个分析")
+        return {hit['analysis_id']: rank for rank, hit in enumerate(hits)}
+    except Exception as e:
+        logger.error(f"全文检索失败: {e}")
+        return None
+
+def load_report_detail(result):
+    """按需读取报告正文，合并到结果中（列表只包含摘要字段）"""
+    if result.get('reports') or result.get('full_data'):
+        return result
+
+    analysis_id = result.get('analysis_id', '')
+    cache = st.session_state.setdefault('report_detail_cache', {})
+    if analysis_id not in cache:
+        detail = {}
+        try:
+            if result.get('source') == 'mongodb':
+                mongodb_manager = get_mongodb_manager()
+                if mongodb_manager:
+                    detail = {'reports': mongodb_manager.get_report_bodies(analysis_id)}
+            else:
+                from web.utils.analysis_history_catalog import get_history_catalog
+                detail = get_history_catalog().load_report_detail(analysis_id)
+        except Exception as e:
+            logger.error(f"读取报告正文失败 {analysis_id}: {e}")
+        cache[analysis_id] = detail
+
+    result.update(cache[analysis_id])
+    return result
+
+def load_report_details(results):
+    """
+    批量读取报告正文，返回带正文的结果副本（导出完整数据时调用）
+
+    MongoDB 中的记录一次查询读取；已展开过的记录直接使用会话缓存。
+    返回副本而不写入会话缓存，避免一次导出把全部正文留在会话中。
+    """
+    cache = st.session_state.get('report_detail_cache', {})
+    details = {}
+    mongodb_ids = []
+    for result in results:
+        analysis_id = result.get('analysis_id', '')
+        if result.get('reports') or result.get('full_data'):
+            continue
+        if analysis_id in cache:
+            details[analysis_id] = cache[analysis_id]
+        elif result.get('source') == 'mongodb':
+            mongodb_ids.append(analysis_id)
+        else:
+            try:
+                from web.utils.analysis_history_catalog import get_history_catalog
+                details[analysis_id] = get_history_catalog().load_report_detail(analysis_id)
+            except Exception as e:
+                logger.error(f"读取报告正文失败 {analysis_id}: {e}")
 
-                    if not reports_dir.exists():
-                        continue
+    if mongodb_ids:
+        mongodb_manager = get_mongodb_manager()
+        if mongodb_manager:
+            bodies = mongodb_manager.get_report_bodies_batch(mongodb_ids)
+            for analysis_id in mongodb_ids:
+                details[analysis_id] = {'reports': bodies.get(analysis_id, {})}
 
-                    # 读取所有报告文件
-                    reports = {}
-                    summary_content = ""
-
-                    for report_file in reports_dir.glob("*.md"):
-                        try:
-                            with open(report_file, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                report_name = report_file.stem
-                                reports[report_name] = content
-
-                                # 如果是最终决策报告，提取摘要
-                                if report_name == "final_trade_decision":
-                                    # 提取前200个字符作为摘要
-                                    summary_content = content[:200].replace('#', '').replace('*', '').strip()
-                                    if len(content) > 200:
-                                        summary_content += "..."
-
-                        except Exception as e:
-                            continue
-
-                    if reports:
-                        # 解析日期
-                        try:
-                            analysis_date = datetime.strptime(date_str, '%Y-%m-%d')
-                            timestamp = analysis_date.timestamp()
-                        except:
-                            timestamp = datetime.now().timestamp()
-
-                        # 创建分析结果条目
-                        analysis_id = f"{stock_code}_{date_str}_{int(timestamp)}"
-
-                        # 尝试从元数据文件中读取真实的研究深度和分析师信息
-                        research_depth = 1
-                        analysts = ['market', 'fundamentals', 'trader']  # 默认值
-
-                        metadata_file = date_dir / "analysis_metadata.json"
-                        if metadata_file.exists():
-                            try:
-                                with open(metadata_file, 'r', encoding='utf-8') as f:
-                                    metadata = json.load(f)
-                                    research_depth = metadata.get('research_depth', 1)
-                                    analysts = metadata.get('analysts', analysts)
-                            except Exception as e:
-                                # 如果读取元数据失败，使用推断逻辑
-                                if len(reports) >= 5:
-                                    research_depth = 3
-                                elif len(reports) >= 3:
-                                    research_depth = 2
-                        else:
-                            # 如果没有元数据文件，使用推断逻辑
-                            if len(reports) >= 5:
-                                research_depth = 3
-                            elif len(reports) >= 3:
-                                research_depth = 2
-
-                        result = {
-                            'analysis_id': analysis_id,
-                            'timestamp': timestamp,
-                            'stock_symbol': stock_code,
-                            'analysts': analysts,
-                            'research_depth': research_depth,
-                            'status': 'completed',
-                            'summary': summary_content,
-                            'performance': {},
-                            'tags': tags_data.get(analysis_id, []),
-                            'is_favorite': analysis_id in favorites,
-                            'reports': reports,  # 保存所有报告内容
-                            'source': 'file_system'  # 标记数据来源
-                        }
-
-                        all_results.append(result)
-
-        print(f"🔄 [备用数据源] 从文件系统加载了 {len(all_results)} 个分析结果")
-    
-    # 过滤结果
-    filtered_results = []
-    for result in all_results:
-        # 收藏过滤
-        if favorites_only and not result.get('is_favorite', False):
-            continue
-            
-        # 时间过滤
-        if start_date or end_date:
-            result_time = safe_timestamp_to_datetime(result.get('timestamp', 0))
-            if start_date and result_time.date() < start_date:
-                continue
-            if end_date and result_time.date() > end_date:
-                continue
-        
-        # 股票代码过滤
-        if stock_symbol and stock_symbol.upper() not in result.get('stock_symbol', '').upper():
-            continue
-        
-        # 分析师类型过滤
-        if analyst_type and analyst_type not in result.get('analysts', []):
-            continue
-            
-        # 文本搜索过滤
-        if search_text:
-            search_text = search_text.lower()
-            searchable_text = f"{result.get('stock_symbol', '')} {result.get('summary', '')} {' '.join(result.get('analysts', []))}".lower()
-            if search_text not in searchable_text:
-                continue
-                
-        # 标签过滤
-        if tags_filter:
-            result_tags = result.get('tags', [])
-            if not any(tag in result_tags for tag in tags_filter):
-                continue
-        
-        filtered_results.append(result)
-    
-    # 按时间倒序排列 - 使用安全的时间戳转换函数确保类型一致
-    filtered_results.sort(key=lambda x: safe_timestamp_to_datetime(x.get('timestamp', 0)), reverse=True)
-    
-    # 限制数量
-    return filtered_results[:limit]
+    return [{**result, **details.get(result.get('analysis_id', ''), {})} for result in results]
 
 def render_analysis_results():
     """渲染分析结果管理界面"""
@@ -955,7 +934,8 @@ def render_results_export(results: List[Dict[str, Any]]):
             
             else:  # 完整数据
                 if export_format == "JSON":
-                    json_data = json.dumps(results, ensure_ascii=False, indent=2)
+                    # 列表只包含摘要字段，导出前读取报告正文
+                    json_data = json.dumps(load_report_details(results), ensure_ascii=False, indent=2)
                     
                     st.download_button(
                         label="下载完整数据 JSON 文件",
@@ -1241,6 +1221,9 @@ def render_detailed_analysis_content(selected_result):
     """渲染详细分析结果内容"""
     st.subheader("📊 完整分析数据")
 
+    # 列表只包含摘要，展开时再读取报告正文
+    load_report_detail(selected_result)
+
     # 检查是否有报告数据（支持文件系统和MongoDB）
     if 'reports' in selected_result and selected_result['reports']:
         # 显示文件系统中的报告
@@ -1616,6 +1599,26 @@ def save_analysis_result(analysis_id: str, stock_symbol: str, analysts: List[str
         with open(result_file, 'w', encoding='utf-8') as f:
             json.dump(result_entry, f, ensure_ascii=False, indent=2)
 
+        try:
+            from web.utils.analysis_history_catalog import get_history_catalog
+            get_history_catalog().mark_stale()
+        except Exception as e:
+            logger.debug(f"刷新本地历史目录失败: {e}")
+
+        # 加入报告全文检索索引
+        try:
+            from web.utils.report_search_index import extract_report_texts, get_report_search_index
+            get_report_search_index().index_analysis(
+                analysis_id=analysis_id,
+                reports=extract_report_texts(result_data.get('reports'), result_data),
+                stock_symbol=stock_symbol,
+                timestamp=result_entry['timestamp'],
+                summary=str(result_entry.get('summary') or ''),
+                analysts=analysts,
+            )
+        except Exception as e:
+            logger.warning(f"加入报告检索索引失败: {e}")
+
         # 2. 保存到MongoDB（如果可用）
         if MONGODB_AVAILABLE:
             try:
@@ -1699,6 +1702,9 @@ def show_expanded_detail(result):
         st.markdown("---")
         st.markdown("### 📊 详细分析报告")
 
+        # 列表只包含摘要，展开时再读取报告正文
+        load_report_detail(result)
+
         # 检查是否有报告数据
         if 'reports' not in result or not result['reports']:
             # 如果没有reports字段，检查是否有其他分析数据
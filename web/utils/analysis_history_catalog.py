@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+分析历史本地目录
+MongoDB不可用时，历史记录页面原本每次渲染都要遍历
+data/analysis_results/detailed/<股票>/<日期>/reports/*.md 并读取全部报告文件。
+这里把每条分析的摘要信息登记到本地SQLite中：
+- 刷新时只对目录和文件做stat，修改时间未变化的分析不再读取文件
+- 过滤、排序和分页在SQLite中完成，列表只返回摘要字段
+- 报告正文在展开详情时按 analysis_id 单独读取
+- 可选同步维护报告全文检索索引（见 report_search_index）
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 列表视图返回的摘要字段
+SUMMARY_FIELDS = ("analysis_id", "timestamp", "stock_symbol", "analysts", "research_depth",
+                  "status", "summary", "performance")
+
+# Web界面结果目录中不属于分析结果的JSON文件
+_NON_RESULT_FILES = ("favorites.json", "tags.json")
+
+
+def date_range_to_timestamps(start_date=None, end_date=None):
+    """把日期范围转换为 [开始, 结束) 的本地时间戳，结束日期当天包含在内"""
+    start_ts = datetime.combine(start_date, datetime.min.time()).timestamp() if start_date else None
+    end_ts = (datetime.combine(end_date, datetime.min.time()) + timedelta(days=1)).timestamp() if end_date else None
+    return start_ts, end_ts
+
+
+def _infer_research_depth(report_count: int) -> int:
+    """没有元数据时按报告数量推断研究深度"""
+    if report_count >= 5:
+        return 3
+    if report_count >= 3:
+        return 2
+    return 1
+
+
+class AnalysisHistoryCatalog:
+    """文件系统分析结果的SQLite目录"""
+
+    def __init__(self, db_path: str, web_results_dir: Optional[str] = None,
+                 detailed_results_dir: Optional[str] = None, refresh_interval: float = 10,
+                 search_index=None):
+        self.db_path = db_path
+        self.web_results_dir = Path(web_results_dir) if web_results_dir else None
+        self.detailed_results_dir = Path(detailed_results_dir) if detailed_results_dir else None
+        self.refresh_interval = refresh_interval
+        self.search_index = search_index if search_index is not None and search_index.available else None
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+        self._stats = {'refreshes': 0, 'indexed': 0, 'removed': 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS analyses ("
+            " analysis_id TEXT PRIMARY KEY, stock_symbol TEXT COLLATE NOCASE, timestamp REAL,"
+            " analysts TEXT, research_depth INTEGER, status TEXT, summary TEXT, performance TEXT,"
+            " source_kind TEXT NOT NULL, source_path TEXT NOT NULL, source_mtime REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS analysis_analysts ("
+            " analyst TEXT NOT NULL, analysis_id TEXT NOT NULL, PRIMARY KEY (analyst, analysis_id));"
+            "CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses (timestamp);"
+            "CREATE INDEX IF NOT EXISTS idx_analyses_symbol ON analyses (stock_symbol, timestamp);"
+            "CREATE INDEX IF NOT EXISTS idx_analyses_source ON analyses (source_path);"
+        )
+        self._db.commit()
+
+    def mark_stale(self):
+        """下一次查询时强制刷新（保存新结果后调用）"""
+        self._last_refresh = 0.0
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """
+        与文件系统同步
+
+        只对目录和文件做stat；源文件修改时间未变化的分析直接跳过，
+        新增或修改的分析才读取文件，已删除的分析从目录中移除。
+        """
+        with self._lock:
+            if not force and time.time() - self._last_refresh < self.refresh_interval:
+                return {'indexed': 0, 'removed': 0}
+
+            known = {path: mtime for path, mtime in
+                     self._db.execute("SELECT source_path, source_mtime FROM analyses")}
+            # 检索索引尚未回填时，重新读取全部分析一次
+            backfill = self.search_index is not None and not self.search_index.is_backfilled("file_system")
+            seen = set()
+            indexed = 0
+
+            for kind, path, mtime in self._iter_sources():
+                seen.add(path)
+                if not backfill and known.get(path) == mtime:
+                    continue
+                try:
+                    entry = self._read_json_entry(path) if kind == "json" else self._read_detailed_entry(path)
+                except Exception as e:
+                    logger.warning(f"⚠️ [历史目录] 读取分析结果失败 {path}: {e}")
+                    continue
+                if entry:
+                    self._upsert(entry, kind, path, mtime)
+                    self._index_for_search(entry, kind, path)
+                    indexed += 1
+
+            removed = [path for path in known if path not in seen]
+            for path in removed:
+                self._delete_source(path)
+
+            self._db.commit()
+            if self.search_index is not None:
+                self.search_index.commit()
+            if backfill:
+                self.search_index.mark_backfilled("file_system", len(seen))
+            self._last_refresh = time.time()
+            self._stats['refreshes'] += 1
+            self._stats['indexed'] += indexed
+            self._stats['removed'] += len(removed)
+            if indexed or removed:
+                logger.info(f"📚 [历史目录] 更新 {indexed} 条，移除 {len(removed)} 条")
+            return {'indexed': indexed, 'removed': len(removed)}
+
+    def query(self, start_date=None, end_date=None, stock_symbol: Optional[str] = None,
+              analyst_type: Optional[str] = None, search_text: Optional[str] = None,
+              analysis_ids: Optional[Iterable[str]] = None, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """按条件查询分析摘要，按时间倒序分页返回，不包含报告正文"""
+        self.refresh()
+
+        clauses, params = [], []
+        start_ts, end_ts = date_range_to_timestamps(start_date, end_date)
+        if start_ts is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start_ts)
+        if end_ts is not None:
+            clauses.append("timestamp < ?")
+            params.append(end_ts)
+        if stock_symbol:
+            # 前缀范围查询，可以使用 (stock_symbol, timestamp) 索引
+            prefix = stock_symbol.strip().upper()
+            clauses.append("stock_symbol >= ? AND stock_symbol < ?")
+            params.extend([prefix, prefix + "\U0010ffff"])
+        if analyst_type:
+            clauses.append("analysis_id IN (SELECT analysis_id FROM analysis_analysts WHERE analyst = ?)")
+            params.append(analyst_type)
+        if analysis_ids is not None:
+            analysis_ids = list(analysis_ids)
+            if not analysis_ids:
+                return []
+            clauses.append(f"analysis_id IN ({', '.join('?' * len(analysis_ids))})")
+            params.extend(analysis_ids)
+        if search_text:
+            escaped = search_text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("(stock_symbol || ' ' || COALESCE(summary, '') || ' ' || COALESCE(analysts, '')) "
+                           "LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+
+        sql = f"SELECT {', '.join(SUMMARY_FIELDS)} FROM analyses"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
+        params.extend([limit, skip])
+
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [self._row_to_summary(row) for row in rows]
+
+    def load_report_detail(self, analysis_id: str) -> Dict[str, Any]:
+        """读取单条分析的报告正文（展开详情时调用）"""
+        with self._lock:
+            row = self._db.execute("SELECT source_kind, source_path FROM analyses WHERE analysis_id = ?",
+                                   (analysis_id,)).fetchone()
+        if not row:
+            return {}
+
+        kind, path = row
+        try:
+            if kind == "detailed":
+                return {'reports': self._read_reports(Path(path) / "reports")}
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {key: data[key] for key in ('reports', 'full_data') if data.get(key)}
+        except Exception as e:
+            logger.warning(f"⚠️ [历史目录] 读取报告正文失败 {analysis_id}: {e}")
+            return {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = self._db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            return stats
+
+    def _index_for_search(self, entry: Dict[str, Any], kind: str, path: str):
+        if self.search_index is None:
+            return
+        from web.utils.report_search_index import extract_report_texts
+
+        if kind == "detailed":
+            reports = extract_report_texts(entry.get('reports'))
+        else:
+            reports = extract_report_texts(entry.get('reports'), entry.get('full_data'))
+        self.search_index.index_analysis(
+            analysis_id=entry['analysis_id'],
+            reports=reports,
+            stock_symbol=entry.get('stock_symbol', ''),
+            timestamp=entry.get('timestamp') or 0,
+            summary=str(entry.get('summary') or ''),
+            analysts=entry.get('analysts') or [],
+            commit=False,
+        )
+
+    def _iter_sources(self):
+        """遍历分析结果来源，返回 (类型, 路径, 修改时间)，不读取文件内容"""
+        if self.web_results_dir and self.web_results_dir.exists():
+            for result_file in self.web_results_dir.glob("*.json"):
+                if result_file.name in _NON_RESULT_FILES:
+                    continue
+                yield "json", str(result_file), result_file.stat().st_mtime
+
+        if self.detailed_results_dir and self.detailed_results_dir.exists():
+            for stock_dir in self.detailed_results_dir.iterdir():
+                if not stock_dir.is_dir():
+                    continue
+                for date_dir in stock_dir.iterdir():
+                    reports_dir = date_dir / "reports"
+                    if not reports_dir.is_dir():
+                        continue
+                    # 报告文件只新增不改写，目录修改时间足以判断变化；元数据文件单独检查
+                    mtime = reports_dir.stat().st_mtime
+                    metadata_file = date_dir / "analysis_metadata.json"
+                    if metadata_file.exists():
+                        mtime = max(mtime, metadata_file.stat().st_mtime)
+                    yield "detailed", str(date_dir), mtime
+
+    @staticmethod
+    def _read_reports(reports_dir: Path) -> Dict[str, str]:
+        reports = {}
+        for report_file in reports_dir.glob("*.md"):
+            try:
+                with open(report_file, 'r', encoding='utf-8') as f:
+                    reports[report_file.stem] = f.read()
+            except Exception:
+                continue
+        return reports
+
+    def _read_json_entry(self, path: str) -> Optional[Dict[str, Any]]:
+        with open(path, 'r', encoding='utf-8') as f:
+            result = json.load(f)
+        if not result.get('analysis_id'):
+            return None
+        return result
+
+    def _read_detailed_entry(self, path: str) -> Optional[Dict[str, Any]]:
+        date_dir = Path(path)
+        stock_code, date_str = date_dir.parent.name, date_dir.name
+        reports = self._read_reports(date_dir / "reports")
+        if not reports:
+            return None
+
+        # 最终决策报告的前200个字符作为摘要
+        summary = ""
+        decision = reports.get("final_trade_decision")
+        if decision:
+            summary = decision[:200].replace('#', '').replace('*', '').strip()
+            if len(decision) > 200:
+                summary += "..."
+
+        try:
+            timestamp = datetime.strptime(date_str, '%Y-%m-%d').timestamp()
+        except ValueError:
+            timestamp = datetime.now().timestamp()
+
+        research_depth = _infer_research_depth(len(reports))
+        analysts = ['market', 'fundamentals', 'trader']  # 默认值
+        metadata_file = date_dir / "analysis_metadata.json"
+        if metadata_file.exists():
+            try:
+                with open(metadata_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+                research_depth = metadata.get('research_depth', 1)
+                analysts = metadata.get('analysts', analysts)
+            except Exception:
+                pass
+
+        return {
+            'analysis_id': f"{stock_code}_{date_str}_{int(timestamp)}",
+            'timestamp': timestamp,
+            'stock_symbol': stock_code,
+            'analysts': analysts,
+            'research_depth': research_depth,
+            'status': 'completed',
+            'summary': summary,
+            'performance': {},
+            'reports': reports,
+        }
+
+    def _upsert(self, entry: Dict[str, Any], kind: str, path: str, mtime: float):
+        analysis_id = entry['analysis_id']
+        analysts = entry.get('analysts') or []
+        self._delete_source(path)
+        self._db.execute("DELETE FROM analysis_analysts WHERE analysis_id = ?", (analysis_id,))
+        self._db.execute(
+            "INSERT OR REPLACE INTO analyses (analysis_id, stock_symbol, timestamp, analysts, research_depth, "
+            "status, summary, performance, source_kind, source_path, source_mtime) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (analysis_id, entry.get('stock_symbol', ''), float(entry.get('timestamp') or 0),
+             json.dumps(analysts, ensure_ascii=False), entry.get('research_depth', 1),
+             entry.get('status', 'completed'), str(entry.get('summary') or ''),
+             json.dumps(entry.get('performance') or {}, ensure_ascii=False, default=str),
+             kind, path, mtime),
+        )
+        self._db.executemany("INSERT OR IGNORE INTO analysis_analysts (analyst, analysis_id) VALUES (?, ?)",
+                             [(analyst, analysis_id) for analyst in analysts])
+
+    def _delete_source(self, path: str):
+        ids = [row[0] for row in self._db.execute("SELECT analysis_id FROM analyses WHERE source_path = ?", (path,))]
+        for analysis_id in ids:
+            self._db.execute("DELETE FROM analysis_analysts WHERE analysis_id = ?", (analysis_id,))
+            if self.search_index is not None:
+                self.search_index.remove_analysis(analysis_id, commit=False)
+        self._db.execute("DELETE FROM analyses WHERE source_path = ?", (path,))
+
+    @staticmethod
+    def _row_to_summary(row) -> Dict[str, Any]:
+        result = dict(zip(SUMMARY_FIELDS, row))
+        result['analysts'] = json.loads(result['analysts'] or '[]')
+        result['performance'] = json.loads(result['performance'] or '{}')
+        result['source'] = 'file_system'
+        return result
+
+
+_history_catalog = None
+_history_catalog_lock = threading.Lock()
+
+
+def get_history_catalog() -> AnalysisHistoryCatalog:
+    """获取全局分析历史目录
+
+    目录文件保存在 web/data/analysis_results/history_catalog.db，
+    登记 web/data/analysis_results/*.json 和 data/analysis_results/detailed 下的分析结果。
+    """
+    global _history_catalog
+    if _history_catalog is None:
+        with _history_catalog_lock:
+            if _history_catalog is None:
+                from web.utils.report_search_index import get_report_search_index
+
+                web_root = Path(__file__).parent.parent
+                web_results_dir = web_root / "data" / "analysis_results"
+                _history_catalog = AnalysisHistoryCatalog(
+                    db_path=str(web_results_dir / "history_catalog.db"),
+                    web_results_dir=str(web_results_dir),
+                    detailed_results_dir=str(web_root.parent / "data" / "analysis_results" / "detailed"),
+                    search_index=get_report_search_index(),
+                )
+    return _history_catalog
@@ -5,9 +5,10 @@ MongoDB报告管理器
 """
 
 import os
+import re
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional, Any
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Any
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -100,6 +101,10 @@ class MongoDBReportManager:
             # 创建单字段索引
             self.collection.create_index("analysis_id")
             self.collection.create_index("status")
+
+            # 历史记录页面：按时间倒序分页、按分析师过滤
+            self.collection.create_index([("timestamp", -1)])
+            self.collection.create_index([("analysts", 1), ("timestamp", -1)])
             
             logger.info("✅ MongoDB索引创建成功")
             
@@ -145,6 +150,7 @@ class MongoDBReportManager:
             
             if result.inserted_id:
                 logger.info(f"✅ 分析报告已保存到MongoDB: {analysis_id}")
+                self._index_for_search(document)
                 return True
             else:
                 logger.error("❌ MongoDB插入失败")
@@ -217,6 +223,112 @@ class MongoDBReportManager:
             logger.error(f"❌ 从MongoDB获取分析报告失败: {e}")
             return []
     
+    @staticmethod
+    def build_history_query(start_date=None, end_date=None, stock_symbol: Optional[str] = None,
+                            analyst_type: Optional[str] = None, search_text: Optional[str] = None,
+                            analysis_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """构建历史记录查询条件，日期范围包含结束日期当天"""
+        query = {}
+
+        if start_date or end_date:
+            time_query = {}
+            if start_date:
+                time_query["$gte"] = datetime.combine(start_date, datetime.min.time())
+            if end_date:
+                time_query["$lt"] = datetime.combine(end_date, datetime.min.time()) + timedelta(days=1)
+            query["timestamp"] = time_query
+
+        if stock_symbol:
+            # 锚定前缀的正则可以使用 stock_symbol 开头的复合索引
+            query["stock_symbol"] = {"$regex": f"^{re.escape(stock_symbol.strip().upper())}"}
+
+        if analyst_type:
+            query["analysts"] = analyst_type
+
+        if analysis_ids is not None:
+            query["analysis_id"] = {"$in": list(analysis_ids)}
+
+        if search_text:
+            pattern = {"$regex": re.escape(search_text), "$options": "i"}
+            query["$or"] = [{"stock_symbol": pattern}, {"summary": pattern}, {"analysts": pattern}]
+
+        return query
+
+    def query_reports(self, start_date=None, end_date=None, stock_symbol: Optional[str] = None,
+                      analyst_type: Optional[str] = None, search_text: Optional[str] = None,
+                      analysis_ids: Optional[Iterable[str]] = None,
+                      skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        查询历史记录列表
+
+        过滤、排序和分页都在MongoDB中完成，只返回摘要字段，不包含报告正文；
+        正文通过 get_report_bodies 在展开详情时单独读取。
+        """
+        if not self.connected:
+            return []
+
+        if analysis_ids is not None:
+            analysis_ids = list(analysis_ids)
+            if not analysis_ids:
+                return []
+
+        try:
+            query = self.build_history_query(start_date, end_date, stock_symbol, analyst_type,
+                                             search_text, analysis_ids)
+            projection = {
+                "_id": 0, "analysis_id": 1, "timestamp": 1, "stock_symbol": 1, "analysts": 1,
+                "research_depth": 1, "status": 1, "summary": 1, "performance": 1,
+            }
+            cursor = self.collection.find(query, projection).sort("timestamp", -1).skip(skip).limit(limit)
+
+            results = []
+            for doc in cursor:
+                results.append({
+                    "analysis_id": doc.get("analysis_id", ""),
+                    "timestamp": doc.get("timestamp", 0),
+                    "stock_symbol": doc.get("stock_symbol", ""),
+                    "analysts": doc.get("analysts", []),
+                    "research_depth": doc.get("research_depth", 1),
+                    "status": doc.get("status", "completed"),
+                    "summary": doc.get("summary", ""),
+                    "performance": doc.get("performance", {}),
+                    "source": "mongodb"
+                })
+
+            logger.info(f"✅ 从MongoDB查询到 {len(results)} 条历史记录")
+            return results
+
+        except Exception as e:
+            logger.error(f"❌ 从MongoDB查询历史记录失败: {e}")
+            return []
+
+    def get_report_bodies(self, analysis_id: str) -> Dict[str, str]:
+        """只读取单条分析的报告正文"""
+        if not self.connected:
+            return {}
+
+        try:
+            doc = self.collection.find_one({"analysis_id": analysis_id}, {"_id": 0, "reports": 1})
+            return (doc or {}).get("reports") or {}
+
+        except Exception as e:
+            logger.error(f"❌ 从MongoDB读取报告正文失败: {e}")
+            return {}
+
+    def get_report_bodies_batch(self, analysis_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """一次查询读取多条分析的报告正文（导出完整数据时调用）"""
+        if not self.connected or not analysis_ids:
+            return {}
+
+        try:
+            cursor = self.collection.find({"analysis_id": {"$in": list(analysis_ids)}},
+                                          {"_id": 0, "analysis_id": 1, "reports": 1})
+            return {doc["analysis_id"]: doc.get("reports") or {} for doc in cursor}
+
+        except Exception as e:
+            logger.error(f"❌ 从MongoDB批量读取报告正文失败: {e}")
+            return {}
+
     def get_report_by_id(self, analysis_id: str) -> Optional[Dict[str, Any]]:
         """根据ID获取单个分析报告"""
         if not self.connected:
@@ -259,6 +371,11 @@ class MongoDBReportManager:
             
             if result.deleted_count > 0:
                 logger.info(f"✅ 已删除分析报告: {analysis_id}")
+                try:
+                    from web.utils.report_search_index import get_report_search_index
+                    get_report_search_index().remove_analysis(analysis_id)
+                except Exception as e:
+                    logger.warning(f"⚠️ 从检索索引中移除报告失败: {e}")
                 return True
             else:
                 logger.warning(f"⚠️ 未找到要删除的报告: {analysis_id}")
@@ -268,6 +385,56 @@ class MongoDBReportManager:
             logger.error(f"❌ 删除分析报告失败: {e}")
             return False
 
+    def _index_for_search(self, document: Dict[str, Any], search_index=None, commit: bool = True):
+        """把报告加入全文检索索引，失败不影响保存"""
+        try:
+            from web.utils.report_search_index import extract_report_texts, get_report_search_index
+
+            search_index = search_index or get_report_search_index()
+            timestamp = document.get("timestamp")
+            search_index.index_analysis(
+                analysis_id=document.get("analysis_id", ""),
+                reports=extract_report_texts(document.get("reports")),
+                stock_symbol=document.get("stock_symbol", ""),
+                timestamp=timestamp.timestamp() if hasattr(timestamp, "timestamp") else (timestamp or 0),
+                summary=document.get("summary", ""),
+                analysts=document.get("analysts", []),
+                commit=commit,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ 报告加入检索索引失败: {e}")
+
+    def ensure_search_index(self, search_index=None, batch_size: int = 200) -> bool:
+        """首次使用全文检索时，把MongoDB中已有的报告回填到索引"""
+        if not self.connected:
+            return False
+
+        try:
+            from web.utils.report_search_index import get_report_search_index
+
+            search_index = search_index or get_report_search_index()
+            if not search_index.available:
+                return False
+            if search_index.is_backfilled("mongodb"):
+                return True
+
+            logger.info("📚 开始回填MongoDB报告检索索引...")
+            projection = {"_id": 0, "analysis_id": 1, "stock_symbol": 1, "timestamp": 1,
+                          "summary": 1, "analysts": 1, "reports": 1}
+            count = 0
+            for doc in self.collection.find({}, projection).batch_size(batch_size):
+                self._index_for_search(doc, search_index, commit=False)
+                count += 1
+                if count % batch_size == 0:
+                    search_index.commit()
+            search_index.commit()
+            search_index.mark_backfilled("mongodb", count)
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ 回填报告检索索引失败: {e}")
+            return False
+
     def get_all_reports(self, limit: int = 1000) -> List[Dict[str, Any]]:
         """获取所有分析报告"""
         if not self.connected:
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+分析报告全文检索
+历史记录页面的关键词搜索原来只匹配股票代码、200字摘要和分析师名称，而且需要先把全部结果加载到内存。
+这里在本地SQLite FTS5中为全部报告（市场/新闻/基本面/辩论/最终决策等）建立倒排索引：
+- 中文按相邻两字切分（二元分词），每段中文的首字和末字另外作为单字记号，英文和数字按单词切分，不依赖分词词典
+- 查询词按同样方式切分后作为短语匹配，等价于子串匹配，不需要扫描报告；
+  中英文相邻处（如“A股”“5G手机”）用边界单字记号衔接，单个汉字与字母数字相邻时同样可以命中
+- 每份报告单独建索引，按 bm25 相关度聚合到分析并分页返回，同时给出命中的报告类型
+- 保存分析结果时增量更新，历史数据在首次使用时回填一次
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import logging
+logger = logging.getLogger(__name__)
+
+# 中日韩统一表意文字（含扩展A区、兼容区）
+_CJK_CHARS = "㐀-䶿一-鿿豈-﫿"
+_TOKEN_PATTERN = re.compile(f"[{_CJK_CHARS}]+|[0-9a-z]+")
+_CJK_RUN = re.compile(f"^[{_CJK_CHARS}]+$")
+
+# full_data 中需要建索引的报告字段
+REPORT_FIELDS = (
+    "market_report", "sentiment_report", "news_report", "fundamentals_report",
+    "investment_debate_state", "investment_plan", "trader_investment_plan",
+    "risk_debate_state", "final_trade_decision",
+)
+
+# 股票代码、摘要和分析师名称单独作为一份“报告”，保持原有搜索范围
+SUMMARY_REPORT = "summary"
+
+# 分词方式变化时递增，已有索引会被清空并重新回填
+TOKENIZER_VERSION = "2"
+
+
+def _cjk_tokens(run: str, leading: bool, trailing: bool) -> List[str]:
+    """一段连续中文的记号：可选的首字单字记号 + 二元切分 + 可选的末字单字记号"""
+    if len(run) == 1:
+        return [run]
+    tokens = [run[0]] if leading else []
+    tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    if trailing:
+        tokens.append(run[-1])
+    return tokens
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    建索引用的分词：中文二元切分，每段中文的首字和末字另外作为单字记号；英文和数字按单词切分
+
+    单字记号让与字母数字相邻的单个汉字（如“A股”中的“股”）也能按短语匹配
+    """
+    tokens = []
+    for run in _TOKEN_PATTERN.findall((text or "").lower()):
+        if _CJK_RUN.match(run):
+            tokens.extend(_cjk_tokens(run, leading=True, trailing=True))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def tokenize_query(term: str) -> List[str]:
+    """
+    查询词分词：与 tokenize 一致，但中文段只在与字母数字相邻的一侧加单字记号
+
+    纯中文的词只用二元记号，因此可以匹配中文段中间的任意位置
+    """
+    runs = _TOKEN_PATTERN.findall((term or "").lower())
+    tokens = []
+    for i, run in enumerate(runs):
+        if _CJK_RUN.match(run):
+            tokens.extend(_cjk_tokens(run, leading=i > 0, trailing=i < len(runs) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """把搜索词转换为FTS5查询：空格分隔的每个词作为短语，多个词之间为AND"""
+    phrases = []
+    for term in (query or "").split():
+        tokens = tokenize_query(term)
+        if not tokens:
+            continue
+        if len(tokens) == 1 and _CJK_RUN.match(tokens[0]) and len(tokens[0]) == 1:
+            # 单个汉字：匹配以该字开头的二元词或单字记号（中文段的末字）
+            phrases.append(f'"{tokens[0]}" *')
+        else:
+            phrases.append('"' + " ".join(tokens) + '"')
+    return " AND ".join(phrases) if phrases else None
+
+
+def _flatten_text(value: Any) -> str:
+    """把辩论状态等嵌套结构展开为文本"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return "\n".join(_flatten_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return "\n".join(_flatten_text(v) for v in value)
+    return str(value)
+
+
+def extract_report_texts(reports: Optional[Dict[str, Any]] = None,
+                         full_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """从报告字典或完整分析数据中提取需要建索引的报告文本"""
+    texts = {}
+    for name, content in (reports or {}).items():
+        text = _flatten_text(content)
+        if text.strip():
+            texts[name] = text
+
+    if isinstance(full_data, dict):
+        sources = [full_data]
+        if isinstance(full_data.get("state"), dict):
+            sources.append(full_data["state"])
+        for source in sources:
+            for field in REPORT_FIELDS:
+                if field not in texts and source.get(field):
+                    text = _flatten_text(source[field])
+                    if text.strip():
+                        texts[field] = text
+    return texts
+
+
+class ReportSearchIndex:
+    """基于SQLite FTS5的报告倒排索引"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = None
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self._db.executescript(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS report_fts USING fts5(tokens, tokenize='unicode61');"
+                "CREATE TABLE IF NOT EXISTS report_docs ("
+                " rowid INTEGER PRIMARY KEY, analysis_id TEXT NOT NULL, report_type TEXT NOT NULL,"
+                " stock_symbol TEXT, timestamp REAL);"
+                "CREATE INDEX IF NOT EXISTS idx_report_docs_analysis ON report_docs (analysis_id);"
+                "CREATE TABLE IF NOT EXISTS search_meta (key TEXT PRIMARY KEY, value TEXT);"
+            )
+            self._db.commit()
+            self._check_tokenizer_version()
+        except Exception as e:
+            # 部分SQLite构建没有FTS5，此时退回原有的摘要搜索
+            logger.warning(f"⚠️ [报告检索] 全文索引不可用: {e}")
+            self._db = None
+
+    @property
+    def available(self) -> bool:
+        return self._db is not None
+
+    def index_analysis(self, analysis_id: str, reports: Dict[str, str], stock_symbol: str = "",
+                       timestamp: float = 0, summary: str = "", analysts: Optional[Iterable[str]] = None,
+                       commit: bool = True):
+        """
+        为一次分析的全部报告建索引，已存在的同ID分析会被替换
+
+        批量回填时传入 commit=False，由调用方定期调用 commit()
+        """
+        if not self.available or not analysis_id:
+            return
+
+        documents = dict(reports)
+        documents[SUMMARY_REPORT] = " ".join([stock_symbol or "", summary or "", " ".join(analysts or [])])
+        try:
+            with self._lock:
+                self._delete(analysis_id)
+                for report_type, text in documents.items():
+                    tokens = tokenize(text)
+                    if not tokens:
+                        continue
+                    cursor = self._db.execute(
+                        "INSERT INTO report_docs (analysis_id, report_type, stock_symbol, timestamp) VALUES (?, ?, ?, ?)",
+                        (analysis_id, report_type, stock_symbol, float(timestamp or 0)),
+                    )
+                    self._db.execute("INSERT INTO report_fts (rowid, tokens) VALUES (?, ?)",
+                                     (cursor.lastrowid, " ".join(tokens)))
+                if commit:
+                    self._db.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ [报告检索] 索引分析 {analysis_id} 失败: {e}")
+
+    def remove_analysis(self, analysis_id: str, commit: bool = True):
+        if not self.available:
+            return
+        with self._lock:
+            self._delete(analysis_id)
+            if commit:
+                self._db.commit()
+
+    def commit(self):
+        if not self.available:
+            return
+        with self._lock:
+            self._db.commit()
+
+    def search(self, query: str, limit: int = 20, offset: int = 0,
+               analysis_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        按相关度返回命中的分析
+
+        Returns:
+            [{'analysis_id', 'score', 'matched_reports', 'stock_symbol', 'timestamp'}]，score越大越相关
+        """
+        match = build_match_query(query)
+        if not self.available or not match:
+            return []
+
+        sql = (
+            "SELECT d.analysis_id, -SUM(m.rank) AS score, GROUP_CONCAT(d.report_type), "
+            "MAX(d.stock_symbol), MAX(d.timestamp) "
+            "FROM (SELECT rowid, rank FROM report_fts WHERE report_fts MATCH ?) m "
+            "JOIN report_docs d ON d.rowid = m.rowid"
+        )
+        params: List[Any] = [match]
+        if analysis_ids is not None:
+            analysis_ids = list(analysis_ids)
+            if not analysis_ids:
+                return []
+            sql += f" WHERE d.analysis_id IN ({', '.join('?' * len(analysis_ids))})"
+            params.extend(analysis_ids)
+        sql += " GROUP BY d.analysis_id ORDER BY score DESC, MAX(d.timestamp) DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+        try:
+            with self._lock:
+                rows = self._db.execute(sql, params).fetchall()
+        except Exception as e:
+            logger.warning(f"⚠️ [报告检索] 查询失败 {query}: {e}")
+            return []
+
+        return [{
+            'analysis_id': analysis_id,
+            'score': score,
+            'matched_reports': sorted(set(report_types.split(','))),
+            'stock_symbol': stock_symbol,
+            'timestamp': timestamp,
+        } for analysis_id, score, report_types, stock_symbol, timestamp in rows]
+
+    def count(self, query: str) -> int:
+        """命中的分析数量"""
+        match = build_match_query(query)
+        if not self.available or not match:
+            return 0
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(DISTINCT d.analysis_id) FROM report_fts "
+                "JOIN report_docs d ON d.rowid = report_fts.rowid WHERE report_fts MATCH ?",
+                (match,),
+            ).fetchone()[0]
+
+    def is_backfilled(self, source: str) -> bool:
+        """指定数据源的历史数据是否已回填"""
+        if not self.available:
+            return True
+        with self._lock:
+            row = self._db.execute("SELECT value FROM search_meta WHERE key = ?", (f"backfill:{source}",)).fetchone()
+        return row is not None
+
+    def mark_backfilled(self, source: str, count: int):
+        if not self.available:
+            return
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO search_meta (key, value) VALUES (?, ?)",
+                             (f"backfill:{source}", json.dumps({'count': count})))
+            self._db.commit()
+        logger.info(f"📚 [报告检索] {source} 历史报告回填完成，共 {count} 个分析")
+
+    def get_stats(self) -> Dict[str, Any]:
+        if not self.available:
+            return {'available': False}
+        with self._lock:
+            analyses, documents = self._db.execute(
+                "SELECT COUNT(DISTINCT analysis_id), COUNT(*) FROM report_docs").fetchone()
+        return {'available': True, 'analyses': analyses, 'documents': documents}
+
+    def _check_tokenizer_version(self):
+        """分词方式变化后清空旧索引和回填标记，由历史目录和MongoDB重新回填"""
+        row = self._db.execute("SELECT value FROM search_meta WHERE key = 'tokenizer_version'").fetchone()
+        if row and row[0] == TOKENIZER_VERSION:
+            return
+        if row or self._db.execute("SELECT 1 FROM report_docs LIMIT 1").fetchone():
+            logger.info(f"📚 [报告检索] 分词方式已更新，重建全文索引")
+        self._db.execute("DELETE FROM report_fts")
+        self._db.execute("DELETE FROM report_docs")
+        self._db.execute("DELETE FROM search_meta WHERE key LIKE 'backfill:%'")
+        self._db.execute("INSERT OR REPLACE INTO search_meta (key, value) VALUES ('tokenizer_version', ?)",
+                         (TOKENIZER_VERSION,))
+        self._db.commit()
+
+    def _delete(self, analysis_id: str):
+        """在持有 self._lock 时调用"""
+        rowids = [row[0] for row in self._db.execute(
+            "SELECT rowid FROM report_docs WHERE analysis_id = ?", (analysis_id,))]
+        if rowids:
+            self._db.executemany("DELETE FROM report_fts WHERE rowid = ?", [(rowid,) for rowid in rowids])
+            self._db.execute("DELETE FROM report_docs WHERE analysis_id = ?", (analysis_id,))
+
+
+_report_search_index = None
+_report_search_index_lock = threading.Lock()
+
+
+def get_report_search_index() -> ReportSearchIndex:
+    """获取全局报告检索索引，索引文件保存在 web/data/analysis_results/report_search.db"""
+    global _report_search_index
+    if _report_search_index is None:
+        with _report_search_index_lock:
+            if _report_search_index is None:
+                db_path = Path(__file__).parent.parent / "data" / "analysis_results" / "report_search.db"
+                _report_search_index = ReportSearchIndex(str(db_path))
+    return _report_search_index